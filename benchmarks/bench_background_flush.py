@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+Benchmark for the background flush mode of FileStorage.
+
+Runs a burst of updates, each followed by a save as the console
+`update` command does, with synchronous saves and with the background
+thread coalescing the saves over several flush intervals. The time
+includes the final flush().
+
+Usage:
+    python3 -m benchmarks.bench_background_flush [objects] [updates]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def run(count, updates, **options):
+    """
+    Returns the time of a burst of updates against a new storage.
+
+    Args:
+        count (int): The number of objects in storage.
+        updates (int): The number of updates, each followed by a save.
+        options: Keyword arguments of FileStorage.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"), **options)
+        with patch("models.storage", storage):
+            places = [Place() for _ in range(count)]
+            storage.save()
+            storage.flush()
+            start = time.perf_counter()
+            for i in range(updates):
+                place = places[i % count]
+                place.number_rooms = i
+                place.save()
+            storage.flush()
+            elapsed = time.perf_counter() - start
+        storage.close()
+    return elapsed
+
+
+def main(count, updates):
+    """
+    Runs the benchmark for several flush intervals.
+
+    Args:
+        count (int): The number of objects in storage.
+        updates (int): The number of updates.
+    """
+    print(f"objects: {count}, updates: {updates}")
+    sync = run(count, updates)
+    print(f"synchronous:          {sync:8.3f} s")
+    for interval in (0.01, 0.1, 1):
+        elapsed = run(count, updates, flush_interval=interval)
+        print(f"flush interval {interval:<5}  {elapsed:8.3f} s"
+              f"  ({sync / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+"""
+Benchmark for the batches of FileStorage.
+
+Creates users and saves each one with obj.save(), as a script loading
+data does, without a batch, in a batch and in a transaction, with the
+JSON file, the journal and SQLite, for several numbers of users: each
+save rewrites the whole file without a batch, so the time per user
+grows with the number of users, while a batch writes once.
+
+Usage:
+    python3 -m benchmarks.bench_batch [users ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from unittest.mock import patch
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.user import User
+
+
+def load(storage, users, block):
+    """
+    Creates and saves users one at a time.
+
+    Args:
+        storage (FileStorage): The storage.
+        users (int): The number of users.
+        block (callable): Returns the context manager of the load.
+
+    Returns:
+        float: The time of the load in seconds.
+    """
+    start = time.perf_counter()
+    with patch("models.storage", storage):
+        with block():
+            for i in range(users):
+                user = User()
+                user.first_name = f"User {i}"
+                user.save()
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    """
+    Runs the benchmark against temporary storages.
+
+    Args:
+        sizes (list): The numbers of users to load.
+    """
+    for name, make in (
+            ("json", lambda path: FileStorage(path + ".json")),
+            ("journal", lambda path: FileStorage(path + ".json",
+                                                 journal=True)),
+            ("sqlite", lambda path: DBStorage(path + ".db"))):
+        print(f"{name}:")
+        for users in sizes:
+            times = []
+            for mode in ("none", "batch", "transaction"):
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    storage = make(os.path.join(tmp_dir, "bench"))
+                    block = {"none": nullcontext, "batch": storage.batch,
+                             "transaction": storage.transaction}[mode]
+                    times.append(load(storage, users, block))
+                    storage.close()
+            print(f"  {users:6} users: without batch {times[0] * 1000:9.1f}"
+                  f" ms  batch {times[1] * 1000:7.1f} ms  transaction "
+                  f"{times[2] * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [500, 1000, 2000])
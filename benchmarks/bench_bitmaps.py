@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+"""
+Benchmark for the bitmap indexes of FileStorage.
+
+Stores places with random amenities, then compares scanning
+storage.all(Place) with the Place.amenity_ids BitmapIndex for the
+places with wifi, a pool and parking, with wifi or a pool but no
+parking, and for the same amenities combined with a price condition
+in a query.
+
+Usage:
+    python3 -m benchmarks.bench_bitmaps [places] [amenities]
+"""
+
+import os
+import random
+import sys
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def main(places, amenities):
+    """
+    Runs the benchmark against a temporary storage.
+
+    Args:
+        places (int): The number of places.
+        amenities (int): The number of amenities, every place having
+                         each with a probability of one in four.
+    """
+    rng = random.Random(0)
+    amenity_ids = [f"amenity-{i}" for i in range(amenities)]
+    wifi, pool, parking = amenity_ids[:3]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"))
+        with patch("models.storage", storage):
+            for _ in range(places):
+                place = Place()
+                place.price_by_night = rng.randrange(10, 1000)
+                place.amenity_ids = [amenity for amenity in amenity_ids
+                                     if rng.random() < 0.25]
+
+        def scan_all():
+            return [obj for obj in storage.all(Place).values()
+                    if wifi in obj.amenity_ids and pool in obj.amenity_ids
+                    and parking in obj.amenity_ids]
+
+        def index_all():
+            return storage.having(Place, "amenity_ids",
+                                  all_of=[wifi, pool, parking])
+
+        def scan_any():
+            return [obj for obj in storage.all(Place).values()
+                    if (wifi in obj.amenity_ids or pool in obj.amenity_ids)
+                    and parking not in obj.amenity_ids]
+
+        def index_any():
+            return storage.having(Place, "amenity_ids", any_of=[wifi, pool],
+                                  none_of=[parking])
+
+        def scan_query():
+            return [obj for obj in scan_all() if obj.price_by_night < 100]
+
+        def index_query():
+            return storage.query(Place) \
+                .where("amenity_ids", "has", wifi) \
+                .where("amenity_ids", "has", pool) \
+                .where("amenity_ids", "has", parking) \
+                .where("price_by_night", "<", 100).all()
+
+        for scan, index in ((scan_all, index_all), (scan_any, index_any),
+                            (scan_query, index_query)):
+            assert sorted(scan(), key=id) == sorted(index(), key=id)
+        print(f"places: {places}, amenities: {amenities}, "
+              f"with all three: {len(index_all())}")
+        for name, scan, index in (
+                ("wifi and pool and parking", scan_all, index_all),
+                ("(wifi or pool) and not parking", scan_any, index_any),
+                ("all three and price < 100", scan_query, index_query)):
+            print(f"{name}:")
+            print(f"  scan:  {timed(scan) * 1000:10.3f} ms")
+            print(f"  index: {timed(index) * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 20)
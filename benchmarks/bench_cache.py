@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""
+Benchmark for the bounded cache of instances of FileStorage.
+
+Saves places, then reloads them eagerly, lazily and with caches of
+1000 and 10000 instances, and measures with tracemalloc the memory
+held after the reload and after streaming every place through
+iterate(), which creates every instance. Then times get() on random
+places, 90% of them among a hot 1% of the places, and prints the
+hit ratio of these calls with every cache.
+
+Usage:
+    python3 -m benchmarks.bench_cache [places]
+"""
+
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+MODES = (
+    ("eager", {}),
+    ("lazy", {"lazy": True}),
+    ("cache 10000", {"cache_size": 10000}),
+    ("cache 1000", {"cache_size": 1000}),
+)
+
+
+def main(places, gets=100000):
+    """
+    Runs the benchmark against a temporary storage.
+
+    Args:
+        places (int): The number of places.
+        gets (int): The number of get() calls.
+    """
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.json")
+        storage = FileStorage(path)
+        with patch("models.storage", storage):
+            ids = []
+            for i in range(places):
+                place = Place()
+                place.name = f"Place {i}"
+                place.price_by_night = rng.randrange(10, 1000)
+                ids.append(place.id)
+            storage.save()
+        del storage, place
+        hot = ids[:places // 100]
+        workload = [rng.choice(hot) if rng.random() < 0.9 else rng.choice(ids)
+                    for _ in range(gets)]
+        print(f"places: {places}")
+        for name, options in MODES:
+            gc.collect()
+            tracemalloc.start()
+            storage = FileStorage(path, **options)
+            storage.reload()
+            loaded = tracemalloc.get_traced_memory()[0] / 2 ** 20
+            for _ in storage.iterate(Place):
+                pass
+            streamed = tracemalloc.get_traced_memory()[0] / 2 ** 20
+            tracemalloc.stop()
+            before = storage.cache_stats()
+            start = time.perf_counter()
+            for place_id in workload:
+                storage.get(Place, place_id)
+            elapsed = time.perf_counter() - start
+            ratio = ""
+            if before is not None:
+                hits = storage.cache_stats()["hits"] - before["hits"]
+                ratio = f"  hit ratio {hits / gets:.2f}"
+            print(f"  {name:12} after reload {loaded:7.1f} MiB"
+                  f"  after iterate {streamed:7.1f} MiB"
+                  f"  get {elapsed / gets * 1e6:6.2f} µs{ratio}")
+            storage.close()
+            del storage
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
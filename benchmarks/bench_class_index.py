@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+"""
+Benchmark for the class index of FileStorage.
+
+Stores many reviews and a few places, then compares the console
+`count Review` and `all Place` scans over storage.all() with
+count(cls) and all(cls).
+
+Usage:
+    python3 -m benchmarks.bench_class_index [reviews] [places]
+"""
+
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+
+
+def main(reviews, places):
+    """
+    Runs the benchmark against a temporary storage.
+
+    Args:
+        reviews (int): The number of reviews.
+        places (int): The number of places.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"))
+        with patch("models.storage", storage):
+            for _ in range(reviews):
+                Review()
+            for _ in range(places):
+                Place()
+
+        def scan_count():
+            return sum(1 for obj in storage.all().values()
+                       if obj.__class__.__name__ == "Review")
+
+        def scan_all():
+            return [str(obj) for obj in storage.all().values()
+                    if obj.__class__.__name__ == "Place"]
+
+        cases = [
+            ("count Review, scan", scan_count),
+            ("count Review, index", lambda: storage.count("Review")),
+            ("all Place, scan", scan_all),
+            ("all Place, index",
+             lambda: [str(obj) for obj in storage.all("Place").values()]),
+        ]
+        print(f"reviews: {reviews}, places: {places}")
+        for name, func in cases:
+            print(f"{name:<20} {timed(func) * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 100)
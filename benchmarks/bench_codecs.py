@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+"""
+Benchmark matrix of the FileStorage codecs.
+
+For every codec and compressed variant, and for every number of
+objects, measures the time of a full save (every object serialized),
+the time of a reload and the size of the file.
+
+Usage:
+    python3 -m benchmarks.bench_codecs [number of objects ...]
+    (10000, 100000 and 1000000 objects by default)
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+from models.engine.codecs import CODECS
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+from models.user import User
+
+
+def make_objects(count):
+    """
+    Creates users, places and reviews that refer to each other.
+
+    Args:
+        count (int): The number of objects.
+    """
+    objects = []
+    with patch("models.storage", FileStorage(os.devnull)):
+        for i in range(count):
+            if i % 10 == 0:
+                obj = User()
+                obj.email = f"user{i}@example.com"
+            elif i % 10 == 1:
+                obj = Place()
+                obj.user_id = objects[-1].id
+                obj.name = f"Place {i}"
+                obj.price_by_night = i % 300
+                obj.latitude = 37.0 + i % 1000 / 1000
+            else:
+                obj = Review()
+                obj.user_id = objects[-(i % 10)].id
+                obj.text = f"Review {i} of a nice place"
+            objects.append(obj)
+    return objects
+
+
+def main(sizes):
+    """
+    Runs the benchmark for every codec and number of objects.
+
+    Args:
+        sizes (list): The numbers of objects.
+    """
+    names = list(CODECS)
+    names += [f"{name}+{method}" for name in ("json-compact", "pickle")
+              for method in ("gzip", "lzma")]
+    print(f"{'codec':<20} {'objects':>9} {'save s':>8} {'reload s':>9} "
+          f"{'size MiB':>9}")
+    for count in sizes:
+        objects = make_objects(count)
+        for name in names:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "bench")
+                storage = FileStorage(path, snapshot_format=name)
+                for obj in objects:
+                    storage.new(obj)
+                start = time.perf_counter()
+                storage.save()
+                save = time.perf_counter() - start
+                del storage
+                gc.collect()
+
+                storage = FileStorage(path, snapshot_format=name)
+                start = time.perf_counter()
+                storage.reload()
+                reload = time.perf_counter() - start
+                del storage
+                gc.collect()
+                size = os.path.getsize(path) / 2 ** 20
+            print(f"{name:<20} {count:>9} {save:>8.2f} {reload:>9.2f} "
+                  f"{size:>9.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""
+Benchmark for the SQLite storage engine.
+
+Saves places into the JSON file of FileStorage, its journal and a
+DBStorage database, then compares the time to save one changed place,
+to delete one place and to reload every place, and the size of the
+files. Also times a query of the places of one city run directly on
+the database, which uses the index of the city_id column.
+
+Usage:
+    python3 -m benchmarks.bench_db_storage [places]
+"""
+
+import glob
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+ENGINES = (
+    ("json file", FileStorage, "bench.json", {}),
+    ("journal", FileStorage, "bench.json", {"journal": True}),
+    ("sqlite", DBStorage, "bench.db", {}),
+)
+
+
+def main(places):
+    """
+    Runs the benchmark against temporary storages.
+
+    Args:
+        places (int): The number of places, in places // 100 cities.
+    """
+    rng = random.Random(0)
+    cities = [f"city-{i}" for i in range(max(places // 100, 1))]
+    print(f"places: {places}")
+    for name, engine, file_name, options in ENGINES:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, file_name)
+            storage = engine(path, **options)
+            with patch("models.storage", storage):
+                for i in range(places):
+                    place = Place()
+                    place.name = f"Place {i}"
+                    place.city_id = rng.choice(cities)
+                    place.price_by_night = rng.randrange(10, 1000)
+                storage.save()
+                prices = itertools.count()
+
+                def update():
+                    place.price_by_night = next(prices) % 1000
+                    storage.save()
+
+                objects = iter(list(storage.all().values()))
+
+                def delete():
+                    storage.delete(next(objects))
+                    storage.save()
+
+                save = timed(update, 20)
+                remove = timed(delete, 20)
+                storage.close()
+            size = sum(os.path.getsize(file)
+                       for file in glob.glob(path + "*")) / 2 ** 20
+
+            def reload():
+                loaded = engine(path, **options)
+                loaded.reload()
+                loaded.close()
+
+            print(f"  {name:10} save one change {save * 1000:8.3f} ms"
+                  f"  delete one {remove * 1000:8.3f} ms"
+                  f"  reload {timed(reload, 3) * 1000:8.1f} ms"
+                  f"  files {size:6.1f} MiB")
+            if engine is DBStorage:
+                connection = sqlite3.connect(path)
+                query = timed(lambda: connection.execute(
+                    "SELECT data FROM Place WHERE city_id = ?",
+                    (cities[0],)).fetchall(), 100)
+                connection.close()
+                print(f"  sqlite places of one city: {query * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""
+Benchmark for the dirty tracking of FileStorage.
+
+Compares the time of FileStorage.save() when a single object changed
+(with the fragment cache, clean objects reuse their serialized form)
+with the time of a save where every object is dirty, which is what
+every save costs without the fragment cache.
+
+Usage:
+    python3 -m benchmarks.bench_dirty_tracking [number of objects]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def timed(func, repeat=5):
+    """
+    Returns the best wall-clock time of func over several runs.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(count):
+    """
+    Runs the benchmark against a temporary storage file.
+
+    Args:
+        count (int): The number of objects in storage.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"),
+                              fragment_cache=True)
+        with patch("models.storage", storage):
+            places = [Place() for _ in range(count)]
+            storage.save()
+
+            def save_one_dirty():
+                places[0].name = "renamed"
+                storage.save()
+
+            def save_all_dirty():
+                for place in places:
+                    storage.touch(place)
+                storage.save()
+
+            one = timed(save_one_dirty)
+            every = timed(save_all_dirty)
+    print(f"objects: {count}")
+    print(f"save, 1 dirty object:   {one * 1000:9.2f} ms")
+    print(f"save, all objects dirty: {every * 1000:9.2f} ms")
+    print(f"speedup: {every / one:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
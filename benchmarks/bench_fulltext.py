@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""
+Benchmark for the full-text index of FileStorage.
+
+Stores reviews of random words, then compares a substring scan of
+every review with search() for a two-word search, and a reload
+followed by the first search, which builds the text index, reading
+the persisted index or tokenizing every text.
+
+Usage:
+    python3 -m benchmarks.bench_fulltext [reviews]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.file_storage import FileStorage
+from models.review import Review
+
+
+def main(reviews):
+    """
+    Runs the benchmark against a temporary storage.
+
+    Args:
+        reviews (int): The number of reviews.
+    """
+    rng = random.Random(0)
+    words = [f"word{i}" for i in range(5000)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.json")
+        storage = FileStorage(path, snapshot_format="json-compact")
+        with patch("models.storage", storage):
+            for _ in range(reviews):
+                Review().text = " ".join(rng.choices(words, k=30))
+        storage.save()
+
+        def scan():
+            return [obj for obj in storage.all(Review).values()
+                    if " word12 " in f" {obj.text} "
+                    and " word345 " in f" {obj.text} "]
+
+        def search():
+            return storage.search(Review, "word12 word345")
+
+        assert sorted(scan(), key=id) == sorted(search(), key=id)
+        print(f"reviews: {reviews}, matches: {len(search())}")
+        print(f"scan:   {timed(scan) * 1000:10.3f} ms")
+        print(f"search: {timed(search) * 1000:10.3f} ms")
+        storage.close()  # writes the text index
+
+        def reload():
+            start = time.perf_counter()
+            reloaded = FileStorage(path, snapshot_format="json-compact")
+            reloaded.reload()
+            reloaded.search(Review, "word12 word345")
+            return time.perf_counter() - start
+
+        print(f"reload and search, persisted index: {reload():8.3f} s")
+        os.remove(path + ".fts")
+        print(f"reload and search, rebuilt index:   {reload():8.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""
+Benchmark for the durable saves of FileStorage.
+
+Several threads each change an object and save it, as concurrent
+clients would. The saves are run without fsync, with an fsync per
+save, and with group commit, where the saves made while a write is
+in progress share the next write and fsync.
+
+Usage:
+    python3 -m benchmarks.bench_group_commit [threads] [saves per thread]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def run(threads, saves, **options):
+    """
+    Returns the number of saves per second of concurrent threads.
+
+    Args:
+        threads (int): The number of threads.
+        saves (int): The number of saves of each thread.
+        options: Keyword arguments of FileStorage.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"), **options)
+        with patch("models.storage", storage):
+            places = [Place() for _ in range(1000)]
+            storage.save()
+
+            def client(place):
+                for i in range(saves):
+                    place.number_rooms = i
+                    storage.save()
+
+            workers = [threading.Thread(target=client, args=(places[i],))
+                       for i in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            storage.flush()
+            elapsed = time.perf_counter() - start
+        storage.close()
+    return threads * saves / elapsed
+
+
+def main(threads, saves):
+    """
+    Runs the benchmark with and without fsync and group commit.
+
+    Args:
+        threads (int): The number of threads.
+        saves (int): The number of saves of each thread.
+    """
+    print(f"threads: {threads}, saves per thread: {saves}, objects: 1000")
+    cases = [
+        ("no fsync", {}),
+        ("fsync", {"fsync": True}),
+        ("fsync + group commit", {"fsync": True, "group_commit": True}),
+    ]
+    for name, options in cases:
+        print(f"{name:<22} {run(threads, saves, **options):9.1f} saves/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 50)
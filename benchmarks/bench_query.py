@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""
+Benchmark for the query engine of FileStorage.
+
+Compares an ordered query with a limit (heap top-k) with sorting
+every match, and a query on an indexed attribute with the same
+condition on an attribute that is not indexed (filtered scan).
+
+Usage:
+    python3 -m benchmarks.bench_query [places]
+"""
+
+import os
+import random
+import sys
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def main(count):
+    """
+    Runs the benchmark against a temporary storage.
+
+    Args:
+        count (int): The number of places.
+    """
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"))
+        with patch("models.storage", storage):
+            for i in range(count):
+                place = Place()
+                place.city_id = f"city-{i % 1000}"
+                place.name = place.city_id
+                place.price_by_night = rng.randrange(1000)
+                place.max_guest = rng.randrange(10)
+
+        def sort_all():
+            matches = [place for place in storage.all(Place).values()
+                       if place.max_guest >= 4]
+            matches.sort(key=lambda place: place.price_by_night)
+            return matches[:20]
+
+        def top_k():
+            return storage.query(Place).where("max_guest", ">=", 4) \
+                .order_by("price_by_night").limit(20).all()
+
+        def indexed():
+            return storage.query(Place).where("city_id", "==", "city-7") \
+                .where("max_guest", ">=", 4).all()
+
+        def scanned():
+            return storage.query(Place).where("name", "==", "city-7") \
+                .where("max_guest", ">=", 4).all()
+
+        print(f"places: {count}")
+        print(f"filter + sort + [:20]:  {timed(sort_all) * 1000:9.2f} ms")
+        print(f"query top 20 (heap):    {timed(top_k) * 1000:9.2f} ms")
+        print(f"scan on name:           {timed(scanned) * 1000:9.2f} ms")
+        print(f"index on city_id:       {timed(indexed) * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
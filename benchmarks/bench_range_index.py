@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+Benchmark for the sorted indexes of FileStorage.
+
+Stores places with random prices, then compares scanning
+storage.all(Place) with the Place.price_by_night SortedIndex for a
+price range, the first page of that range in order, the cheapest
+price and a price update.
+
+Usage:
+    python3 -m benchmarks.bench_range_index [places]
+"""
+
+import os
+import random
+import sys
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def main(places):
+    """
+    Runs the benchmark against a temporary storage.
+
+    Args:
+        places (int): The number of places.
+    """
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"))
+        with patch("models.storage", storage):
+            for _ in range(places):
+                Place().price_by_night = rng.randrange(10, 1000)
+
+        def scan_range():
+            return [obj for obj in storage.all(Place).values()
+                    if 100 <= obj.price_by_night <= 110]
+
+        def index_range():
+            return list(storage.range(Place, "price_by_night", 100, 110))
+
+        def scan_page():
+            return sorted(scan_range(),
+                          key=lambda obj: obj.price_by_night)[:20]
+
+        def index_page():
+            return storage.range(Place, "price_by_night", 100, 110).fetch(20)
+
+        def scan_min():
+            return min(obj.price_by_night
+                       for obj in storage.all(Place).values())
+
+        def index_min():
+            return storage.min(Place, "price_by_night")
+
+        place = next(iter(storage.all(Place).values()))
+
+        def update():
+            place.price_by_night = rng.randrange(10, 1000)
+
+        assert sorted(scan_range(), key=id) == sorted(index_range(), key=id)
+        assert scan_min() == index_min()
+        print(f"places: {places}, in range: {len(index_range())}")
+        for name, scan, index in (("range 100-110", scan_range, index_range),
+                                  ("first page", scan_page, index_page),
+                                  ("cheapest", scan_min, index_min)):
+            print(f"{name}:")
+            print(f"  scan:  {timed(scan) * 1000:10.3f} ms")
+            print(f"  index: {timed(index) * 1000:10.3f} ms")
+        print(f"price update (best of 1000): "
+              f"{timed(update, 1000) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
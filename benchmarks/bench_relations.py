@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""
+Benchmark for the relationship graph of FileStorage.
+
+Stores states, cities, places and reviews, then compares expanding
+one state into its cities, places and reviews by scanning
+storage.all() at every level with descendants(), which follows the
+foreign key indexes.
+
+Usage:
+    python3 -m benchmarks.bench_relations [states] [fan-out]
+"""
+
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+from models.state import State
+
+
+def main(states, fan_out):
+    """
+    Runs the benchmark against a temporary storage.
+
+    Args:
+        states (int): The number of states.
+        fan_out (int): The number of children of each state, city
+                       and place.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"))
+        with patch("models.storage", storage):
+            for _ in range(states):
+                state = State()
+                for _ in range(fan_out):
+                    city = City()
+                    city.state_id = state.id
+                    for _ in range(fan_out):
+                        place = Place()
+                        place.city_id = city.id
+                        for _ in range(fan_out):
+                            Review().place_id = place.id
+        foreign_keys = {"City": "state_id", "Place": "city_id",
+                        "Review": "place_id"}
+
+        def scan(parent=state, depth=1):
+            found = []
+            for obj in storage.all().values():
+                attribute = foreign_keys.get(obj.__class__.__name__)
+                if attribute and getattr(obj, attribute) == parent.id:
+                    found.append((depth, obj))
+                    found.extend(scan(obj, depth + 1))
+            return found
+
+        def graph():
+            return list(storage.descendants(state))
+
+        assert scan() == graph()
+        print(f"objects: {storage.count()}, "
+              f"descendants: {len(graph())}")
+        print(f"scan:  {timed(scan) * 1000:10.3f} ms")
+        print(f"graph: {timed(graph) * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5)
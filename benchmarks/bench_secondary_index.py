@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""
+Benchmark for the secondary indexes of FileStorage.
+
+Stores reviews spread over many places, then compares finding the
+reviews of one place by scanning storage.all() with lookup() on the
+Review.place_id index.
+
+Usage:
+    python3 -m benchmarks.bench_secondary_index [reviews] [places]
+"""
+
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.file_storage import FileStorage
+from models.review import Review
+
+
+def main(reviews, places):
+    """
+    Runs the benchmark against a temporary storage.
+
+    Args:
+        reviews (int): The number of reviews.
+        places (int): The number of places they are spread over.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"))
+        with patch("models.storage", storage):
+            for i in range(reviews):
+                Review().place_id = f"place-{i % places}"
+
+        def scan():
+            return [obj for obj in storage.all().values()
+                    if obj.__class__.__name__ == "Review"
+                    and obj.place_id == "place-0"]
+
+        def lookup():
+            return storage.lookup(Review, "place_id", "place-0")
+
+        assert scan() == lookup()
+        print(f"reviews: {reviews}, places: {places}, "
+              f"matches: {len(lookup())}")
+        print(f"scan:   {timed(scan) * 1000:10.3f} ms")
+        print(f"lookup: {timed(lookup) * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+"""
+Benchmark for the shared mode of FileStorage.
+
+Stores users, then times the save of one changed user without and
+with shared mode, and in shared mode when another storage saved the
+file in between, which makes every save merge the file. Then runs
+processes that each save new users one at a time into one file,
+without and with shared mode, and counts the users the file kept
+and the processes that failed, e.g. on the temporary file another
+process renamed.
+
+Usage:
+    python3 -m benchmarks.bench_shared [objects] [processes]
+"""
+
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.file_storage import FileStorage
+from models.user import User
+
+SAVES = 50
+WORKER = """
+import sys
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.user import User
+storage = FileStorage(sys.argv[1], shared=sys.argv[2] == "1")
+storage.reload()
+with patch("models.storage", storage):
+    for _ in range(int(sys.argv[3])):
+        User().save()
+"""
+
+
+def main(objects, processes):
+    """
+    Runs the benchmark against temporary storages.
+
+    Args:
+        objects (int): The number of users stored first.
+        processes (int): The number of concurrent processes.
+    """
+    print(f"objects: {objects}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.json")
+        storage = FileStorage(path)
+        with patch("models.storage", storage):
+            for _ in range(objects):
+                User()
+            storage.save()
+        names = itertools.count()
+        for shared in (False, True):
+            storage = FileStorage(path, shared=shared)
+            storage.reload()
+            user = next(iter(storage.all().values()))
+
+            def update():
+                user.__dict__["first_name"] = f"{next(names)}"
+                storage.touch(user)
+                storage.save()
+
+            print(f"  save one change, shared={shared!s:5}: "
+                  f"{timed(update, 20) * 1000:8.2f} ms")
+        other = FileStorage(path, shared=True)
+        other.reload()
+        keys = list(other.all())
+        users = [storage.all()[keys[0]], other.all()[keys[-1]]]
+
+        def alternate():
+            for obj, target in zip(users, (storage, other)):
+                obj.__dict__["first_name"] = f"{next(names)}"
+                target.touch(obj)
+                target.save()
+
+        print(f"  save one change with a merge:  "
+              f"{timed(alternate, 10) / 2 * 1000:8.2f} ms")
+
+    print(f"{processes} processes saving {SAVES} new users each:")
+    for shared in (False, True):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bench.json")
+            start = time.perf_counter()
+            workers = [subprocess.Popen(
+                [sys.executable, "-c", WORKER, path, str(int(shared)),
+                 str(SAVES)], stderr=subprocess.DEVNULL)
+                for _ in range(processes)]
+            failed = sum(worker.wait() != 0 for worker in workers)
+            elapsed = time.perf_counter() - start
+            storage = FileStorage(path)
+            storage.reload()
+            print(f"  shared={shared!s:5} kept {storage.count(User):5} of "
+                  f"{processes * SAVES} users in {elapsed:.2f} s, "
+                  f"{failed} processes failed")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 4)
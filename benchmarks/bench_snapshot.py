@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+"""
+Benchmark for the snapshots of FileStorage and DBStorage.
+
+Stores places, then times snapshot() and the export of a snapshot,
+for the default storage (which serializes the instances), a storage
+with the fragment cache, a storage with a cache (binary format) and
+DBStorage. Then, in a thread-safe storage with the fragment cache, a
+writer thread changes and saves places, pausing for a millisecond
+between saves, while the objects are exported, once with
+export_json(), which holds the lock, and once from a snapshot,
+counting the saves of the writer during the export.
+
+Usage:
+    python3 -m benchmarks.bench_snapshot [places]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+PAUSE = 0.001
+
+
+def fill(storage, places, rng):
+    """
+    Stores and saves places in a storage.
+
+    Args:
+        storage (FileStorage): The storage.
+        places (int): The number of places.
+        rng (random.Random): The random generator.
+
+    Returns:
+        list: The places.
+    """
+    with patch("models.storage", storage):
+        stored = []
+        for i in range(places):
+            place = Place()
+            place.city_id = f"city-{i // 10}"
+            place.price_by_night = rng.randrange(10, 1000)
+            stored.append(place)
+        storage.save()
+        storage.flush()
+    return stored
+
+
+def export_while_writing(storage, stored, export, rng):
+    """
+    Exports the objects while a writer thread changes and saves them.
+
+    Returns:
+        tuple: The time of the export in seconds and the saves made
+               during it.
+    """
+    saves = [0]
+    stop = threading.Event()
+
+    def write():
+        with patch("models.storage", storage):
+            while not stop.is_set():
+                rng.choice(stored).price_by_night = rng.randrange(10, 1000)
+                storage.save()
+                saves[0] += 1
+                time.sleep(PAUSE)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    time.sleep(0.1)
+    before = saves[0]
+    start = time.perf_counter()
+    export()
+    elapsed = time.perf_counter() - start
+    during = saves[0] - before
+    stop.set()
+    writer.join()
+    return elapsed, during
+
+
+def main(places):
+    """
+    Runs the benchmark against temporary storages.
+
+    Args:
+        places (int): The number of places.
+    """
+    rng = random.Random(0)
+    print(f"places: {places}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.json")
+        export_path = os.path.join(tmp_dir, "export.json")
+        for name, make in (
+                ("default", lambda: FileStorage(path)),
+                ("fragments", lambda: FileStorage(path, fragment_cache=True)),
+                ("cache", lambda: FileStorage(
+                    path, cache_size=places // 10, snapshot_format="binary")),
+                ("DBStorage", lambda: DBStorage(
+                    os.path.join(tmp_dir, "bench.db")))):
+            storage = make()
+            fill(storage, places, rng)
+
+            def export():
+                with storage.snapshot() as snapshot:
+                    snapshot.export_json(export_path)
+
+            print(f"  {name:10} snapshot() "
+                  f"{timed(lambda: storage.snapshot().close(), 5) * 1000:7.2f}"
+                  f" ms  export {timed(export, 1) * 1000:8.2f} ms")
+            storage.close()
+        storage = FileStorage(path, thread_safe=True, journal=True,
+                              fragment_cache=True)
+        stored = fill(storage, places, rng)
+
+        def export_snapshot():
+            with storage.snapshot() as snapshot:
+                snapshot.export_json(export_path)
+
+        print("export while a thread changes and saves places:")
+        for name, export in (
+                ("export_json()", lambda: storage.export_json(export_path)),
+                ("snapshot", export_snapshot)):
+            elapsed, saves = export_while_writing(storage, stored, export,
+                                                  rng)
+            print(f"  {name:14} {elapsed * 1000:8.2f} ms, "
+                  f"{saves:5} saves during the export")
+        storage.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
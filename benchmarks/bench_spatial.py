@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""
+Benchmark for the spatial index of FileStorage.
+
+Stores places spread over the continental United States, then
+compares a scan of storage.all() with within() for a city-sized and
+a state-sized map viewport, and with near() for the places within
+10 km of a point.
+
+Usage:
+    python3 -m benchmarks.bench_spatial [places]
+"""
+
+import os
+import random
+import sys
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.file_storage import FileStorage
+from models.engine.spatial import distance_km
+from models.place import Place
+
+
+def main(places):
+    """
+    Runs the benchmark against a temporary storage.
+
+    Args:
+        places (int): The number of places.
+    """
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"))
+        with patch("models.storage", storage):
+            for _ in range(places):
+                place = Place()
+                place.latitude = rng.uniform(24, 50)
+                place.longitude = rng.uniform(-125, -66)
+
+        def scan_within(south, west, north, east):
+            return [obj for obj in storage.all(Place).values()
+                    if south <= obj.latitude <= north
+                    and west <= obj.longitude <= east]
+
+        def scan_near(latitude, longitude, radius_km):
+            return [obj for obj in storage.all(Place).values()
+                    if distance_km(latitude, longitude,
+                                   obj.latitude, obj.longitude) <= radius_km]
+
+        print(f"places: {places}")
+        for name, box in (("city viewport", (37.7, -122.5, 37.85, -122.3)),
+                          ("state viewport", (36, -124, 40, -119))):
+            assert (sorted(scan_within(*box), key=id)
+                    == sorted(storage.within(Place, *box), key=id))
+            print(f"{name} ({len(scan_within(*box))} places):")
+            print(f"  scan:   {timed(lambda: scan_within(*box)) * 1000:10.3f}"
+                  " ms")
+            print(f"  within: "
+                  f"{timed(lambda: storage.within(Place, *box)) * 1000:10.3f}"
+                  " ms")
+
+        point = (37.77, -122.42, 10)
+        assert (sorted(scan_near(*point), key=id)
+                == sorted(storage.near(Place, *point), key=id))
+        print(f"10 km radius ({len(scan_near(*point))} places):")
+        print(f"  scan:   {timed(lambda: scan_near(*point)) * 1000:10.3f} ms")
+        print(f"  near:   "
+              f"{timed(lambda: storage.near(Place, *point)) * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
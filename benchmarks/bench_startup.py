@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+"""
+Startup benchmark for FileStorage.
+
+Writes a storage file of places and reviews, then reloads it in child
+processes: once as the baseline reload did, parsing the whole file
+with json.load and creating the instances, once with
+FileStorage.reload(), which only builds the indexes of the foreign
+keys, and once with FileStorage.reload() followed by the first use of
+every other index (sorted, text, bitmap and grid), which builds them.
+Each child reports its time and its peak resident memory.
+
+Usage:
+    python3 -m benchmarks.bench_startup [number of objects]
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from benchmarks.bench_streaming_reload import rss_mb
+
+WORDS = ("quiet", "cozy", "view", "beach", "noisy", "clean", "host",
+         "great", "street", "garden", "pool", "downtown")
+
+
+def records(count):
+    """
+    Generates serialized places and reviews, one place for four
+    reviews.
+
+    Args:
+        count (int): The number of records.
+    """
+    rng = random.Random(0)
+    now = datetime.now().isoformat()
+    for i in range(count):
+        record = {
+            "id": f"{i:08d}-0000-4000-8000-000000000000",
+            "created_at": now,
+            "updated_at": now,
+        }
+        if i % 5 == 0:
+            record.update(
+                __class__="Place",
+                city_id=f"{i % 500:08d}-0000-4000-8000-000000000000",
+                user_id=f"{i % 5000:08d}-0000-4000-8000-000000000000",
+                name=f"Place {i}",
+                description=" ".join(rng.choices(WORDS, k=12)),
+                number_rooms=rng.randrange(1, 6),
+                max_guest=rng.randrange(1, 10),
+                price_by_night=rng.randrange(20, 400),
+                latitude=rng.uniform(-60, 60),
+                longitude=rng.uniform(-180, 180),
+                amenity_ids=rng.sample(range(20), 4))
+        else:
+            record.update(
+                __class__="Review",
+                place_id=f"{i // 5 * 5:08d}-0000-4000-8000-000000000000",
+                user_id=f"{i % 5000:08d}-0000-4000-8000-000000000000",
+                text=" ".join(rng.choices(WORDS, k=8)))
+        yield record
+
+
+def write_file(path, count):
+    """
+    Writes a storage file, one record at a time.
+
+    Args:
+        path (str): The path of the file.
+        count (int): The number of records.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("{")
+        for i, record in enumerate(records(count)):
+            key = f"{record['__class__']}.{record['id']}"
+            member = json.dumps({key: record}, indent=4)
+            file.write(("," if i else "") + member[1:-1])
+        file.write("}")
+
+
+def first_use(storage):
+    """
+    Uses every index that is built on first use once.
+
+    Args:
+        storage (FileStorage): The reloaded storage.
+    """
+    from models.place import Place
+    from models.review import Review
+
+    for attribute in Place.sorted_attributes:
+        storage.min(Place, attribute)
+    storage.search(Review, "quiet view", limit=10)
+    storage.search(Place, "beach", limit=10)
+    storage.having(Place, "amenity_ids", all_of=[1, 2])
+    storage.near(Place, 0, 0, 100)
+
+
+def child(mode, path):
+    """
+    Reloads the file in the current process and prints the results.
+
+    Args:
+        mode (str): "baseline", "reload" or "indexes".
+        path (str): The path of the storage file.
+    """
+    from models.engine.file_storage import FileStorage
+
+    start_mb = rss_mb()[0]
+    start = time.perf_counter()
+    if mode == "baseline":
+        classes = FileStorage._classes()
+        with open(path, "r", encoding="utf-8") as file:
+            from_json = json.load(file)
+        objects = {}
+        for key, value in from_json.items():
+            objects[key] = classes[value["__class__"]](**value)
+        del from_json
+    else:
+        storage = FileStorage(path)
+        storage.reload()
+        objects = storage.all()
+        if mode == "indexes":
+            first_use(storage)
+    elapsed = time.perf_counter() - start
+    peak = rss_mb()[1]
+    print(f"{mode:>9}: {len(objects)} objects in {elapsed:6.2f} s, "
+          f"peak {peak - start_mb:8.1f} MiB")
+
+
+def main(count):
+    """
+    Runs the benchmark against a temporary storage file.
+
+    Args:
+        count (int): The number of records in the file.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.json")
+        write_file(path, count)
+        size = os.path.getsize(path) / 2 ** 20
+        print(f"records: {count}, file size: {size:.1f} MiB")
+        for mode in ("baseline", "reload", "indexes"):
+            subprocess.run(
+                [sys.executable, "-m", __spec__.name, "--child", mode, path],
+                check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
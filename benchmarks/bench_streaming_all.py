@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""
+Benchmark for the streaming output of the console 'all' command.
+
+Stores places, then prints 'all Place' into a sink that records the
+time of its first write, once as the former command did (building the
+list of every string, then printing its repr) and once with the
+streaming command. tracemalloc, which slows both down, measures the
+memory allocated on top of the stored objects. Pages of 20 places are
+printed from the middle of the table with
+'all Place limit=20 after=<cursor>'.
+
+Usage:
+    python3 -m benchmarks.bench_streaming_all [places ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from console import HBNBCommand
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+class Sink:
+    """
+    A stdout that discards the output and records the time of the
+    first write.
+    """
+
+    def __init__(self):
+        """
+        Initializes the sink.
+        """
+        self.first = None
+
+    def write(self, text):
+        """
+        Discards the text.
+        """
+        if self.first is None:
+            self.first = time.perf_counter()
+        return len(text)
+
+    def flush(self):
+        """
+        Does nothing.
+        """
+
+
+def measure(func):
+    """
+    Runs func with stdout replaced by a sink.
+
+    Returns:
+        tuple: (seconds to the first write, seconds in total,
+                peak KiB allocated).
+    """
+    sink = Sink()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with patch("sys.stdout", sink):
+        func()
+    end = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 10
+    tracemalloc.stop()
+    return sink.first - start, end - start, peak
+
+
+def main(counts):
+    """
+    Runs the benchmark against temporary storages.
+
+    Args:
+        counts (list): The numbers of places.
+    """
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            storage = FileStorage(os.path.join(tmp_dir, "bench.json"))
+            with patch("models.storage", storage), \
+                    patch("console.storage", storage):
+                places = [Place() for _ in range(count)]
+                console = HBNBCommand()
+
+                def former():
+                    print([str(obj) for obj in storage.all(Place).values()])
+
+                def streaming():
+                    console.onecmd("all Place")
+
+                cursor = f"Place.{sorted(p.id for p in places)[count // 2]}"
+
+                def page():
+                    with patch("sys.stdout", Sink()):
+                        console.onecmd(f"all Place limit=20 after={cursor}")
+
+                page()  # sorts the keys once
+                print(f"places: {count}")
+                for name, func in (("former", former),
+                                   ("streaming", streaming)):
+                    first, total, peak = measure(func)
+                    print(f"  {name:9}  first output {first * 1000:9.3f} ms"
+                          f"  total {total * 1000:9.1f} ms"
+                          f"  peak {peak:10.1f} KiB")
+                print(f"  page of 20 from the middle: "
+                      f"{timed(page) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
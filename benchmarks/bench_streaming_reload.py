@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+"""
+Memory benchmark for the streaming reload of FileStorage.
+
+Writes a storage file of Review records, then reloads it in child
+processes, once by parsing the whole file with json.load before
+creating the instances (the former reload) and once with
+FileStorage.reload(), which creates each instance as soon as its
+record is parsed and keeps no serialized form of it. A third child
+reloads with the fragment cache, which also keeps the serialized
+form of every instance so that saves only serialize the changed
+objects. A fourth one creates the same instances without reading any
+file, which gives the size of the objects alone. Each child reports
+its peak and final resident memory.
+
+Usage:
+    python3 -m benchmarks.bench_streaming_reload [number of records]
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+
+def records(count):
+    """
+    Generates serialized Review objects.
+
+    Args:
+        count (int): The number of records.
+    """
+    now = datetime.now().isoformat()
+    for i in range(count):
+        yield {
+            "id": f"{i:08d}-0000-4000-8000-000000000000",
+            "created_at": now,
+            "updated_at": now,
+            "place_id": f"{i % 1000:08d}-0000-4000-8000-000000000000",
+            "user_id": f"{i % 5000:08d}-0000-4000-8000-000000000000",
+            "text": f"Review number {i}",
+            "__class__": "Review",
+        }
+
+
+def write_file(path, count):
+    """
+    Writes a storage file of Review records, one record at a time.
+
+    Args:
+        path (str): The path of the file.
+        count (int): The number of records.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("{")
+        for i, record in enumerate(records(count)):
+            member = json.dumps({f"Review.{record['id']}": record}, indent=4)
+            file.write(("," if i else "") + member[1:-1])
+        file.write("}")
+
+
+def rss_mb():
+    """
+    Returns the current and the peak resident memory in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as file:
+            pages = int(file.read().split()[1])
+        current = pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        current = float("nan")
+    return current, peak
+
+
+def child(mode, path):
+    """
+    Reloads the file in the current process and prints the results.
+
+    Args:
+        mode (str): "objects", "json.load", "streaming" or
+                    "fragments".
+        path (str): The path of the storage file, or the number
+                    of records in "objects" mode.
+    """
+    from models.engine.file_storage import FileStorage
+    from models.review import Review
+
+    start_mb = rss_mb()[0]
+    start = time.perf_counter()
+    if mode == "objects":
+        objects = {}
+        for record in records(int(path)):
+            objects[f"Review.{record['id']}"] = Review(**record)
+    elif mode == "json.load":
+        with open(path, "r", encoding="utf-8") as file:
+            from_json = json.load(file)
+        objects = {key: Review(**value) for key, value in from_json.items()}
+        del from_json
+    else:
+        storage = FileStorage(path, fragment_cache=mode == "fragments")
+        storage.reload()
+        objects = storage.all()
+    elapsed = time.perf_counter() - start
+    current, peak = rss_mb()
+    print(f"{mode:>10}: {len(objects)} objects in {elapsed:6.2f} s, "
+          f"peak {peak - start_mb:8.1f} MiB, "
+          f"final {current - start_mb:8.1f} MiB")
+
+
+def main(count):
+    """
+    Runs the benchmark against a temporary storage file.
+
+    Args:
+        count (int): The number of records in the file.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.json")
+        write_file(path, count)
+        size = os.path.getsize(path) / 2 ** 20
+        print(f"records: {count}, file size: {size:.1f} MiB")
+        for mode, arg in (("objects", str(count)), ("json.load", path),
+                          ("streaming", path), ("fragments", path)):
+            subprocess.run(
+                [sys.executable, "-m", __spec__.name, "--child", mode, arg],
+                check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
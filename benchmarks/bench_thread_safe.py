@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+"""
+Benchmark for the thread-safe mode of FileStorage.
+
+Stores places, ten per city, then times get(), an attribute change
+and all(Place) without and with thread-safe mode, and runs reader
+threads (get() and lookup()) next to a writer thread (attribute
+changes and new places) for a second, counting the operations of each
+side with the reader-writer lock and with an exclusive lock taken for
+the reads too.
+
+Usage:
+    python3 -m benchmarks.bench_thread_safe [places] [readers]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.engine.file_storage import FileStorage
+from models.engine.locking import ReadWriteLock
+from models.place import Place
+
+DURATION = 1
+
+
+def fill(storage, places, rng):
+    """
+    Stores places in a storage.
+
+    Args:
+        storage (FileStorage): The storage.
+        places (int): The number of places.
+        rng (random.Random): The random generator.
+
+    Returns:
+        list: The places.
+    """
+    with patch("models.storage", storage):
+        stored = []
+        for i in range(places):
+            place = Place()
+            place.city_id = f"city-{i // 10}"
+            place.price_by_night = rng.randrange(10, 1000)
+            stored.append(place)
+    return stored
+
+
+def mixed(storage, stored, readers, rng):
+    """
+    Runs reader threads next to a writer thread.
+
+    Returns:
+        tuple: The reads and writes per second.
+    """
+    counts = [0] * (readers + 1)
+    stop = threading.Event()
+
+    def read(slot):
+        while not stop.is_set():
+            place = rng.choice(stored)
+            storage.get(Place, place.id)
+            storage.lookup(Place, "city_id", place.city_id)
+            counts[slot] += 2
+
+    def write():
+        with patch("models.storage", storage):
+            while not stop.is_set():
+                rng.choice(stored).price_by_night = rng.randrange(10, 1000)
+                Place().city_id = "city-0"
+                counts[readers] += 2
+
+    threads = [threading.Thread(target=read, args=(i,))
+               for i in range(readers)]
+    threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts[:readers]) / DURATION, counts[readers] / DURATION
+
+
+def main(places, readers):
+    """
+    Runs the benchmark against temporary storages.
+
+    Args:
+        places (int): The number of places.
+        readers (int): The number of reader threads.
+    """
+    rng = random.Random(0)
+    print(f"places: {places}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.json")
+        for name, options in (("plain", {}),
+                              ("thread-safe", {"thread_safe": True})):
+            storage = FileStorage(path, **options)
+            stored = fill(storage, places, rng)
+            place = stored[0]
+
+            def update():
+                place.price_by_night = rng.randrange(10, 1000)
+
+            with patch("models.storage", storage):
+                get = timed(lambda: storage.get(Place, place.id), 10000)
+                print(f"  {name:12} get {get * 1e6:.2f} µs"
+                      f"  set attribute {timed(update, 10000) * 1e6:.2f} µs"
+                      f"  all(Place) "
+                      f"{timed(lambda: storage.all(Place)) * 1000:.2f} ms")
+        print(f"{readers} reader threads and one writer for {DURATION} s:")
+        for name, read in (("reader-writer lock", ReadWriteLock.read),
+                           ("exclusive lock", ReadWriteLock.write)):
+            with patch.object(ReadWriteLock, "read", read):
+                storage = FileStorage(path, thread_safe=True)
+            stored = fill(storage, places, rng)
+            reads, writes = mixed(storage, stored, readers, rng)
+            print(f"  {name:18} {reads:10.0f} reads/s"
+                  f"  {writes:8.0f} writes/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 4)
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+"""
+Benchmark for the aggregate views of FileStorage.
+
+Stores states, cities, places and reviews, then compares computing the
+average price of the places of every city, the number of reviews of
+every place and the number of places of every state by scanning
+storage.all() with reading the registered views, and the cost of
+changing a price with and without the views.
+
+Usage:
+    python3 -m benchmarks.bench_views [places]
+"""
+
+import itertools
+import os
+import random
+import sys
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_dirty_tracking import timed
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+from models.state import State
+
+
+def main(places):
+    """
+    Runs the benchmark against a temporary storage.
+
+    Args:
+        places (int): The number of places, with two reviews each,
+                      in places // 100 cities of 50 states.
+    """
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = FileStorage(os.path.join(tmp_dir, "bench.json"))
+        with patch("models.storage", storage):
+            states = [State() for _ in range(50)]
+            cities = [City() for _ in range(max(places // 100, 1))]
+            for city in cities:
+                city.state_id = rng.choice(states).id
+            for _ in range(places):
+                place = Place()
+                place.city_id = rng.choice(cities).id
+                place.price_by_night = rng.randrange(10, 1000)
+                for _ in range(2):
+                    Review().place_id = place.id
+
+            def scan_price():
+                totals = {}
+                for obj in storage.all(Place).values():
+                    total = totals.setdefault(obj.city_id, [0, 0])
+                    total[0] += obj.price_by_night
+                    total[1] += 1
+                return {city_id: total[0] / total[1]
+                        for city_id, total in totals.items()}
+
+            def scan_reviews():
+                counts = {}
+                for obj in storage.all(Review).values():
+                    counts[obj.place_id] = counts.get(obj.place_id, 0) + 1
+                return counts
+
+            def scan_states():
+                counts = {}
+                for obj in storage.all(Place).values():
+                    state_id = storage.get(City, obj.city_id).state_id
+                    counts[state_id] = counts.get(state_id, 0) + 1
+                return counts
+
+            obj = next(iter(storage.all(Place).values()))
+            prices = itertools.count()
+
+            def update():
+                obj.price_by_night = next(prices) % 1000
+
+            without_views = timed(update, 1000)
+            build = timed(lambda: (
+                storage.register_view("price", Place, "city_id", "avg",
+                                      "price_by_night"),
+                storage.register_view("reviews", Review, "place_id"),
+                storage.register_view("states", Place,
+                                      ("city_id", "state_id"))), 1)
+            with_views = timed(update, 1000)
+            print(f"places: {places}, reviews: {2 * places}, "
+                  f"cities: {len(cities)}, states: {len(states)}")
+            print(f"building the three views: {build * 1000:.1f} ms")
+            for name, scan, view in (
+                    ("average price by city", scan_price, "price"),
+                    ("reviews by place", scan_reviews, "reviews"),
+                    ("places by state", scan_states, "states")):
+                results = storage.view(view).results
+                assert scan() == results()
+                print(f"{name}:")
+                print(f"  scan: {timed(scan) * 1000:10.3f} ms")
+                print(f"  view: {timed(results) * 1000:10.3f} ms")
+                get = storage.view(view).get
+                group = next(iter(results()))
+                print(f"  one group: "
+                      f"{timed(lambda: get(group), 1000) * 1e6:8.2f} µs")
+            print(f"price update without views: {without_views * 1e6:.2f} µs"
+                  f", with views: {with_views * 1e6:.2f} µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -10,11 +10,14 @@ objects in the HBNB application.
 
 import ast
 import cmd
+import itertools
 import re
+import sys
 import f_console_functions as cf
 from models import storage
 from models.base_model import BaseModel
 from models.amenity import Amenity
+from models.engine.locking import ConflictError
 from models.city import City
 from models.place import Place
 from models.review import Review
@@ -32,10 +35,20 @@ class HBNBCommand(cmd.Cmd):
     Supported commands include:
         - 'create': Creates a new object.
         - 'show': Displays an object by ID.
+        - 'expand': Displays an object by ID with its descendants.
         - 'destroy': Deletes an object by ID.
-        - 'all': Displays all objects or those of a specific class.
+        - 'all': Displays all objects or those of a specific class,
+          optionally one page at a time.
         - 'update': Updates an object with attributes.
         - 'count': Counts objects of a specific class.
+        - 'near': Displays the objects of a class around a point.
+        - 'within': Displays the objects of a class in a bounding box.
+        - 'search': Displays the objects of a class matching words.
+        - 'view': Displays an aggregate view, e.g. the number of
+          reviews of every place.
+        - '<class name>.where(...)': Queries objects of a class, e.g.
+          Place.where(price_by_night<100, max_guest>=4)
+          .order_by(price_by_night).limit(20)
 
     Attributes:
         prompt (str): The command prompt displayed to the user.
@@ -60,6 +73,13 @@ class HBNBCommand(cmd.Cmd):
         "Place": Place,
         "Review": Review,
     }
+    # aggregate views registered on storage the first time they are read
+    __views = {
+        "average_price_by_city": ("Place", "city_id", "avg",
+                                  "price_by_night"),
+        "reviews_by_place": ("Review", "place_id"),
+        "places_by_state": ("Place", ("city_id", "state_id")),
+    }
 
     def emptyline(self):
         """
@@ -93,7 +113,11 @@ class HBNBCommand(cmd.Cmd):
             cls_name = line.split()[0]
             # create a new instance for the given class
             new_obj = HBNBCommand.__classes[cls_name]()
-            new_obj.save()
+            try:
+                new_obj.save()
+            except ConflictError as e:
+                # the new instance was written with the other changes
+                print(f"** {e} **")
             print(new_obj.id)
 
     def do_count(self, line):
@@ -111,11 +135,7 @@ class HBNBCommand(cmd.Cmd):
             print(err_message)
         else:
             cls_name = line.split()[0]
-            count = 0
-            for obj in storage.all().values():
-                if cls_name == obj.__class__.__name__:
-                    count += 1
-            print(count)
+            print(storage.count(cls_name))
 
     def do_show(self, line):
         """
@@ -134,13 +154,166 @@ class HBNBCommand(cmd.Cmd):
             print(err_message)
         else:
             cls_name, obj_id = line.split()[0:2]
-            all_objects = storage.all()
-            obj_info = cf.id_exists(cls_name, obj_id, all_objects)
-            if obj_info:
-                print(obj_info[1])  # Display string representation of object
+            obj = storage.get(cls_name, obj_id)
+            if obj:
+                print(obj)  # Display string representation of object
+            else:
+                print("** no instance found **")
+
+    def do_expand(self, line):
+        """
+        Displays the string representation of a class instance
+        followed by its descendants, e.g. the cities of a state, their
+        places and the reviews of the places, indented by depth.
+
+        Usage:
+            expand <class name> <id>
+            <class name>.expand(<id>)
+            # replace <class name> and <id> with the actual values
+        """
+        err_message = cf.validate_command_args(line, "expand")
+
+        if err_message:
+            print(err_message)
+        else:
+            cls_name, obj_id = line.split()[0:2]
+            obj = storage.get(cls_name, obj_id)
+            if obj:
+                print(obj)
+                for depth, descendant in storage.descendants(obj):
+                    print("    " * depth + str(descendant))
             else:
                 print("** no instance found **")
 
+    def do_near(self, line):
+        """
+        Displays the instances of a class within a distance
+        of a point, nearest first.
+
+        Usage:
+            near <class name> <latitude> <longitude> <radius km> [limit]
+            <class name>.near(<latitude>, <longitude>, <radius km>)
+            <class name>.near(<latitude>, <longitude>, <radius km>, <limit>)
+        """
+        args = self.__spatial_args(line, "near", (3, 4))
+        if args:
+            cls_name, numbers = args
+            latitude, longitude, radius_km = numbers[:3]
+            limit = None
+            if len(numbers) > 3:
+                if not numbers[3].is_integer():
+                    print(f"** invalid limit: {numbers[3]} **")
+                    return
+                limit = int(numbers[3])
+            try:
+                found = storage.near(cls_name, latitude, longitude,
+                                     radius_km, limit)
+            except ValueError as e:
+                print(f"** {e} **")
+                return
+            print([str(obj) for obj in found])
+
+    def do_within(self, line):
+        """
+        Displays the instances of a class in a bounding box,
+        e.g. the places shown on a map.
+
+        Usage:
+            within <class name> <south> <west> <north> <east>
+            <class name>.within(<south>, <west>, <north>, <east>)
+        """
+        args = self.__spatial_args(line, "within", (4,))
+        if args:
+            cls_name, numbers = args
+            try:
+                found = storage.within(cls_name, *numbers)
+            except ValueError as e:
+                print(f"** {e} **")
+                return
+            print([str(obj) for obj in found])
+
+    def do_search(self, line):
+        """
+        Displays the instances of a class whose text attributes
+        (Review.text, Place.description) contain every word,
+        best match first.
+
+        Usage:
+            search <class name> <words>
+            <class name>.search("<words>")
+        """
+        cmd_args = line.split(maxsplit=1)
+        if not cmd_args:
+            print("** class name missing **")
+        elif cmd_args[0] not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+        elif len(cmd_args) < 2:
+            print("** words missing **")
+        else:
+            try:
+                found = storage.search(cmd_args[0], cmd_args[1])
+            except ValueError:
+                print(f"** {cmd_args[0]} has no text attributes **")
+                return
+            print([str(obj) for obj in found])
+
+    def do_view(self, line):
+        """
+        Displays an aggregate view maintained by storage, such as the
+        average price of the places of every city.
+
+        Usage:
+            view                      # Lists the names of the views,
+                                      # which are built on first use
+            view <view name>          # Displays every group
+            view <view name> <group>  # Displays one group, e.g.
+                                      # view reviews_by_place <place id>
+        """
+        cmd_args = line.split()
+        if not cmd_args:
+            views = storage.views()
+            print(views + [name for name in HBNBCommand.__views
+                           if name not in views])
+            return
+        view = storage.view(cmd_args[0])
+        if view is None and cmd_args[0] in HBNBCommand.__views:
+            view = storage.register_view(
+                cmd_args[0], *HBNBCommand.__views[cmd_args[0]])
+        if view is None:
+            print("** view doesn't exist **")
+        elif len(cmd_args) > 1:
+            print(view.get(cmd_args[1]))
+        else:
+            print(view.results())
+
+    def __spatial_args(self, line, cmd, counts):
+        """
+        Validates the arguments of a spatial search and prints
+        the error, if any.
+
+        Args:
+            line (str): The arguments of the command.
+            cmd (str): The name of the command.
+            counts (tuple): The accepted numbers of numeric arguments.
+
+        Returns:
+            tuple: (class name, numbers), or None on error.
+        """
+        cmd_args = line.split(maxsplit=1)
+        if not cmd_args:
+            print("** class name missing **")
+            return None
+        if cmd_args[0] not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+            return None
+        text = cmd_args[1] if len(cmd_args) > 1 else ""
+        numbers = cf.parse_numbers(text)
+        if numbers is None or len(numbers) not in counts:
+            print(f"** invalid arguments: {text} **\n"
+                  f"Type 'help {cmd}' for its usage.")
+            return None
+        return cmd_args[0], numbers
+
     def do_destroy(self, line):
         """
         Deletes an instance from the file using its id
@@ -155,11 +328,13 @@ class HBNBCommand(cmd.Cmd):
             print(err_message)
         else:
             cls_name, obj_id = line.split()[0:2]
-            all_objects = storage.all()
-            obj_info = cf.id_exists(cls_name, obj_id, all_objects)
-            if obj_info:
-                del all_objects[obj_info[0]]
-                storage.save()
+            obj = storage.get(cls_name, obj_id)
+            if obj:
+                storage.delete(obj)
+                try:
+                    storage.save()
+                except ConflictError as e:
+                    print(f"** {e} **")
             else:
                 print("** no instance found **")
 
@@ -169,26 +344,73 @@ class HBNBCommand(cmd.Cmd):
 
         If no class name is provided, all instances are listed.
         If a class name is provided, only instances of that class are listed.
+        The instances are printed one at a time, so the output starts
+        at once whatever the number of instances.
+
+        With a limit, one page of instances is listed in the order of
+        their ids, followed by the cursor of the next page if there
+        is one: '** next page: after=<class name>.<id> **'.
 
         Usage:
             all                # Lists all instances of all classes
             all <class name>   # Lists all instances of the specified class
             <class name>.all() # Lists all instances of the specified class
+            all [<class name>] limit=<number> [after=<cursor>]
+            <class name>.all(limit=<number>, after=<cursor>)
             # replace <class name> with the actual value
         """
-        obj_ref = storage.all().values()
-        if line:
-            cls_name = line.split()[0]
-            if cls_name in HBNBCommand.__classes:
-                filtered_obj = [str(obj) for obj in obj_ref
-                                if cls_name == obj.__class__.__name__]
-                print(filtered_obj)
-            else:
+        args = line.replace(",", " ").split()
+        cls_name = None
+        if args and "=" not in args[0]:
+            cls_name = args.pop(0)
+            if cls_name not in HBNBCommand.__classes:
                 print("** class doesn't exist **")
-        else:
+                return
+        options = {}
+        for arg in args:
+            name, sep, value = arg.partition("=")
+            if not sep or name not in ("limit", "after"):
+                print(f"** invalid argument: {arg} **")
+                return
+            options[name] = value.strip("'\"")
+        limit = options.get("limit")
+        if limit is not None and not limit.isdigit():
+            print(f"** invalid limit: {limit} **")
+            return
+
+        if not options:
+            self.__print_list(storage.all(cls_name).values())
+            return
+        objects = storage.iterate(cls_name, options.get("after"))
+        if limit is None:
+            self.__print_list(objects)
+            return
+        last = self.__print_list(itertools.islice(objects, int(limit)))
+        if last is not None and next(objects, None) is not None:
+            print(f"** next page: after={last.__class__.__name__}."
+                  f"{last.id} **")
+
+    @staticmethod
+    def __print_list(objects):
+        """
+        Prints instances exactly as print([str(obj) for obj in objects])
+        would, one instance at a time, without building the list.
 
-            all_obj_str = [str(obj) for obj in obj_ref]
-            print(all_obj_str)
+        Args:
+            objects (iterable): The instances.
+
+        Returns:
+            BaseModel: The last instance printed, or None.
+        """
+        write = sys.stdout.write
+        last = None
+        write("[")
+        for obj in objects:
+            write(repr(str(obj)) if last is None
+                  else ", " + repr(str(obj)))
+            last = obj
+        write("]\n")
+        return last
 
     def do_update(self, line):
         """
@@ -207,8 +429,7 @@ class HBNBCommand(cmd.Cmd):
 
         else:
             cls_name, obj_id, attr_data = args.split(maxsplit=2)
-            all_objects = storage.all()
-            obj_info = cf.id_exists(cls_name, obj_id, all_objects)
+            obj = storage.get(cls_name, obj_id)
             try:
                 # Convert string representation of dictionary to a Python dict
                 attr_dict = ast.literal_eval(attr_data)
@@ -221,13 +442,15 @@ class HBNBCommand(cmd.Cmd):
                 attr_value = cf.convert_value_type(attr_value)
                 attr_dict = {attr_name: attr_value}
 
-            if obj_info:
-                obj = obj_info[1]
+            if obj:
                 for attr_name, attr_value in attr_dict.items():
                     attr_name = attr_name.strip('"')
                     if cf.validate_attribute(attr_name):
                         setattr(obj, attr_name, attr_value)
-                obj.save()
+                try:
+                    obj.save()
+                except ConflictError as e:
+                    print(f"** {e} **")
             else:
                 print("** no instance found **")
 
@@ -238,15 +461,26 @@ class HBNBCommand(cmd.Cmd):
         This method checks if the input follows the format
         <class name>.<command>(<arguments>). If it does,
         it runs the corresponding command for the class.
+        Queries starting with <class name>.where(<conditions>) are
+        run by the storage query engine.
         Otherwise, it prints an error message.
         """
+        query = cf.parse_query(line)
+        if query:
+            self.__run_query(*query)
+            return
+
         cmd_dict = {
             "create": self.do_create,
             "count": self.do_count,
             "show": self.do_show,
+            "expand": self.do_expand,
             "destroy": self.do_destroy,
             "all": self.do_all,
             "update": self.do_update,
+            "near": self.do_near,
+            "within": self.do_within,
+            "search": self.do_search,
         }
         cmd_pattern = r"^(\w+)\.(\w+)\(([^\(]*)\)$"
         is_valid_cmd = re.search(cmd_pattern, line)
@@ -265,6 +499,62 @@ class HBNBCommand(cmd.Cmd):
         else:
             print(f"**Invalid syntax: {line}")
 
+    def __run_query(self, cls_name, calls):
+        """
+        Runs a query and prints the matching instances.
+
+        Usage:
+            <class name>.where(<attribute><operator><value>, ...)
+            followed by any of:
+                .order_by(<attribute>)    # or -<attribute> to reverse
+                .limit(<number>)
+                .explain()                # prints the query plan
+            # operators: ==, =, !=, <, <=, >, >=
+            # and has, !has for a value in a list, e.g. amenity_ids has <id>
+
+        Args:
+            cls_name (str): The name of the class.
+            calls (list): The (method name, arguments) of each call.
+        """
+        if cls_name not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+            return
+        query = storage.query(cls_name)
+        explain = False
+        for method, args in calls:
+            args = args.strip()
+            if method == "where":
+                conditions = cf.parse_conditions(args)
+                if conditions is None:
+                    print(f"** invalid condition: {args} **")
+                    return
+                for condition in conditions:
+                    query.where(*condition)
+            elif method == "order_by":
+                attr_name = args.strip("'\"")
+                if not attr_name.lstrip("-").isidentifier():
+                    print(f"** invalid attribute: {args} **")
+                    return
+                query.order_by(attr_name.lstrip("-"),
+                               descending=attr_name.startswith("-"))
+            elif method == "limit" and args.isdigit():
+                query.limit(int(args))
+            elif method == "limit":
+                print(f"** invalid limit: {args} **")
+                return
+            elif method == "explain" and not args:
+                explain = True
+            else:
+                print(
+                    f"{method} is not a valid command"
+                    + "\nType 'help' to display lists of valid commands."
+                )
+                return
+        if explain:
+            print(query.explain())
+        else:
+            print([str(obj) for obj in query.all()])
+
 
 if __name__ == "__main__":
     HBNBCommand().cmdloop()
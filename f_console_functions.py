@@ -21,6 +21,14 @@ Functions:
 
     - extract_valid_args(line): Extracts valid arguments from
       a formatted input string.
+
+    - parse_query(line): Splits a query such as
+      Place.where(max_guest>=4).limit(20) into its method calls.
+
+    - parse_conditions(text): Parses the conditions of a where() call.
+
+    - parse_numbers(text): Parses the numbers of a near() or
+      within() call.
 """
 
 
@@ -54,6 +62,7 @@ def validate_command_args(line, cmd):
         "create": [msg0, msg1],
         "count": [msg0, msg1],
         "show": [msg0, msg1, msg2],
+        "expand": [msg0, msg1, msg2],
         "destroy": [msg0, msg1, msg2],
         "update": [msg0, msg1, msg2, msg3, msg4],
     }
@@ -63,7 +72,7 @@ def validate_command_args(line, cmd):
     if cmd_args[0] not in classes and cmd not in ["create", "count"]:
         return err_msg[cmd][1]  # class doesn't exist
 
-    if len(cmd_args) < 2 and cmd in ["show", "destroy", "update"]:
+    if len(cmd_args) < 2 and cmd in ["show", "expand", "destroy", "update"]:
         return err_msg[cmd][2]  # instance id missing
 
     if (cmd in ["create", "count"] and
@@ -182,3 +191,74 @@ def extract_valid_args(line):
             return " ".join(second_match.groups())
 
     return line
+
+
+def parse_query(line):
+    """
+    Splits a chained query into the class name and the method calls,
+    e.g. Place.where(max_guest>=4).order_by(price_by_night).limit(20).
+
+    Args:
+        line (str): The input line.
+
+    Returns:
+        tuple: (class name, [(method name, arguments), ...]), or None
+        if the line is not a query starting with where().
+    """
+    query_pattern = r"^(\w+)((?:\.\w+\([^()]*\))+)$"
+    call_pattern = r"\.(\w+)\(([^()]*)\)"
+    is_query = re.match(query_pattern, line.strip())
+    if not is_query:
+        return None
+    calls = re.findall(call_pattern, is_query.group(2))
+    if calls[0][0] != "where":
+        return None
+    return is_query.group(1), calls
+
+
+def parse_conditions(text):
+    """
+    Parses the comma-separated conditions of a where() call,
+    e.g. 'price_by_night<100, name="My house", amenity_ids has 1a2b'.
+
+    Args:
+        text (str): The arguments of the where() call.
+
+    Returns:
+        list: A list of (attribute, operator, value) tuples, with
+        "=" read as "==", quoted values kept as strings and the others
+        converted by convert_value_type, or None if the text is not a
+        list of conditions.
+    """
+    cond_pattern = (r'\s*(\w+)\s*(==|!=|<=|>=|<|>|=|(?<=\s)!?has(?=\s))'
+                    r'\s*("[^"]*"|\'[^\']*\'|[^,"\']*[^,"\'\s])\s*')
+    if not re.fullmatch(rf"(?:{cond_pattern}(?:,{cond_pattern})*)?", text):
+        return None
+    conditions = []
+    for attr_name, op, value in re.findall(cond_pattern, text):
+        if not attr_name.isidentifier():
+            return None
+        if value[0] in "\"'":
+            value = value[1:-1]
+        else:
+            value = convert_value_type(value)
+        conditions.append((attr_name, "==" if op == "=" else op, value))
+    return conditions
+
+
+def parse_numbers(text):
+    """
+    Parses numbers separated by commas or spaces,
+    e.g. '37.77, -122.42, 5'.
+
+    Args:
+        text (str): The arguments of the command.
+
+    Returns:
+        list: The numbers as floats, or None if an argument
+        is not a number.
+    """
+    try:
+        return [float(number) for number in text.replace(",", " ").split()]
+    except ValueError:
+        return None
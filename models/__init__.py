@@ -1,4 +1,27 @@
+from os import getenv
 from models.engine.file_storage import FileStorage
 
-storage = FileStorage()
+options = {
+    "lazy": getenv("HBNB_STORAGE_LAZY") == "1",
+    "flush_interval":
+        float(getenv("HBNB_STORAGE_FLUSH_INTERVAL") or 0) or None,
+    "checksum": getenv("HBNB_STORAGE_CHECKSUM") == "1",
+    "fsync": getenv("HBNB_STORAGE_FSYNC") == "1",
+    "group_commit": getenv("HBNB_STORAGE_GROUP_COMMIT") == "1",
+    "cache_size": int(getenv("HBNB_STORAGE_CACHE_SIZE") or 0) or None,
+    "cache_bytes": int(getenv("HBNB_STORAGE_CACHE_BYTES") or 0) or None,
+    "thread_safe": getenv("HBNB_STORAGE_THREAD_SAFE") == "1",
+}
+if getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage(getenv("HBNB_STORAGE_DB"), **options)
+else:
+    storage = FileStorage(
+        journal=getenv("HBNB_STORAGE_JOURNAL") == "1",
+        sharded=getenv("HBNB_STORAGE_SHARDED") == "1",
+        snapshot_format=getenv("HBNB_STORAGE_FORMAT", "json"),
+        shared=getenv("HBNB_STORAGE_SHARED") == "1",
+        fragment_cache=getenv("HBNB_STORAGE_FRAGMENT_CACHE") == "1",
+        **options,
+    )
 storage.reload()
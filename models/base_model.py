@@ -17,8 +17,29 @@ class BaseModel:
         id (str): A unique identifier for the instance.
         created_at (datetime): The time the instance was created.
         updated_at (datetime): The time the instance was last updated.
+        indexed_attributes (tuple): The names of the attributes
+                                    FileStorage indexes for lookup().
+        sorted_attributes (tuple): The names of the attributes
+                                   FileStorage keeps in order for
+                                   range searches.
+        text_attributes (tuple): The names of the attributes
+                                 FileStorage indexes by word for
+                                 search().
+        list_attributes (tuple): The names of the attributes holding
+                                 lists of values FileStorage indexes
+                                 in bitmaps for having().
+        spatial_attributes (tuple): The names of the latitude and
+                                    longitude attributes FileStorage
+                                    indexes for near() and within(),
+                                    if any.
     """
 
+    indexed_attributes = ()
+    sorted_attributes = ()
+    text_attributes = ()
+    list_attributes = ()
+    spatial_attributes = ()
+
     def __init__(self, *args, **kwargs):
         """
         Initializes a new BaseModel instance.
@@ -30,21 +51,35 @@ class BaseModel:
                       otherwise generates default values.
         """
         if kwargs:
+            # the instance is not in storage yet, so bypass __setattr__
             for key, value in kwargs.items():
-                if key == "created_at":
-                    self.created_at = datetime.fromisoformat(value)
-                elif key == "updated_at":
-                    self.updated_at = datetime.fromisoformat(value)
+                if key in ("created_at", "updated_at"):
+                    self.__dict__[key] = datetime.fromisoformat(value)
                 elif key == "__class__":
                     continue
                 else:
-                    setattr(self, key, value)
+                    self.__dict__[key] = value
         else:
             self.id = str(uuid4())
             self.created_at = datetime.now()
             self.updated_at = self.created_at
             models.storage.new(self)
 
+    def __setattr__(self, name, value):
+        """
+        Sets an attribute and marks the instance as dirty in storage,
+        so that the next save re-serializes it. The storage is told
+        first, so an open transaction keeps the form to roll back to.
+
+        Note:
+            In-place changes to mutable attributes (e.g. appending to a
+            list) are not detected until the attribute is reassigned
+            or the instance is saved.
+        """
+        models.storage.changing(self)
+        super().__setattr__(name, value)
+        models.storage.touch(self, name)
+
     def __str__(self):
         """
         Returns a string representation of the instance.
@@ -57,8 +92,13 @@ class BaseModel:
     def save(self):
         """
         Updates the 'updated_at' attribute and saves the instance to storage.
+
+        The whole instance is indexed again, since an attribute may have
+        been changed in place, e.g. an item appended to a list, without
+        going through __setattr__.
         """
         self.updated_at = datetime.now()
+        models.storage.touch(self)
         models.storage.save()
 
     def to_dict(self):
@@ -15,7 +15,10 @@ class City(BaseModel):
     Attributes:
         state_id (str): The state identifier where the city is located.
         name (str): The name of the city.
+        indexed_attributes (tuple): The attributes indexed by storage.
     """
 
+    indexed_attributes = ("state_id",)
+
     state_id = ""
     name = ""
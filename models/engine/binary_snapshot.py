@@ -0,0 +1,254 @@
+#!/usr/bin/python3
+"""
+This module contains the BinarySnapshot class, a compact binary
+file format for FileStorage that is read through a memory map and
+decoded one record at a time.
+
+Layout (all integers little-endian):
+    header:   b"HBNBBIN" + version (u8)
+    records:  repeated u32 length + record, ended by u32 0xFFFFFFFF
+    strings:  u32 count + repeated u32 length + UTF-8 bytes
+    footer:   u64 offset of the string table + b"HBNBEND"
+
+A record is a u16 field count followed by the fields. A field is
+the string table index of its name (u32), a type tag (u8) and a
+payload. Class names and the values of foreign key attributes
+(names ending with "_id") are stored once in the string table and
+referenced by index.
+"""
+
+import io
+import json
+import mmap
+import struct
+
+MAGIC = b"HBNBBIN"
+VERSION = 1
+FOOTER_MAGIC = b"HBNBEND"
+END_OF_RECORDS = 0xFFFFFFFF
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_FIELD = struct.Struct("<IB")
+
+
+class BinarySnapshot:
+    """
+    Encodes and decodes FileStorage records in the binary format.
+
+    The string table belongs to the instance: it is extended by
+    encode() and by read(), so encoded records stay valid for every
+    later write() of the same instance.
+
+    Attributes:
+        strings (list): The string table.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty string table.
+        """
+        self.strings = []
+        self.__index = {}
+
+    def intern(self, string):
+        """
+        Returns the index of a string in the string table,
+        adding it if needed.
+
+        Args:
+            string (str): The string to intern.
+        """
+        index = self.__index.get(string)
+        if index is None:
+            index = self.__index[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+    def encode(self, value):
+        """
+        Encodes a serialized object into a record.
+
+        Args:
+            value (dict): The serialized object (output of to_dict()).
+
+        Returns:
+            bytes: The record.
+        """
+        parts = [_U16.pack(len(value))]
+        for name, field in value.items():
+            ref = self.intern(name)
+            if isinstance(field, str):
+                if name == "__class__" or name.endswith("_id"):
+                    parts.append(_FIELD.pack(ref, ord("S")))
+                    parts.append(_U32.pack(self.intern(field)))
+                else:
+                    data = field.encode("utf-8")
+                    parts.append(_FIELD.pack(ref, ord("s")))
+                    parts.append(_U32.pack(len(data)) + data)
+            elif isinstance(field, bool) or field is None:
+                tag = {True: "T", False: "F", None: "N"}[field]
+                parts.append(_FIELD.pack(ref, ord(tag)))
+            elif isinstance(field, int) and -2 ** 63 <= field < 2 ** 63:
+                parts.append(_FIELD.pack(ref, ord("i")))
+                parts.append(_I64.pack(field))
+            elif isinstance(field, float):
+                parts.append(_FIELD.pack(ref, ord("f")))
+                parts.append(_F64.pack(field))
+            else:
+                data = json.dumps(field).encode("utf-8")
+                parts.append(_FIELD.pack(ref, ord("j")))
+                parts.append(_U32.pack(len(data)) + data)
+        return b"".join(parts)
+
+    def decode(self, record, strings=None):
+        """
+        Decodes a record into a serialized object.
+
+        Args:
+            record (bytes): The record.
+            strings (list): The string table the record refers to,
+                            by default the one of the instance.
+
+        Returns:
+            dict: The serialized object.
+        """
+        if strings is None:
+            strings = self.strings
+        (count,) = _U16.unpack_from(record, 0)
+        pos = _U16.size
+        value = {}
+        for _ in range(count):
+            ref, tag = _FIELD.unpack_from(record, pos)
+            pos += _FIELD.size
+            tag = chr(tag)
+            if tag == "S":
+                (index,) = _U32.unpack_from(record, pos)
+                field = strings[index]
+                pos += _U32.size
+            elif tag in "sj":
+                (length,) = _U32.unpack_from(record, pos)
+                pos += _U32.size
+                field = record[pos:pos + length].decode("utf-8")
+                if tag == "j":
+                    field = json.loads(field)
+                pos += length
+            elif tag == "i":
+                (field,) = _I64.unpack_from(record, pos)
+                pos += _I64.size
+            elif tag == "f":
+                (field,) = _F64.unpack_from(record, pos)
+                pos += _F64.size
+            elif tag in "TFN":
+                field = {"T": True, "F": False, "N": None}[tag]
+            else:
+                raise ValueError(f"unknown field type {tag!r}")
+            value[strings[ref]] = field
+        return value
+
+    def write(self, file, records):
+        """
+        Writes a snapshot file.
+
+        Args:
+            file (file): A binary file opened for writing.
+            records (iterable): Records returned by encode().
+        """
+        file.write(MAGIC + _U8.pack(VERSION))
+        offset = len(MAGIC) + _U8.size
+        for record in records:
+            file.write(_U32.pack(len(record)))
+            file.write(record)
+            offset += _U32.size + len(record)
+        file.write(_U32.pack(END_OF_RECORDS))
+        offset += _U32.size
+        # a copy, as strings may be interned by another thread meanwhile
+        strings = list(self.strings)
+        file.write(_U32.pack(len(strings)))
+        for string in strings:
+            data = string.encode("utf-8")
+            file.write(_U32.pack(len(data)) + data)
+        file.write(_U64.pack(offset) + FOOTER_MAGIC)
+
+    def read(self, file):
+        """
+        Iterates over the records of a snapshot file, through a
+        memory map when the file is a regular file. The strings of the
+        file are added to the string table of the instance, and records
+        are re-encoded when the two tables do not agree.
+
+        Args:
+            file (file): A binary file opened for reading.
+
+        Yields:
+            tuple: (key, value, record) for each record, where value
+                   is the decoded object and record its encoded form.
+
+        Raises:
+            ValueError: If the file is not a valid snapshot.
+        """
+        data = None
+        # compressed streams also have a fileno(), of the compressed file
+        if isinstance(file, (io.BufferedReader, io.FileIO)):
+            # map the bytes the file object ends at, not the whole file
+            size = file.seek(0, io.SEEK_END)
+            file.seek(0)
+            try:
+                if size:
+                    data = mmap.mmap(file.fileno(), size,
+                                     access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                pass
+        if data is None:
+            data = file.read()
+        try:
+            yield from self.__read_records(data)
+        except (struct.error, IndexError, UnicodeError) as e:
+            raise ValueError(f"corrupted binary snapshot: {e}")
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def __read_records(self, mm):
+        """
+        Loads the string table of a file and iterates over its records.
+
+        Args:
+            mm (mmap.mmap|bytes): The content of the file.
+        """
+        footer_size = _U64.size + len(FOOTER_MAGIC)
+        if (mm[:len(MAGIC)] != MAGIC or len(mm) < len(MAGIC) + footer_size
+                or mm[-len(FOOTER_MAGIC):] != FOOTER_MAGIC):
+            raise ValueError("not a binary snapshot file")
+        version = mm[len(MAGIC)]
+        if version != VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+
+        (pos,) = _U64.unpack_from(mm, len(mm) - footer_size)
+        (count,) = _U32.unpack_from(mm, pos)
+        pos += _U32.size
+        strings = []
+        for _ in range(count):
+            (length,) = _U32.unpack_from(mm, pos)
+            pos += _U32.size
+            strings.append(mm[pos:pos + length].decode("utf-8"))
+            pos += length
+        indexes = [self.intern(string) for string in strings]
+        same_table = indexes == list(range(len(strings)))
+
+        pos = len(MAGIC) + _U8.size
+        while True:
+            (length,) = _U32.unpack_from(mm, pos)
+            pos += _U32.size
+            if length == END_OF_RECORDS:
+                return
+            record = mm[pos:pos + length]
+            pos += length
+            value = self.decode(record, strings)
+            if not same_table:
+                record = self.encode(value)
+            yield f"{value['__class__']}.{value['id']}", value, record
@@ -0,0 +1,247 @@
+#!/usr/bin/python3
+"""
+This module contains the bitmap indexes FileStorage keeps on the list
+attributes of models.
+
+A model declares the attributes holding lists of values in its
+list_attributes class attribute, such as Place.amenity_ids, and
+FileStorage maintains one BitmapIndex per declared attribute as
+objects are added, changed, removed and reloaded.
+
+Every indexed object is numbered, and every value found in the lists
+has a bitmap whose bit n is set when the list of object n contains the
+value. A search for the objects whose list contains all, any or none
+of several values is then a few AND, OR and NOT operations on the
+bitmaps, done on Python integers, whatever the number of objects.
+Numbers freed by removed objects are reused so the bitmaps stay dense.
+
+Lists changed in place (e.g. place.amenity_ids.append(amenity.id))
+are not seen by the index: assign a new list, or call
+storage.touch(place, "amenity_ids").
+"""
+
+import heapq
+import itertools
+from models.engine.query import LIST_TYPES
+
+_BIT_VALUES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class BitmapIndex:
+    """
+    Maps every value found in the lists of one attribute to a bitmap
+    of the objects whose list contains it. Objects whose attribute is
+    not a list, tuple or set are not indexed, and unhashable values
+    are ignored.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty index.
+        """
+        self.__ordinals = {}
+        self.__keys = []
+        self.__free = []
+        self.__values = {}
+        self.__bitmaps = {}
+        self.__counts = {}
+        self.__present = bytearray()
+
+    def __len__(self):
+        """
+        Returns the number of indexed objects.
+        """
+        return len(self.__ordinals)
+
+    def add(self, key, values):
+        """
+        Indexes an object under the values of its list, replacing its
+        previous values.
+
+        Args:
+            key (str): The storage key of the object.
+            values (list): The value of the attribute.
+        """
+        self.remove(key)
+        if not isinstance(values, LIST_TYPES):
+            return
+        distinct = {}
+        for value in values:
+            try:
+                distinct[value] = None
+            except TypeError:
+                continue
+        if self.__free:
+            ordinal = heapq.heappop(self.__free)
+            self.__keys[ordinal] = key
+        else:
+            ordinal = len(self.__keys)
+            self.__keys.append(key)
+        self.__ordinals[key] = ordinal
+        self.__values[key] = tuple(distinct)
+        self.__set(self.__present, ordinal)
+        for value in distinct:
+            bitmap = self.__bitmaps.get(value)
+            if bitmap is None:
+                bitmap = self.__bitmaps[value] = bytearray()
+                self.__counts[value] = 0
+            self.__set(bitmap, ordinal)
+            self.__counts[value] += 1
+
+    def remove(self, key):
+        """
+        Removes an object from the index, if it is indexed.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        ordinal = self.__ordinals.pop(key, None)
+        if ordinal is None:
+            return
+        mask = ~(1 << (ordinal & 7))
+        self.__present[ordinal >> 3] &= mask
+        for value in self.__values.pop(key):
+            self.__counts[value] -= 1
+            if self.__counts[value]:
+                self.__bitmaps[value][ordinal >> 3] &= mask
+            else:
+                del self.__counts[value]
+                del self.__bitmaps[value]
+        self.__keys[ordinal] = None
+        heapq.heappush(self.__free, ordinal)
+
+    def lookup(self, value):
+        """
+        Returns the keys of the objects whose list contains a value.
+
+        Args:
+            value: The value.
+
+        Returns:
+            list: The storage keys, in no particular order.
+        """
+        return self.match(all_of=(value,))
+
+    def match(self, all_of=(), any_of=(), none_of=()):
+        """
+        Returns the keys of the objects whose list contains every value
+        of all_of, at least one value of any_of (if any is given) and
+        no value of none_of.
+
+        Args:
+            all_of (list): The values every list must contain.
+            any_of (list): The values of which every list must
+                           contain one.
+            none_of (list): The values no list may contain.
+
+        Returns:
+            list: The storage keys, in no particular order.
+        """
+        found = int.from_bytes(self.__present, "little")
+        for value in all_of:
+            found &= self.__bitmap(value)
+        if any_of:
+            union = 0
+            for value in any_of:
+                union |= self.__bitmap(value)
+            found &= union
+        for value in none_of:
+            found &= ~self.__bitmap(value)
+        return self.__decode(found)
+
+    def estimate(self, op, value):
+        """
+        Returns the number of objects matching a condition.
+
+        Args:
+            op (str): "has" for the objects whose list contains the
+                      value, "!has" for those whose list does not.
+            value: The value.
+
+        Returns:
+            int: The number of matches, or None if the index
+                 cannot answer the condition.
+        """
+        if op not in ("has", "!has"):
+            return None
+        try:
+            count = self.__counts.get(value, 0)
+        except TypeError:
+            count = 0
+        return count if op == "has" else len(self) - count
+
+    def search(self, op, value):
+        """
+        Returns the keys of the objects matching a condition
+        supported by estimate().
+
+        Args:
+            op (str): "has" or "!has".
+            value: The value.
+
+        Returns:
+            list: The storage keys.
+        """
+        return self.search_all([(op, value)])
+
+    def search_all(self, conditions):
+        """
+        Returns the keys of the objects matching every one of several
+        conditions supported by estimate(), with one AND or NOT per
+        condition.
+
+        Args:
+            conditions (list): The (op, value) of each condition.
+
+        Returns:
+            list: The storage keys.
+        """
+        return self.match(
+            all_of=[value for op, value in conditions if op == "has"],
+            none_of=[value for op, value in conditions if op == "!has"])
+
+    def __bitmap(self, value):
+        """
+        Returns the bitmap of a value as an integer.
+
+        Args:
+            value: The value.
+
+        Returns:
+            int: The bitmap, 0 if no list contains the value.
+        """
+        try:
+            bitmap = self.__bitmaps.get(value, b"")
+        except TypeError:
+            return 0
+        return int.from_bytes(bitmap, "little")
+
+    def __decode(self, bitmap):
+        """
+        Returns the keys of the objects whose bit is set in a bitmap.
+        The bitmap is spelled out as bytes of 0 and 1, one per object,
+        which select the keys without a loop in Python.
+
+        Args:
+            bitmap (int): The bitmap.
+
+        Returns:
+            list: The storage keys.
+        """
+        bits = bin(bitmap)[:1:-1].encode("ascii").translate(_BIT_VALUES)
+        return list(itertools.compress(self.__keys, bits))
+
+    @staticmethod
+    def __set(bitmap, ordinal):
+        """
+        Sets the bit of an object in a bitmap, growing the bitmap
+        if needed.
+
+        Args:
+            bitmap (bytearray): The bitmap.
+            ordinal (int): The number of the object.
+        """
+        byte = ordinal >> 3
+        if byte >= len(bitmap):
+            bitmap.extend(bytes(byte + 1 - len(bitmap)))
+        bitmap[byte] |= 1 << (ordinal & 7)
@@ -0,0 +1,464 @@
+#!/usr/bin/python3
+"""
+This module contains the bounded object cache of FileStorage and the
+on-disk record stores that hold the objects it evicts.
+
+With a cache, FileStorage keeps at most a number of instances, or an
+approximate number of bytes of instances, in memory. The LRUCache
+orders them from the least to the most recently used, and the least
+recently used are evicted: a clean instance is dropped, a changed one
+is written back first. Evicted and not yet loaded objects are kept in
+RecordStores, mappings whose values are pickled into an anonymous
+temporary file and read back on demand, so only their keys and file
+offsets stay in memory.
+"""
+
+import pickle
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+
+COMPACT_MIN_BYTES = 1 << 20  # garbage kept before a compaction
+_LENGTH_BITS = 32  # a position is offset << _LENGTH_BITS | length
+_LENGTH_MASK = (1 << _LENGTH_BITS) - 1
+
+
+def object_size(obj):
+    """
+    Estimates the memory used by an instance: the instance, its
+    attribute dictionary and the values of its attributes.
+
+    Args:
+        obj (BaseModel): The instance.
+
+    Returns:
+        int: The size in bytes.
+    """
+    return (sys.getsizeof(obj) + sys.getsizeof(obj.__dict__)
+            + sum(sys.getsizeof(value) for value in obj.__dict__.values()))
+
+
+class _Segment:
+    """
+    An anonymous temporary file holding records, closed once neither
+    its store nor a view of it uses it anymore.
+    """
+
+    def __init__(self, directory):
+        """
+        Creates the file.
+
+        Args:
+            directory (str): The directory of the file.
+        """
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.end = 0
+
+    def __del__(self):
+        """
+        Closes the file, which removes it.
+        """
+        self.file.close()
+
+    def append(self, data):
+        """
+        Appends a record.
+
+        Args:
+            data (bytes): The record.
+
+        Returns:
+            int: The position of the record, its offset and length
+                 packed in one integer.
+        """
+        self.file.seek(self.end)
+        self.file.write(data)
+        offset, self.end = self.end, self.end + len(data)
+        return offset << _LENGTH_BITS | len(data)
+
+    def read(self, position):
+        """
+        Reads a record.
+
+        Args:
+            position (int): The position returned by append().
+
+        Returns:
+            bytes: The record.
+        """
+        self.file.seek(position >> _LENGTH_BITS)
+        return self.file.read(position & _LENGTH_MASK)
+
+
+class RecordStore(MutableMapping):
+    """
+    A mapping whose values are pickled to an append-only temporary
+    file. Only the keys and the positions of the records are kept in
+    memory. Replaced and removed records are garbage, which is
+    dropped by copying the live records to a new file once there is
+    more garbage than live records.
+
+    A record can also be detached: it leaves the mapping but stays in
+    the file, so attach() can put it back without writing it again,
+    e.g. when an instance created from it is evicted unchanged.
+
+    The methods can be called from several threads.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Initializes an empty store.
+
+        Args:
+            directory (str): The directory of the temporary file,
+                             by default the system temporary directory.
+        """
+        self.__directory = directory
+        self.__segment = _Segment(directory)
+        self.__positions = {}
+        self.__detached = {}
+        self.__live = 0
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        """
+        Returns the number of records in the mapping.
+        """
+        return len(self.__positions)
+
+    def __iter__(self):
+        """
+        Iterates over the keys, in the order they were first stored.
+        """
+        return iter(self.__positions)
+
+    def __contains__(self, key):
+        """
+        Checks whether a key is in the mapping, without reading it.
+        """
+        return key in self.__positions
+
+    def __getitem__(self, key):
+        """
+        Reads the value of a key from the file.
+
+        Raises:
+            KeyError: If the key is not in the mapping.
+        """
+        with self.__lock:
+            data = self.__segment.read(self.__positions[key])
+        return pickle.loads(data)
+
+    def __setitem__(self, key, value):
+        """
+        Appends the value of a key to the file.
+        """
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.__lock:
+            self.__free(key)
+            position = self.__segment.append(data)
+            self.__positions[key] = position
+            self.__live += len(data)
+            self.__compact_if_needed()
+
+    def __delitem__(self, key):
+        """
+        Removes a key.
+
+        Raises:
+            KeyError: If the key is not in the mapping.
+        """
+        with self.__lock:
+            if key not in self.__positions:
+                raise KeyError(key)
+            self.__free(key)
+
+    def pop(self, key, *default):
+        """
+        Removes a key and returns its value, or the default if it is
+        not in the mapping. A detached record of the key is dropped.
+
+        Raises:
+            KeyError: If the key is not in the mapping and there is
+                      no default.
+        """
+        with self.__lock:
+            position = self.__positions.get(key)
+            data = None if position is None else self.__segment.read(
+                position)
+            self.__free(key)
+        if data is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        return pickle.loads(data)
+
+    def detach(self, key):
+        """
+        Removes a key from the mapping but keeps its record.
+
+        Args:
+            key (str): The key.
+        """
+        with self.__lock:
+            position = self.__positions.pop(key, None)
+            if position is not None:
+                self.__detached[key] = position
+
+    def attach(self, key):
+        """
+        Puts a detached record back in the mapping.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            bool: Whether the key had a detached record.
+        """
+        with self.__lock:
+            position = self.__detached.pop(key, None)
+            if position is None:
+                return False
+            self.__positions[key] = position
+            return True
+
+    def copy(self):
+        """
+        Returns a read-only view of the records stored so far, which
+        later changes of the store do not affect.
+
+        Returns:
+            Mapping: The view.
+        """
+        with self.__lock:
+            return _RecordView(self.__segment, dict(self.__positions),
+                               self.__lock)
+
+    def file_size(self):
+        """
+        Returns the size of the file, garbage included.
+        """
+        return self.__segment.end
+
+    def __free(self, key):
+        """
+        Turns the records of a key into garbage. The lock is held.
+        """
+        for positions in (self.__positions, self.__detached):
+            position = positions.pop(key, None)
+            if position is not None:
+                self.__live -= position & _LENGTH_MASK
+
+    def __compact_if_needed(self):
+        """
+        Copies the live and detached records to a new file once there
+        is more garbage than live records. The lock is held, and views
+        keep reading the former file.
+        """
+        garbage = self.__segment.end - self.__live
+        if garbage < max(self.__live, COMPACT_MIN_BYTES):
+            return
+        segment = _Segment(self.__directory)
+        for positions in (self.__positions, self.__detached):
+            for key, position in positions.items():
+                positions[key] = segment.append(
+                    self.__segment.read(position))
+        self.__segment = segment
+
+
+class _RecordView(Mapping):
+    """
+    A read-only copy of the mapping of a RecordStore, reading the
+    records from the file they were in when it was made.
+    """
+
+    def __init__(self, segment, positions, lock):
+        """
+        Initializes the view.
+
+        Args:
+            segment (_Segment): The file of the records.
+            positions (dict): The positions of the records by key.
+            lock (threading.Lock): The lock of the store.
+        """
+        self.__segment = segment
+        self.__positions = positions
+        self.__lock = lock
+
+    def __len__(self):
+        """
+        Returns the number of records.
+        """
+        return len(self.__positions)
+
+    def __iter__(self):
+        """
+        Iterates over the keys.
+        """
+        return iter(self.__positions)
+
+    def __getitem__(self, key):
+        """
+        Reads the value of a key.
+        """
+        with self.__lock:
+            data = self.__segment.read(self.__positions[key])
+        return pickle.loads(data)
+
+
+class LRUCache:
+    """
+    Keeps the keys of the instances FileStorage holds in memory, from
+    the least to the most recently used, and counts the cache hits,
+    misses, evictions and write-backs.
+
+    Attributes:
+        max_objects (int): The largest number of instances, or None.
+        max_bytes (int): The largest estimated size of the instances,
+                         or None.
+        size (int): The estimated size of the instances, in bytes,
+                    measured when they enter the cache (only when
+                    there is a max_bytes).
+        hits (int): The accesses to an instance in memory.
+        misses (int): The instances created from their record.
+        evictions (int): The instances removed from memory.
+        write_backs (int): The evicted instances whose record was
+                           written because they changed.
+    """
+
+    def __init__(self, max_objects=None, max_bytes=None):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_objects (int): The largest number of instances.
+            max_bytes (int): The largest estimated size of the
+                             instances, in bytes.
+
+        Raises:
+            ValueError: If no limit is given or a limit is not positive.
+        """
+        if max_objects is None and max_bytes is None:
+            raise ValueError("a cache needs max_objects or max_bytes")
+        for limit in (max_objects, max_bytes):
+            if limit is not None and limit < 1:
+                raise ValueError(f"invalid cache limit: {limit}")
+        self.max_objects = max_objects
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_backs = 0
+        self.__entries = OrderedDict()
+
+    def __len__(self):
+        """
+        Returns the number of instances in memory.
+        """
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        """
+        Checks whether an instance is in memory.
+        """
+        return key in self.__entries
+
+    def admit(self, key, obj, loaded=False):
+        """
+        Adds an instance as the most recently used.
+
+        Args:
+            key (str): The storage key of the instance.
+            obj (BaseModel): The instance.
+            loaded (bool): Whether it was just created from its record,
+                           which counts as a miss. Otherwise it differs
+                           from its record, if any.
+        """
+        self.discard(key)
+        size = object_size(obj) if self.max_bytes is not None else 0
+        self.__entries[key] = [size, not loaded]
+        self.size += size
+        if loaded:
+            self.misses += 1
+
+    def hit(self, key):
+        """
+        Marks an instance in memory as the most recently used.
+
+        Args:
+            key (str): The storage key of the instance.
+        """
+        if key in self.__entries:
+            self.__entries.move_to_end(key)
+            self.hits += 1
+
+    def touch(self, key):
+        """
+        Marks an instance as changed and most recently used.
+
+        Args:
+            key (str): The storage key of the instance.
+        """
+        entry = self.__entries.get(key)
+        if entry is not None:
+            entry[1] = True
+            self.__entries.move_to_end(key)
+
+    def discard(self, key):
+        """
+        Removes an instance that was deleted or replaced.
+
+        Args:
+            key (str): The storage key of the instance.
+        """
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[0]
+
+    def full(self):
+        """
+        Checks whether an instance must be evicted. The most recently
+        used instance is never evicted, whatever its size.
+        """
+        return len(self.__entries) > 1 and (
+            (self.max_objects is not None
+             and len(self.__entries) > self.max_objects)
+            or (self.max_bytes is not None and self.size > self.max_bytes))
+
+    def evict(self):
+        """
+        Removes the least recently used instance.
+
+        Returns:
+            tuple: (key, changed) where changed tells whether the
+                   instance must be written back.
+        """
+        key, (size, changed) = self.__entries.popitem(last=False)
+        self.size -= size
+        self.evictions += 1
+        if changed:
+            self.write_backs += 1
+        return key, changed
+
+    def stats(self):
+        """
+        Returns the counters of the cache.
+
+        Returns:
+            dict: hits, misses, evictions, write_backs, the number of
+                  objects and the estimated bytes in memory, and the
+                  hit ratio.
+        """
+        accesses = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "write_backs": self.write_backs,
+            "objects": len(self.__entries),
+            "bytes": self.size,
+            "hit_ratio": self.hits / accesses if accesses else None,
+        }
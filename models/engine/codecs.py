@@ -0,0 +1,587 @@
+#!/usr/bin/python3
+"""
+This module contains the codecs FileStorage can use to write its
+file, and the functions that write and auto-detect them.
+
+Every codec turns an object into a "fragment" (its serialized form
+in the codec format, cached by FileStorage for clean objects),
+writes fragments to a file and reads them back one by one, and
+decodes a single fragment back into the serialized object.
+
+Files start with a header line (b"HBNB-CODEC <name>\\n") naming their
+codec, except for two formats that identify themselves: the
+pretty-printed JSON file, which starts with "{", and the binary
+snapshot, which starts with its magic number. Only the codecs that
+read plain data are detected: a pickle or marshal file, which could
+run code or crash the interpreter if it was crafted, is only read
+with a codec of the same kind, i.e. by a storage configured with it.
+
+Codecs:
+    json           JSON with indent=4 (the original file format).
+    json-compact   JSON without indentation, one object per line.
+    orjson         json-compact written with the orjson library
+                   (only available when orjson is installed).
+    pickle         Length-prefixed pickle records.
+    marshal        Length-prefixed marshal records.
+    binary         The BinarySnapshot format.
+
+Any codec name followed by "+gzip" (zlib deflate) or "+lzma" is the
+compressed variant of that codec.
+"""
+
+import gzip
+import io
+import json
+import lzma
+import marshal
+import pickle
+import struct
+from collections.abc import Mapping
+from models.engine.binary_snapshot import BinarySnapshot, MAGIC
+from models.engine.json_stream import (
+    encode_member, iter_object_items, write_object_members)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+HEADER = b"HBNB-CODEC "
+
+_U32 = struct.Struct("<I")
+
+
+class Codec:
+    """
+    Base class of the FileStorage codecs.
+
+    Attributes:
+        name (str): The name of the codec.
+        header (bool): Whether files start with the codec header line.
+        trusted_only (bool): Whether files must come from a trusted
+                             source, so the codec is never detected.
+    """
+
+    name = None
+    header = True
+    trusted_only = False
+
+    def encode(self, key, value):
+        """
+        Returns the fragment of one object.
+
+        Args:
+            key (str): The storage key of the object.
+            value (dict): The serialized object (output of to_dict()).
+        """
+        raise NotImplementedError
+
+    def decode(self, fragment):
+        """
+        Returns the serialized object of a fragment.
+
+        Args:
+            fragment: A fragment returned by encode() or read().
+
+        Returns:
+            dict: The serialized object.
+        """
+        raise NotImplementedError
+
+    def write(self, file, fragments):
+        """
+        Writes fragments to a file, after the header.
+
+        Args:
+            file (file): A binary file opened for writing.
+            fragments (iterable): Fragments returned by encode().
+        """
+        raise NotImplementedError
+
+    def read(self, file):
+        """
+        Iterates over the objects of a file, after the header.
+
+        Args:
+            file (file): A binary file opened for reading.
+
+        Yields:
+            tuple: (key, value, fragment) for each object.
+        """
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    """
+    The original FileStorage format: one JSON object laid out as
+    json.dump(..., indent=4) writes it.
+    """
+
+    name = "json"
+    header = False
+
+    def encode(self, key, value):
+        """
+        Returns the indented text of the member of one object.
+        """
+        return encode_member(key, value)
+
+    def decode(self, fragment):
+        """
+        Parses the member of one object.
+        """
+        (_, value), = json.loads("{" + fragment + "}").items()
+        return value
+
+    def write(self, file, fragments):
+        """
+        Writes the members inside an indented JSON object.
+        """
+        text = io.TextIOWrapper(file, encoding="utf-8")
+        write_object_members(text, fragments)
+        text.flush()
+        text.detach()
+
+    def read(self, file):
+        """
+        Parses the members of the JSON object one at a time.
+        """
+        text = io.TextIOWrapper(file, encoding="utf-8")
+        try:
+            for key, value, member in iter_object_items(
+                    text, with_text=True):
+                yield key, value, "    " + member
+        finally:
+            text.detach()
+
+
+class CompactJsonCodec(Codec):
+    """
+    A JSON object without indentation, with one member per line,
+    so the file can be read back line by line.
+    """
+
+    name = "json-compact"
+
+    def encode(self, key, value):
+        """
+        Returns the compact text of the member of one object.
+        """
+        return json.dumps({key: value}, separators=(",", ":"))[1:-1]
+
+    def decode(self, fragment):
+        """
+        Parses the compact member of one object.
+        """
+        (_, value), = json.loads("{" + fragment + "}").items()
+        return value
+
+    def write(self, file, fragments):
+        """
+        Writes the members inside a JSON object, one per line.
+        """
+        text = io.TextIOWrapper(file, encoding="utf-8")
+        write_object_members(text, fragments)
+        text.flush()
+        text.detach()
+
+    def read(self, file):
+        """
+        Parses the members of the JSON object one line at a time.
+        """
+        for line in file:
+            line = line.rstrip(b",\r\n")
+            if line in (b"{", b"}", b"{}"):
+                continue
+            (key, value), = json.loads(b"{" + line + b"}").items()
+            yield key, value, line.decode("utf-8")
+
+
+class OrjsonCodec(CompactJsonCodec):
+    """
+    The json-compact layout written and parsed with orjson.
+    """
+
+    name = "orjson"
+
+    def encode(self, key, value):
+        """
+        Returns the compact member of one object as bytes.
+        """
+        try:
+            return orjson.dumps({key: value})[1:-1]
+        except TypeError:  # e.g. integers over 64 bits
+            return super().encode(key, value).encode("utf-8")
+
+    def decode(self, fragment):
+        """
+        Parses the compact member of one object.
+        """
+        (_, value), = orjson.loads(b"{" + fragment + b"}").items()
+        return value
+
+    def write(self, file, fragments):
+        """
+        Writes the members inside a JSON object, one per line.
+        """
+        separator = b"{\n"
+        for fragment in fragments:
+            file.write(separator)
+            file.write(fragment)
+            separator = b",\n"
+        file.write(b"{}" if separator == b"{\n" else b"\n}")
+
+    def read(self, file):
+        """
+        Parses the members of the JSON object one line at a time.
+        """
+        for line in file:
+            line = line.rstrip(b",\r\n")
+            if line in (b"{", b"}", b"{}"):
+                continue
+            (key, value), = orjson.loads(b"{" + line + b"}").items()
+            yield key, value, line
+
+
+class PickleCodec(Codec):
+    """
+    Length-prefixed records, each holding a pickled (key, value) pair.
+    Like any pickle, the file must only be loaded from a trusted source.
+    """
+
+    name = "pickle"
+    trusted_only = True
+
+    def dumps(self, item):
+        """
+        Serializes a (key, value) pair.
+        """
+        return pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        """
+        Deserializes a (key, value) pair.
+        """
+        return pickle.loads(data)
+
+    def encode(self, key, value):
+        """
+        Returns the serialized (key, value) pair of one object.
+        """
+        return self.dumps((key, value))
+
+    def decode(self, fragment):
+        """
+        Deserializes the (key, value) pair of one object.
+        """
+        return self.loads(fragment)[1]
+
+    def write(self, file, fragments):
+        """
+        Writes each fragment after its length.
+        """
+        for fragment in fragments:
+            file.write(_U32.pack(len(fragment)))
+            file.write(fragment)
+
+    def read(self, file):
+        """
+        Reads the length-prefixed fragments one at a time.
+        """
+        while True:
+            prefix = file.read(_U32.size)
+            if not prefix:
+                return
+            if len(prefix) < _U32.size:
+                raise ValueError("truncated record")
+            (length,) = _U32.unpack(prefix)
+            fragment = file.read(length)
+            if len(fragment) < length:
+                raise ValueError("truncated record")
+            key, value = self.loads(fragment)
+            yield key, value, fragment
+
+
+class MarshalCodec(PickleCodec):
+    """
+    Length-prefixed records, each holding a marshaled (key, value) pair.
+    marshal is not safe against crafted data either, so the file must
+    only be loaded from a trusted source.
+    """
+
+    name = "marshal"
+
+    def dumps(self, item):
+        """
+        Serializes a (key, value) pair.
+        """
+        return marshal.dumps(item)
+
+    def loads(self, data):
+        """
+        Deserializes a (key, value) pair.
+        """
+        return marshal.loads(data)
+
+
+class BinaryCodec(Codec):
+    """
+    The BinarySnapshot format. The codec keeps the string table of
+    the snapshot, so it must not be shared between storages.
+    """
+
+    name = "binary"
+    header = False
+
+    def __init__(self):
+        """
+        Initializes the codec with an empty string table.
+        """
+        self.snapshot = BinarySnapshot()
+
+    def encode(self, key, value):
+        """
+        Returns the binary record of one object.
+        """
+        return self.snapshot.encode(value)
+
+    def decode(self, record):
+        """
+        Decodes the binary record of one object. The string table
+        only grows, so every record encoded or read stays decodable.
+        """
+        return self.snapshot.decode(record)
+
+    def write(self, file, fragments):
+        """
+        Writes the records and the string table.
+        """
+        self.snapshot.write(file, fragments)
+
+    def read(self, file):
+        """
+        Reads the records through a memory map when possible.
+        """
+        return self.snapshot.read(file)
+
+
+class CompressedCodec(Codec):
+    """
+    Compresses the output of another codec.
+
+    Attributes:
+        inner (Codec): The codec whose output is compressed.
+        method (str): "gzip" or "lzma".
+    """
+
+    methods = {
+        "gzip": lambda file, mode: gzip.GzipFile(
+            fileobj=file, mode=mode, mtime=0),
+        "lzma": lambda file, mode: lzma.LZMAFile(file, mode),
+    }
+
+    def __init__(self, inner, method):
+        """
+        Initializes the codec.
+
+        Args:
+            inner (Codec): The codec whose output is compressed.
+            method (str): "gzip" or "lzma".
+        """
+        self.inner = inner
+        self.method = method
+        self.name = f"{inner.name}+{method}"
+        self.trusted_only = inner.trusted_only
+
+    def encode(self, key, value):
+        """
+        Returns the fragment of the inner codec.
+        """
+        return self.inner.encode(key, value)
+
+    def decode(self, fragment):
+        """
+        Decodes a fragment of the inner codec.
+        """
+        return self.inner.decode(fragment)
+
+    def write(self, file, fragments):
+        """
+        Writes the compressed output of the inner codec.
+        """
+        with self.methods[self.method](file, "wb") as stream:
+            self.inner.write(stream, fragments)
+
+    def read(self, file):
+        """
+        Reads the inner codec from the decompressed stream.
+        """
+        with self.methods[self.method](file, "rb") as stream:
+            try:
+                yield from self.inner.read(stream)
+            except (EOFError, OSError, lzma.LZMAError) as e:
+                raise ValueError(f"corrupted {self.method} stream: {e}")
+
+
+class FragmentRecords(Mapping):
+    """
+    The serialized objects of a class, kept as their fragments and
+    decoded when read. A lazy reload indexes the objects by their
+    fragments, which the storage keeps anyway for its next save, so
+    the parsed objects are not kept as well.
+    """
+
+    def __init__(self, decode, fragments=None):
+        """
+        Initializes the records.
+
+        Args:
+            decode (callable): Turns a fragment into the serialized
+                               object, e.g. Codec.decode.
+            fragments (dict): Optional fragments by key.
+        """
+        self.__decode = decode
+        self.__fragments = fragments or {}
+
+    def __len__(self):
+        """
+        Returns the number of records.
+        """
+        return len(self.__fragments)
+
+    def __iter__(self):
+        """
+        Iterates over the keys, in the order they were added.
+        """
+        return iter(self.__fragments)
+
+    def __contains__(self, key):
+        """
+        Checks whether a key has a record, without decoding it.
+        """
+        return key in self.__fragments
+
+    def __getitem__(self, key):
+        """
+        Decodes the record of a key.
+
+        Raises:
+            KeyError: If the key has no record.
+        """
+        return self.__decode(self.__fragments[key])
+
+    def add(self, key, fragment):
+        """
+        Adds or replaces the record of a key.
+
+        Args:
+            key (str): The storage key of the object.
+            fragment: The fragment of the object.
+        """
+        self.__fragments[key] = fragment
+
+    def pop(self, key, *default):
+        """
+        Removes a key and returns its serialized object, or the
+        default if it has no record.
+
+        Raises:
+            KeyError: If the key has no record and there is no default.
+        """
+        fragment = self.__fragments.pop(key, None)
+        if fragment is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        return self.__decode(fragment)
+
+    def copy(self):
+        """
+        Returns the records as they are, which later changes do not
+        affect. The fragments themselves are shared.
+
+        Returns:
+            FragmentRecords: The copy.
+        """
+        return FragmentRecords(self.__decode, dict(self.__fragments))
+
+
+CODECS = {
+    codec.name: codec
+    for codec in (JsonCodec, CompactJsonCodec, PickleCodec, MarshalCodec,
+                  BinaryCodec)
+}
+if orjson is not None:
+    CODECS[OrjsonCodec.name] = OrjsonCodec
+
+
+def get_codec(name):
+    """
+    Returns a new instance of a codec.
+
+    Args:
+        name (str): The name of the codec, e.g. "pickle+lzma".
+
+    Raises:
+        ValueError: If the codec is unknown or not available.
+    """
+    inner, _, method = name.partition("+")
+    if inner not in CODECS or (method and
+                               method not in CompressedCodec.methods):
+        raise ValueError(f"unknown storage codec: {name}")
+    codec = CODECS[inner]()
+    if method:
+        codec = CompressedCodec(codec, method)
+    return codec
+
+
+def write_file(file, codec, fragments):
+    """
+    Writes the header of a codec and fragments to a file.
+
+    Args:
+        file (file): A binary file opened for writing.
+        codec (Codec): The codec of the fragments.
+        fragments (iterable): Fragments returned by codec.encode().
+    """
+    if codec.header:
+        file.write(HEADER + codec.name.encode("ascii") + b"\n")
+    codec.write(file, fragments)
+
+
+def read_file(file, codec=None):
+    """
+    Detects the codec of a file from its header. A codec that must
+    only read trusted files is used only if the given codec is of the
+    same kind, whatever its compression.
+
+    Args:
+        file (file): A binary file opened for reading.
+        codec (Codec): A codec instance to use if the file is in its
+                       format, e.g. to keep the binary string table.
+
+    Returns:
+        tuple: (codec, items) where items iterates over
+               (key, value, fragment) for each object of the file.
+
+    Raises:
+        ValueError: If the codec named in the header is unknown, or
+                    must only read trusted files and is not the kind
+                    of the given codec.
+    """
+    start = file.read(len(HEADER))
+    if start == HEADER:
+        name = file.readline().rstrip(b"\n").decode("ascii")
+    else:
+        file.seek(0)
+        name = BinaryCodec.name if start.startswith(MAGIC) else JsonCodec.name
+    if codec is None or codec.name != name:
+        detected = get_codec(name)
+        if detected.trusted_only and (
+                codec is None or
+                type(getattr(codec, "inner", codec)) is not
+                type(getattr(detected, "inner", detected))):
+            raise ValueError(f"refusing to read a {name} file: configure "
+                             f"the storage with this format to read it")
+        codec = detected
+    return codec, codec.read(file)
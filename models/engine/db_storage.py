@@ -0,0 +1,369 @@
+#!/usr/bin/python3
+"""
+This module contains the DBStorage class, a storage engine that
+persists the objects in an SQLite database with the standard
+library's sqlite3 module.
+
+DBStorage keeps the objects, their indexes and views in memory like
+FileStorage, and offers the same methods, but a save writes the
+objects that changed since the previous save in one transaction
+instead of rewriting a file, and reload() reads the tables.
+
+Every model class has its own table, named after the class, holding
+the id, the foreign keys (e.g. Place.city_id) in indexed columns and
+the JSON text of the object:
+
+    CREATE TABLE "Place" (id TEXT PRIMARY KEY, city_id, user_id,
+                          data TEXT NOT NULL)
+    CREATE INDEX "Place_city_id" ON "Place" (city_id)
+
+The database is in WAL mode, so a snapshot reads the tables in a read
+transaction of its own connection, which sees the rows as they were
+when it started while the saves commit new ones.
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from models.engine.file_storage import FileStorage
+from models.engine.indexes import foreign_keys
+
+
+class DBStorage(FileStorage):
+    """
+    Handles the storage of objects in an SQLite database.
+
+    Attributes:
+        __path (str): The path to the database file.
+        __tables (dict): The foreign-key columns of the table of every
+                         class, by class name.
+    """
+
+    snapshots = False
+
+    def __init__(self, file_path=None, lazy=False, flush_interval=None,
+                 flush_threshold=1000, checksum=False, fsync=False,
+                 group_commit=False, cache_size=None, cache_bytes=None,
+                 thread_safe=False):
+        """
+        Initializes the storage engine and creates the missing tables.
+
+        Args:
+            file_path (str): Optional path of the database file,
+                             basemodel_file.db by default.
+            lazy (bool): Whether to create instances on first access
+                         instead of on reload.
+            flush_interval (float): If set, the longest time in seconds
+                                    a save waits for the background
+                                    thread to write it.
+            flush_threshold (int): The number of pending saves that
+                                   makes the background thread write
+                                   at once.
+            checksum (bool): Whether to append a checksum trailer to
+                             the file of the text indexes.
+            fsync (bool): Whether every transaction is flushed to the
+                          disk (synchronous=FULL instead of NORMAL).
+            group_commit (bool): Whether a save waits until the
+                                 background thread has written it,
+                                 sharing the transaction with
+                                 concurrent saves.
+            cache_size (int): If set, the largest number of instances
+                              kept in memory.
+            cache_bytes (int): If set, the largest estimated size of
+                               the instances kept in memory, in bytes.
+            thread_safe (bool): Whether several threads use the storage,
+                                in which case its methods hold a
+                                reader-writer lock.
+
+        Raises:
+            ValueError: If a cache limit is not positive.
+            sqlite3.Error: If the database cannot be opened.
+        """
+        self.__path = os.path.abspath(file_path or "basemodel_file.db")
+        self.__fsync = fsync
+        self.__connection = None
+        self.__lock = threading.Lock()
+        parents = foreign_keys(self._classes())
+        self.__tables = {
+            cls_name: [attribute for attribute, _ in parents[cls_name]]
+            for cls_name in parents}
+        super().__init__(self.__path, lazy=lazy,
+                         flush_interval=flush_interval,
+                         flush_threshold=flush_threshold,
+                         checksum=checksum, fsync=fsync,
+                         group_commit=group_commit, cache_size=cache_size,
+                         cache_bytes=cache_bytes, thread_safe=thread_safe)
+        with self.__lock:
+            self.__connect()
+
+    def close(self):
+        """
+        Writes the pending saves and the text indexes, stops the
+        background thread and closes the database. The storage can
+        still be used, and then opens the database again.
+        """
+        super().close()
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+
+    def compact(self):
+        """
+        Writes the pending saves, then rebuilds the database file
+        without its free pages.
+        """
+        super().compact()
+        with self.__lock:
+            self.__connect().execute("VACUUM")
+
+    def _write_changes(self, puts, deletes):
+        """
+        Writes the changes of the saves made since the previous write
+        in one transaction: the changed objects replace their rows and
+        the rows of the removed objects are deleted. If the write
+        fails, none of the changes is written.
+
+        Args:
+            puts (dict): The serialized objects that changed, by key.
+            deletes (set): The keys of the removed objects.
+
+        Raises:
+            sqlite3.Error: If the database cannot be written.
+            TypeError: If an object holds a value JSON cannot encode.
+        """
+        rows = {}
+        for key, value in puts.items():
+            cls_name, _, obj_id = key.partition(".")
+            rows.setdefault(cls_name, []).append(
+                (obj_id, *(self.__column(value.get(attribute))
+                           for attribute in self.__tables[cls_name]),
+                 json.dumps(value, separators=(",", ":"))))
+        removed = {}
+        for key in deletes:
+            cls_name, _, obj_id = key.partition(".")
+            removed.setdefault(cls_name, []).append((obj_id,))
+        if not rows and not removed:
+            return
+        with self.__lock:
+            connection = self.__connect()
+            with connection:  # one transaction, rolled back on error
+                for cls_name, values in rows.items():
+                    columns = ["id", *self.__tables[cls_name], "data"]
+                    connection.executemany(
+                        f'INSERT OR REPLACE INTO "{cls_name}" '
+                        f'({", ".join(columns)}) '
+                        f'VALUES ({", ".join("?" * len(columns))})', values)
+                for cls_name, ids in removed.items():
+                    connection.executemany(
+                        f'DELETE FROM "{cls_name}" WHERE id = ?', ids)
+
+    def _read_changes(self, classes):
+        """
+        Iterates over the rows of the tables of some classes.
+
+        Args:
+            classes (list): The names of the classes.
+
+        Yields:
+            tuple: ("put", key, value, None) for every stored object.
+
+        Raises:
+            ValueError: If a row does not hold valid JSON.
+        """
+        for cls_name in classes:
+            if cls_name not in self.__tables:
+                continue
+            with self.__lock:
+                rows = self.__connect().execute(
+                    f'SELECT id, data FROM "{cls_name}"').fetchall()
+            for obj_id, data in rows:
+                try:
+                    value = json.loads(data)
+                except ValueError as e:
+                    raise ValueError(
+                        f"cannot load {cls_name}.{obj_id}: {e}") from e
+                yield "put", f"{cls_name}.{obj_id}", value, None
+
+    def _snapshot_records(self, puts, deletes):
+        """
+        Returns the objects as they are now: the rows of the tables,
+        read in a transaction started now, with the saves that are not
+        written yet applied over them.
+
+        Args:
+            puts (dict): The serialized objects saved but not written
+                         yet, by key.
+            deletes (set): The keys of the objects removed but not
+                           deleted from the tables yet.
+
+        Returns:
+            Mapping: The serialized objects by key.
+
+        Raises:
+            sqlite3.Error: If the database cannot be read.
+        """
+        with self.__lock:
+            self.__connect()  # creates the tables
+        return _TableSnapshot(self.__path, list(self.__tables), puts,
+                              deletes)
+
+    def _saved_record(self, key):
+        """
+        Returns the serialized object of a key as its row holds it, or
+        None if it has no row.
+
+        Args:
+            key (str): The storage key of the object.
+
+        Returns:
+            dict: The serialized object, or None.
+
+        Raises:
+            sqlite3.Error: If the database cannot be read.
+        """
+        cls_name, _, obj_id = key.partition(".")
+        if cls_name not in self.__tables:
+            return None
+        with self.__lock:
+            row = self.__connect().execute(
+                f'SELECT data FROM "{cls_name}" WHERE id = ?',
+                (obj_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def __connect(self):
+        """
+        Returns the connection to the database, opening it and
+        creating the missing tables and indexes the first time.
+        The lock is held.
+
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+        if self.__connection is not None:
+            return self.__connection
+        connection = sqlite3.connect(self.__path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            f"PRAGMA synchronous={'FULL' if self.__fsync else 'NORMAL'}")
+        with connection:
+            for cls_name, attributes in self.__tables.items():
+                columns = "".join(f", {name}" for name in attributes)
+                connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{cls_name}" '
+                    f'(id TEXT PRIMARY KEY{columns}, data TEXT NOT NULL)')
+                for name in attributes:
+                    connection.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{cls_name}_{name}" '
+                        f'ON "{cls_name}" ({name})')
+        self.__connection = connection
+        return connection
+
+    @staticmethod
+    def __column(value):
+        """
+        Returns the value of a foreign-key column: the value of the
+        attribute if SQLite can store it, else NULL.
+
+        Args:
+            value: The value of the attribute.
+        """
+        if isinstance(value, (str, int, float)) and \
+                not isinstance(value, bool):
+            return value
+        return None
+
+
+class _TableSnapshot(Mapping):
+    """
+    The serialized objects of the tables of a database, read in one
+    read transaction, with changes applied over them. The transaction
+    keeps the rows of that point until close(), so the writes of the
+    meantime go to the write-ahead log and are only checkpointed into
+    the database file afterwards.
+    """
+
+    def __init__(self, path, classes, puts, deletes):
+        """
+        Starts the read transaction.
+
+        Args:
+            path (str): The path of the database file.
+            classes (list): The names of the tables.
+            puts (dict): The serialized objects replacing the rows,
+                         by key.
+            deletes (set): The keys of the rows to leave out.
+        """
+        self.__classes = classes
+        self.__puts = puts
+        self.__deletes = deletes
+        self.__keys = None
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False,
+                                            isolation_level=None)
+        self.__connection.execute("BEGIN")
+        # the transaction sees the database as of its first read
+        self.__connection.execute("SELECT 1 FROM sqlite_master").fetchall()
+
+    def __len__(self):
+        """
+        Returns the number of objects.
+        """
+        return len(self.__key_set())
+
+    def __iter__(self):
+        """
+        Iterates over the keys.
+        """
+        return iter(self.__key_set())
+
+    def __contains__(self, key):
+        """
+        Checks whether an object is in the snapshot.
+        """
+        return key in self.__key_set()
+
+    def __getitem__(self, key):
+        """
+        Returns a new copy of the serialized object of a key.
+
+        Raises:
+            KeyError: If the key is not in the snapshot.
+        """
+        if key in self.__puts:
+            return copy.deepcopy(self.__puts[key])
+        cls_name, _, obj_id = key.partition(".")
+        if key in self.__deletes or cls_name not in self.__classes:
+            raise KeyError(key)
+        with self.__lock:
+            row = self.__connection.execute(
+                f'SELECT data FROM "{cls_name}" WHERE id = ?',
+                (obj_id,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def close(self):
+        """
+        Ends the read transaction and closes the connection.
+        """
+        with self.__lock:
+            self.__connection.close()
+
+    def __key_set(self):
+        """
+        Returns the set of the keys, reading them the first time.
+        """
+        with self.__lock:
+            if self.__keys is None:
+                keys = set(self.__puts)
+                for cls_name in self.__classes:
+                    keys.update(
+                        f"{cls_name}.{obj_id}"
+                        for obj_id, in self.__connection.execute(
+                            f'SELECT id FROM "{cls_name}"'))
+                self.__keys = keys - self.__deletes
+            return self.__keys
@@ -0,0 +1,277 @@
+#!/usr/bin/python3
+"""
+This module contains the functions FileStorage uses to replace its
+files atomically and to verify them on reload.
+
+A file is written to a temporary file next to it, with a name of its
+own so that several processes can save at once, which is renamed over
+the old file once it is complete, so a crash leaves either the old or
+the new file but never a truncated one. A checksum trailer
+(b"\\nHBNB-CRC32 <crc32 in hex> <size>\\n") can be appended to the
+data, and open_verified() checks it before the file is parsed. Files
+without a trailer are read without verification.
+"""
+
+import io
+import os
+import re
+import tempfile
+import zlib
+from contextlib import contextmanager
+
+TRAILER_SIZE = 34
+_TRAILER = re.compile(rb"\nHBNB-CRC32 ([0-9a-f]{8}) ([0-9]{12})\n")
+_CHUNK_SIZE = 1 << 20
+# the permissions of a new file, which mkstemp() does not apply
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_write(path, checksum=True, fsync=False):
+    """
+    Opens a temporary file that replaces a file when the block ends
+    without an exception, and is removed otherwise.
+
+    Args:
+        path (str): The path of the file to replace.
+        checksum (bool): Whether to append the checksum trailer.
+        fsync (bool): Whether to flush the file and its directory to
+                      the disk before returning, so the new content
+                      also survives a power loss.
+
+    Yields:
+        file: A binary file opened for writing.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or None,
+        prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with open(fd, "wb") as file:
+            try:
+                mode = os.stat(path).st_mode & 0o777
+            except FileNotFoundError:
+                mode = 0o666 & ~_UMASK
+            os.chmod(tmp_path, mode)
+            writer = _ChecksumWriter(file)
+            buffered = io.BufferedWriter(writer)
+            yield buffered
+            buffered.flush()
+            if checksum:
+                file.write(b"\nHBNB-CRC32 %08x %012d\n"
+                           % (writer.crc, writer.size))
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        sync_directory(os.path.dirname(path))
+
+
+def sync_directory(path):
+    """
+    Flushes a directory to the disk, so that a rename in it survives
+    a power loss. Does nothing where directories cannot be opened.
+
+    Args:
+        path (str): The path of the directory.
+    """
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def open_verified(path):
+    """
+    Opens a file for reading after checking its checksum trailer.
+
+    Args:
+        path (str): The path of the file.
+
+    Yields:
+        file: A binary file ending before the trailer.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the file does not match its checksum.
+    """
+    with open(path, "rb") as file:
+        size = verify(file)
+        yield io.BufferedReader(_FileSection(file, size))
+
+
+def verify(file):
+    """
+    Checks the checksum trailer of a file.
+
+    Args:
+        file (file): A binary file opened for reading.
+
+    Returns:
+        int: The size of the data before the trailer, or the size of
+             the file if it has no trailer.
+
+    Raises:
+        ValueError: If the file does not match its checksum.
+    """
+    size = os.fstat(file.fileno()).st_size
+    if size < TRAILER_SIZE:
+        return size
+    file.seek(size - TRAILER_SIZE)
+    match = _TRAILER.fullmatch(file.read(TRAILER_SIZE))
+    if not match:
+        return size
+    size -= TRAILER_SIZE
+    if int(match.group(2)) != size:
+        raise ValueError(f"size mismatch: {size} bytes, "
+                         f"trailer says {int(match.group(2))}")
+    file.seek(0)
+    crc = 0
+    remaining = size
+    while remaining:
+        chunk = file.read(min(remaining, _CHUNK_SIZE))
+        if not chunk:
+            raise ValueError("file shrank while it was verified")
+        crc = zlib.crc32(chunk, crc)
+        remaining -= len(chunk)
+    if crc != int(match.group(1), 16):
+        raise ValueError("checksum mismatch")
+    file.seek(0)
+    return size
+
+
+class _ChecksumWriter(io.RawIOBase):
+    """
+    A writable stream that computes the CRC32 of the data written
+    to a file.
+
+    Attributes:
+        crc (int): The CRC32 of the data written so far.
+        size (int): The number of bytes written so far.
+    """
+
+    def __init__(self, file):
+        """
+        Initializes the stream.
+
+        Args:
+            file (file): The binary file the data is written to.
+        """
+        self.file = file
+        self.crc = 0
+        self.size = 0
+
+    def writable(self):
+        """
+        Returns True: the stream is writable.
+        """
+        return True
+
+    def write(self, data):
+        """
+        Writes data to the file.
+
+        Args:
+            data (bytes): The data to write.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.file.write(data)
+        return len(data)
+
+
+class _FileSection(io.RawIOBase):
+    """
+    A readable stream over the first bytes of a file.
+
+    Attributes:
+        size (int): The number of bytes of the section.
+    """
+
+    def __init__(self, file, size):
+        """
+        Initializes the stream at the start of the file.
+
+        Args:
+            file (file): A binary file opened for reading.
+            size (int): The number of bytes of the section.
+        """
+        self.file = file
+        self.size = size
+        self.pos = 0
+
+    def readable(self):
+        """
+        Returns True: the stream is readable.
+        """
+        return True
+
+    def seekable(self):
+        """
+        Returns True: the stream is seekable.
+        """
+        return True
+
+    def fileno(self):
+        """
+        Returns the file descriptor of the file, e.g. to map the
+        section in memory.
+        """
+        return self.file.fileno()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """
+        Moves the position in the section.
+
+        Args:
+            offset (int): The offset.
+            whence (int): What the offset is relative to.
+
+        Returns:
+            int: The new position.
+        """
+        start = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos,
+                 io.SEEK_END: self.size}[whence]
+        self.pos = max(0, min(start + offset, self.size))
+        return self.pos
+
+    def tell(self):
+        """
+        Returns the position in the section.
+        """
+        return self.pos
+
+    def readinto(self, buffer):
+        """
+        Reads bytes of the section into a buffer.
+
+        Args:
+            buffer (bytearray): The buffer to fill.
+
+        Returns:
+            int: The number of bytes read, 0 at the end of the section.
+        """
+        count = min(len(buffer), self.size - self.pos)
+        if count <= 0:
+            return 0
+        self.file.seek(self.pos)
+        count = self.file.readinto(memoryview(buffer)[:count])
+        self.pos += count
+        return count
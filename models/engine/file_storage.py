@@ -5,8 +5,15 @@ that manages the storage of objects. It provides methods
 to save, retrieve, and reload objects to and from a JSON file.
 """
 
+import copy
+import functools
+import io
+import itertools
 import json
 import os
+import threading
+import weakref
+from contextlib import contextmanager, nullcontext
 from models.base_model import BaseModel
 from models.user import User
 from models.city import City
@@ -14,6 +21,25 @@ from models.place import Place
 from models.amenity import Amenity
 from models.state import State
 from models.review import Review
+from models.engine.bitmaps import BitmapIndex
+from models.engine.cache import LRUCache, RecordStore
+from models.engine.flusher import Flusher
+from models.engine.fulltext import TextIndex
+from models.engine.indexes import (
+    HashIndex, KeyIndex, SortedIndex, foreign_keys)
+from models.engine.query import Query
+from models.engine.snapshot import Snapshot
+from models.engine.spatial import GridIndex, is_coordinate
+from models.engine.views import AggregateView
+from models.engine.journal import Journal
+from models.engine.json_stream import (
+    encode_member, iter_object_items, write_object_members)
+from models.engine.codecs import (
+    FragmentRecords, get_codec, read_file, write_file)
+from models.engine.durable import atomic_write, open_verified
+from models.engine.locking import (
+    ConflictError, ReadWriteLock, file_lock, file_signature, synchronized,
+    synchronized_iterator)
 
 
 class FileStorage:
@@ -22,22 +48,391 @@ class FileStorage:
     The class manages the saving, reloading, and
     retrieval of objects in memory.
 
+    Objects report attribute changes through touch(), and FileStorage
+    keeps the JSON text of every clean object, so a save only calls
+    to_dict() and encodes the objects that changed since the
+    previous save or reload.
+
+    In journal mode, save() appends the objects changed since the
+    last save to a write-ahead journal instead of rewriting the
+    whole file. The journal is folded back into the JSON file once
+    it holds more records than there are objects, so the cost of a
+    save stays proportional to the number of changed objects.
+
+    In sharded mode, every class is stored in its own file
+    (<name>.<class name>.json), a save only rewrites the files of
+    the classes that changed, and reload() can load a subset of
+    the classes.
+
+    The objects are also indexed by class, so all(cls) and count(cls)
+    only cost the number of objects of that class, and the attributes
+    a model lists in indexed_attributes (such as City.state_id) are
+    indexed by value, so lookup() only costs the number of matches.
+    Those listed in sorted_attributes (such as Place.price_by_night)
+    are kept in order, so range() pages through a range of values
+    and min() and max() cost a lookup. The attributes listed in
+    text_attributes (Review.text and Place.description) are indexed by
+    word, and search() ranks the objects containing every searched
+    word. The text indexes are persisted to <file>.fts, so building
+    one only tokenizes the texts that changed since it was written.
+    The lists a model lists in list_attributes (Place.amenity_ids) are
+    indexed in bitmaps, so having() finds the places with all, any or
+    none of several amenities with a few set operations.
+    query() builds a Query that filters, orders and limits the objects
+    of a class, using these indexes when it can. The indexes of the
+    foreign keys (<class name>_id attributes) link the objects into a
+    graph walked by children(), parent() and descendants(), at a cost
+    proportional to the objects returned. The coordinates a model
+    lists in spatial_attributes (Place.latitude and Place.longitude)
+    are indexed in a grid, so near() and within() only cost the
+    objects around the searched area. Every index is built the first
+    time it is used, so a reload does not pay for the unused ones,
+    and kept up to date from then on.
+
+    iterate() goes through the objects in the order of their keys,
+    which are kept sorted in a KeyIndex from its first call, so the
+    objects can be streamed and paginated from any key at a cost
+    proportional to the objects returned.
+
+    register_view() adds an AggregateView, such as the average price of
+    the places of every city, which is updated with every change of an
+    object of its class, or of an object its group_by path goes through,
+    and rebuilt by reload().
+
+    In lazy mode, reload() only indexes the serialized objects by key
+    and an instance is created the first time it is accessed through
+    all() or get().
+
+    The serialized form of an instance is not kept in memory, so a
+    reload costs less than json.load, and a save rewriting the file
+    serializes every instance. With the fragment cache the forms are
+    kept, and a save only serializes the objects that changed.
+
+    With a cache size (or a cache size in bytes), the storage is lazy
+    and keeps a bounded number of instances in memory (see LRUCache):
+    the least recently used are evicted, after writing back those
+    that changed, and the serialized objects are kept on disk in
+    RecordStores instead of in memory. Only the keys and the indexes
+    stay in memory for every object. get(), iterate() and the index
+    searches read the evicted objects back on demand, while all()
+    returns a new dictionary holding every object. The evicted
+    instances still referenced elsewhere are remembered through weak
+    references, so get() returns the same instance, and an evicted
+    instance that changes is cached again. cache_stats() returns the
+    hits and misses.
+
+    The file is written with the codec named by snapshot_format
+    (see models.engine.codecs), such as the original pretty-printed
+    JSON, compact JSON, pickle or the compact binary layout of
+    BinarySnapshot. reload() detects the codec of the file from its
+    header, so changing the format converts the file on the next save,
+    and export_json()/import_json() convert from and to a JSON file.
+
+    With a flush interval, save() only serializes the changed objects
+    and a background thread writes them (see Flusher), so a burst of
+    saves costs one write per interval. flush() waits for the pending
+    writes and close() also stops the thread; both run at exit.
+
+    Files are replaced atomically: they are written to a temporary
+    file which is renamed over the old one, optionally after an fsync,
+    and an optional checksum trailer lets reload() detect a damaged
+    file instead of starting empty; it is off by default, since it
+    makes the JSON file unreadable for other JSON tools. With group
+    commit, a save waits until its changes are written, and the saves
+    of concurrent threads share one write and one fsync.
+
+    A shared storage can be saved by several processes at once: a save
+    holds an advisory lock on <file>.lock and, if another process
+    replaced the file since it was read, merges the objects that
+    changed there before writing it. Every save gives the objects it
+    writes a new version (the __version__ of to_dict()), so a save
+    detects the objects it changed that were also changed or deleted
+    by another process since it read them: the other process's
+    version is kept, and the save raises a ConflictError once the
+    rest of its changes is written.
+
+    A thread-safe storage can be used by several threads: its methods
+    hold a ReadWriteLock, so the methods that read the objects, such
+    as all(), get() and the index searches, run concurrently, while
+    those that change them (new(), touch(), delete(), save(), reload()
+    and so on) run one at a time. all() then returns a copy of the
+    dictionary, which the caller can iterate while the objects change,
+    and iterate(), cursors, queries and views hold the lock while they
+    compute each item. In lazy mode, and with a cache, reading creates
+    instances, so the reads also run one at a time. The attributes of
+    an instance are still set without the lock.
+
+    snapshot() returns a Snapshot of the objects as they are, which
+    readers go through without locks while the storage changes: a
+    save replaces the serialized form of the objects that changed
+    instead of changing it, and the snapshot keeps the former ones
+    until it is dropped, so writers never wait for it.
+
+    batch() defers the saves made in a block to one save at its end,
+    so creating and saving N objects writes the file once instead of
+    N times. transaction() also puts the objects back in their state
+    at its start if the block raises, from the saved form of the
+    objects it changed.
+
+    Subclasses can persist the objects elsewhere by overriding
+    _write_changes(), _read_changes(), _snapshot_records() and
+    _saved_record() (see DBStorage).
+
     Attributes:
+        snapshots (bool): Whether the objects are written to files.
+                          Subclasses that persist the changes elsewhere
+                          set it to False, so the serialized form of
+                          the objects is not kept and save() records
+                          the changed objects as in journal mode.
         __file_path (str): The path to the JSON file used for storage.
         __objects (dict): A dictionary of all objects stored in memory.
+        __by_class (dict): The objects of __objects by class name.
+        __indexes (dict): The HashIndex, SortedIndex, TextIndex or
+                          BitmapIndex of the indexed attributes used
+                          so far, by class name and attribute name.
+        __spatial (dict): The GridIndex of the classes that have
+                          spatial attributes, by class name, once
+                          used.
     """
 
+    snapshots = True
     __file_path = os.path.abspath("basemodel_file.json")
     __objects = {}
+    __by_class = {}
+    __indexes = {}
+    __spatial = {}
+    __classes = {
+        "BaseModel": BaseModel,
+        "User": User,
+        "State": State,
+        "City": City,
+        "Amenity": Amenity,
+        "Place": Place,
+        "Review": Review,
+    }
+
+    def __init__(self, file_path=None, journal=False, sharded=False,
+                 lazy=False, snapshot_format="json", flush_interval=None,
+                 flush_threshold=1000, checksum=False, fsync=False,
+                 group_commit=False, cache_size=None, cache_bytes=None,
+                 shared=False, thread_safe=False, fragment_cache=False):
+        """
+        Initializes the storage engine.
+
+        Args:
+            file_path (str): Optional path of a JSON file. An instance
+                             created with its own path keeps its own
+                             dictionary of objects.
+            journal (bool): Whether to persist changes through an
+                            append-only journal.
+            sharded (bool): Whether to store each class in its own file.
+            lazy (bool): Whether to create instances on first access
+                         instead of on reload.
+            snapshot_format (str): The name of the codec used to write
+                                   the file, e.g. "json", "binary"
+                                   or "json-compact+gzip".
+            flush_interval (float): If set, the longest time in seconds
+                                    a save waits for the background
+                                    thread to write it.
+            flush_threshold (int): The number of pending saves that
+                                   makes the background thread write
+                                   at once.
+            checksum (bool): Whether to append a checksum trailer to
+                             the files (off by default).
+            fsync (bool): Whether to flush every write to the disk.
+            group_commit (bool): Whether a save waits until the
+                                 background thread has written it,
+                                 sharing the write with concurrent
+                                 saves. The flush interval then
+                                 defaults to 0.
+            cache_size (int): If set, the largest number of instances
+                              kept in memory.
+            cache_bytes (int): If set, the largest estimated size of
+                               the instances kept in memory, in bytes.
+            shared (bool): Whether other processes save the same file,
+                           in which case a save merges their changes.
+            thread_safe (bool): Whether several threads use the storage,
+                                in which case its methods hold a
+                                reader-writer lock.
+            fragment_cache (bool): Whether to keep the serialized form
+                                   of the instances in memory, so that
+                                   a save only serializes the objects
+                                   that changed. Always kept with a
+                                   cache or background writes.
+
+        Raises:
+            ValueError: If the snapshot format is unknown, a cache
+                        limit is not positive, or a shared storage
+                        uses a journal, shards or background writes.
+        """
+        codec = get_codec(snapshot_format)
+        if shared and (journal or sharded or group_commit
+                       or flush_interval is not None):
+            raise ValueError("a shared storage cannot use a journal, "
+                             "shards or background writes")
+        if file_path:
+            self.__file_path = os.path.abspath(file_path)
+            self.__objects = {}
+            self.__by_class = {}
+            self.__indexes = {}
+            self.__spatial = {}
+        self.__journal = None
+        if journal:
+            self.__journal = Journal(self.__file_path + ".journal",
+                                     fsync=fsync)
+        self.__sharded = sharded
+        self.__cache = None
+        if cache_size is not None or cache_bytes is not None:
+            self.__cache = LRUCache(cache_size, cache_bytes)
+        # the evicted instances that are still referenced elsewhere
+        self.__evicted = weakref.WeakValueDictionary()
+        self.__lazy = lazy or self.__cache is not None
+        self.__unloaded = {}
+        self.__key_index = None
+        self.__views = {}
+        self.__dirty = {}
+        self.__deleted = set()
+        self.__serialized = {}
+        if self.__cache is not None:
+            self.__serialized = RecordStore(os.path.dirname(self.__file_path))
+        self.__stale_shards = set()
+        self.__codec = codec
+        self.__lock = threading.Lock()
+        self.__write_lock = threading.RLock()
+        self.__shared = shared
+        self.__versions = {}
+        self.__signature = None
+        self.__pending_puts = {}
+        self.__pending_deletes = set()
+        self.__batches = 0
+        self.__undo = None
+        self.__exclusive = nullcontext
+        self.__parents = foreign_keys(FileStorage.__classes)
+        self.__children = {}
+        for child, keys in self.__parents.items():
+            for attribute, parent in keys:
+                self.__children.setdefault(parent, []).append(
+                    (child, attribute))
+        self.__checksum = checksum
+        self.__fsync = fsync
+        self.__group_commit = group_commit
+        if group_commit and flush_interval is None:
+            flush_interval = 0
+        self.__flusher = None
+        if flush_interval is not None:
+            self.__flusher = Flusher(
+                self.__write_pending, flush_interval, flush_threshold)
+        # the background writes serialize nothing but the changed objects
+        self.__keep_fragments = (fragment_cache or self.__cache is not None
+                                 or self.__flusher is not None)
+        if thread_safe:
+            self.__synchronize()
+
+    def all(self, cls=None):
+        """
+        Retrieves all stored objects, or the objects of one class.
+
+        Args:
+            cls (type|str): Optional class or class name. Only the
+                            objects of that class are returned,
+                            without looking at the other objects.
+
+        Returns:
+            dict: A dictionary of the stored objects by key.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        if self.__cache is not None:
+            return self.__all_cached(cls_name)
+        if cls is None:
+            for cls_name in list(self.__unloaded):
+                self.__materialize_class(cls_name)
+            return self.__objects
+        self.__materialize_class(cls_name)
+        return self.__by_class.get(cls_name, {})
+
+    def iterate(self, cls=None, after=None):
+        """
+        Iterates over the stored objects, or the objects of one class,
+        in the order of their keys, e.g. to page through them:
+
+            page = list(itertools.islice(storage.iterate(Place), 20))
+            next_page = list(itertools.islice(
+                storage.iterate(Place, after=page[-1]), 20))
+
+        The keys are sorted on the first call and then kept in order.
+        Objects created by a lazy reload are created as they are
+        reached.
+
+        Args:
+            cls (type|str): Optional class or class name.
+            after (BaseModel|str): Optional object, or storage key, to
+                                   resume after. It need not be stored
+                                   anymore.
+
+        Yields:
+            BaseModel: The objects.
+        """
+        if self.__key_index is None:
+            self.__key_index = KeyIndex(itertools.chain(
+                self.__objects, *self.__unloaded.values()))
+        if isinstance(after, BaseModel):
+            after = f"{after.__class__.__name__}.{after.id}"
+        key, end = after or "", "\U0010ffff"
+        if cls is not None:
+            cls_name = getattr(cls, "__name__", cls)
+            # the keys of a class are between "<name>." and "<name>/"
+            key, end = max(key, f"{cls_name}."), f"{cls_name}/"
+        while True:
+            keys = self.__key_index.after(key, KeyIndex.CHUNK_SIZE, end)
+            if not keys:
+                return
+            for key in keys:
+                obj = self.__objects.get(key)
+                if obj is None:
+                    if key not in self.__unloaded.get(
+                            key.partition(".")[0], ()):
+                        continue  # deleted since the keys were read
+                    obj = self.__materialize(key)
+                elif self.__cache is not None:
+                    self.__cache.hit(key)
+                yield obj
+
+    def count(self, cls=None):
+        """
+        Counts the stored objects, or the objects of one class,
+        without creating the instances of a lazy reload.
+
+        Args:
+            cls (type|str): Optional class or class name.
+
+        Returns:
+            int: The number of objects.
+        """
+        if cls is None:
+            return len(self.__objects) + sum(
+                len(records) for records in self.__unloaded.values())
+        cls_name = getattr(cls, "__name__", cls)
+        return (len(self.__by_class.get(cls_name, ()))
+                + len(self.__unloaded.get(cls_name, ())))
 
-    def all(self):
+    def get(self, cls, id):
         """
-        Retrieves all stored objects.
+        Retrieves one object by class and id.
+
+        Args:
+            cls (type|str): The class of the object or its name.
+            id (str): The id of the object.
 
         Returns:
-            dict: A dictionary of all stored objects.
+            BaseModel: The object, or None if it is not stored.
         """
-        return FileStorage.__objects
+        cls_name = getattr(cls, "__name__", cls)
+        key = f"{cls_name}.{id}"
+        if key in self.__unloaded.get(cls_name, ()):
+            return self.__materialize(key)
+        if self.__cache is not None:
+            self.__cache.hit(key)
+        return self.__objects.get(key)
 
     def new(self, obj):
         """
@@ -47,7 +442,485 @@ class FileStorage:
             obj (BaseModel): The object to store.
         """
         key = f"{obj.__class__.__name__}.{obj.id}"
-        FileStorage.__objects[key] = obj
+        if self.__undo is not None:
+            self.__remember(key)
+        self.__store(key, obj)
+        self.__dirty[key] = None
+        self.__deleted.discard(key)
+
+    def lookup(self, cls, attribute, value):
+        """
+        Retrieves the objects of a class whose indexed attribute
+        has a value, e.g. lookup(City, "state_id", state.id).
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+            attribute (str): An attribute listed in the
+                             indexed_attributes or sorted_attributes
+                             of the class.
+            value: The value of the attribute.
+
+        Returns:
+            list: The matching objects, in the order they were indexed.
+
+        Raises:
+            ValueError: If the attribute is not indexed.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        index = self.index(cls_name, attribute)
+        if index is None:
+            raise ValueError(f"{cls_name}.{attribute} is not indexed")
+        return self.__resolve(index.lookup(value))
+
+    def children(self, obj, cls=None):
+        """
+        Retrieves the objects whose foreign key refers to an object,
+        e.g. the cities of a state.
+
+        Args:
+            obj (BaseModel): The parent object.
+            cls (type|str): Optional class or class name of the
+                            children. By default the children of
+                            every class are returned.
+
+        Returns:
+            list: The children, by class then in index order.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        found = []
+        for child, attribute in self.__children.get(
+                obj.__class__.__name__, ()):
+            if cls_name is None or child == cls_name:
+                found.extend(self.lookup(child, attribute, obj.id))
+        return found
+
+    def parent(self, obj, cls=None):
+        """
+        Retrieves the object a foreign key of an object refers to,
+        e.g. the state of a city.
+
+        Args:
+            obj (BaseModel): The child object.
+            cls (type|str): Optional class or class name of the parent,
+                            e.g. User for the author of a review.
+                            By default the first foreign key listed in
+                            the indexed_attributes of the class is used.
+
+        Returns:
+            BaseModel: The parent, or None if it is not stored.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        for attribute, parent in self.__parents.get(
+                obj.__class__.__name__, ()):
+            if cls_name is None or parent == cls_name:
+                return self.get(parent, getattr(obj, attribute, None))
+        return None
+
+    def descendants(self, obj):
+        """
+        Walks the children of an object, their children and so on,
+        depth first.
+
+        Args:
+            obj (BaseModel): The object to expand.
+
+        Yields:
+            tuple: (depth, descendant) where the children of obj
+                   have depth 1.
+        """
+        stack = [(1, child, (obj,)) for child in reversed(self.children(obj))]
+        while stack:
+            depth, child, ancestors = stack.pop()
+            yield depth, child
+            if any(child is ancestor for ancestor in ancestors):
+                continue  # a cycle of foreign keys
+            ancestors += (child,)
+            stack.extend((depth + 1, grandchild, ancestors)
+                         for grandchild in reversed(self.children(child)))
+
+    def index(self, cls, attribute):
+        """
+        Returns the index of an attribute.
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+            attribute (str): The name of the attribute.
+
+        Returns:
+            HashIndex|SortedIndex|TextIndex|BitmapIndex: The index, or
+                                                         None if the
+                                                         attribute is
+                                                         not indexed.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        return self.__attribute_index(cls_name, attribute)
+
+    def range(self, cls, attribute, low=None, high=None, descending=False,
+              after=None):
+        """
+        Iterates over the objects of a class in the order of a sorted
+        attribute, e.g. the places from 50 to 100 a night:
+
+            cursor = storage.range(Place, "price_by_night", 50, 100)
+            page = cursor.fetch(20)
+            next_page = cursor.fetch(20)
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+            attribute (str): An attribute listed in the
+                             sorted_attributes of the class.
+            low: The smallest value, included.
+            high: The largest value, included. A missing bound leaves
+                  the range open up to the end of the values of the
+                  same type as the other bound.
+            descending (bool): Whether the largest values come first.
+            after (tuple): The position attribute of a previous cursor,
+                           to resume after the last object it returned.
+
+        Returns:
+            Cursor: A cursor whose fetch() returns the next objects.
+
+        Raises:
+            ValueError: If the attribute is not sorted.
+        """
+        return self.__sorted_index(cls, attribute).cursor(
+            low, high, descending, after, self.__resolve)
+
+    def search(self, cls, text, attribute=None, limit=None):
+        """
+        Retrieves the objects of a class whose text attributes contain
+        every word of a text, best match first,
+        e.g. search(Review, "quiet view").
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+            text (str): The words to search.
+            attribute (str): Optional attribute listed in the
+                             text_attributes of the class. By default
+                             every text attribute is searched and the
+                             scores of an object are added.
+            limit (int): Optional largest number of objects to return.
+
+        Returns:
+            list: The matching objects, ranked by BM25.
+
+        Raises:
+            ValueError: If the class has no such text attributes.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        indexes = self.__text_indexes(cls_name)
+        if attribute is not None:
+            indexes = {attribute: indexes.get(attribute)}
+        if not indexes or None in indexes.values():
+            raise ValueError(f"{cls_name}.{attribute or '*'} "
+                             "is not a text attribute")
+        if len(indexes) == 1:
+            ranked = next(iter(indexes.values())).rank(text, limit)
+        else:
+            scores = {}
+            for index in indexes.values():
+                for score, key in index.rank(text):
+                    scores[key] = scores.get(key, 0) + score
+            ranked = sorted(((score, key) for key, score in scores.items()),
+                            key=lambda item: (-item[0], item[1]))[:limit]
+        return self.__resolve([key for _, key in ranked])
+
+    def having(self, cls, attribute, all_of=(), any_of=(), none_of=()):
+        """
+        Retrieves the objects of a class whose list attribute contains
+        every value of all_of, one of any_of and none of none_of,
+        e.g. having(Place, "amenity_ids", all_of=[wifi.id, pool.id]).
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+            attribute (str): An attribute listed in the list_attributes
+                             of the class.
+            all_of (list): The values every list must contain.
+            any_of (list): The values of which every list must contain
+                           one, if any is given.
+            none_of (list): The values no list may contain.
+
+        Returns:
+            list: The matching objects, in no particular order.
+
+        Raises:
+            ValueError: If the attribute is not a list attribute.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        index = self.__attribute_index(cls_name, attribute)
+        if not isinstance(index, BitmapIndex):
+            raise ValueError(f"{cls_name}.{attribute} "
+                             "is not a list attribute")
+        return self.__resolve(index.match(all_of, any_of, none_of))
+
+    def min(self, cls, attribute):
+        """
+        Returns the smallest value of a sorted attribute among the
+        objects of a class, numbers coming before strings.
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+            attribute (str): An attribute listed in the
+                             sorted_attributes of the class.
+
+        Returns:
+            The value, or None if there are no objects.
+
+        Raises:
+            ValueError: If the attribute is not sorted.
+        """
+        return self.__sorted_index(cls, attribute).min()
+
+    def max(self, cls, attribute):
+        """
+        Returns the largest value of a sorted attribute among the
+        objects of a class, strings coming after numbers.
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+            attribute (str): An attribute listed in the
+                             sorted_attributes of the class.
+
+        Returns:
+            The value, or None if there are no objects.
+
+        Raises:
+            ValueError: If the attribute is not sorted.
+        """
+        return self.__sorted_index(cls, attribute).max()
+
+    def near(self, cls, latitude, longitude, radius_km, limit=None):
+        """
+        Retrieves the objects of a class within a distance of a point,
+        e.g. near(Place, 37.77, -122.42, 5, limit=10).
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            radius_km (float): The largest distance in kilometers.
+            limit (int): Optional largest number of objects to return.
+
+        Returns:
+            list: The matching objects, nearest first.
+
+        Raises:
+            ValueError: If the class has no spatial attributes,
+                        the point is invalid or the radius or the
+                        limit is negative.
+        """
+        index = self.__spatial_index(cls)
+        if not is_coordinate(latitude, longitude):
+            raise ValueError(f"invalid point: {latitude}, {longitude}")
+        if radius_km < 0:
+            raise ValueError("the radius cannot be negative")
+        if limit is not None and limit < 0:
+            raise ValueError("the limit cannot be negative")
+        return self.__resolve([key for _, key in index.near(
+            latitude, longitude, radius_km, limit)])
+
+    def within(self, cls, south, west, north, east):
+        """
+        Retrieves the objects of a class in a bounding box, e.g. the
+        places shown on a map. A box whose west edge is east of its
+        east edge crosses the antimeridian.
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+            south (float): The smallest latitude.
+            west (float): The west longitude.
+            north (float): The largest latitude.
+            east (float): The east longitude.
+
+        Returns:
+            list: The matching objects, in no particular order.
+
+        Raises:
+            ValueError: If the class has no spatial attributes or
+                        a corner of the box is invalid.
+        """
+        index = self.__spatial_index(cls)
+        if not (is_coordinate(south, west) and is_coordinate(north, east)):
+            raise ValueError(
+                f"invalid box: {south}, {west}, {north}, {east}")
+        return self.__resolve(index.within(south, west, north, east))
+
+    def query(self, cls):
+        """
+        Starts a query over the objects of a class,
+        e.g. query(Place).where("max_guest", ">=", 4).all().
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+
+        Returns:
+            Query: A query matching every object of the class.
+        """
+        return Query(self, cls)
+
+    def register_view(self, name, cls, group_by, function="count",
+                      attribute=None):
+        """
+        Registers an aggregate view, built from the stored objects and
+        then kept up to date, e.g. the average price of the places of
+        every city:
+
+            register_view("average_price_by_city", Place, "city_id",
+                          "avg", "price_by_night")
+
+        A group_by tuple follows foreign keys: ("city_id", "state_id")
+        groups places by the state_id of their city. A registered view
+        replaces the view of the same name.
+
+        Args:
+            name (str): The name of the view.
+            cls (type|str): The class of the objects or its name.
+            group_by (str|tuple): The attribute the objects are grouped
+                                  by, or the foreign keys leading to it.
+            function (str): "count", "sum" or "avg".
+            attribute (str): The aggregated attribute, needed by
+                             sum and avg.
+
+        Returns:
+            AggregateView: The view.
+
+        Raises:
+            ValueError: If the function is unknown or needs an
+                        attribute, or if an attribute of group_by other
+                        than the last is not a foreign key.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        if isinstance(group_by, str):
+            group_by = (group_by,)
+        classes = [cls_name]
+        for attribute_name in group_by[:-1]:
+            parent = dict(self.__parents.get(classes[-1], ())).get(
+                attribute_name)
+            if parent is None:
+                raise ValueError(f"{classes[-1]}.{attribute_name} "
+                                 "is not a foreign key")
+            classes.append(parent)
+        view = AggregateView(cls_name, group_by, function, attribute,
+                             classes)
+        self.__views[name] = view
+        self.__build_view(name)
+        return view
+
+    def drop_view(self, name):
+        """
+        Removes an aggregate view, if it is registered.
+
+        Args:
+            name (str): The name of the view.
+        """
+        self.__views.pop(name, None)
+
+    def view(self, name):
+        """
+        Returns an aggregate view, whose get() and results() read
+        the aggregates of its groups.
+
+        Args:
+            name (str): The name of the view.
+
+        Returns:
+            AggregateView: The view, or None if no view has the name.
+        """
+        return self.__views.get(name)
+
+    def views(self):
+        """
+        Returns the names of the aggregate views.
+
+        Returns:
+            list: The names, in the order the views were registered.
+        """
+        return list(self.__views)
+
+    def cache_stats(self):
+        """
+        Returns the statistics of the cache of instances.
+
+        Returns:
+            dict: The hits, misses, evictions and write-backs, the
+                  number and estimated bytes of the instances in
+                  memory and the hit ratio, or None if the storage
+                  has no cache.
+        """
+        if self.__cache is None:
+            return None
+        return self.__cache.stats()
+
+    def changing(self, obj):
+        """
+        Keeps the saved form of a stored object that is about to
+        change, if a transaction is open, so that a rollback can put
+        it back when the serialized form of the objects is not kept.
+
+        Args:
+            obj (BaseModel): The object about to change.
+        """
+        if self.__undo is None:
+            return
+        obj_id = getattr(obj, "id", None)
+        if obj_id is None:
+            return
+        key = f"{obj.__class__.__name__}.{obj_id}"
+        if self.__objects.get(key) is obj:
+            self.__remember(key)
+
+    def touch(self, obj, name=None):
+        """
+        Marks a stored object as dirty so the next save
+        re-serializes it, and updates the index of the attribute.
+        Objects that are not in storage, such as an instance built
+        from a dictionary without an id, are ignored.
+
+        Args:
+            obj (BaseModel): The object that changed.
+            name (str): The attribute that changed, if known.
+        """
+        obj_id = getattr(obj, "id", None)
+        if obj_id is None:
+            return
+        key = f"{obj.__class__.__name__}.{obj_id}"
+        if self.__cache is not None and key not in self.__objects and \
+                key in self.__unloaded.get(obj.__class__.__name__, ()):
+            self.__store(key, obj)  # an evicted instance changed
+        if self.__objects.get(key) is obj:
+            self.__dirty[key] = None
+            if self.__undo is not None:
+                self.__remember(key)
+            if self.__cache is not None:
+                self.__cache.touch(key)
+            indexes = self.__indexes.get(obj.__class__.__name__, {})
+            if name is None:
+                self.__index(key, obj.__dict__)
+            elif name in indexes:
+                indexes[name].add(key, getattr(obj, name))
+            elif name in obj.spatial_attributes:
+                self.__index(key, obj.__dict__)
+            if name is not None and self.__views:
+                self.__update_views(key, obj.__dict__, name)
+
+    def delete(self, obj=None):
+        """
+        Removes an object from the storage.
+
+        Args:
+            obj (BaseModel): The object to remove. Nothing happens
+                             if it is None or not stored.
+        """
+        if obj is None:
+            return
+        key = f"{obj.__class__.__name__}.{obj.id}"
+        evicted = key in self.__unloaded.get(obj.__class__.__name__, ())
+        if self.__undo is not None:
+            self.__remember(key)
+        if self.__unstore(key) is not None or evicted:
+            self.__dirty.pop(key, None)
+            self.__serialized.pop(key, None)
+            self.__deleted.add(key)
 
     def save(self):
         """
@@ -55,38 +928,1327 @@ class FileStorage:
 
         Converts each object to a dictionary and
         writes the data to the file specified by __file_path.
+        In journal mode only the changed and deleted objects
+        are appended to the journal.
+        With a flush interval the write is left to the background
+        thread, and the saves made before it runs are written at once.
+        With group commit the save then waits for that write.
+        A shared storage first merges the changes of other processes.
+        Inside a batch or a transaction, does nothing: the outermost
+        one saves once when it ends.
+
+        Raises:
+            OSError: If the file cannot be written.
+            ConflictError: If objects the save changed or deleted were
+                           also changed or deleted by another process.
+        """
+        if self.__batches:
+            return
+        if self.__shared:
+            with self.__write_lock:  # serialized and written at once
+                self.__record_changes()
+                self.__write_pending()
+            return
+        self.__record_changes()
+        if self.__flusher is None:
+            self.__write_pending()
+        else:
+            self.__flusher.request()
+            if self.__group_commit:
+                self.__flusher.flush(urgent=False)
+
+    def flush(self):
+        """
+        Waits until the background thread has written every save
+        made so far. Does nothing without a flush interval.
+
+        Raises:
+            OSError: If a background write failed.
+        """
+        if self.__flusher is not None:
+            self.__flusher.flush()
+
+    def close(self):
+        """
+        Writes the pending saves and the text indexes, and stops the
+        background thread. The storage can still be used, but saves
+        are then written synchronously.
         """
-        to_json = {}
-        for key, value in FileStorage.__objects.items():
-            to_json[key] = value.to_dict()
-        with open(FileStorage.__file_path, "w", encoding="utf-8") as file:
-            json.dump(to_json, file, indent=4)
+        if self.__flusher is not None:
+            flusher, self.__flusher = self.__flusher, None
+            flusher.close()
+        with self.__write_lock:
+            self.__write_text_indexes(force=True)
 
-    def reload(self):
+    def compact(self):
+        """
+        Rewrites the JSON file from memory and empties the journal.
+        """
+        self.save()
+        self.flush()
+        with self.__write_lock:
+            if self.snapshots and not self.__shared:
+                self.__write_snapshot()
+            if self.__journal is not None:
+                self.__journal.truncate()
+            self.__write_text_indexes(force=True)
+
+    def snapshot(self):
+        """
+        Returns a read-only view of every object as it is now, which
+        can be read without locks while the storage keeps changing.
+        The objects changed since the previous save are serialized
+        first, and are still written by the next save.
+
+            with storage.snapshot() as snapshot:
+                snapshot.export_json("backup.json")
+
+        Returns:
+            Snapshot: The view.
+        """
+        with self.__write_lock:  # no write is half done meanwhile
+            self.__record_changes()
+            with self.__lock:
+                records = self._snapshot_records(
+                    dict(self.__pending_puts), set(self.__pending_deletes))
+        if self.snapshots:
+            return Snapshot(records, self.__codec.decode)
+        return Snapshot(records)
+
+    @contextmanager
+    def batch(self):
+        """
+        Defers the saves made in a block, e.g. by obj.save(), to one
+        save when the block ends, even if it raises:
+
+            with storage.batch():
+                for name in names:
+                    user = User()
+                    user.first_name = name
+                    user.save()
+
+        Batches and transactions can be nested, and only the outermost
+        one saves. The saves of every thread are deferred meanwhile.
+
+        Yields:
+            FileStorage: The storage.
+        """
+        self.__begin_batch()
+        try:
+            yield self
+        finally:
+            if self.__end_batch():
+                self.save()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Defers the saves made in a block like batch(), and if the block
+        raises, puts the objects it created, changed or deleted back
+        in their state at its start, then saves nothing:
+
+            with storage.transaction():
+                place.price_by_night = 80
+                booking.save()
+
+        Changed objects are restored in place, deleted ones are
+        created again, and the changes made before the block stay
+        unsaved. A transaction nested in another one only undoes its
+        own changes. The saved form of an object is kept the first
+        time the transaction changes it, so a transaction costs the
+        objects it changes, not the objects stored.
+
+        A thread-safe storage holds its write lock for the whole
+        block, so the other threads cannot change or save objects a
+        rollback would undo; they wait until the transaction ends.
+        Other storages must only be used by one thread meanwhile.
+
+        Yields:
+            FileStorage: The storage.
+        """
+        with self.__exclusive():
+            self.__record_changes()  # the saved form of every object
+            undo, outer = {}, self.__undo
+            self.__undo = undo
+            self.__begin_batch()
+            committed = False
+            try:
+                yield self
+                committed = True
+            finally:
+                try:
+                    if not committed:
+                        self.__restore(undo)
+                finally:
+                    self.__undo = outer
+                    if outer is not None:
+                        for key, value in undo.items():
+                            outer.setdefault(key, value)
+                    if self.__end_batch() and committed:
+                        self.save()
+
+    def shard_path(self, cls_name):
+        """
+        Returns the path of the file holding the objects of a class
+        in sharded mode.
+
+        Args:
+            cls_name (str): The name of the class.
+        """
+        root, ext = os.path.splitext(self.__file_path)
+        return f"{root}.{cls_name}{ext}"
+
+    def __synchronize(self):
+        """
+        Replaces the public methods of this instance with methods that
+        hold a ReadWriteLock, and makes the objects they return (the
+        dictionaries of all(), cursors, queries and views) safe to use
+        while other threads change the storage.
+        """
+        lock = ReadWriteLock()
+        self.__exclusive = lock.write
+        # lazy reads create instances, and cached ones evict others
+        read = lock.write if self.__lazy else lock.read
+        for name in ("count", "get", "lookup", "children", "parent",
+                     "index", "search", "having", "min", "max", "near",
+                     "within", "view", "views", "cache_stats",
+                     "export_json"):
+            setattr(self, name, synchronized(getattr(self, name), read))
+        for name in ("new", "changing", "touch", "delete", "save",
+                     "compact", "reload", "import_json", "drop_view",
+                     "snapshot"):
+            setattr(self, name, synchronized(getattr(self, name),
+                                             lock.write))
+        self.iterate = synchronized_iterator(self.iterate, read)
+        all_objects = self.all
+        range_cursor = self.range
+        query = self.query
+        register_view = self.register_view
+
+        @functools.wraps(all_objects)
+        def copy_all(cls=None):
+            with read():
+                return dict(all_objects(cls))
+
+        @functools.wraps(range_cursor)
+        def synchronized_range(*args, **kwargs):
+            with read():
+                cursor = range_cursor(*args, **kwargs)
+            cursor.fetch = synchronized(cursor.fetch, read)
+            return cursor
+
+        @functools.wraps(query)
+        def synchronized_query(cls):
+            started = query(cls)
+            for name in ("plan", "explain", "all", "count", "first"):
+                setattr(started, name,
+                        synchronized(getattr(started, name), read))
+            return started
+
+        @functools.wraps(register_view)
+        def synchronized_register_view(*args, **kwargs):
+            with lock.write():
+                view = register_view(*args, **kwargs)
+            view.get = synchronized(view.get, read)
+            view.results = synchronized(view.results, read)
+            return view
+
+        self.all = copy_all
+        self.range = synchronized_range
+        self.query = synchronized_query
+        self.register_view = synchronized_register_view
+
+    def __begin_batch(self):
+        """
+        Starts deferring the saves.
+        """
+        with self.__lock:
+            self.__batches += 1
+
+    def __end_batch(self):
+        """
+        Stops deferring the saves of one batch.
+
+        Returns:
+            bool: Whether it was the outermost batch.
+        """
+        with self.__lock:
+            self.__batches -= 1
+            return not self.__batches
+
+    def __remember(self, key):
+        """
+        Keeps the saved form of an object the first time the innermost
+        transaction changes it, before the change is recorded.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        if key in self.__undo:
+            return
+        value = None
+        if key in self.__objects or \
+                key in self.__unloaded.get(key.partition(".")[0], ()):
+            with self.__write_lock:  # no write is half done meanwhile
+                with self.__lock:
+                    if key in self.__pending_puts:
+                        value = copy.deepcopy(self.__pending_puts[key])
+                    elif key not in self.__pending_deletes:
+                        value = self._saved_record(key)
+        self.__undo[key] = value
+
+    def __restore(self, undo):
+        """
+        Puts objects back in their saved form, or removes them if they
+        had none. Their changes that were not saved are dropped.
+
+        Args:
+            undo (dict): The serialized objects, or None, by key.
+        """
+        for key, value in undo.items():
+            cls_name = key.partition(".")[0]
+            self.__dirty.pop(key, None)
+            self.__deleted.discard(key)
+            with self.__lock:
+                # recorded by a snapshot() taken in the transaction
+                recorded = key in self.__pending_puts or \
+                    key in self.__pending_deletes
+                if value is None:
+                    self.__pending_puts.pop(key, None)
+            if value is None:
+                if key in self.__objects or \
+                        key in self.__unloaded.get(cls_name, ()):
+                    self.__unstore(key)
+                self.__serialized.pop(key, None)
+                continue
+            self.__update(key, value)
+            if recorded:
+                self.__dirty[key] = None
+
+    def __record_changes(self):
+        """
+        Serializes the objects changed since the previous save and,
+        unless the whole file is written, records the changed and
+        deleted objects as pending writes.
+        """
+        with self.__lock:
+            puts = self.__serialize_dirty()
+            if self.__journal is not None or not self.snapshots or \
+                    self.__shared:
+                self.__pending_deletes -= puts.keys()
+                self.__pending_deletes |= self.__deleted
+                for key in self.__deleted:
+                    self.__pending_puts.pop(key, None)
+                self.__pending_puts.update(puts)
+            self.__deleted = set()
+
+    def __serialize_dirty(self):
+        """
+        Refreshes the serialized form of every dirty object.
+
+        Returns:
+            dict: The freshly serialized objects keyed by storage key.
+        """
+        dirty, self.__dirty = self.__dirty, {}
+        puts = {}
+        for key in dirty:
+            if key in self.__objects:
+                puts[key] = self.__objects[key].to_dict()
+            else:  # written back when it was evicted from the cache
+                value = self.__unloaded.get(key.partition(".")[0], {}).get(
+                    key)
+                if value is None:
+                    continue
+                puts[key] = value
+            if self.__shared:
+                version = self.__versions.get(key, 0) + 1
+                puts[key]["__version__"] = version
+                if key in self.__objects:
+                    self.__objects[key].__dict__["__version__"] = version
+            if self.snapshots and (self.__keep_fragments
+                                   or key not in self.__objects):
+                self.__serialized[key] = self.__encode(key, puts[key])
+        for key in dirty.keys() | self.__deleted:
+            self.__stale_shards.add(key.split(".")[0])
+        return puts
+
+    def __write_pending(self):
+        """
+        Writes the changes of the saves made so far. Runs on the
+        background thread when there is a flush interval. Writes of
+        concurrent saves run one at a time. If the write fails, its
+        changes stay pending under those of the later saves.
+        """
+        with self.__write_lock:
+            with self.__lock:
+                puts, self.__pending_puts = self.__pending_puts, {}
+                deletes = self.__pending_deletes
+                self.__pending_deletes = set()
+            try:
+                self._write_changes(puts, deletes)
+            except ConflictError:
+                raise  # the other changes were written
+            except BaseException:
+                with self.__lock:
+                    for key in self.__pending_deletes:
+                        puts.pop(key, None)
+                    deletes -= self.__pending_puts.keys()
+                    puts.update(self.__pending_puts)
+                    self.__pending_puts = puts
+                    self.__pending_deletes |= deletes
+                raise
+
+    @classmethod
+    def _classes(cls):
+        """
+        Returns the model classes that the storage creates instances
+        of, for the engines built on it.
+
+        Returns:
+            dict: The classes, by class name.
+        """
+        return FileStorage.__classes
+
+    def _write_changes(self, puts, deletes):
+        """
+        Persists the changes of the saves made since the previous
+        write: appends them to the journal, or rewrites the file.
+        Called with the write lock held.
+
+        Args:
+            puts (dict): The serialized objects that changed, by key
+                         (empty unless in journal mode).
+            deletes (set): The keys of the removed objects.
+
+        Raises:
+            ConflictError: If objects of a shared storage were also
+                           changed or deleted by another process.
+        """
+        if self.__shared:
+            self.__write_shared(puts, deletes)
+            return
+        if self.__journal is None:
+            self.__write_snapshot()
+            return
+        self.__journal.append(puts, deletes)
+        stored = len(self.__objects) + sum(
+            len(records) for records in self.__unloaded.values())
+        if self.__journal.entries > max(stored, 1000):
+            self.__write_snapshot()
+            self.__journal.truncate()
+
+    def __write_shared(self, puts, deletes):
+        """
+        Writes the file of a shared storage while holding the lock of
+        the file, after merging the changes another process wrote
+        since this storage last read or wrote it.
+
+        Args:
+            puts (dict): The serialized objects that changed, by key.
+            deletes (set): The keys of the removed objects.
+
+        Raises:
+            ConflictError: If objects were also changed or deleted by
+                           another process.
+        """
+        conflicts = []
+        with file_lock(self.__file_path + ".lock"):
+            if file_signature(self.__file_path) != self.__signature:
+                conflicts = self.__merge(puts, deletes)
+            if puts or deletes:
+                self.__write_snapshot()
+            self.__signature = file_signature(self.__file_path)
+        with self.__lock:
+            for key, value in puts.items():
+                self.__versions[key] = value["__version__"]
+            for key in deletes:
+                self.__versions.pop(key, None)
+        if conflicts:
+            raise ConflictError(conflicts)
+
+    def __merge(self, puts, deletes):
+        """
+        Reads the file written by another process and stores the
+        objects whose version differs from the one this storage read
+        or wrote, and removes the objects missing from it. An object
+        in conflict, which the pending changes also change or delete,
+        takes the version of the file and leaves the pending changes.
+
+        Args:
+            puts (dict): The serialized objects that changed, by key.
+            deletes (set): The keys of the removed objects.
+
+        Returns:
+            list: The keys of the objects in conflict.
+        """
+        conflicts = []
+        seen = set()
+        with self.__lock:
+            try:
+                for key, value, fragment in self.__read_file(
+                        self.__file_path):
+                    seen.add(key)
+                    version = value.get("__version__", 0)
+                    if version == self.__versions.get(key):
+                        continue
+                    if key in puts or key in deletes:
+                        conflicts.append(key)
+                        puts.pop(key, None)
+                        deletes.discard(key)
+                    self.__dirty.pop(key, None)
+                    self.__update(key, value, fragment)
+                    self.__versions[key] = version
+            except FileNotFoundError:
+                pass
+            for key in [key for key in self.__versions if key not in seen]:
+                if key in puts:
+                    conflicts.append(key)
+                    del puts[key]
+                del self.__versions[key]
+                deletes.discard(key)
+                self.__dirty.pop(key, None)
+                self.__unstore(key)
+                self.__serialized.pop(key, None)
+        return conflicts
+
+    def __write_snapshot(self):
+        """
+        Writes the serialized form of the objects to the JSON file,
+        or to the files of the changed classes in sharded mode.
+
+        The serialized forms are copied first, so the objects can keep
+        changing while the file is written.
+        """
+        with self.__lock:
+            stale_shards, self.__stale_shards = self.__stale_shards, set()
+            fragments = self.__fragments(
+                stale_shards if self.__sharded else None)
+        if not self.__sharded:
+            self.__write_file(self.__file_path, fragments.values())
+        else:
+            for cls_name in stale_shards:
+                prefix = f"{cls_name}."
+                self.__write_file(
+                    self.shard_path(cls_name),
+                    [fragment for key, fragment in fragments.items()
+                     if key.startswith(prefix)])
+        self.__write_text_indexes()
+
+    def __fragments(self, classes=None):
+        """
+        Returns a copy of the serialized form of the stored objects,
+        serializing the instances that have none: all of them unless
+        the forms are kept, and with the storages created without a
+        path, which share the objects, those another one created.
+        The forms of the objects another one deleted are dropped.
+        Called with the lock held.
+
+        Args:
+            classes (set): Optional names of the classes whose
+                           instances are serialized. The others may
+                           be missing from the copy.
+
+        Returns:
+            Mapping: The serialized forms by key, in the format of
+                     the storage codec.
+        """
+        stored = len(self.__objects) + sum(
+            len(records) for records in self.__unloaded.values())
+        if len(self.__serialized) > stored:
+            for key in list(self.__serialized):
+                if key not in self.__objects and key not in \
+                        self.__unloaded.get(key.partition(".")[0], ()):
+                    self.__serialized.pop(key)
+        fragments = self.__serialized if self.__keep_fragments else {}
+        for key, obj in self.__objects.items():
+            if key in self.__serialized:
+                if not self.__keep_fragments:
+                    fragments[key] = self.__serialized[key]
+            elif classes is None or key.partition(".")[0] in classes:
+                fragments[key] = self.__encode(key, obj.to_dict())
+        if self.__keep_fragments:
+            return self.__serialized.copy()
+        for records in self.__unloaded.values():
+            for key in records:
+                fragments[key] = self.__serialized[key]
+        return fragments
+
+    def __write_text_indexes(self, force=False):
+        """
+        Writes the text indexes built so far to <file>.fts once a
+        tenth of their texts changed since they were last written, so
+        that writing them costs a bounded share of the saves. The
+        saved indexes that were not built are kept.
+
+        Args:
+            force (bool): Whether to write them if anything changed.
+        """
+        indexes = {
+            f"{cls_name}.{name}": index
+            for cls_name, built in self.__indexes.items()
+            for name, index in built.items()
+            if isinstance(index, TextIndex)}
+        changes = sum(index.changes for index in indexes.values())
+        size = sum(len(index) for index in indexes.values())
+        if not changes or (not force and changes < max(1, size // 10)):
+            return
+        saved = {name: index.dumps() for name, index in indexes.items()}
+        for name, data in self.__read_text_file().items():
+            saved.setdefault(name, data)  # of the indexes not built
+        with atomic_write(self.__file_path + ".fts", self.__checksum,
+                          self.__fsync) as file:
+            file.write(json.dumps(saved).encode("utf-8"))
+
+    def __read_text_file(self):
+        """
+        Reads the text indexes saved in <file>.fts, a JSON object of
+        the serialized indexes by class and attribute name.
+
+        Returns:
+            dict: The serialized indexes, or an empty dictionary if
+                  the file is missing or damaged.
+        """
+        try:
+            with open_verified(self.__file_path + ".fts") as file:
+                saved = json.loads(file.read())
+        except (OSError, ValueError, RecursionError):
+            return {}
+        return saved if isinstance(saved, dict) else {}
+
+    def __read_text_index(self, cls_name, name, index):
+        """
+        Loads a text index from <file>.fts, if it can be read.
+        A missing or damaged file is ignored: the texts it did not
+        restore are indexed when the index is built.
+
+        Args:
+            cls_name (str): The name of the class.
+            name (str): The name of the text attribute.
+            index (TextIndex): The empty index.
+        """
+        data = self.__read_text_file().get(f"{cls_name}.{name}")
+        if data is not None:
+            try:
+                index.loads(data)
+            except ValueError:
+                pass  # the texts not loaded are indexed
+
+    def __write_file(self, path, fragments):
+        """
+        Writes the serialized form of some objects to a file.
+
+        Args:
+            path (str): The path of the file.
+            fragments (iterable): The serialized objects to write.
+        """
+        with atomic_write(path, self.__checksum, self.__fsync) as file:
+            write_file(file, self.__codec, fragments)
+
+    def __encode(self, key, value):
+        """
+        Returns the serialized form of one object in the format
+        of the storage codec.
+
+        Args:
+            key (str): The storage key of the object.
+            value (dict): The serialized object.
+        """
+        return self.__codec.encode(key, value)
+
+    def __read_file(self, path):
+        """
+        Iterates over the objects stored in a file, whatever its codec.
+
+        Args:
+            path (str): The path of the file.
+
+        Yields:
+            tuple: (key, value, fragment) where value is the serialized
+                   object and fragment its serialized form in the format
+                   of the storage codec, or None if the file was written
+                   with another codec.
+
+        Raises:
+            ValueError: If the file does not match its checksum.
+        """
+        with open_verified(path) as file:
+            codec, items = read_file(file, self.__codec)
+            same_codec = codec is self.__codec
+            for key, value, fragment in items:
+                yield key, value, fragment if same_codec else None
+
+    def export_json(self, path):
+        """
+        Writes every object to a file in the JSON format,
+        whatever the snapshot format of the storage.
+
+        Args:
+            path (str): The path of the JSON file.
+        """
+        loaded = ((key, obj.to_dict())
+                  for key, obj in list(self.__objects.items()))
+        unloaded = (item for records in list(self.__unloaded.values())
+                    for item in records.copy().items())
+        with atomic_write(path, checksum=False, fsync=self.__fsync) as file:
+            text = io.TextIOWrapper(file, encoding="utf-8")
+            write_object_members(text, (
+                encode_member(key, value)
+                for key, value in itertools.chain(loaded, unloaded)))
+            text.flush()
+            text.detach()
+
+    def import_json(self, path):
+        """
+        Loads every object of a file in the JSON format,
+        then writes the storage in its own snapshot format.
+
+        Args:
+            path (str): The path of the JSON file.
+        """
+        with open(path, "r", encoding="utf-8") as file:
+            for key, value in iter_object_items(file):
+                self.__load(key, value)
+                self.__stale_shards.add(value["__class__"])
+                if not self.snapshots or self.__shared:
+                    self.__dirty[key] = None
+        self.compact()
+
+    def reload(self, classes=None):
         """
         Reloads objects from the JSON file into memory.
 
-        Reads data from the JSON file and creates instances
+        Reads the JSON file one object at a time and creates instances
         of the appropriate classes based on the data.
         The objects are then stored in memory.
+        In journal mode the journal is replayed on top of the file.
+        A missing file is an empty storage.
+
+        Args:
+            classes (list): Optional classes or class names to load,
+                            in sharded mode (only their files are read)
+                            or when the objects are not written to
+                            files. A save rewrites the single file with
+                            the objects in memory, so it would drop the
+                            classes that were not loaded. Not in
+                            journal mode: a compaction truncates the
+                            journal, so it would drop the changes of
+                            the classes that were not loaded.
+
+        Raises:
+            ValueError: If a file is damaged or cannot be parsed, or
+                        if classes are given to a storage writing
+                        every object to one file or keeping a journal.
         """
-        from_json = {}
-        classes = {
-            "BaseModel": BaseModel,
-            "User": User,
-            "State": State,
-            "City": City,
-            "Amenity": Amenity,
-            "Place": Place,
-            "Review": Review,
-        }
+        if classes is not None and self.snapshots and not self.__sharded:
+            raise ValueError("only a sharded storage can reload "
+                             "some classes")
+        if (classes is not None and self.snapshots
+                and self.__journal is not None):
+            raise ValueError("a storage keeping a journal cannot reload "
+                             "some classes")
+        self.flush()
+        if classes is None:
+            classes = list(FileStorage.__classes)
+        classes = [getattr(cls, "__name__", cls) for cls in classes]
+        if self.__shared:  # read before, so a later change is merged
+            self.__signature = file_signature(self.__file_path)
+
+        # the views are rebuilt once every object is loaded
+        views, self.__views = self.__views, {}
         try:
-            with open(FileStorage.__file_path, "r", encoding="utf-8") as file:
-                from_json = json.load(file)
-        except Exception:
-            pass
-
-        for key, value in from_json.items():
-            class_name = value["__class__"]
-            instance = classes[class_name](**value)
-            FileStorage.__objects[key] = instance
+            # records are built one at a time as they are read
+            for op, key, value, fragment in self._read_changes(classes):
+                if op == "put":
+                    self.__load(key, value, fragment)
+                    if self.__shared:
+                        self.__versions[key] = value.get("__version__", 0)
+                else:
+                    self.__unstore(key)
+                    self.__serialized.pop(key, None)
+        finally:
+            self.__views = views
+            for name in views:
+                self.__build_view(name)
+        self.__dirty.clear()
+        self.__deleted.clear()
+
+    def _read_changes(self, classes):
+        """
+        Iterates over the stored objects of some classes: those of the
+        file, or of their files in sharded mode, then the changes
+        recorded in the journal.
+
+        Args:
+            classes (list): The names of the classes.
+
+        Yields:
+            tuple: (op, key, value, fragment) where op is "put" or
+                   "del", value is the serialized object (None for
+                   "del") and fragment its serialized form in the
+                   format of the storage codec, or None if unknown.
+
+        Raises:
+            ValueError: If a file is damaged or cannot be parsed.
+        """
+        if self.__sharded:
+            paths = [self.shard_path(cls_name) for cls_name in classes]
+        else:
+            paths = [self.__file_path]
+        for path in paths:
+            try:
+                for key, value, fragment in self.__read_file(path):
+                    if value["__class__"] in classes:
+                        yield "put", key, value, fragment
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                raise ValueError(f"cannot load {path}: {e}") from e
+
+        if self.__journal is not None:
+            for op, key, value in self.__journal.replay():
+                if key.split(".")[0] not in classes:
+                    continue
+                self.__stale_shards.add(key.split(".")[0])
+                yield op, key, value, None
+
+    def _snapshot_records(self, puts, deletes):
+        """
+        Returns the stored form of every object at this point, which
+        later changes must not affect: a copy of the serialized forms
+        in the format of the storage codec. A copy of the dictionary
+        only copies references, and the forms themselves are replaced,
+        never changed, by the saves. Called with the write lock and
+        the lock held, after the changed objects were serialized.
+
+        Args:
+            puts (dict): The serialized objects saved but not written
+                         yet, by key.
+            deletes (set): The keys of the objects removed but not
+                           deleted from the file yet.
+
+        Returns:
+            Mapping: The stored forms by key, decoded by the codec
+                     unless snapshots is False, in which case they
+                     are serialized objects.
+        """
+        return self.__fragments()
+
+    def _saved_record(self, key):
+        """
+        Returns the serialized object of a key as the last save or
+        reload left it, or None if it was not saved. Called with the
+        write lock and the lock held, for an object that has no
+        pending write, before it changes.
+
+        Args:
+            key (str): The storage key of the object.
+
+        Returns:
+            dict: The serialized object, or None.
+        """
+        fragment = self.__serialized.get(key)
+        if fragment is None:
+            obj = self.__objects.get(key)
+            # its form is not kept, and it has not changed since saved
+            return None if obj is None else obj.to_dict()
+        return self.__codec.decode(fragment)
+
+    def __load(self, key, value, fragment=None):
+        """
+        Creates an instance from its serialized form and stores it.
+        In lazy mode the serialized form is only indexed by key.
+
+        Args:
+            key (str): The storage key of the object.
+            value (dict): The serialized object.
+            fragment: The serialized form of the object in the file
+                      format, if known.
+        """
+        if self.snapshots and (self.__lazy or self.__keep_fragments):
+            if fragment is None:
+                fragment = self.__encode(key, value)
+            self.__serialized[key] = fragment
+        if self.__lazy:
+            if key in self.__objects:
+                self.__unstore(key)
+            if self.__cache is not None:  # replaced by the new value
+                self.__evicted.pop(key, None)
+            records = self.__records(value["__class__"])
+            if isinstance(records, FragmentRecords):
+                records.add(key, fragment)
+            else:
+                records[key] = value
+            self.__index(key, value)
+            if self.__key_index is not None:
+                self.__key_index.add(key)
+        else:
+            instance = FileStorage.__classes[value["__class__"]](**value)
+            self.__store(key, instance)
+
+    def __update(self, key, value, fragment=None):
+        """
+        Stores the serialized form of an object, updating its instance
+        in place if there is one, so that the references held to it
+        see the new values and their later changes are saved.
+
+        Args:
+            key (str): The storage key of the object.
+            value (dict): The serialized object.
+            fragment: The serialized form of the object in the file
+                      format, if known.
+        """
+        obj = self.__objects.get(key)
+        if obj is None and self.__cache is not None:
+            obj = self.__evicted.get(key)
+        if obj is None:
+            self.__load(key, value, fragment)
+            return
+        updated = FileStorage.__classes[value["__class__"]](**value)
+        obj.__dict__.clear()
+        obj.__dict__.update(updated.__dict__)
+        if key not in self.__objects:  # evicted, loaded from its record
+            self.__load(key, value, fragment)
+            self.__evicted[key] = obj
+            return
+        if self.snapshots and self.__keep_fragments:
+            if fragment is None:
+                fragment = self.__encode(key, value)
+            self.__serialized[key] = fragment
+        self.__index(key, obj.__dict__)
+
+    def __store(self, key, obj, loaded=False):
+        """
+        Stores an instance and indexes it by class. With a cache,
+        the least recently used instances are then evicted.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The instance.
+            loaded (bool): Whether the instance was just created from
+                           its serialized form.
+        """
+        cls_name = key.partition(".")[0]
+        self.__objects[key] = obj
+        self.__by_class.setdefault(cls_name, {})[key] = obj
+        if not self.__keep_fragments:  # serialized again when written
+            self.__serialized.pop(key, None)
+        if self.__cache is not None:
+            self.__evicted.pop(key, None)
+        if cls_name in self.__unloaded:
+            if loaded and self.__cache is not None:
+                # kept on disk until it changes, to be evicted for free
+                self.__unloaded[cls_name].detach(key)
+            else:
+                self.__unloaded[cls_name].pop(key, None)
+        if not loaded:  # its serialized form is indexed already
+            self.__index(key, obj.__dict__)
+            if self.__key_index is not None:
+                self.__key_index.add(key)
+        if self.__cache is not None:
+            self.__cache.admit(key, obj, loaded)
+            while self.__cache.full():
+                self.__evict()
+
+    def __evict(self):
+        """
+        Evicts the least recently used instance from memory, writing
+        it to its record first if it changed. It stays indexed.
+        """
+        key, changed = self.__cache.evict()
+        cls_name = key.partition(".")[0]
+        obj = self.__objects.pop(key)
+        del self.__by_class[cls_name][key]
+        self.__evicted[key] = obj
+        records = self.__records(cls_name)
+        if changed or not records.attach(key):
+            records[key] = obj.to_dict()
+
+    def __unstore(self, key):
+        """
+        Removes an object from memory, whether it was created or
+        only indexed by a lazy reload.
+
+        Args:
+            key (str): The storage key of the object.
+
+        Returns:
+            BaseModel: The removed instance, or None if it
+                       was not created.
+        """
+        cls_name = key.partition(".")[0]
+        if cls_name in self.__unloaded:
+            self.__unloaded[cls_name].pop(key, None)
+        if cls_name in self.__by_class:
+            self.__by_class[cls_name].pop(key, None)
+        for index in self.__indexes.get(cls_name, {}).values():
+            index.remove(key)
+        if cls_name in self.__spatial:
+            self.__spatial[cls_name].remove(key)
+        if self.__key_index is not None:
+            self.__key_index.remove(key)
+        if self.__cache is not None:
+            self.__cache.discard(key)
+            self.__evicted.pop(key, None)
+        obj = self.__objects.pop(key, None)
+        if self.__views:
+            self.__update_views(key)
+        return obj
+
+    def __attribute_index(self, cls_name, name):
+        """
+        Returns the index of an attribute of a class, building it from
+        the stored objects the first time, so that a reload only costs
+        the indexes that are used, besides the HashIndex of the
+        indexed attributes. A text index starts from the one
+        saved in <file>.fts, whose texts that did not change are not
+        indexed again. Once built, an index is kept up to date.
+
+        Args:
+            cls_name (str): The name of the class.
+            name (str): The name of the attribute.
+
+        Returns:
+            HashIndex|SortedIndex|TextIndex|BitmapIndex: The index, or
+                                                         None if the
+                                                         attribute is
+                                                         not indexed.
+        """
+        built = self.__built_indexes(cls_name)
+        index = built.get(name)
+        if index is not None:
+            return index
+        cls = FileStorage.__classes.get(cls_name, BaseModel)
+        for attributes, kind in ((cls.sorted_attributes, SortedIndex),
+                                 (cls.text_attributes, TextIndex),
+                                 (cls.list_attributes, BitmapIndex)):
+            if name in attributes:
+                index = kind()
+                break
+        else:
+            return None
+        if kind is TextIndex:
+            self.__read_text_index(cls_name, name, index)
+        default = getattr(cls, name)
+        for key in itertools.chain(self.__by_class.get(cls_name, ()),
+                                   self.__unloaded.get(cls_name, ())):
+            index.add(key, self.__attributes(key).get(name, default))
+        if kind is TextIndex:
+            index.prune()  # the saved texts of the deleted objects
+        return built.setdefault(name, index)
+
+    def __built_indexes(self, cls_name):
+        """
+        Returns the indexes of a class built so far, creating the
+        HashIndex of its indexed attributes the first time: they are
+        kept from the start, since they link the objects for the
+        relations and the views, in the order they were indexed.
+
+        Args:
+            cls_name (str): The name of the class.
+
+        Returns:
+            dict: The indexes by attribute name.
+        """
+        indexes = self.__indexes.get(cls_name)
+        if indexes is None:
+            cls = FileStorage.__classes.get(cls_name, BaseModel)
+            indexes = {name: HashIndex() for name in cls.indexed_attributes}
+            self.__indexes[cls_name] = indexes
+        return indexes
+
+    def __text_indexes(self, cls_name):
+        """
+        Returns the text indexes of a class, building them the first
+        time.
+
+        Args:
+            cls_name (str): The name of the class.
+
+        Returns:
+            dict: The TextIndex of each text attribute by name.
+        """
+        cls = FileStorage.__classes.get(cls_name, BaseModel)
+        return {name: self.__attribute_index(cls_name, name)
+                for name in cls.text_attributes}
+
+    def __sorted_index(self, cls, attribute):
+        """
+        Returns the index of a sorted attribute.
+
+        Args:
+            cls (type|str): The class of the objects or its name.
+            attribute (str): The name of the attribute.
+
+        Returns:
+            SortedIndex: The index.
+
+        Raises:
+            ValueError: If the attribute is not sorted.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        index = self.__attribute_index(cls_name, attribute)
+        if not isinstance(index, SortedIndex):
+            raise ValueError(f"{cls_name}.{attribute} is not sorted")
+        return index
+
+    def __spatial_index(self, cls):
+        """
+        Returns the spatial index of a class, creating it the first
+        time.
+
+        Args:
+            cls (type|str): The class or its name.
+
+        Returns:
+            GridIndex: The index.
+
+        Raises:
+            ValueError: If the class has no spatial attributes.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        index = self.__spatial.get(cls_name)
+        if index is None:
+            model = FileStorage.__classes.get(cls_name, BaseModel)
+            if not model.spatial_attributes:
+                raise ValueError(f"{cls_name} has no spatial attributes")
+            index = GridIndex()
+            for key in itertools.chain(self.__by_class.get(cls_name, ()),
+                                       self.__unloaded.get(cls_name, ())):
+                attributes = self.__attributes(key)
+                if all(name in attributes
+                       for name in model.spatial_attributes):
+                    index.add(key, *(attributes[name]
+                                     for name in model.spatial_attributes))
+            index = self.__spatial.setdefault(cls_name, index)
+        return index
+
+    def __index(self, key, attributes):
+        """
+        Indexes an object under the values of its indexed attributes
+        and at the point of its spatial attributes, unless they were
+        never set: the defaults of the class are not a location. Only
+        the indexes built so far are updated.
+
+        Args:
+            key (str): The storage key of the object.
+            attributes (dict): The attributes of the object, or its
+                               serialized form. Missing attributes
+                               have the default value of the class.
+        """
+        cls_name = key.partition(".")[0]
+        for name, index in self.__built_indexes(cls_name).items():
+            if name in attributes:
+                index.add(key, attributes[name])
+            else:
+                index.add(key, getattr(FileStorage.__classes[cls_name], name))
+        model = FileStorage.__classes.get(cls_name, BaseModel)
+        if cls_name in self.__spatial:
+            index = self.__spatial[cls_name]
+            if all(name in attributes for name in model.spatial_attributes):
+                latitude, longitude = (
+                    attributes[name] for name in model.spatial_attributes)
+                index.add(key, latitude, longitude)
+            else:
+                index.remove(key)
+        if self.__views:
+            self.__update_views(key, attributes)
+
+    def __resolve(self, keys):
+        """
+        Retrieves the objects of keys found in an index, creating
+        those indexed by a lazy reload.
+
+        Args:
+            keys (list): The storage keys.
+
+        Returns:
+            list: The objects.
+        """
+        found = [self.__objects.get(key) for key in keys]
+        if self.__cache is not None:
+            for key in keys:
+                self.__cache.hit(key)
+        if None in found:
+            found = [self.__materialize(key) if obj is None else obj
+                     for key, obj in zip(keys, found)]
+        return found
+
+    def __materialize(self, key):
+        """
+        Creates the instance of an object indexed by a lazy reload.
+
+        Args:
+            key (str): The storage key of the object.
+
+        Returns:
+            BaseModel: The new instance, or the evicted instance of the
+                       object if it is still referenced elsewhere.
+        """
+        instance = self.__evicted.get(key)
+        if instance is None:
+            value = self.__unloaded[key.partition(".")[0]][key]
+            instance = FileStorage.__classes[value["__class__"]](**value)
+        self.__store(key, instance, loaded=True)
+        return instance
+
+    def __materialize_class(self, cls_name):
+        """
+        Creates the instances of a class indexed by a lazy reload.
+
+        Args:
+            cls_name (str): The name of the class.
+        """
+        records = self.__unloaded.pop(cls_name, {})
+        for key, value in records.items():
+            instance = FileStorage.__classes[value["__class__"]](**value)
+            self.__store(key, instance, loaded=True)
+
+    def __all_cached(self, cls_name=None):
+        """
+        Retrieves every object, or the objects of one class, when
+        there is a cache, in the order of their keys within each
+        class: which objects are in memory changes as the cache
+        evicts them, so it cannot give the order. The objects read
+        back from disk may be evicted again as the next ones are read.
+
+        Args:
+            cls_name (str): Optional class name.
+
+        Returns:
+            dict: A new dictionary of the objects by key.
+        """
+        if cls_name is None:
+            names = list(dict.fromkeys(
+                itertools.chain(self.__by_class, self.__unloaded)))
+        else:
+            names = [cls_name]
+        found = {}
+        for name in names:
+            for key in sorted(itertools.chain(
+                    self.__by_class.get(name, ()),
+                    self.__unloaded.get(name, ()))):
+                obj = self.__by_class.get(name, {}).get(key)
+                if obj is None:
+                    obj = self.__materialize(key)
+                found[key] = obj
+        return found
+
+    def __records(self, cls_name):
+        """
+        Returns the serialized objects of a class that have no
+        instance in memory, creating their mapping the first time:
+        a RecordStore on disk when there is a cache, or the fragments
+        kept for the next save, decoded when read.
+
+        Args:
+            cls_name (str): The name of the class.
+
+        Returns:
+            dict|RecordStore|FragmentRecords: The serialized objects by
+                                              key.
+        """
+        records = self.__unloaded.get(cls_name)
+        if records is None:
+            if self.__cache is not None:
+                records = RecordStore(os.path.dirname(self.__file_path))
+            elif self.snapshots:
+                records = FragmentRecords(self.__codec.decode)
+            else:
+                records = {}
+            self.__unloaded[cls_name] = records
+        return records
+
+    def __build_view(self, name):
+        """
+        Rebuilds an aggregate view from the stored objects.
+
+        Args:
+            name (str): The name of the view.
+        """
+        view = self.__views[name]
+        view.clear()
+        cls_name = view.classes[0]
+        for key in itertools.chain(self.__by_class.get(cls_name, ()),
+                                   self.__unloaded.get(cls_name, ())):
+            self.__aggregate(view, key, self.__attributes(key))
+
+    def __update_views(self, key, attributes=None, name=None):
+        """
+        Updates the aggregate views after an object was stored,
+        changed or removed: the object itself, or the objects whose
+        group_by path goes through it.
+
+        Args:
+            key (str): The storage key of the object.
+            attributes (dict): The attributes of the object, or its
+                               serialized form, or None if the object
+                               was removed.
+            name (str): The attribute that changed, or None if any
+                        attribute may have changed.
+        """
+        cls_name = key.partition(".")[0]
+        for view in self.__views.values():
+            if cls_name == view.classes[0] and (
+                    name is None or name in (view.group_by[0],
+                                             view.attribute)):
+                self.__aggregate(view, key, attributes)
+            for level in range(1, len(view.classes)):
+                if cls_name == view.classes[level] and (
+                        name is None or name == view.group_by[level]):
+                    # objects referring to this one, through the
+                    # indexes of the foreign keys of the path
+                    keys = [key]
+                    for i in range(level - 1, -1, -1):
+                        index = self.__attribute_index(
+                            view.classes[i], view.group_by[i])
+                        keys = [child for parent in keys
+                                for child in index.lookup(
+                                    parent.partition(".")[2])]
+                    for child in keys:
+                        self.__aggregate(view, child,
+                                         self.__attributes(child))
+
+    def __aggregate(self, view, key, attributes):
+        """
+        Puts an object in the group its group_by path leads to, or
+        removes it from the view if it was removed or the path is
+        broken by a missing object.
+
+        Args:
+            view (AggregateView): The view.
+            key (str): The storage key of the object.
+            attributes (dict): The attributes of the object, or its
+                               serialized form, or None.
+        """
+        classes = view.classes
+        value = None
+        for level, name in enumerate(view.group_by):
+            if attributes is None:
+                view.remove(key)
+                return
+            model = FileStorage.__classes.get(classes[level], BaseModel)
+            if level == 0 and view.attribute is not None:
+                value = attributes.get(view.attribute,
+                                       getattr(model, view.attribute, None))
+            group = attributes.get(name, getattr(model, name, None))
+            if level + 1 < len(classes):
+                attributes = self.__attributes(f"{classes[level + 1]}."
+                                               f"{group}")
+        view.add(key, group, value)
+
+    def __attributes(self, key):
+        """
+        Returns the attributes of a stored object, without creating
+        the instance of a lazy reload.
+
+        Args:
+            key (str): The storage key of the object.
+
+        Returns:
+            dict: The attributes of the instance, or its serialized
+                  form, or None if the object is not stored.
+        """
+        obj = self.__objects.get(key)
+        if obj is not None:
+            return obj.__dict__
+        return self.__unloaded.get(key.partition(".")[0], {}).get(key)
@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+"""
+This module contains the Flusher class, a background thread that
+runs the writes requested by FileStorage.save() so that a burst of
+saves is coalesced into one write.
+"""
+
+import atexit
+import threading
+import time
+
+
+class Flusher:
+    """
+    Runs a write function on a background thread.
+
+    request() only records that a write is needed. The thread waits
+    until the first pending request is `interval` seconds old, or
+    until `threshold` requests are pending, then calls the write
+    function once for all of them. flush() waits until every request
+    made so far has been written. A failed write leaves its requests
+    pending, to be written again with the next request or flush, and
+    its error is raised in every flush waiting for one of them. The
+    flusher is closed when the interpreter exits so that pending
+    writes are not lost.
+
+    Attributes:
+        interval (float): The longest time in seconds a request waits.
+        threshold (int): The number of pending requests that starts
+                         a write at once.
+    """
+
+    def __init__(self, write, interval, threshold=1000):
+        """
+        Initializes the flusher and starts its thread.
+
+        Args:
+            write (callable): The function writing the pending changes.
+            interval (float): The longest time in seconds a request
+                              waits before it is written.
+            threshold (int): The number of pending requests that starts
+                             a write at once.
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.__write = write
+        self.__cond = threading.Condition()
+        self.__requested = 0
+        self.__written = 0
+        self.__since = None
+        self.__urgent = False
+        self.__closed = False
+        self.__attempts = 0
+        # failed writes by attempt number: (last request, error)
+        self.__failures = {}
+        self.__waiting = []
+        self.__thread = threading.Thread(
+            target=self.__run, name="FileStorage-flusher", daemon=True)
+        self.__thread.start()
+        atexit.register(self.close)
+
+    @property
+    def pending(self):
+        """
+        The number of requests not written yet.
+        """
+        with self.__cond:
+            return self.__requested - self.__written
+
+    def request(self):
+        """
+        Records that a write is needed.
+
+        Raises:
+            ValueError: If the flusher is closed.
+        """
+        with self.__cond:
+            if self.__closed:
+                raise ValueError("flush requested on a closed storage")
+            self.__requested += 1
+            if self.__since is None:
+                self.__since = time.monotonic()
+                self.__cond.notify_all()
+            elif self.__requested - self.__written >= self.threshold:
+                self.__cond.notify_all()
+
+    def flush(self, urgent=True):
+        """
+        Waits until every request made so far has been written.
+
+        Args:
+            urgent (bool): Whether to write at once instead of
+                           waiting for the interval or the threshold.
+
+        Raises:
+            Exception: The error of a write of these requests that
+                       failed while waiting.
+        """
+        with self.__cond:
+            target = self.__requested
+            if self.__written < target:
+                if self.__since is None:  # left by a failed write
+                    self.__since = time.monotonic()
+                self.__urgent = self.__urgent or urgent
+                self.__cond.notify_all()
+            start = self.__attempts
+            self.__waiting.append(start)
+            try:
+                while self.__written < target and \
+                        self.__thread.is_alive():
+                    error = next((
+                        error for attempt, (last, error)
+                        in self.__failures.items()
+                        if attempt > start and last >= target), None)
+                    if error is not None:
+                        raise error
+                    self.__cond.wait()
+            finally:
+                self.__waiting.remove(start)
+                self.__failures = {
+                    attempt: failure
+                    for attempt, failure in self.__failures.items()
+                    if self.__waiting and attempt > min(self.__waiting)}
+
+    def close(self):
+        """
+        Writes the pending requests and stops the thread.
+        Closing a closed flusher does nothing.
+        """
+        if self.__closed:
+            return
+        atexit.unregister(self.close)
+        try:
+            self.flush()
+        finally:
+            with self.__cond:
+                self.__closed = True
+                self.__cond.notify_all()
+            self.__thread.join()
+
+    def __run(self):
+        """
+        The loop of the thread: waits for requests and writes them.
+        """
+        while True:
+            with self.__cond:
+                while self.__since is None and not self.__closed:
+                    self.__cond.wait()
+                if self.__since is None:
+                    return
+                deadline = self.__since + self.interval
+                while not (self.__urgent or self.__closed
+                           or self.__requested - self.__written
+                           >= self.threshold):
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self.__cond.wait(timeout)
+                target = self.__requested
+                self.__since = None
+                self.__urgent = False
+            try:
+                self.__write()
+            except Exception as e:
+                error = e
+            else:
+                error = None
+            with self.__cond:
+                self.__attempts += 1
+                if error is None:
+                    self.__written = target
+                elif self.__waiting:
+                    self.__failures[self.__attempts] = (target, error)
+                if error is not None or self.__written == self.__requested:
+                    self.__urgent = False
+                self.__cond.notify_all()
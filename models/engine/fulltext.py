@@ -0,0 +1,414 @@
+#!/usr/bin/python3
+"""
+This module contains the full-text index FileStorage keeps on the
+text attributes of models.
+
+A model declares the attributes to index by word in its
+text_attributes class attribute, such as Review.text and
+Place.description, and FileStorage maintains one TextIndex per
+declared attribute as objects are added, changed, removed and
+reloaded. An index maps every word to the objects containing it
+(its postings) and ranks the objects matching a search with BM25.
+
+The indexes are a cache persisted next to the storage file: every
+indexed text is recorded with its checksum, so when an index is built
+again a text whose checksum matches the persisted one is not
+tokenized again, and only the texts that changed since the indexes
+were written are. Postings are persisted as packed arrays, base64
+encoded in a JSON document, which load much faster than dictionaries
+and are only unpacked when their word is first used. Loading the
+document runs no code, and a document that does not describe a
+valid index is rejected as a whole.
+"""
+
+import base64
+import heapq
+from array import array
+import math
+import re
+import threading
+import zlib
+
+FORMAT_VERSION = 2
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Splits a text into lowercase words.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        list: The words, in order.
+    """
+    return _WORD.findall(text.lower())
+
+
+def _as_text(value):
+    """
+    Returns the text indexed for the value of an attribute, which the
+    console may have converted to a number.
+
+    Args:
+        value: The value of the attribute.
+    """
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _pack(numbers):
+    """
+    Packs numbers as an array of unsigned integers in base64.
+
+    Args:
+        numbers (iterable): The numbers.
+
+    Returns:
+        str: The packed numbers.
+    """
+    return base64.b64encode(array("I", numbers).tobytes()).decode("ascii")
+
+
+def _unpack(packed, bound):
+    """
+    Checks packed numbers and returns their bytes.
+
+    Args:
+        packed (str): The numbers packed by _pack().
+        bound (int): The numbers must be smaller than this bound.
+
+    Returns:
+        bytes: The bytes of the array of numbers.
+
+    Raises:
+        TypeError, ValueError: If they are not valid packed numbers.
+    """
+    data = base64.b64decode(packed, validate=True)
+    numbers = array("I", data)
+    if numbers and max(numbers) >= bound:
+        raise ValueError("a number is out of range")
+    return data
+
+
+def _unpack_index(data):
+    """
+    Checks a serialized index and unpacks its arrays.
+
+    Args:
+        data (dict): The serialized index.
+
+    Returns:
+        tuple: The keys, the words, the postings as pairs of arrays of
+               key numbers and counts, the documents as (checksum,
+               length, array of word numbers) and the total length.
+
+    Raises:
+        TypeError, KeyError, ValueError: If the index is not valid.
+    """
+    keys, words = data["keys"], data["words"]
+    if not isinstance(keys, list) or not isinstance(words, list) or \
+            not all(isinstance(item, str) for item in keys + words):
+        raise TypeError("keys and words must be strings")
+    if len(data["postings"]) != len(words) or \
+            len(data["documents"]) != len(keys):
+        raise ValueError("the numbers of postings or documents differ")
+    postings = []
+    for ids, counts in data["postings"]:
+        ids, counts = _unpack(ids, len(keys)), _unpack(counts, 2 ** 32)
+        if len(ids) != len(counts):
+            raise ValueError("a posting has more keys than counts")
+        postings.append((ids, counts))
+    documents = []
+    for checksum, length, document_words in data["documents"]:
+        if not isinstance(checksum, int) or not isinstance(length, int):
+            raise TypeError("checksums and lengths must be integers")
+        documents.append(
+            (checksum, length, _unpack(document_words, len(words))))
+    total_length = data["total_length"]
+    if not isinstance(total_length, int):
+        raise TypeError("the total length must be an integer")
+    return keys, words, postings, documents, total_length
+
+
+class TextIndex:
+    """
+    Maps the words of one text attribute to the storage keys of the
+    objects whose text contains them, with the number of occurrences.
+
+    Attributes:
+        changes (int): The number of texts indexed or removed since
+                       the index was created or last dumped.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        """
+        Initializes an empty index.
+        """
+        self.__lock = threading.Lock()
+        self.__postings = {}
+        self.__documents = {}
+        self.__total_length = 0
+        self.__unconfirmed = set()
+        self.__keys = []
+        self.__words = []
+        self.changes = 0
+
+    def __len__(self):
+        """
+        Returns the number of indexed objects.
+        """
+        return len(self.__documents)
+
+    def add(self, key, text):
+        """
+        Indexes the text of an object, replacing its previous text.
+        Nothing is done if the text did not change.
+
+        Args:
+            key (str): The storage key of the object.
+            text (str): The text of the attribute.
+        """
+        text = _as_text(text)
+        checksum = zlib.crc32(text.encode("utf-8", "surrogatepass"))
+        with self.__lock:
+            self.__unconfirmed.discard(key)
+            document = self.__documents.get(key)
+            if document is not None and document[0] == checksum:
+                return
+            if document is None and not text:
+                return
+            self.__remove(key)
+            counts = {}
+            for word in tokenize(text):
+                counts[word] = counts.get(word, 0) + 1
+            self.changes += 1
+            if not counts:
+                return
+            for word, count in counts.items():
+                posting = self.__posting(word)
+                if posting is None:
+                    posting = self.__postings[word] = {}
+                posting[key] = count
+            length = sum(counts.values())
+            self.__documents[key] = (checksum, length, tuple(counts))
+            self.__total_length += length
+
+    def remove(self, key):
+        """
+        Removes an object from the index, if it is indexed.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        with self.__lock:
+            self.__unconfirmed.discard(key)
+            if key in self.__documents:
+                self.__remove(key)
+                self.changes += 1
+
+    def lookup(self, text):
+        """
+        Returns the keys of the objects whose text contains every
+        word of a text.
+
+        Args:
+            text (str): The words to search.
+
+        Returns:
+            list: The storage keys, in no particular order.
+        """
+        return [key for _, key in self.rank(text)]
+
+    def estimate(self, op, value):
+        """
+        Returns None: the query planner cannot use a text index.
+
+        Args:
+            op (str): The comparison operator.
+            value: The value compared with.
+        """
+        return None
+
+    def search(self, op, value):
+        """
+        Returns no keys: the query planner cannot use a text index.
+
+        Args:
+            op (str): The comparison operator.
+            value: The value compared with.
+        """
+        return []
+
+    def rank(self, text, limit=None):
+        """
+        Scores the objects whose text contains every word of a text
+        with BM25.
+
+        Args:
+            text (str): The words to search.
+            limit (int): Optional largest number of objects to return.
+
+        Returns:
+            list: (score, storage key) pairs, best first.
+        """
+        words = set(tokenize(_as_text(text)))
+        if not words:
+            return []
+        with self.__lock:
+            postings = [self.__posting(word) for word in words]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            keys = [key for key in postings[0]
+                    if all(key in other for other in postings[1:])]
+            count = len(self.__documents)
+            average = self.__total_length / count
+            scores = []
+            for key in keys:
+                length = self.__documents[key][1]
+                norm = self.K1 * (1 - self.B + self.B * length / average)
+                score = 0.0
+                for posting in postings:
+                    frequency = posting[key]
+                    idf = math.log(1 + (count - len(posting) + 0.5)
+                                   / (len(posting) + 0.5))
+                    score += (idf * frequency * (self.K1 + 1)
+                              / (frequency + norm))
+                scores.append((score, key))
+        if limit is None:
+            return sorted(scores, key=lambda item: (-item[0], item[1]))
+        return heapq.nsmallest(limit, scores,
+                               key=lambda item: (-item[0], item[1]))
+
+    def dumps(self):
+        """
+        Serializes the index. Keys and words are numbered, and the
+        postings and the words of every text are packed as arrays of
+        numbers, base64 encoded.
+
+        Returns:
+            dict: The serialized index, which json.dumps() can write.
+        """
+        with self.__lock:
+            keys = list(self.__documents)
+            key_ids = {key: i for i, key in enumerate(keys)}
+            words = list(self.__postings)
+            word_ids = {word: i for i, word in enumerate(words)}
+            postings = []
+            for word in words:
+                posting = self.__posting(word)
+                postings.append([
+                    _pack(map(key_ids.__getitem__, posting)),
+                    _pack(posting.values())])
+            documents = [
+                [document[0], document[1], _pack(map(
+                    word_ids.__getitem__, self.__document_words(document)))]
+                for document in self.__documents.values()]
+            data = {"version": FORMAT_VERSION, "keys": keys, "words": words,
+                    "postings": postings, "documents": documents,
+                    "total_length": self.__total_length}
+            self.changes = 0
+        return data
+
+    def loads(self, data):
+        """
+        Replaces the index with a serialized index. Its postings are
+        only unpacked when their word is first used. Its objects are
+        unconfirmed until they are added again, and prune() removes
+        those that are not.
+
+        Args:
+            data (dict): The serialized index, as dumps() returned it.
+
+        Raises:
+            ValueError: If the data is not a serialized index.
+        """
+        try:
+            version = data["version"]
+        except (TypeError, KeyError, IndexError) as e:
+            raise ValueError(f"not a text index: {e!r}") from e
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unknown text index version: {version}")
+        try:
+            keys, words, postings, documents, total_length = _unpack_index(
+                data)
+        except (TypeError, KeyError, ValueError) as e:
+            raise ValueError(f"not a text index: {e!r}") from e
+        with self.__lock:
+            self.__keys = keys
+            self.__words = words
+            self.__postings = dict(zip(words, postings))
+            self.__documents = dict(zip(keys, documents))
+            self.__total_length = total_length
+            self.__unconfirmed = set(keys)
+            self.changes = 0
+
+    def prune(self):
+        """
+        Removes the objects of a loaded index that were not added
+        again, i.e. that are no longer stored.
+        """
+        with self.__lock:
+            for key in self.__unconfirmed:
+                self.__remove(key)
+                self.changes += 1
+            self.__unconfirmed = set()
+
+    def __posting(self, word):
+        """
+        Returns the posting of a word as a dictionary, with the lock
+        held.
+
+        Args:
+            word (str): The word.
+
+        Returns:
+            dict: The number of occurrences of the word by storage key,
+                  or None if no text contains it.
+        """
+        posting = self.__postings.get(word)
+        if isinstance(posting, tuple):
+            ids, counts = posting
+            posting = self.__postings[word] = dict(zip(
+                map(self.__keys.__getitem__, array("I", ids)),
+                array("I", counts)))
+        return posting
+
+    def __document_words(self, document):
+        """
+        Returns the words of an indexed text.
+
+        Args:
+            document (tuple): The (checksum, length, words) of the text.
+
+        Returns:
+            tuple: The distinct words of the text.
+        """
+        words = document[2]
+        if isinstance(words, bytes):
+            return tuple(map(self.__words.__getitem__, array("I", words)))
+        return words
+
+    def __remove(self, key):
+        """
+        Removes an object from the index, with the lock held.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        document = self.__documents.pop(key, None)
+        if document is None:
+            return
+        self.__total_length -= document[1]
+        for word in self.__document_words(document):
+            posting = self.__posting(word)
+            del posting[key]
+            if not posting:
+                del self.__postings[word]
@@ -0,0 +1,579 @@
+#!/usr/bin/python3
+"""
+This module contains the secondary indexes FileStorage keeps on
+model attributes.
+
+A model declares the attributes to index by value in its
+indexed_attributes class attribute and those to index in order in its
+sorted_attributes class attribute, and FileStorage maintains one
+HashIndex or SortedIndex per declared attribute as objects are added,
+changed, removed and reloaded.
+
+Besides add(), remove() and lookup(), every index answers the query
+planner (see models.engine.query) through estimate(), which returns
+the number of objects matching a comparison or None if the index
+cannot answer it, and search(), which returns their keys.
+
+FileStorage also keeps the storage keys of every object in order in a
+KeyIndex, which gives all the objects, or those of one class, a stable
+order to be paginated in.
+
+An indexed attribute named <class name>_id (e.g. City.state_id) is a
+foreign key: its index maps every object of the referenced class to
+its children, which FileStorage uses as a relationship graph.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from models.engine.query import sort_key
+
+_LAST_KEY = "\U0010ffff"  # sorts after every storage key
+
+
+def foreign_keys(classes):
+    """
+    Finds the foreign keys among the indexed attributes of models.
+
+    Args:
+        classes (dict): The model classes by name.
+
+    Returns:
+        dict: For each class name, the list of (attribute name,
+              referenced class name) of its foreign keys.
+    """
+    names = {name.lower(): name for name in classes}
+    return {
+        name: [(attribute, names[attribute[:-3]])
+               for attribute in cls.indexed_attributes
+               if attribute.endswith("_id") and attribute[:-3] in names]
+        for name, cls in classes.items()
+    }
+
+
+class HashIndex:
+    """
+    Maps the values of one attribute to the storage keys of the
+    objects that have them. Unhashable values are not indexed.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty index.
+        """
+        self.__keys = {}
+        self.__values = {}
+
+    def __len__(self):
+        """
+        Returns the number of indexed objects.
+        """
+        return len(self.__values)
+
+    def add(self, key, value):
+        """
+        Indexes an object under a value, replacing its previous value.
+
+        Args:
+            key (str): The storage key of the object.
+            value: The value of the attribute.
+        """
+        self.remove(key)
+        try:
+            bucket = self.__keys.setdefault(value, {})
+        except TypeError:
+            return
+        bucket[key] = None
+        self.__values[key] = value
+
+    def remove(self, key):
+        """
+        Removes an object from the index, if it is indexed.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        bucket = self.__keys[value]
+        del bucket[key]
+        if not bucket:
+            del self.__keys[value]
+
+    def lookup(self, value):
+        """
+        Returns the keys of the objects indexed under a value,
+        in the order they were indexed.
+
+        Args:
+            value: The value of the attribute.
+
+        Returns:
+            list: The storage keys.
+        """
+        try:
+            return list(self.__keys.get(value, ()))
+        except TypeError:
+            return []
+
+    def estimate(self, op, value):
+        """
+        Returns the number of objects matching a comparison.
+
+        Args:
+            op (str): The comparison operator.
+            value: The value compared with.
+
+        Returns:
+            int: The number of matches, or None if the index
+                 cannot answer the comparison.
+        """
+        if op != "==":
+            return None
+        try:
+            return len(self.__keys.get(value, ()))
+        except TypeError:
+            return 0
+
+    def search(self, op, value):
+        """
+        Returns the keys of the objects matching a comparison
+        supported by estimate().
+
+        Args:
+            op (str): The comparison operator.
+            value: The value compared with.
+
+        Returns:
+            list: The storage keys.
+        """
+        return self.lookup(value)
+
+
+class SortedIndex:
+    """
+    Keeps the storage keys of objects ordered by the value of one
+    attribute, e.g. Place.price_by_night, for range searches, min(),
+    max() and ordered iteration with cursors.
+
+    Values are ordered by sort_key(): numbers, then strings, then other
+    values, so that a value converted by the console to an int, a float
+    or a str stays indexed. Objects with equal values are ordered by
+    key. NaN is not indexed.
+
+    The entries are kept in a list of sorted chunks of at most
+    2 * CHUNK_SIZE entries, found by bisecting the last entry of every
+    chunk, so that adding or removing an entry only moves the entries
+    of one chunk.
+    """
+
+    CHUNK_SIZE = 1000
+
+    def __init__(self):
+        """
+        Initializes an empty index.
+        """
+        self.__chunks = []
+        self.__lasts = []
+        self.__values = {}
+
+    def __len__(self):
+        """
+        Returns the number of indexed objects.
+        """
+        return len(self.__values)
+
+    def add(self, key, value):
+        """
+        Indexes an object under a value, replacing its previous value.
+
+        Args:
+            key (str): The storage key of the object.
+            value: The value of the attribute.
+        """
+        self.remove(key)
+        if value != value:
+            return  # NaN
+        entry = (sort_key(value), key)
+        self.__values[key] = value
+        if not self.__chunks:
+            self.__chunks.append([entry])
+            self.__lasts.append(entry)
+            return
+        i = min(bisect_left(self.__lasts, entry), len(self.__lasts) - 1)
+        chunk = self.__chunks[i]
+        insort(chunk, entry)
+        self.__lasts[i] = chunk[-1]
+        if len(chunk) > 2 * self.CHUNK_SIZE:
+            half = chunk[self.CHUNK_SIZE:]
+            del chunk[self.CHUNK_SIZE:]
+            self.__chunks.insert(i + 1, half)
+            self.__lasts[i:i + 1] = [chunk[-1], half[-1]]
+
+    def remove(self, key):
+        """
+        Removes an object from the index, if it is indexed.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        if key not in self.__values:
+            return
+        entry = (sort_key(self.__values.pop(key)), key)
+        i = bisect_left(self.__lasts, entry)
+        chunk = self.__chunks[i]
+        del chunk[bisect_left(chunk, entry)]
+        if chunk:
+            self.__lasts[i] = chunk[-1]
+        else:
+            del self.__chunks[i]
+            del self.__lasts[i]
+
+    def lookup(self, value):
+        """
+        Returns the keys of the objects indexed under a value,
+        ordered by key.
+
+        Args:
+            value: The value of the attribute.
+
+        Returns:
+            list: The storage keys.
+        """
+        return self.search("==", value)
+
+    def min(self):
+        """
+        Returns the smallest indexed value, or None if the index
+        is empty.
+        """
+        if not self.__chunks:
+            return None
+        return self.__values[self.__chunks[0][0][1]]
+
+    def max(self):
+        """
+        Returns the largest indexed value, or None if the index
+        is empty.
+        """
+        if not self.__chunks:
+            return None
+        return self.__values[self.__chunks[-1][-1][1]]
+
+    def estimate(self, op, value):
+        """
+        Returns the number of objects matching a comparison.
+
+        Args:
+            op (str): The comparison operator.
+            value: The value compared with.
+
+        Returns:
+            int: The number of matches, or None if the index
+                 cannot answer the comparison.
+        """
+        bounds = self.__bounds(op, value)
+        if bounds is None:
+            return None
+        return max(0, self.__rank(bounds[1]) - self.__rank(bounds[0]))
+
+    def search(self, op, value):
+        """
+        Returns the keys of the objects matching a comparison
+        supported by estimate(), in the order of their values.
+
+        Args:
+            op (str): The comparison operator.
+            value: The value compared with.
+
+        Returns:
+            list: The storage keys.
+        """
+        bounds = self.__bounds(op, value)
+        if bounds is None:
+            return []
+        return self.keys(*bounds)
+
+    def cursor(self, low=None, high=None, descending=False, after=None,
+               resolve=None):
+        """
+        Starts an ordered iteration over the objects whose value is
+        between two bounds, both included. A missing bound leaves the
+        range open up to the end of the values of the same type as
+        the other bound, or of every value if both are missing.
+
+        Args:
+            low: The smallest value.
+            high: The largest value.
+            descending (bool): Whether the largest values come first.
+            after (tuple): The position of a previous cursor, to
+                           resume after the last object it returned.
+            resolve (callable): Optional function mapping a list of
+                                storage keys to what the cursor
+                                returns, e.g. the objects.
+
+        Returns:
+            Cursor: The cursor.
+        """
+        if low is None:
+            start = (sort_key(high)[:1],) if high is not None else ()
+        else:
+            start = (sort_key(low),)
+        if high is None:
+            end = ((sort_key(low)[0] + 1,),) if low is not None else ((3,),)
+        else:
+            end = (sort_key(high), _LAST_KEY)
+        return Cursor(self, start, end, descending, after, resolve)
+
+    def keys(self, start, end, count=None, descending=False):
+        """
+        Returns the keys of the entries between two positions.
+
+        Args:
+            start (tuple): The first position, included.
+            end (tuple): The last position, excluded.
+            count (int): Optional largest number of keys.
+            descending (bool): Whether to start from the end.
+
+        Returns:
+            list: The storage keys, in order.
+        """
+        keys = []
+        if descending:
+            i = bisect_left(self.__lasts, end)
+            for chunk in reversed(self.__chunks[:i + 1]):
+                for entry in reversed(chunk[:bisect_left(chunk, end)]):
+                    if entry < start or len(keys) == count:
+                        return keys
+                    keys.append(entry[1])
+        else:
+            i = bisect_left(self.__lasts, start)
+            for chunk in self.__chunks[i:]:
+                for entry in chunk[bisect_left(chunk, start):]:
+                    if entry >= end or len(keys) == count:
+                        return keys
+                    keys.append(entry[1])
+        return keys
+
+    def position(self, key):
+        """
+        Returns the position of an object, which a cursor resumes
+        after.
+
+        Args:
+            key (str): The storage key of the object.
+
+        Returns:
+            tuple: The position, or None if the object is not indexed.
+        """
+        if key not in self.__values:
+            return None
+        return (sort_key(self.__values[key]), key)
+
+    def __rank(self, position):
+        """
+        Returns the number of entries before a position.
+
+        Args:
+            position (tuple): The position.
+        """
+        i = bisect_left(self.__lasts, position)
+        if i == len(self.__chunks):
+            return len(self.__values)
+        return (sum(len(chunk) for chunk in self.__chunks[:i])
+                + bisect_left(self.__chunks[i], position))
+
+    @staticmethod
+    def __bounds(op, value):
+        """
+        Returns the positions of the entries matching a comparison.
+
+        Args:
+            op (str): The comparison operator.
+            value: The value compared with.
+
+        Returns:
+            tuple: (start, end) positions, or None if the comparison
+                   is not supported. Only values of the type compared
+                   with match, as with Python comparisons.
+        """
+        if (isinstance(value, bool) or value != value
+                or not isinstance(value, (int, float, str))):
+            return None
+        key = sort_key(value)
+        first, after = (key[:1],), ((key[0] + 1,),)
+        return {
+            "==": ((key,), (key, _LAST_KEY)),
+            "<": (first, (key,)),
+            "<=": (first, (key, _LAST_KEY)),
+            ">": ((key, _LAST_KEY), after),
+            ">=": ((key,), after),
+        }.get(op)
+
+
+class Cursor:
+    """
+    An ordered iteration over a range of a SortedIndex. The cursor
+    remembers the position of the last object it returned, so it can
+    be paged through with fetch() and resumed later, even after the
+    index changed, from its position attribute.
+
+    Attributes:
+        position (tuple): The position of the last object returned,
+                          or None.
+    """
+
+    def __init__(self, index, start, end, descending=False, after=None,
+                 resolve=None):
+        """
+        Initializes a cursor.
+
+        Args:
+            index (SortedIndex): The index.
+            start (tuple): The first position, included.
+            end (tuple): The last position, excluded.
+            descending (bool): Whether to start from the end.
+            after (tuple): The position to resume after.
+            resolve (callable): Optional function mapping a list of
+                                storage keys to what fetch() returns.
+        """
+        self.__index = index
+        self.__start = start
+        self.__end = end
+        self.__descending = descending
+        self.__resolve = resolve
+        self.position = after
+
+    def __iter__(self):
+        """
+        Yields the remaining items one page at a time.
+        """
+        while True:
+            page = self.fetch(SortedIndex.CHUNK_SIZE)
+            if not page:
+                return
+            yield from page
+
+    def fetch(self, count):
+        """
+        Returns the next items.
+
+        Args:
+            count (int): The largest number of items to return.
+
+        Returns:
+            list: The storage keys, or what resolve() maps them to.
+        """
+        start, end = self.__start, self.__end
+        if self.position is not None and self.__descending:
+            end = min(end, self.position)
+        elif self.position is not None:
+            start = max(start, self.position + (_LAST_KEY,))
+        keys = self.__index.keys(start, end, count, self.__descending)
+        if keys:
+            self.position = self.__index.position(keys[-1])
+        if self.__resolve is not None:
+            return self.__resolve(keys)
+        return keys
+
+
+class KeyIndex:
+    """
+    Keeps storage keys in order, for pagination. The keys of a class
+    are contiguous, as they start with its name.
+
+    As in SortedIndex, the keys are kept in a list of sorted chunks of
+    at most 2 * CHUNK_SIZE keys, found by bisecting the last key of
+    every chunk.
+    """
+
+    CHUNK_SIZE = 1000
+
+    def __init__(self, keys=()):
+        """
+        Initializes an index.
+
+        Args:
+            keys (iterable): The keys to start with, in any order.
+        """
+        keys = sorted(keys)
+        self.__chunks = [keys[i:i + self.CHUNK_SIZE]
+                         for i in range(0, len(keys), self.CHUNK_SIZE)]
+        self.__lasts = [chunk[-1] for chunk in self.__chunks]
+        self.__count = len(keys)
+
+    def __len__(self):
+        """
+        Returns the number of keys.
+        """
+        return self.__count
+
+    def add(self, key):
+        """
+        Adds a key, if it is not in the index.
+
+        Args:
+            key (str): The storage key.
+        """
+        if not self.__chunks:
+            self.__chunks.append([key])
+            self.__lasts.append(key)
+            self.__count += 1
+            return
+        i = min(bisect_left(self.__lasts, key), len(self.__lasts) - 1)
+        chunk = self.__chunks[i]
+        j = bisect_left(chunk, key)
+        if j < len(chunk) and chunk[j] == key:
+            return
+        chunk.insert(j, key)
+        self.__lasts[i] = chunk[-1]
+        self.__count += 1
+        if len(chunk) > 2 * self.CHUNK_SIZE:
+            half = chunk[self.CHUNK_SIZE:]
+            del chunk[self.CHUNK_SIZE:]
+            self.__chunks.insert(i + 1, half)
+            self.__lasts[i:i + 1] = [chunk[-1], half[-1]]
+
+    def remove(self, key):
+        """
+        Removes a key, if it is in the index.
+
+        Args:
+            key (str): The storage key.
+        """
+        i = bisect_left(self.__lasts, key)
+        if i == len(self.__lasts):
+            return
+        chunk = self.__chunks[i]
+        j = bisect_left(chunk, key)
+        if chunk[j] != key:
+            return
+        del chunk[j]
+        self.__count -= 1
+        if chunk:
+            self.__lasts[i] = chunk[-1]
+        else:
+            del self.__chunks[i]
+            del self.__lasts[i]
+
+    def after(self, key, count, end=_LAST_KEY):
+        """
+        Returns the keys following a key, which need not be in the
+        index.
+
+        Args:
+            key (str): The key to start after, or "" to start from
+                       the first key.
+            count (int): The largest number of keys to return.
+            end (str): The key to stop before.
+
+        Returns:
+            list: The keys, in order.
+        """
+        keys = []
+        i = bisect_right(self.__lasts, key)
+        for chunk in self.__chunks[i:]:
+            for found in chunk[bisect_right(chunk, key):]:
+                if found >= end or len(keys) == count:
+                    return keys
+                keys.append(found)
+        return keys
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+"""
+This module contains the Journal class, an append-only
+write-ahead log used by FileStorage to persist single
+object changes without rewriting the whole storage file.
+"""
+
+import json
+import os
+
+
+class Journal:
+    """
+    Append-only log of storage mutations.
+
+    Each line of the journal file is a compact JSON record:
+        {"op": "put", "key": <key>, "data": <to_dict() output>}
+        {"op": "del", "key": <key>}
+
+    Attributes:
+        path (str): The path to the journal file.
+        entries (int): The number of records currently in the journal.
+        fsync (bool): Whether every append is flushed to the disk.
+    """
+
+    def __init__(self, path, fsync=False):
+        """
+        Initializes a journal bound to a file path.
+
+        Args:
+            path (str): The path to the journal file.
+            fsync (bool): Whether every append is flushed to the disk.
+        """
+        self.path = path
+        self.entries = 0
+        self.fsync = fsync
+
+    def append(self, puts, deletes=()):
+        """
+        Appends put and delete records to the journal.
+
+        Args:
+            puts (dict): Mapping of storage keys to serialized objects.
+            deletes (iterable): Storage keys that were removed.
+        """
+        lines = []
+        for key, data in puts.items():
+            lines.append(json.dumps({"op": "put", "key": key, "data": data},
+                                    separators=(",", ":")))
+        for key in deletes:
+            lines.append(json.dumps({"op": "del", "key": key},
+                                    separators=(",", ":")))
+        if not lines:
+            return
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+            if self.fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        self.entries += len(lines)
+
+    def replay(self):
+        """
+        Iterates over the records stored in the journal.
+
+        A record that cannot be decoded, or that does not end with a
+        newline (the last line of a write interrupted by a crash),
+        ends the replay, and the journal is then cut after the last
+        good record, so the next append does not follow a partial
+        line.
+
+        Yields:
+            tuple: (op, key, data) where data is None for deletes.
+        """
+        self.entries = 0
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        good = 0
+        torn = False
+        with file:
+            for line in file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("partial line")
+                    record = json.loads(line)
+                except ValueError:
+                    torn = True
+                    break
+                good += len(line)
+                self.entries += 1
+                yield record["op"], record["key"], record.get("data")
+        if torn:
+            with open(self.path, "r+b") as file:
+                file.truncate(good)
+                if self.fsync:
+                    os.fsync(file.fileno())
+
+    def truncate(self):
+        """
+        Removes every record from the journal.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.entries = 0
@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+"""
+This module contains an incremental reader and writer for JSON
+files whose top-level value is an object, such as the FileStorage
+file. They handle one member at a time, so the whole document never
+has to be held in memory.
+"""
+
+import json
+import re
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_KEY = re.compile(r'[ \t\n\r]*("(?:[^"\\]|\\.)*")[ \t\n\r]*:', re.DOTALL)
+_SEPARATOR = re.compile(r"[ \t\n\r]*([,}])")
+
+
+def iter_object_items(file, chunk_size=65536, with_text=False):
+    """
+    Iterates over the members of the top-level JSON object of a file.
+
+    Args:
+        file (file): A text file opened for reading.
+        chunk_size (int): The number of characters read at a time.
+        with_text (bool): Whether to also yield the source text of
+                          each member ('"key": value').
+
+    Yields:
+        tuple: (key, value) for each member, in file order,
+               or (key, value, text) if with_text is True.
+
+    Raises:
+        ValueError: If the file is not a well-formed JSON object.
+    """
+    reader = _Reader(file, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        reader.mark = reader.pos
+        match = reader.match(_KEY, "object key")
+        reader.mark = match.start(1)
+        key = match.group(1)
+        key = json.loads(key) if "\\" in key else key[1:-1]
+        value = reader.value()
+        if with_text:
+            yield key, value, reader.buf[reader.mark:reader.pos]
+        else:
+            yield key, value
+        if reader.match(_SEPARATOR, "',' or '}'").group(1) == "}":
+            return
+
+
+def write_object_members(file, members):
+    """
+    Writes a JSON object from the text of its members, laid out as
+    json.dump(..., indent=4) would write it when each member is
+    indented by four spaces.
+
+    Args:
+        file (file): A text file opened for writing.
+        members (iterable): The text of each member ('"key": value').
+    """
+    separator = "{\n"
+    for member in members:
+        file.write(separator)
+        file.write(member)
+        separator = ",\n"
+    file.write("{}" if separator == "{\n" else "\n}")
+
+
+def encode_member(key, value):
+    """
+    Returns the text of one member of a JSON object as written
+    by json.dump(..., indent=4).
+
+    Args:
+        key (str): The key of the member.
+        value: The value of the member.
+    """
+    return json.dumps({key: value}, indent=4)[2:-2]
+
+
+class _Reader:
+    """
+    A buffered cursor over a text file used by iter_object_items.
+
+    Attributes:
+        buf (str): The characters read but not consumed yet.
+        pos (int): The position of the cursor in buf.
+        mark (int): The position in buf where the current member starts.
+        eof (bool): Whether the whole file has been read.
+    """
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, file, chunk_size):
+        """
+        Initializes the reader.
+
+        Args:
+            file (file): A text file opened for reading.
+            chunk_size (int): The number of characters read at a time.
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.mark = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Reads the next chunk, dropping the characters before the
+        current member.
+
+        Returns:
+            bool: False if the end of the file was already reached.
+        """
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.mark:] + chunk
+        self.pos -= self.mark
+        self.mark = 0
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character.
+
+        Raises:
+            ValueError: If the end of the file is reached.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("unexpected end of JSON data")
+
+    def expect(self, char):
+        """
+        Consumes the next non-whitespace character.
+
+        Args:
+            char (str): The character that must come next.
+
+        Raises:
+            ValueError: If another character comes next.
+        """
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} but found {found!r}")
+        self.pos += 1
+
+    def match(self, pattern, expected):
+        """
+        Matches a pattern at the cursor, reading more of the file
+        while it does not match.
+
+        Args:
+            pattern (re.Pattern): The pattern to match.
+            expected (str): A description of the pattern for errors.
+
+        Returns:
+            re.Match: The match, in buf coordinates.
+
+        Raises:
+            ValueError: If the pattern does not match.
+        """
+        while True:
+            match = pattern.match(self.buf, self.pos)
+            if match:
+                self.pos = match.end()
+                return match
+            if not self.fill():
+                found = self.buf[self.pos:self.pos + 10]
+                raise ValueError(f"expected {expected} but found {found!r}")
+
+    def value(self):
+        """
+        Decodes the next JSON value, reading more of the file
+        while the value is incomplete.
+
+        Returns:
+            The decoded value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a number ending the buffer may continue in the next chunk
+            if end < len(self.buf) or self.eof:
+                self.pos = end
+                return value
+            self.fill()
@@ -0,0 +1,261 @@
+#!/usr/bin/python3
+"""
+This module contains the helpers FileStorage uses when several
+threads share a storage or several processes share its file.
+
+A thread-safe storage guards its methods with a ReadWriteLock: the
+methods that only read the objects run concurrently, and those that
+change them run one at a time, while no read runs.
+
+A save of a shared storage holds an advisory lock on <file>.lock, so
+the saves of the processes run one at a time: each one re-reads the
+file if another process replaced it since, merges the objects that
+changed there, then writes the file. The lock is advisory: it only
+excludes the processes that take it, and it is released by the
+operating system if a process dies holding it.
+"""
+
+import functools
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_END = object()
+
+
+class ConflictError(Exception):
+    """
+    Raised by a save when objects it changed or deleted were also
+    changed or deleted by another process since they were read. The
+    changes of the other process were kept and the other changes of
+    the save were written.
+
+    Attributes:
+        keys (list): The storage keys of the objects in conflict.
+    """
+
+    def __init__(self, keys):
+        """
+        Initializes the error.
+
+        Args:
+            keys (list): The storage keys of the objects in conflict.
+        """
+        super().__init__(
+            f"changed by another process: {', '.join(sorted(keys))}")
+        self.keys = sorted(keys)
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive advisory lock on a file, creating it if needed,
+    waiting until other processes release it.
+
+    Args:
+        path (str): The path of the lock file.
+    """
+    with open(path, "a+b") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_signature(path):
+    """
+    Returns what identifies the version of a file replaced atomically:
+    its inode, size and modification time, or None if it is missing.
+
+    Args:
+        path (str): The path of the file.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class ReadWriteLock:
+    """
+    A lock held by any number of readers or by one writer.
+
+    A waiting writer goes before the readers that arrive after it, so
+    a stream of reads cannot starve the writes. Both sides are
+    reentrant: a thread holding the write lock can take it again or
+    read, and a reader can read again. A reader cannot take the write
+    lock, which would wait for itself.
+    """
+
+    def __init__(self):
+        """
+        Initializes an unlocked lock.
+        """
+        self.__condition = threading.Condition(threading.Lock())
+        self.__readers = 0
+        self.__writer = None
+        self.__writes = 0
+        self.__waiting_writers = 0
+        self.__local = threading.local()
+        self.__reading = _Holder(self.acquire_read, self.release_read)
+        self.__writing = _Holder(self.acquire_write, self.release_write)
+
+    def read(self):
+        """
+        Returns a context manager holding the lock as a reader.
+        """
+        return self.__reading
+
+    def write(self):
+        """
+        Returns a context manager holding the lock as the writer.
+        """
+        return self.__writing
+
+    def acquire_read(self):
+        """
+        Takes the lock as a reader, waiting for the writers.
+        """
+        local = self.__local
+        reads = getattr(local, "reads", 0)
+        if not reads:
+            local.registered = self.__writer != threading.get_ident()
+            if local.registered:
+                with self.__condition:
+                    while self.__writer is not None or \
+                            self.__waiting_writers:
+                        self.__condition.wait()
+                    self.__readers += 1
+        local.reads = reads + 1
+
+    def release_read(self):
+        """
+        Releases the lock taken by acquire_read().
+        """
+        local = self.__local
+        local.reads -= 1
+        if not local.reads and local.registered:
+            with self.__condition:
+                self.__readers -= 1
+                if not self.__readers and self.__waiting_writers:
+                    self.__condition.notify_all()
+
+    def acquire_write(self):
+        """
+        Takes the lock as the writer, waiting for the readers and the
+        other writers.
+
+        Raises:
+            RuntimeError: If the thread holds the lock as a reader.
+        """
+        me = threading.get_ident()
+        if self.__writer != me:
+            if getattr(self.__local, "reads", 0):
+                raise RuntimeError("cannot write while reading")
+            with self.__condition:
+                self.__waiting_writers += 1
+                while self.__writer is not None or self.__readers:
+                    self.__condition.wait()
+                self.__waiting_writers -= 1
+                self.__writer = me
+        self.__writes += 1
+
+    def release_write(self):
+        """
+        Releases the lock taken by acquire_write().
+        """
+        self.__writes -= 1
+        if not self.__writes:
+            with self.__condition:
+                self.__writer = None
+                self.__condition.notify_all()
+
+
+class _Holder:
+    """
+    A context manager calling an acquire and a release function.
+    """
+
+    def __init__(self, acquire, release):
+        """
+        Initializes the context manager.
+
+        Args:
+            acquire (callable): Called when the block starts.
+            release (callable): Called when the block ends.
+        """
+        self.__acquire = acquire
+        self.__release = release
+
+    def __enter__(self):
+        """
+        Calls the acquire function.
+        """
+        self.__acquire()
+
+    def __exit__(self, *exc_info):
+        """
+        Calls the release function.
+        """
+        self.__release()
+
+
+def synchronized(function, hold):
+    """
+    Returns a function that calls another while holding a lock.
+
+    Args:
+        function (callable): The function.
+        hold (callable): Returns the context manager holding the
+                         lock, e.g. ReadWriteLock.read.
+
+    Returns:
+        callable: The synchronized function.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with hold():
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def synchronized_iterator(function, hold):
+    """
+    Returns a generator function that iterates over what another
+    returns, holding a lock while each item is computed but not
+    between items, so the caller can stop or take its time.
+
+    Args:
+        function (callable): The function returning an iterator.
+        hold (callable): Returns the context manager holding the lock.
+
+    Returns:
+        callable: The synchronized generator function.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with hold():
+            iterator = iter(function(*args, **kwargs))
+        while True:
+            with hold():
+                item = next(iterator, _END)
+            if item is _END:
+                return
+            yield item
+    return wrapper
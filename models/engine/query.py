@@ -0,0 +1,366 @@
+#!/usr/bin/python3
+"""
+This module contains the Query class, which filters, orders and
+limits the objects of one class stored in FileStorage.
+
+A query is planned when it runs: among its conditions, the one whose
+attribute has an index that supports it and matches the fewest
+objects is answered by the index, and the other conditions filter
+its result. Without such a condition, the objects of the class are
+scanned. An ordered query with a limit keeps the first objects in a
+heap instead of sorting every match.
+
+The has and !has operators test whether a list attribute, such as
+Place.amenity_ids, contains a value. An index that can combine
+conditions (see BitmapIndex.search_all) answers every condition on
+its attribute at once.
+"""
+
+import heapq
+import operator
+
+LIST_TYPES = (list, tuple, set, frozenset)
+
+
+def has(values, value):
+    """
+    Checks that the value of a list attribute contains a value.
+
+    Args:
+        values (list): The value of the attribute.
+        value: The value searched.
+
+    Returns:
+        bool: Whether the attribute is a list containing the value.
+    """
+    return isinstance(values, LIST_TYPES) and value in values
+
+
+def has_not(values, value):
+    """
+    Checks that the value of a list attribute does not contain a value.
+
+    Args:
+        values (list): The value of the attribute.
+        value: The value searched.
+
+    Returns:
+        bool: Whether the attribute is a list without the value.
+    """
+    return isinstance(values, LIST_TYPES) and value not in values
+
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "has": has,
+    "!has": has_not,
+}
+
+_MISSING = object()
+
+
+def sort_key(value):
+    """
+    Returns a key that orders values of different types:
+    numbers first, then strings, then any other value.
+
+    Args:
+        value: The value of an attribute.
+    """
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, value)
+    return (2, repr(value))
+
+
+class Query:
+    """
+    A query over the objects of one class, built by chaining where(),
+    order_by() and limit(), e.g.:
+
+        storage.query(Place).where("price_by_night", "<", 100) \\
+            .order_by("price_by_night").limit(20).all()
+
+    Attributes:
+        cls_name (str): The name of the class of the objects.
+    """
+
+    def __init__(self, storage, cls):
+        """
+        Initializes a query that matches every object of a class.
+
+        Args:
+            storage (FileStorage): The storage to query.
+            cls (type|str): The class of the objects or its name.
+        """
+        self.cls_name = getattr(cls, "__name__", cls)
+        self.__storage = storage
+        self.__conditions = []
+        self.__order = None
+        self.__limit = None
+
+    def where(self, attribute, op, value):
+        """
+        Adds a condition every object must match.
+
+        Args:
+            attribute (str): The name of the attribute.
+            op (str): A comparison operator: ==, !=, <, <=, > or >=,
+                      or has or !has for a value in a list attribute.
+            value: The value the attribute is compared with. Objects
+                   whose attribute cannot be compared with it
+                   do not match.
+
+        Returns:
+            Query: The query.
+
+        Raises:
+            ValueError: If the operator is unknown.
+        """
+        if op not in OPERATORS:
+            raise ValueError(f"unknown operator: {op}")
+        self.__conditions.append((attribute, op, value))
+        return self
+
+    def order_by(self, attribute, descending=False):
+        """
+        Orders the objects by an attribute.
+
+        Args:
+            attribute (str): The name of the attribute.
+            descending (bool): Whether the largest values come first.
+
+        Returns:
+            Query: The query.
+        """
+        self.__order = (attribute, descending)
+        return self
+
+    def limit(self, count):
+        """
+        Keeps only the first objects.
+
+        Args:
+            count (int): The largest number of objects to return.
+
+        Returns:
+            Query: The query.
+
+        Raises:
+            ValueError: If the count is negative.
+        """
+        if count < 0:
+            raise ValueError("the limit cannot be negative")
+        self.__limit = count
+        return self
+
+    def plan(self):
+        """
+        Chooses how to find the candidate objects. The conditions an
+        index combines are estimated together.
+
+        Returns:
+            tuple: (condition, index, estimate) for the condition
+                   answered by an index, or (None, None, estimate)
+                   when the class is scanned, where estimate is the
+                   number of candidate objects.
+        """
+        best = (None, None, self.__storage.count(self.cls_name))
+        for condition in self.__conditions:
+            attribute, op, value = condition
+            index = self.__storage.index(self.cls_name, attribute)
+            if index is None:
+                continue
+            estimate = index.estimate(op, value)
+            if estimate is not None and hasattr(index, "search_all"):
+                # combined conditions, assumed to be independent
+                for other in self.__answered(condition, index):
+                    if other is not condition:
+                        estimate *= (index.estimate(*other[1:])
+                                     / max(len(index), 1))
+                estimate = round(estimate)
+            if estimate is not None and estimate <= best[2]:
+                best = (condition, index, estimate)
+        return best
+
+    def explain(self):
+        """
+        Describes how the query runs.
+
+        Returns:
+            str: The description of the plan.
+        """
+        condition, index, estimate = self.plan()
+        answered = self.__answered(condition, index)
+        if condition is None:
+            steps = [f"scan {self.cls_name} (~{estimate} objects)"]
+        else:
+            searched = " and ".join(f"{op} {value!r}"
+                                    for _, op, value in answered)
+            steps = [f"index {self.cls_name}.{condition[0]} {searched} "
+                     f"(~{estimate} objects)"]
+        filters = [f"{attribute} {op} {value!r}"
+                   for attribute, op, value in (
+                       other for other in self.__conditions
+                       if other not in answered)]
+        if filters:
+            steps.append("filter " + " and ".join(filters))
+        if self.__order is not None:
+            attribute, descending = self.__order
+            direction = "desc" if descending else "asc"
+            if self.__limit is not None:
+                steps.append(f"top {self.__limit} by {attribute} {direction}")
+            else:
+                steps.append(f"sort by {attribute} {direction}")
+        elif self.__limit is not None:
+            steps.append(f"limit {self.__limit}")
+        return " -> ".join(steps)
+
+    def all(self):
+        """
+        Runs the query.
+
+        Returns:
+            list: The matching objects.
+        """
+        condition, index, _ = self.plan()
+        answered = self.__answered(condition, index)
+        if condition is None:
+            candidates = self.__storage.all(self.cls_name).values()
+        else:
+            if len(answered) > 1:
+                keys = index.search_all(
+                    [(op, value) for _, op, value in answered])
+            else:
+                keys = index.search(*condition[1:])
+            candidates = (self.__storage.get(self.cls_name,
+                                             key.partition(".")[2])
+                          for key in keys)
+        matches = list(candidates)
+        for other in self.__conditions:
+            if other not in answered:
+                matches = self.__filter(matches, other)
+
+        if self.__order is None:
+            return matches[:self.__limit]
+        attribute, descending = self.__order
+        try:
+            return self.__sort(matches, operator.attrgetter(attribute),
+                               descending)
+        except (AttributeError, TypeError):
+            # missing attributes or values of different types
+            return self.__sort(
+                matches, lambda obj: sort_key(getattr(obj, attribute, None)),
+                descending)
+
+    def count(self):
+        """
+        Runs the query and counts the matching objects.
+
+        Returns:
+            int: The number of matching objects.
+        """
+        return len(self.all())
+
+    def first(self):
+        """
+        Runs the query and returns its first object.
+
+        Returns:
+            BaseModel: The first matching object, or None.
+        """
+        limit = self.__limit
+        self.__limit = 1 if limit is None else min(limit, 1)
+        try:
+            matches = self.all()
+        finally:
+            self.__limit = limit
+        return matches[0] if matches else None
+
+    def __answered(self, condition, index):
+        """
+        Returns the conditions answered by the index of the planned
+        condition: the planned condition and, if the index can combine
+        conditions, the other conditions on its attribute it supports.
+
+        Args:
+            condition (tuple): The planned condition, or None.
+            index: The index of its attribute.
+
+        Returns:
+            list: The answered conditions, in the order they were added.
+        """
+        if condition is None:
+            return []
+        if not hasattr(index, "search_all"):
+            return [condition]
+        return [other for other in self.__conditions
+                if other[0] == condition[0]
+                and index.estimate(*other[1:]) is not None]
+
+    def __sort(self, objects, key, descending):
+        """
+        Orders objects and applies the limit, keeping only the first
+        objects in a heap when there is a limit.
+
+        Args:
+            objects (list): The objects.
+            key (callable): Returns the value an object is ordered by.
+            descending (bool): Whether the largest values come first.
+
+        Returns:
+            list: The first objects, in order.
+        """
+        if self.__limit is None:
+            return sorted(objects, key=key, reverse=descending)
+        if descending:
+            return heapq.nlargest(self.__limit, objects, key=key)
+        return heapq.nsmallest(self.__limit, objects, key=key)
+
+    @staticmethod
+    def __filter(objects, condition):
+        """
+        Keeps the objects matching a condition.
+
+        Args:
+            objects (list): The objects.
+            condition (tuple): (attribute, op, value).
+
+        Returns:
+            list: The matching objects.
+        """
+        attribute, op, value = condition
+        compare = OPERATORS[op]
+        try:
+            return [obj for obj in objects
+                    if compare(getattr(obj, attribute), value)]
+        except (AttributeError, TypeError):
+            # missing attributes or values of different types
+            return [obj for obj in objects if Query.__match(obj, condition)]
+
+    @staticmethod
+    def __match(obj, condition):
+        """
+        Checks a condition on an object.
+
+        Args:
+            obj (BaseModel): The object.
+            condition (tuple): (attribute, op, value).
+
+        Returns:
+            bool: Whether the object matches.
+        """
+        attribute, op, value = condition
+        actual = getattr(obj, attribute, _MISSING)
+        if actual is _MISSING:
+            return False
+        try:
+            return bool(OPERATORS[op](actual, value))
+        except TypeError:
+            return False
@@ -0,0 +1,191 @@
+#!/usr/bin/python3
+"""
+This module contains the Snapshot class, a read-only view of the
+objects of a storage as they were at one point in time, returned by
+FileStorage.snapshot().
+
+Every save gives an object that changed a new serialized form (a new
+version) instead of changing the former one, and a snapshot keeps the
+versions that were current when it was taken. Reading a snapshot takes
+no storage lock, so a slow reader, e.g. an export or a report, sees
+consistent objects while other threads keep changing and saving the
+storage, and never makes them wait. The versions only a snapshot
+refers to are freed when it is closed or garbage collected.
+"""
+
+import bisect
+import io
+from models.engine.durable import atomic_write
+from models.engine.json_stream import encode_member, write_object_members
+
+
+class Snapshot:
+    """
+    The objects of a storage at one point in time, as serialized
+    objects (outputs of to_dict()). Every read returns a new
+    dictionary, so the caller can change it.
+
+    A snapshot can be used as a context manager, which closes it.
+    """
+
+    def __init__(self, records, decode=None):
+        """
+        Initializes the snapshot.
+
+        Args:
+            records (Mapping): The stored form of the objects by key,
+                               which must not change afterwards.
+            decode (callable): Turns a stored form into the serialized
+                               object, if the records are not already
+                               serialized objects.
+        """
+        self.__records = records
+        self.__decode = decode
+        self.__keys = None
+
+    def __enter__(self):
+        """
+        Returns the snapshot.
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Closes the snapshot.
+        """
+        self.close()
+
+    def __len__(self):
+        """
+        Returns the number of objects.
+        """
+        return len(self.__open())
+
+    def __contains__(self, key):
+        """
+        Checks whether an object was stored, by storage key.
+        """
+        return key in self.__open()
+
+    def close(self):
+        """
+        Releases the versions of the objects. The snapshot cannot be
+        read anymore.
+        """
+        records, self.__records = self.__records, None
+        self.__keys = None
+        close = getattr(records, "close", None)
+        if close is not None:
+            close()
+
+    def keys(self):
+        """
+        Returns the storage keys of the objects, in order.
+
+        Returns:
+            list: The keys.
+        """
+        return list(self.__sorted_keys())
+
+    def get(self, cls, id):
+        """
+        Retrieves one object by class and id.
+
+        Args:
+            cls (type|str): The class of the object or its name.
+            id (str): The id of the object.
+
+        Returns:
+            dict: The serialized object, or None if it was not stored.
+        """
+        key = f"{getattr(cls, '__name__', cls)}.{id}"
+        records = self.__open()
+        try:
+            record = records[key]
+        except KeyError:
+            return None
+        return self.__decode(record) if self.__decode else record
+
+    def iterate(self, cls=None):
+        """
+        Iterates over the objects, or the objects of one class, in the
+        order of their keys. The keys are sorted on the first call.
+
+        Args:
+            cls (type|str): Optional class or class name.
+
+        Yields:
+            dict: The serialized objects.
+        """
+        keys = self.__sorted_keys()
+        start, end = 0, len(keys)
+        if cls is not None:
+            start, end = self.__class_range(cls)
+        for key in keys[start:end]:
+            record = self.__open()[key]
+            yield self.__decode(record) if self.__decode else record
+
+    def count(self, cls=None):
+        """
+        Counts the objects, or the objects of one class.
+
+        Args:
+            cls (type|str): Optional class or class name.
+
+        Returns:
+            int: The number of objects.
+        """
+        if cls is None:
+            return len(self)
+        start, end = self.__class_range(cls)
+        return end - start
+
+    def export_json(self, path):
+        """
+        Writes every object to a file in the JSON format.
+
+        Args:
+            path (str): The path of the JSON file.
+        """
+        objects = self.iterate()
+        with atomic_write(path, checksum=False) as file:
+            text = io.TextIOWrapper(file, encoding="utf-8")
+            write_object_members(text, (
+                encode_member(f"{value['__class__']}.{value['id']}", value)
+                for value in objects))
+            text.flush()
+            text.detach()
+
+    def __open(self):
+        """
+        Returns the records.
+
+        Raises:
+            ValueError: If the snapshot is closed.
+        """
+        records = self.__records
+        if records is None:
+            raise ValueError("the snapshot is closed")
+        return records
+
+    def __sorted_keys(self):
+        """
+        Returns the sorted keys, sorting them the first time.
+        """
+        if self.__keys is None:
+            self.__keys = sorted(self.__open())
+        return self.__keys
+
+    def __class_range(self, cls):
+        """
+        Returns the positions of the first key of a class in the
+        sorted keys and of the first key after them.
+
+        Args:
+            cls (type|str): The class or its name.
+        """
+        cls_name = getattr(cls, "__name__", cls)
+        keys = self.__sorted_keys()
+        # the keys of a class are between "<name>." and "<name>/"
+        return (bisect.bisect_left(keys, f"{cls_name}."),
+                bisect.bisect_left(keys, f"{cls_name}/"))
@@ -0,0 +1,266 @@
+#!/usr/bin/python3
+"""
+This module contains the spatial index FileStorage keeps on the
+coordinates of models.
+
+A model declares its coordinates in its spatial_attributes class
+attribute, a (latitude attribute, longitude attribute) pair such as
+Place's ("latitude", "longitude"), and FileStorage maintains one
+GridIndex per such class as objects are added, moved, removed and
+reloaded.
+
+The index buckets the objects into a hierarchy of grids whose cells
+are 8 times smaller at every level, so a bounding-box search takes
+the cells inside the box whole at the coarsest level that fits, only
+descends into the cells on its border and only checks the points of
+the finest cells on the border. A radius search is a bounding-box
+search followed by a great-circle distance check. Cell sizes are
+powers of two, which keeps the cells of every level aligned exactly.
+"""
+
+import heapq
+import math
+
+LEVELS = 3
+FAN_OUT = 8
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+    """
+    Returns the great-circle distance between two points.
+
+    Args:
+        latitude1 (float): The latitude of the first point, in degrees.
+        longitude1 (float): The longitude of the first point.
+        latitude2 (float): The latitude of the second point.
+        longitude2 (float): The longitude of the second point.
+
+    Returns:
+        float: The distance in kilometers.
+    """
+    phi1 = math.radians(latitude1)
+    phi2 = math.radians(latitude2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = math.radians(longitude2 - longitude1) / 2
+    a = (math.sin(half_dphi) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def is_coordinate(latitude, longitude):
+    """
+    Checks that two values are a valid latitude and longitude.
+
+    Args:
+        latitude: The latitude, in degrees.
+        longitude: The longitude, in degrees.
+
+    Returns:
+        bool: Whether both are numbers within range.
+    """
+    for value, bound in ((latitude, 90), (longitude, 180)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        if not -bound <= value <= bound:
+            return False
+    return True
+
+
+class GridIndex:
+    """
+    Maps the storage keys of objects to their coordinates, bucketed
+    into grids of cells. Objects without valid coordinates are not
+    indexed.
+
+    Attributes:
+        cell_size (float): The size of the finest cells in degrees.
+    """
+
+    def __init__(self, cell_size=0.125):
+        """
+        Initializes an empty index.
+
+        Args:
+            cell_size (float): The size of the finest cells in degrees,
+                               a power of two. The coarser levels have
+                               cells FAN_OUT and FAN_OUT ** 2 times
+                               larger. Searches only check the points
+                               of the finest cells on their border, so
+                               these should be about the size of the
+                               smallest searched areas.
+
+        Raises:
+            ValueError: If the cell size is not a power of two.
+        """
+        if cell_size <= 0 or math.frexp(cell_size)[0] != 0.5:
+            raise ValueError(f"not a power of two: {cell_size}")
+        self.cell_size = cell_size
+        self.__sizes = [cell_size * FAN_OUT ** level
+                        for level in range(LEVELS)]
+        self.__grids = [{} for _ in range(LEVELS)]
+        self.__points = {}
+
+    def __len__(self):
+        """
+        Returns the number of indexed objects.
+        """
+        return len(self.__points)
+
+    def add(self, key, latitude, longitude):
+        """
+        Indexes an object at a point, replacing its previous point.
+
+        Args:
+            key (str): The storage key of the object.
+            latitude (float): The latitude of the object, in degrees.
+            longitude (float): The longitude of the object, in degrees.
+        """
+        self.remove(key)
+        if not is_coordinate(latitude, longitude):
+            return
+        point = (latitude, longitude)
+        for size, grid in zip(self.__sizes, self.__grids):
+            cell = (math.floor(latitude / size), math.floor(longitude / size))
+            grid.setdefault(cell, {})[key] = point
+        self.__points[key] = point
+
+    def remove(self, key):
+        """
+        Removes an object from the index, if it is indexed.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        point = self.__points.pop(key, None)
+        if point is None:
+            return
+        latitude, longitude = point
+        for size, grid in zip(self.__sizes, self.__grids):
+            cell = (math.floor(latitude / size), math.floor(longitude / size))
+            bucket = grid[cell]
+            del bucket[key]
+            if not bucket:
+                del grid[cell]
+
+    def point(self, key):
+        """
+        Returns the point of an object.
+
+        Args:
+            key (str): The storage key of the object.
+
+        Returns:
+            tuple: (latitude, longitude), or None if the object
+                   is not indexed.
+        """
+        return self.__points.get(key)
+
+    def within(self, south, west, north, east):
+        """
+        Returns the keys of the objects in a bounding box. A box whose
+        west edge is east of its east edge crosses the antimeridian.
+
+        Args:
+            south (float): The smallest latitude.
+            west (float): The west longitude.
+            north (float): The largest latitude.
+            east (float): The east longitude.
+
+        Returns:
+            list: The storage keys, in no particular order.
+        """
+        if west > east:
+            return (self.within(south, west, north, 180)
+                    + self.within(south, -180, north, east))
+        keys = []
+        if south <= north:
+            self.__search(LEVELS - 1, None, (south, west, north, east), keys)
+        return keys
+
+    def near(self, latitude, longitude, radius_km, limit=None):
+        """
+        Returns the objects within a distance of a point,
+        nearest first.
+
+        Args:
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            radius_km (float): The largest distance in kilometers.
+            limit (int): Optional largest number of objects to return.
+
+        Returns:
+            list: (distance in kilometers, storage key) pairs.
+        """
+        angle = radius_km / EARTH_RADIUS_KM
+        south = latitude - math.degrees(angle)
+        north = latitude + math.degrees(angle)
+        reach = math.sin(angle) / max(math.cos(math.radians(latitude)),
+                                      1e-12)
+        if south <= -90 or north >= 90 or angle >= math.pi / 2 or reach >= 1:
+            # the circle contains a pole: search every longitude
+            west, east = -180, 180
+        else:
+            dlon = math.degrees(math.asin(reach))
+            west, east = longitude - dlon, longitude + dlon
+            if west < -180:
+                west += 360
+            if east > 180:
+                east -= 360
+
+        found = []
+        for key in self.within(max(south, -90), west, min(north, 90), east):
+            distance = distance_km(latitude, longitude, *self.__points[key])
+            if distance <= radius_km:
+                found.append((distance, key))
+        if limit is None:
+            return sorted(found)
+        return heapq.nsmallest(limit, found)
+
+    def __search(self, level, parent, box, keys):
+        """
+        Collects the keys of the objects in a box among the cells
+        of one level.
+
+        Args:
+            level (int): The level of the grid, 0 being the finest.
+            parent (tuple): The (row, column) of the cell of the level
+                            above to search in, or None for every cell.
+            box (tuple): (south, west, north, east), not crossing
+                         the antimeridian.
+            keys (list): The list the keys are appended to.
+        """
+        south, west, north, east = box
+        size = self.__sizes[level]
+        grid = self.__grids[level]
+        first_row = math.floor(south / size)
+        last_row = math.floor(north / size)
+        first_col = math.floor(west / size)
+        last_col = math.floor(east / size)
+        rows = range(first_row, last_row + 1)
+        cols = range(first_col, last_col + 1)
+        if parent is not None:
+            row, col = parent
+            rows = range(max(first_row, row * FAN_OUT),
+                         min(last_row, row * FAN_OUT + FAN_OUT - 1) + 1)
+            cols = range(max(first_col, col * FAN_OUT),
+                         min(last_col, col * FAN_OUT + FAN_OUT - 1) + 1)
+        if len(rows) * len(cols) > len(grid):
+            # a large box: visit the occupied cells instead
+            cells = [(cell, bucket) for cell, bucket in grid.items()
+                     if cell[0] in rows and cell[1] in cols]
+        else:
+            cells = [((row, col), grid[(row, col)])
+                     for row in rows for col in cols if (row, col) in grid]
+
+        for (row, col), bucket in cells:
+            if first_row < row < last_row and first_col < col < last_col:
+                keys.extend(bucket)
+            elif level == 0 or len(bucket) <= FAN_OUT:
+                keys.extend(key for key, (latitude, longitude)
+                            in bucket.items()
+                            if south <= latitude <= north
+                            and west <= longitude <= east)
+            else:
+                self.__search(level - 1, (row, col), box, keys)
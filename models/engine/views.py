@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+"""
+This module contains the aggregate views FileStorage maintains over
+the objects of a class.
+
+A view is registered on FileStorage with register_view(), e.g. the
+average price_by_night of places by city_id, the number of reviews by
+place_id, or the number of places by the state_id of their city. Its
+groups are kept up to date as objects are added, changed and removed,
+at the cost of one group update per change, and it is rebuilt from
+the objects by every reload.
+
+A view counts the objects of every group, and sums the attribute it
+aggregates over the objects whose value is a number, so count, sum and
+average are all read from the same totals.
+"""
+
+FUNCTIONS = ("count", "sum", "avg")
+
+
+def _is_number(value):
+    """
+    Checks that a value is a number that can be aggregated.
+
+    Args:
+        value: The value.
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class AggregateView:
+    """
+    Aggregates an attribute of the objects of one class by group.
+
+    Attributes:
+        cls_name (str): The name of the class of the objects.
+        group_by (tuple): The attributes leading to the group of an
+                          object: its own attribute, followed by the
+                          attributes of the objects its foreign keys
+                          refer to, e.g. ("city_id", "state_id").
+        function (str): "count", "sum" or "avg".
+        attribute (str): The aggregated attribute, or None to count
+                         the objects.
+        classes (tuple): The names of the classes of the objects the
+                         group_by attributes are read from.
+    """
+
+    def __init__(self, cls_name, group_by, function="count",
+                 attribute=None, classes=None):
+        """
+        Initializes an empty view.
+
+        Args:
+            cls_name (str): The name of the class of the objects.
+            group_by (str|tuple): The attribute or attributes leading
+                                  to the group of an object.
+            function (str): "count", "sum" or "avg".
+            attribute (str): The aggregated attribute, needed by
+                             sum and avg.
+            classes (tuple): The names of the classes of the objects
+                             the group_by attributes are read from,
+                             by default only the class of the objects.
+
+        Raises:
+            ValueError: If the function is unknown or needs an
+                        attribute, or if there is not one class per
+                        group_by attribute.
+        """
+        if function not in FUNCTIONS:
+            raise ValueError(f"unknown function: {function}")
+        if function != "count" and attribute is None:
+            raise ValueError(f"{function} needs an attribute")
+        if isinstance(group_by, str):
+            group_by = (group_by,)
+        if classes is None:
+            classes = (cls_name,)
+        if len(classes) != len(group_by):
+            raise ValueError("one class is needed per group_by attribute")
+        self.cls_name = cls_name
+        self.group_by = tuple(group_by)
+        self.classes = tuple(classes)
+        self.function = function
+        self.attribute = attribute
+        self.__groups = {}
+        self.__members = {}
+
+    def __len__(self):
+        """
+        Returns the number of groups.
+        """
+        return len(self.__groups)
+
+    def add(self, key, group, value=None):
+        """
+        Adds an object to a group, removing it from its previous group.
+        Unhashable groups are ignored.
+
+        Args:
+            key (str): The storage key of the object.
+            group: The group of the object.
+            value: The value of the aggregated attribute, only summed
+                   if it is a number.
+        """
+        self.remove(key)
+        try:
+            totals = self.__groups.setdefault(group, [0, 0, 0])
+        except TypeError:
+            return
+        number = value if _is_number(value) else None
+        totals[0] += 1
+        if number is not None:
+            totals[1] += 1
+            totals[2] += number
+        self.__members[key] = (group, number)
+
+    def remove(self, key):
+        """
+        Removes an object from its group, if it is in the view.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        member = self.__members.pop(key, None)
+        if member is None:
+            return
+        group, number = member
+        totals = self.__groups[group]
+        totals[0] -= 1
+        if number is not None:
+            totals[1] -= 1
+            totals[2] = totals[2] - number if totals[1] else 0
+        if not totals[0]:
+            del self.__groups[group]
+
+    def clear(self):
+        """
+        Removes every object from the view.
+        """
+        self.__groups.clear()
+        self.__members.clear()
+
+    def get(self, group):
+        """
+        Returns the aggregate of one group.
+
+        Args:
+            group: The group.
+
+        Returns:
+            The count or sum of the group, 0 if it is empty, or its
+            average, None if it has no number.
+        """
+        try:
+            totals = self.__groups.get(group)
+        except TypeError:
+            totals = None
+        return self.__aggregate(totals)
+
+    def results(self):
+        """
+        Returns the aggregate of every group.
+
+        Returns:
+            dict: The aggregates by group.
+        """
+        return {group: self.__aggregate(totals)
+                for group, totals in self.__groups.items()}
+
+    def __aggregate(self, totals):
+        """
+        Computes the aggregate of a group from its totals.
+
+        Args:
+            totals (list): [objects, numbers, sum of the numbers],
+                           or None for an empty group.
+        """
+        if self.function == "count":
+            return totals[0] if totals else 0
+        if self.function == "sum":
+            return totals[2] if totals else 0
+        return totals[2] / totals[1] if totals and totals[1] else None
@@ -28,8 +28,20 @@ class Place(BaseModel):
         longitude (float): The longitude coordinate of the place.
         amenity_ids (list): A list of amenity IDs
         associated with the place.
+        indexed_attributes (tuple): The attributes indexed by storage.
+        sorted_attributes (tuple): The attributes storage keeps in order.
+        text_attributes (tuple): The attributes storage indexes by word.
+        list_attributes (tuple): The lists storage indexes in bitmaps.
+        spatial_attributes (tuple): The coordinates indexed by storage.
     """
 
+    indexed_attributes = ("city_id", "user_id")
+    sorted_attributes = ("price_by_night", "max_guest", "number_rooms",
+                         "number_bathrooms")
+    text_attributes = ("description",)
+    list_attributes = ("amenity_ids",)
+    spatial_attributes = ("latitude", "longitude")
+
     city_id = ""
     user_id = ""
     name = ""
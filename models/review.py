@@ -17,8 +17,13 @@ class Review(BaseModel):
         place_id (str): The ID of the place being reviewed.
         user_id (str): The ID of the user who wrote the review.
         text (str): The content of the review.
+        indexed_attributes (tuple): The attributes indexed by storage.
+        text_attributes (tuple): The attributes storage indexes by word.
     """
 
+    indexed_attributes = ("place_id", "user_id")
+    text_attributes = ("text",)
+
     place_id = ""
     user_id = ""
     text = ""
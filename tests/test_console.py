@@ -4,11 +4,18 @@
 Unit tests for HBNBCommand Interpreter
 """
 
+import ast
 import unittest
 from unittest.mock import patch
 from io import StringIO
+from uuid import uuid4
 from console import HBNBCommand
 from models import storage
+from models.city import City
+from models.engine.locking import ConflictError
+from models.place import Place
+from models.review import Review
+from models.state import State
 
 
 def reset_buffer(buffer):
@@ -321,6 +328,48 @@ class TestAll(unittest.TestCase):
                 self.assertEqual(str(obj_list), dot_cmd_output)
                 reset_buffer(f)
 
+    def test_pages(self):
+        """
+        Test that 'all <class> limit=<n>' pages through the instances
+        in the order of their ids, following the printed cursors.
+        """
+        states = [State() for _ in range(5)]
+        self.addCleanup(lambda: [storage.delete(state) for state in states])
+        expected = [str(state) for state in sorted(
+            storage.all(State).values(), key=lambda state: state.id)]
+        pages = []
+        line = "all State limit=2"
+        while line:
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                output = f.getvalue().splitlines()
+            page = ast.literal_eval(output[0])
+            pages.extend(page)
+            line = None
+            if len(output) > 1:
+                cursor = output[1].split("after=")[1].rstrip(" *")
+                line = f'State.all(limit=2, after="{cursor}")'
+        self.assertEqual(pages, expected)
+
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd(f"all State after={cursor}")
+            self.assertEqual(f.getvalue().strip(), str(page))
+
+    def test_invalid_pages(self):
+        """
+        Test the error messages of invalid pages.
+        """
+        lines = {
+            "all State limit=x": "** invalid limit: x **",
+            "all State page=2": "** invalid argument: page=2 **",
+            "all limit=2 State": "** invalid argument: State **",
+            "all Nowhere limit=2": "** class doesn't exist **",
+        }
+        for line, message in lines.items():
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), message)
+
 
 class TestShow(unittest.TestCase):
     """
@@ -350,6 +399,235 @@ class TestShow(unittest.TestCase):
                 reset_buffer(f)
 
 
+class TestExpand(unittest.TestCase):
+    """
+    Unit tests for the 'expand' command in the HBNBCommand interpreter
+    """
+
+    def test_expand(self):
+        """
+        Test that 'expand <class> <id>' and '<class>.expand(<id>)'
+        display an object followed by its indented descendants.
+        """
+        state = State()
+        city = City()
+        city.state_id = state.id
+        place = Place()
+        place.city_id = city.id
+        review = Review()
+        review.place_id = place.id
+        expected = "\n".join([str(state), "    " + str(city),
+                              "        " + str(place),
+                              "            " + str(review)])
+
+        for line in (f"expand State {state.id}",
+                     f'State.expand("{state.id}")'):
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().rstrip("\n"), expected)
+
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd(f"expand Place {place.id}")
+            self.assertEqual(f.getvalue().rstrip("\n"),
+                             f"{place}\n    {review}")
+
+    def test_errors(self):
+        """
+        Test the error messages of 'expand'.
+        """
+        for line, expected in (
+                ("expand", "** class name missing **"),
+                ("expand MyModel 1", "** class doesn't exist **"),
+                ("expand State", "** instance id missing **"),
+                ("expand State 1", "** no instance found **")):
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), expected)
+
+
+class TestNear(unittest.TestCase):
+    """
+    Unit tests for the 'near' and 'within' commands in the HBNBCommand
+    interpreter.
+    """
+
+    def setUp(self):
+        """
+        Creates two places at a point of their own.
+        """
+        self.places = []
+        for latitude in (-41.001, -41.002):
+            place = Place()
+            place.latitude = latitude
+            place.longitude = 99.5
+            self.places.append(place)
+
+    def tearDown(self):
+        """
+        Removes the places.
+        """
+        for place in self.places:
+            storage.delete(place)
+
+    def test_near(self):
+        """
+        Test that 'near' prints the places around a point,
+        nearest first.
+        """
+        expected = [str(self.places[1]), str(self.places[0])]
+        for line in ("near Place -41.002 99.5 1",
+                     "Place.near(-41.002, 99.5, 1)"):
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), str(expected))
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("Place.near(-41.002, 99.5, 1, 1)")
+            self.assertEqual(f.getvalue().strip(), str(expected[:1]))
+
+    def test_within(self):
+        """
+        Test that 'within' prints the places in a box.
+        """
+        expected = [str(self.places[0])]
+        for line in ("within Place -41.0015 99.4 -41 99.6",
+                     "Place.within(-41.0015, 99.4, -41, 99.6)"):
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), str(expected))
+
+    def test_errors(self):
+        """
+        Test the error messages of 'near' and 'within'.
+        """
+        for line, expected in (
+                ("near", "** class name missing **"),
+                ("within MyModel 1 2 3 4", "** class doesn't exist **"),
+                ("near User 0 0 1", "** User has no spatial attributes **"),
+                ("near Place 0 0 1 1.5", "** invalid limit: 1.5 **"),
+                ("near Place 0 0 -1", "** the radius cannot be negative **"),
+                ("within Place 0 0 91 1", "** invalid box: 0.0, 0.0, "
+                                          "91.0, 1.0 **"),
+                ("near Place 0 x 1", "** invalid arguments: 0 x 1 **\n"
+                                     "Type 'help near' for its usage."),
+                ("within Place 1 2", "** invalid arguments: 1 2 **\n"
+                                     "Type 'help within' for its usage.")):
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), expected)
+
+
+class TestSearch(unittest.TestCase):
+    """
+    Unit tests for the 'search' command in the HBNBCommand interpreter
+    """
+
+    def setUp(self):
+        """
+        Creates reviews with words of their own.
+        """
+        self.reviews = [Review(), Review()]
+        self.reviews[0].text = "Xylophone quokka, quokka!"
+        self.reviews[1].text = "A quokka"
+
+    def tearDown(self):
+        """
+        Removes the reviews.
+        """
+        for review in self.reviews:
+            storage.delete(review)
+
+    def test_search(self):
+        """
+        Test that 'search' prints the matching reviews, best first.
+        """
+        for line, expected in (
+                ("search Review quokka", self.reviews),
+                ('Review.search("QUOKKA xylophone")', self.reviews[:1]),
+                ("search Review quokka zebra", [])):
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(),
+                                 str([str(obj) for obj in expected]))
+
+    def test_errors(self):
+        """
+        Test the error messages of 'search'.
+        """
+        for line, expected in (
+                ("search", "** class name missing **"),
+                ("search MyModel quokka", "** class doesn't exist **"),
+                ("search Review", "** words missing **"),
+                ("search User quokka", "** User has no text attributes **")):
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), expected)
+
+
+class TestView(unittest.TestCase):
+    """
+    Unit tests for the 'view' command in the HBNBCommand interpreter
+    """
+
+    def setUp(self):
+        """
+        Creates a place with two reviews in a city of its own.
+        """
+        self.city = City()
+        self.city.state_id = str(uuid4())
+        self.place = Place()
+        self.place.city_id = self.city.id
+        self.place.price_by_night = 120
+        self.reviews = [Review(), Review()]
+        for review in self.reviews:
+            review.place_id = self.place.id
+
+    def tearDown(self):
+        """
+        Removes the objects.
+        """
+        for obj in self.reviews + [self.place, self.city]:
+            storage.delete(obj)
+
+    def test_view(self):
+        """
+        Test that 'view' prints the views and their groups.
+        """
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("view")
+            for name in ("average_price_by_city", "reviews_by_place",
+                         "places_by_state"):
+                self.assertIn(name, f.getvalue())
+        for line, expected in (
+                (f"view reviews_by_place {self.place.id}", "2"),
+                (f"view average_price_by_city {self.city.id}", "120.0"),
+                (f"view places_by_state {self.city.state_id}", "1"),
+                ("view reviews_by_place missing", "0"),
+                ("view average_price_by_city missing", "None"),
+                ("view missing", "** view doesn't exist **")):
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), expected)
+        self.assertIn("reviews_by_place", storage.views())
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("view reviews_by_place")
+            self.assertEqual(f.getvalue().strip(),
+                             str(storage.view("reviews_by_place").results()))
+
+    def test_view_group_is_a_string(self):
+        """
+        Test that 'view' reads a group that looks like a number as
+        the string it is stored as.
+        """
+        review = Review()
+        review.place_id = "1234"
+        try:
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd("view reviews_by_place 1234")
+                self.assertEqual(f.getvalue().strip(), "1")
+        finally:
+            storage.delete(review)
+
+
 class TestDestroy(unittest.TestCase):
     """
     Unit tests for the 'destroy' command in the HBNBCommand interpreter.
@@ -373,6 +651,129 @@ class TestDestroy(unittest.TestCase):
             self.assertNotIn(classname_id, storage.all())
 
 
+class TestConflict(unittest.TestCase):
+    """
+    Unit tests for the saves of commands that conflict with the
+    changes of another process.
+    """
+
+    def test_conflict_is_reported(self):
+        """
+        Test that 'create', 'update' and 'destroy' print the conflict
+        instead of raising it.
+        """
+        conflict = ConflictError(["User.other"])
+        expected = "** changed by another process: User.other **"
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("create City")
+            city_id = f.getvalue().strip()
+            reset_buffer(f)
+            with patch.object(storage, "save", side_effect=conflict):
+                HBNBCommand().onecmd("create City")
+                lines = f.getvalue().splitlines()
+                self.assertEqual(lines[0], expected)
+                self.assertIsNotNone(storage.get("City", lines[1]))
+                reset_buffer(f)
+
+                HBNBCommand().onecmd(f"update City {city_id} name Paris")
+                self.assertEqual(f.getvalue().strip(), expected)
+                self.assertEqual(storage.get("City", city_id).name,
+                                 "Paris")
+                reset_buffer(f)
+
+                HBNBCommand().onecmd(f"destroy City {city_id}")
+                self.assertEqual(f.getvalue().strip(), expected)
+                self.assertIsNone(storage.get("City", city_id))
+
+
+class TestWhere(unittest.TestCase):
+    """
+    Unit tests for '<class>.where(...)' queries in the HBNBCommand
+    interpreter.
+    """
+
+    def setUp(self):
+        """
+        Creates places in a city of their own.
+        """
+        self.city_id = str(uuid4())
+        self.places = []
+        for max_guest in (3, 6, 4, 8):
+            place = Place()
+            place.city_id = self.city_id
+            place.max_guest = max_guest
+            self.places.append(place)
+
+    def test_where(self):
+        """
+        Test that a query prints the matching instances in order.
+        """
+        line = (f'Place.where(city_id="{self.city_id}", max_guest>=4)'
+                ".order_by(-max_guest).limit(2)")
+        expected = [str(self.places[3]), str(self.places[1])]
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd(line)
+            self.assertEqual(f.getvalue().strip(), str(expected))
+
+        line = f'Place.where(city_id="{self.city_id}").order_by(max_guest)'
+        expected = [str(self.places[i]) for i in (0, 2, 1, 3)]
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd(line)
+            self.assertEqual(f.getvalue().strip(), str(expected))
+
+    def test_quoted_values(self):
+        """
+        Test that quoted values are compared as strings and unquoted
+        ones as numbers.
+        """
+        self.places[0].name = "42"
+        self.places[1].name = 42
+        for value, place in (('"42"', 0), ("'42'", 0), ("42", 1)):
+            line = f'Place.where(city_id="{self.city_id}", name={value})'
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(),
+                                 str([str(self.places[place])]))
+
+    def test_has(self):
+        """
+        Test that has and !has query the amenities of places.
+        """
+        self.places[0].amenity_ids = ["wifi-id", "pool-id"]
+        self.places[1].amenity_ids = ["wifi-id"]
+        line = (f'Place.where(city_id="{self.city_id}", amenity_ids has '
+                'wifi-id, amenity_ids !has "pool-id")')
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd(line)
+            self.assertEqual(f.getvalue().strip(), str([str(self.places[1])]))
+
+    def test_explain(self):
+        """
+        Test that explain() prints the plan of a query.
+        """
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd(
+                f'Place.where(city_id="{self.city_id}").explain()')
+            self.assertTrue(f.getvalue().startswith("index Place.city_id"))
+
+    def test_invalid_queries(self):
+        """
+        Test the error messages of invalid queries.
+        """
+        lines = {
+            "Nowhere.where(a=1)": "** class doesn't exist **",
+            "Place.where(max_guest>)": "** invalid condition: max_guest> **",
+            "Place.where().limit(x)": "** invalid limit: x **",
+            "Place.where().order_by(1)": "** invalid attribute: 1 **",
+            "Place.where().group_by(city_id)":
+                "group_by is not a valid command",
+        }
+        for line, message in lines.items():
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertIn(message, f.getvalue())
+
+
 class TestUpdate(unittest.TestCase):
     """
     Unit tests for the 'update' command in the HBNBCommand interpreter.
@@ -424,6 +825,56 @@ class TestUpdate(unittest.TestCase):
                 self.assertEqual(obj.age, 50)
                 self.assertEqual(obj.height, 6.78)
 
+    def test_update_indexed_attribute(self):
+        """
+        Test that updating an indexed attribute updates the index
+        used by storage.lookup().
+        """
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("create City")
+            city_id = f.getvalue().strip()
+            HBNBCommand().onecmd(f"update City {city_id} state_id s-42")
+        city = storage.get("City", city_id)
+        self.assertIn(city, storage.lookup("City", "state_id", "s-42"))
+        with patch("sys.stdout", new=StringIO()):
+            HBNBCommand().onecmd(f'City.update("{city_id}", "state_id", '
+                                 '"s-43")')
+        self.assertNotIn(city, storage.lookup("City", "state_id", "s-42"))
+        self.assertIn(city, storage.lookup("City", "state_id", "s-43"))
+
+    def test_update_sorted_attribute(self):
+        """
+        Test that values converted by 'update' keep the sorted index
+        used by storage.range() in order.
+        """
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("create Place")
+            place_id = f.getvalue().strip()
+            HBNBCommand().onecmd(
+                f"update Place {place_id} price_by_night 98765")
+        place = storage.get("Place", place_id)
+        self.assertIsInstance(place.price_by_night, int)
+        found = storage.range("Place", "price_by_night", 98765, 98765)
+        self.assertEqual(list(found), [place])
+
+        with patch("sys.stdout", new=StringIO()):
+            HBNBCommand().onecmd(f'Place.update("{place_id}", '
+                                 '"price_by_night", "98765.5")')
+        self.assertEqual(list(storage.range("Place", "price_by_night",
+                                            98765, 98765)), [])
+        self.assertIn(place, storage.range("Place", "price_by_night",
+                                           98765.5, 98766))
+
+        with patch("sys.stdout", new=StringIO()):
+            HBNBCommand().onecmd(
+                f"update Place {place_id} price_by_night cheap")
+        self.assertNotIn(place, storage.range("Place", "price_by_night",
+                                              low=0))
+        self.assertIn(place, storage.range("Place", "price_by_night",
+                                           "cheap", "cheap"))
+        storage.delete(place)
+        storage.save()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,6 +6,7 @@ Unittest module for testing the BaseModel class.
 import unittest
 import datetime
 from models.base_model import BaseModel
+from models.user import User
 
 
 class TestBaseModel(unittest.TestCase):
@@ -83,6 +84,14 @@ class TestBaseModel(unittest.TestCase):
         self.assertIsInstance(my_model_dict["created_at"], str)
         self.assertIsInstance(my_model_dict["updated_at"], str)
 
+    def test_setattr_without_id(self):
+        """
+        Test setting an attribute on an instance built without an id
+        """
+        user = User(first_name="x")
+        user.email = "a"
+        self.assertEqual(user.email, "a")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the BinarySnapshot class.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from models.engine.binary_snapshot import BinarySnapshot
+
+
+class TestBinarySnapshot(unittest.TestCase):
+    """
+    Test cases for encoding, writing and reading binary snapshots.
+    """
+
+    def setUp(self):
+        """
+        Set up a temporary directory and a sample record.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "file.bin")
+        self.value = {
+            "id": "1",
+            "created_at": "2024-01-01T00:00:00",
+            "city_id": "c1",
+            "name": "Dépôt",
+            "max_guest": 4,
+            "big": 2 ** 70,
+            "latitude": 37.77,
+            "flag": True,
+            "none": None,
+            "amenity_ids": ["a", "b"],
+            "__class__": "Place",
+        }
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        self.tmp_dir.cleanup()
+
+    def write(self, snapshot, records):
+        """
+        Writes records to the snapshot file.
+        """
+        with open(self.path, "wb") as file:
+            snapshot.write(file, records)
+
+    def read(self, snapshot):
+        """
+        Returns the records read from the snapshot file.
+        """
+        with open(self.path, "rb") as file:
+            return list(snapshot.read(file))
+
+    def test_read_from_stream(self):
+        """
+        Test that a snapshot can be read from a stream without fileno.
+        """
+        snapshot = BinarySnapshot()
+        buffer = io.BytesIO()
+        snapshot.write(buffer, [snapshot.encode(self.value)])
+        buffer.seek(0)
+        (key, value, _), = BinarySnapshot().read(buffer)
+        self.assertEqual((key, value), ("Place.1", self.value))
+
+    def test_encode_decode(self):
+        """
+        Test that decoding an encoded record returns the same object.
+        """
+        snapshot = BinarySnapshot()
+        self.assertEqual(snapshot.decode(snapshot.encode(self.value)),
+                         self.value)
+
+    def test_foreign_keys_are_interned(self):
+        """
+        Test that class names and foreign keys go to the string table.
+        """
+        snapshot = BinarySnapshot()
+        snapshot.encode(self.value)
+        self.assertIn("Place", snapshot.strings)
+        self.assertIn("c1", snapshot.strings)
+        self.assertNotIn("Dépôt", snapshot.strings)
+
+    def test_write_and_read(self):
+        """
+        Test that every record written can be read back.
+        """
+        snapshot = BinarySnapshot()
+        other = dict(self.value, id="2", city_id="c2")
+        self.write(snapshot, [snapshot.encode(self.value),
+                              snapshot.encode(other)])
+        records = list(self.read(BinarySnapshot()))
+        self.assertEqual([(key, value) for key, value, _ in records],
+                         [("Place.1", self.value), ("Place.2", other)])
+
+    def test_read_reencodes_with_other_table(self):
+        """
+        Test that records read into a snapshot with another string
+        table are re-encoded against that table.
+        """
+        writer = BinarySnapshot()
+        self.write(writer, [writer.encode(self.value)])
+        reader = BinarySnapshot()
+        reader.intern("unrelated")
+        (_, _, record), = self.read(reader)
+        self.assertEqual(reader.decode(record), self.value)
+
+    def test_empty_snapshot(self):
+        """
+        Test that a snapshot without records reads as empty.
+        """
+        self.write(BinarySnapshot(), [])
+        self.assertEqual(self.read(BinarySnapshot()), [])
+
+    def test_invalid_file(self):
+        """
+        Test that reading a file that is not a snapshot raises ValueError.
+        """
+        snapshot = BinarySnapshot()
+        buffer = io.BytesIO()
+        snapshot.write(buffer, [snapshot.encode(self.value)])
+        for data in (b"", b"{}", buffer.getvalue()[:-3],
+                     buffer.getvalue()[:20] + buffer.getvalue()[-15:]):
+            with open(self.path, "wb") as file:
+                file.write(data)
+            with self.assertRaises(ValueError):
+                self.read(BinarySnapshot())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the bitmap indexes of FileStorage.
+"""
+
+import random
+import unittest
+from models.engine.bitmaps import BitmapIndex
+
+
+class TestBitmapIndex(unittest.TestCase):
+    """
+    Test cases for the BitmapIndex class.
+    """
+
+    def setUp(self):
+        """
+        Set up an index of random lists and their brute-force search.
+        """
+        rng = random.Random(0)
+        self.index = BitmapIndex()
+        self.lists = {}
+        for i in range(500):
+            values = rng.sample("abcdefgh", rng.randrange(5))
+            self.lists[f"Place.{i}"] = values
+            self.index.add(f"Place.{i}", values)
+
+    def expected(self, all_of=(), any_of=(), none_of=()):
+        """
+        Returns the keys matching a search, found by checking
+        every list.
+        """
+        return sorted(
+            key for key, values in self.lists.items()
+            if all(value in values for value in all_of)
+            and (not any_of or any(value in values for value in any_of))
+            and not any(value in values for value in none_of))
+
+    def test_match(self):
+        """
+        Test AND, OR and NOT searches against a scan of every list.
+        """
+        for search in ({"all_of": "ab"}, {"any_of": "cd"},
+                       {"none_of": "efgh"}, {"all_of": "a", "any_of": "bc",
+                                             "none_of": "d"},
+                       {"all_of": "z"}, {}):
+            with self.subTest(search=search):
+                self.assertEqual(sorted(self.index.match(**search)),
+                                 self.expected(**search))
+        self.assertEqual(sorted(self.index.lookup("a")),
+                         self.expected(all_of="a"))
+
+    def test_add_remove(self):
+        """
+        Test that add replaces the values and remove forgets them,
+        and that freed numbers are reused.
+        """
+        self.index.add("Place.0", ["z", "a"])
+        self.assertEqual(self.index.lookup("z"), ["Place.0"])
+        self.index.remove("Place.0")
+        self.index.remove("Place.0")
+        self.assertEqual(self.index.lookup("z"), [])
+        self.assertNotIn("Place.0", self.index.match())
+        self.assertEqual(len(self.index), 499)
+        self.index.add("Place.new", ["z"])
+        self.assertEqual(self.index.lookup("z"), ["Place.new"])
+        self.assertEqual(len(self.index), 500)
+
+    def test_invalid_values(self):
+        """
+        Test that only lists are indexed and unhashable values
+        are ignored.
+        """
+        self.index.add("Place.0", "abc")
+        self.index.add("Place.1", None)
+        self.index.add("Place.2", [["a"], "z"])
+        self.assertNotIn("Place.0", self.index.match())
+        self.assertNotIn("Place.1", self.index.match())
+        self.assertEqual(self.index.lookup("z"), ["Place.2"])
+        self.assertEqual(self.index.lookup(["a"]), [])
+        self.assertEqual(len(self.index), 498)
+
+    def test_estimate_search(self):
+        """
+        Test the has and !has conditions of the query planner.
+        """
+        has_a = self.expected(all_of="a")
+        self.assertEqual(self.index.estimate("has", "a"), len(has_a))
+        self.assertEqual(self.index.estimate("!has", "a"), 500 - len(has_a))
+        self.assertEqual(self.index.estimate("has", []), 0)
+        self.assertIsNone(self.index.estimate("==", "a"))
+        self.assertEqual(sorted(self.index.search("!has", "a")),
+                         self.expected(none_of="a"))
+        self.assertEqual(
+            sorted(self.index.search_all([("has", "a"), ("!has", "b")])),
+            self.expected(all_of="a", none_of="b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the object cache and the record stores
+of FileStorage.
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from models.engine import cache
+from models.engine.cache import LRUCache, RecordStore
+
+
+class TestRecordStore(unittest.TestCase):
+    """
+    Test cases for the RecordStore class.
+    """
+
+    def setUp(self):
+        """
+        Set up a store holding three records.
+        """
+        self.store = RecordStore()
+        for i in range(3):
+            self.store[f"Place.{i}"] = {"id": str(i), "tags": [i]}
+
+    def test_mapping(self):
+        """
+        Test that values are read back from the file.
+        """
+        self.assertEqual(len(self.store), 3)
+        self.assertIn("Place.1", self.store)
+        self.assertEqual(self.store["Place.1"], {"id": "1", "tags": [1]})
+        self.assertEqual(self.store.get("Place.3"), None)
+        self.store["Place.1"] = "replaced"
+        self.assertEqual(self.store.pop("Place.1"), "replaced")
+        self.assertIsNone(self.store.pop("Place.1", None))
+        with self.assertRaises(KeyError):
+            self.store.pop("Place.1")
+        del self.store["Place.0"]
+        with self.assertRaises(KeyError):
+            del self.store["Place.0"]
+        self.assertEqual(list(self.store), ["Place.2"])
+
+    def test_detach(self):
+        """
+        Test that a detached record can be attached again until it is
+        replaced or removed.
+        """
+        self.store.detach("Place.0")
+        self.assertNotIn("Place.0", self.store)
+        self.assertTrue(self.store.attach("Place.0"))
+        self.assertEqual(self.store["Place.0"]["id"], "0")
+        self.assertFalse(self.store.attach("Place.0"))
+        self.store.detach("Place.0")
+        self.store.pop("Place.0", None)
+        self.assertFalse(self.store.attach("Place.0"))
+
+    def test_copy_and_compaction(self):
+        """
+        Test that the garbage is dropped and that a copy keeps
+        reading the records it was made with.
+        """
+        view = self.store.copy()
+        with patch.object(cache, "COMPACT_MIN_BYTES", 0):
+            self.store.detach("Place.2")
+            for i in range(10):
+                self.store["Place.0"] = i
+            self.store.pop("Place.1")
+        self.assertLess(self.store.file_size(), 200)
+        self.assertEqual(self.store["Place.0"], 9)
+        self.assertTrue(self.store.attach("Place.2"))
+        self.assertEqual(self.store["Place.2"]["id"], "2")
+        self.assertEqual(dict(view), {
+            f"Place.{i}": {"id": str(i), "tags": [i]} for i in range(3)})
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    Test cases for the LRUCache class.
+    """
+
+    def test_order(self):
+        """
+        Test that the least recently used entry is evicted first and
+        that only changed entries are written back.
+        """
+        lru = LRUCache(max_objects=2)
+        lru.admit("a", object(), loaded=True)
+        lru.admit("b", object())
+        lru.admit("c", object(), loaded=True)
+        self.assertTrue(lru.full())
+        lru.hit("a")
+        self.assertEqual(lru.evict(), ("b", True))
+        self.assertFalse(lru.full())
+        lru.touch("c")
+        lru.admit("d", object(), loaded=True)
+        self.assertEqual(lru.evict(), ("a", False))
+        lru.discard("c")
+        self.assertEqual(lru.stats(), {
+            "hits": 1, "misses": 3, "evictions": 2, "write_backs": 1,
+            "objects": 1, "bytes": 0, "hit_ratio": 0.25})
+
+    def test_bytes(self):
+        """
+        Test that a byte limit evicts all but the most recent entry.
+        """
+        lru = LRUCache(max_bytes=1)
+        lru.admit("a", SimpleNamespace(name="Loft"))
+        self.assertFalse(lru.full())
+        lru.admit("b", SimpleNamespace(name="Loft"))
+        self.assertGreater(lru.size, 1)
+        self.assertTrue(lru.full())
+        lru.evict()
+        self.assertEqual(len(lru), 1)
+        self.assertIn("b", lru)
+
+    def test_limits(self):
+        """
+        Test that a cache needs a positive limit.
+        """
+        for limits in ({}, {"max_objects": 0}, {"max_bytes": -1}):
+            with self.assertRaises(ValueError):
+                LRUCache(**limits)
+
+
+if __name__ == "__main__":
+    unittest.main()
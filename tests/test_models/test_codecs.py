@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the FileStorage codecs.
+"""
+
+import io
+import json
+import unittest
+from models.engine.codecs import (
+    CODECS, FragmentRecords, get_codec, read_file, write_file)
+
+
+class TestCodecs(unittest.TestCase):
+    """
+    Test cases for writing and auto-detecting every codec.
+    """
+
+    objects = {
+        "User.1": {"id": "1", "first_name": "Bétty", "__class__": "User"},
+        "Place.2": {"id": "2", "city_id": "c", "max_guest": 4,
+                    "latitude": 1.5, "amenity_ids": ["a"],
+                    "__class__": "Place"},
+    }
+
+    def names(self):
+        """
+        Returns the name of every codec and compressed variant.
+        """
+        names = list(CODECS)
+        for name in CODECS:
+            names += [f"{name}+gzip", f"{name}+lzma"]
+        return names
+
+    def write(self, codec, objects):
+        """
+        Returns the content of a file written with a codec.
+        """
+        buffer = io.BytesIO()
+        write_file(buffer, codec, (codec.encode(key, value)
+                                   for key, value in objects.items()))
+        return buffer.getvalue()
+
+    def test_round_trip(self):
+        """
+        Test that every codec reads back what it wrote, and is detected
+        from the file.
+        """
+        for name in self.names():
+            for objects in (self.objects, {}):
+                with self.subTest(codec=name, count=len(objects)):
+                    codec = get_codec(name)
+                    data = self.write(codec, objects)
+                    codec, items = read_file(
+                        io.BytesIO(data),
+                        get_codec(name) if codec.trusted_only else None)
+                    self.assertEqual(codec.name, name)
+                    self.assertEqual(
+                        {key: value for key, value, _ in items}, objects)
+
+    def test_fragments_are_reusable(self):
+        """
+        Test that fragments read back can be written again as is.
+        """
+        for name in self.names():
+            with self.subTest(codec=name):
+                codec = get_codec(name)
+                data = self.write(codec, self.objects)
+                codec, items = read_file(io.BytesIO(data), codec)
+                buffer = io.BytesIO()
+                write_file(buffer, codec, [item[2] for item in items])
+                self.assertEqual(buffer.getvalue(), data)
+
+    def test_decode(self):
+        """
+        Test that every codec decodes the fragments it encoded and read.
+        """
+        for name in self.names():
+            with self.subTest(codec=name):
+                codec = get_codec(name)
+                data = self.write(codec, self.objects)
+                reader, items = read_file(io.BytesIO(data), codec)
+                for key, value, fragment in items:
+                    self.assertEqual(reader.decode(fragment), value)
+                    self.assertEqual(
+                        codec.decode(codec.encode(key, value)), value)
+
+    def test_json_is_the_original_format(self):
+        """
+        Test that the json codec writes a plain json.dump(indent=4) file.
+        """
+        data = self.write(get_codec("json"), self.objects)
+        self.assertEqual(data.decode("utf-8"),
+                         json.dumps(self.objects, indent=4))
+
+    def test_trusted_only_codecs(self):
+        """
+        Test that pickle and marshal files are only read with a codec
+        of the same kind, and never detected.
+        """
+        for name in ("pickle", "pickle+lzma", "marshal", "marshal+gzip"):
+            with self.subTest(codec=name):
+                data = self.write(get_codec(name), self.objects)
+                for codec in (None, get_codec("json"), get_codec("binary"),
+                              get_codec("json-compact+lzma")):
+                    with self.assertRaisesRegex(ValueError, "refusing"):
+                        read_file(io.BytesIO(data), codec)
+                other = "marshal" if name.startswith("pickle") else "pickle"
+                with self.assertRaisesRegex(ValueError, "refusing"):
+                    read_file(io.BytesIO(data), get_codec(other))
+                for configured in (name.partition("+")[0], name):
+                    codec, items = read_file(io.BytesIO(data),
+                                             get_codec(configured))
+                    self.assertEqual(codec.name, name)
+                    self.assertEqual(
+                        {key: value for key, value, _ in items},
+                        self.objects)
+
+    def test_fragment_records(self):
+        """
+        Test that fragment records decode their fragments when read.
+        """
+        codec = get_codec("json")
+        records = FragmentRecords(codec.decode)
+        for key, value in self.objects.items():
+            records.add(key, codec.encode(key, value))
+        copy = records.copy()
+        self.assertEqual(dict(records), self.objects)
+        self.assertIn("User.1", records)
+        self.assertEqual(records.pop("User.1"), self.objects["User.1"])
+        self.assertIsNone(records.pop("User.1", None))
+        with self.assertRaises(KeyError):
+            records.pop("User.1")
+        self.assertEqual(list(records), ["Place.2"])
+        self.assertEqual(dict(copy), self.objects)
+
+    def test_unknown_codec(self):
+        """
+        Test that unknown codecs are rejected.
+        """
+        for name in ("yaml", "json+zip", "+gzip"):
+            with self.assertRaises(ValueError):
+                get_codec(name)
+        with self.assertRaises(ValueError):
+            read_file(io.BytesIO(b"HBNB-CODEC yaml\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
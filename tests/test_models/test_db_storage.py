@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+
+"""
+Unittest module for testing the DBStorage class.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.city import City
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.state import State
+from models.user import User
+
+
+class TestDBStorage(unittest.TestCase):
+    """
+    Test cases for the DBStorage class, run against a temporary
+    database installed as models.storage.
+    """
+
+    storage_options = {}
+
+    def setUp(self):
+        """
+        Set up a DBStorage backed by a temporary database.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "file.db")
+        self.storage = DBStorage(self.path, **self.storage_options)
+        patcher = patch("models.storage", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """
+        Close the storage before the temporary directory is removed.
+        """
+        self.storage.close()
+
+    def reloaded(self):
+        """
+        Returns a new DBStorage loaded from the temporary database.
+        """
+        storage = DBStorage(self.path, **self.storage_options)
+        self.addCleanup(storage.close)
+        storage.reload()
+        return storage
+
+    def rows(self, sql, *parameters):
+        """
+        Returns the rows of a query run on a new connection.
+        """
+        connection = sqlite3.connect(self.path)
+        try:
+            return connection.execute(sql, parameters).fetchall()
+        finally:
+            connection.close()
+
+    def test_tables(self):
+        """
+        Test that every class has a table with indexed foreign keys.
+        """
+        tables = dict(self.rows(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table'"))
+        self.assertEqual(set(tables), {
+            "BaseModel", "User", "State", "City", "Amenity", "Place",
+            "Review"})
+        self.assertIn("city_id, user_id, data", tables["Place"])
+        indexes = {name for name, in self.rows(
+            "SELECT name FROM sqlite_master WHERE type = 'index' "
+            "AND sql IS NOT NULL")}
+        self.assertEqual(indexes, {
+            "City_state_id", "Place_city_id", "Place_user_id",
+            "Review_place_id", "Review_user_id"})
+        plan = self.rows("EXPLAIN QUERY PLAN "
+                         "SELECT id FROM Place WHERE city_id = ?", "")
+        self.assertIn("Place_city_id", plan[0][-1])
+
+    def test_save_writes_changed_rows(self):
+        """
+        Test that save inserts, replaces and deletes rows.
+        """
+        city = City()
+        place = Place()
+        place.city_id = city.id
+        place.price_by_night = 80
+        self.storage.save()
+        self.assertEqual(self.rows(
+            "SELECT id, city_id, user_id FROM Place"),
+            [(place.id, city.id, None)])
+
+        place.price_by_night = 95
+        self.storage.delete(city)
+        self.storage.save()
+        self.assertEqual(self.rows("SELECT id FROM City"), [])
+        data, = self.rows("SELECT data FROM Place WHERE id = ?", place.id)
+        self.assertEqual(json.loads(data[0]), place.to_dict())
+
+    def test_reload(self):
+        """
+        Test that reload rebuilds the objects and their indexes.
+        """
+        state = State()
+        state.name = "California"
+        city = City()
+        city.state_id = state.id
+        user = User()
+        self.storage.delete(user)
+        self.storage.save()
+        self.storage.flush()
+
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                storage = DBStorage(self.path, lazy=lazy)
+                self.addCleanup(storage.close)
+                storage.reload()
+                self.assertEqual(set(storage.all()), {
+                    f"State.{state.id}", f"City.{city.id}"})
+                self.assertEqual(storage.get(State, state.id).to_dict(),
+                                 state.to_dict())
+                self.assertEqual(
+                    [obj.id for obj in storage.lookup(
+                        City, "state_id", state.id)], [city.id])
+
+    def test_failed_write_is_rolled_back(self):
+        """
+        Test that the changes of a save are written all or none.
+        """
+        user = User()
+        place = Place()
+        place.amenity_ids = {"not JSON"}
+        with self.assertRaises(TypeError):
+            self.storage.save()
+            self.storage.flush()
+        self.assertEqual(self.rows("SELECT id FROM User"), [])
+
+        place.amenity_ids = []
+        self.storage.save()
+        self.storage.flush()
+        self.assertEqual(self.rows("SELECT id FROM User"), [(user.id,)])
+
+    def test_close_and_compact(self):
+        """
+        Test that the storage can be used after close and compact.
+        """
+        user = User()
+        self.storage.save()
+        self.storage.close()
+        self.storage.delete(user)
+        self.storage.save()
+        self.storage.compact()
+        self.assertEqual(self.reloaded().all(), {})
+
+    def test_import_json(self):
+        """
+        Test that objects of a FileStorage file can be imported.
+        """
+        json_path = os.path.join(self.tmp_dir.name, "file.json")
+        source = FileStorage(json_path, checksum=False)
+        self.addCleanup(source.close)
+        with patch("models.storage", source):
+            user = User()
+            user.first_name = "Betty"
+            source.save()
+        self.storage.import_json(json_path)
+        self.storage.save()
+        self.storage.flush()
+        reloaded = self.reloaded()
+        self.assertEqual(reloaded.get(User, user.id).first_name, "Betty")
+        export_path = os.path.join(self.tmp_dir.name, "export.json")
+        reloaded.export_json(export_path)
+        with open(json_path, encoding="utf-8") as source_file, \
+                open(export_path, encoding="utf-8") as export_file:
+            self.assertEqual(json.load(export_file), json.load(source_file))
+
+    def test_snapshot(self):
+        """
+        Test that a snapshot reads the rows and the unwritten changes
+        as they were when it was taken.
+        """
+        users = [User() for _ in range(3)]
+        self.storage.save()
+        users[0].first_name = "Betty"
+        self.storage.delete(users[1])
+        with self.storage.snapshot() as snapshot:
+            users[0].first_name = "Later"
+            users[2].first_name = "Later"
+            User()
+            self.storage.save()
+            self.storage.flush()
+            self.assertEqual(snapshot.count(User), 2)
+            self.assertEqual(snapshot.get(User, users[0].id)["first_name"],
+                             "Betty")
+            self.assertIsNone(snapshot.get(User, users[1].id))
+            self.assertNotIn("first_name", snapshot.get(User, users[2].id))
+        self.assertEqual(self.reloaded().count(User), 3)
+
+    def test_transaction(self):
+        """
+        Test that a transaction writes its changes in one database
+        transaction, and none of them if it raises.
+        """
+        user = User()
+        self.storage.save()
+        with self.storage.transaction():
+            for _ in range(3):
+                User().save()
+        with self.assertRaises(KeyError):
+            with self.storage.transaction():
+                user.first_name = "Betty"
+                self.storage.delete(User())
+                City().save()
+                raise KeyError
+        self.storage.save()
+        self.storage.flush()
+        storage = self.reloaded()
+        self.assertEqual(storage.count(User), 4)
+        self.assertEqual(storage.count(City), 0)
+        self.assertNotIn("first_name", storage.get(User, user.id).__dict__)
+
+
+class TestDBStorageBackground(TestDBStorage):
+    """
+    Test cases for DBStorage writing from a background thread.
+    """
+
+    storage_options = {"flush_interval": 60}
+
+    def test_save_writes_changed_rows(self):
+        """
+        Test that the rows are written by a flush.
+        """
+        user = User()
+        user.save()
+        self.assertEqual(self.rows("SELECT id FROM User"), [])
+        self.storage.flush()
+        self.assertEqual(self.rows("SELECT id FROM User"), [(user.id,)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the atomic writes and checksums
+of models.engine.durable.
+"""
+
+import os
+import tempfile
+import unittest
+from models.engine.durable import TRAILER_SIZE, atomic_write, open_verified
+
+
+class TestDurable(unittest.TestCase):
+    """
+    Test cases for atomic_write and open_verified.
+    """
+
+    def setUp(self):
+        """
+        Set up a temporary directory.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "data")
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """
+        Test that the data is read back without the trailer.
+        """
+        with atomic_write(self.path, fsync=True) as file:
+            file.write(b"hello\n")
+            file.write(b"world")
+        self.assertEqual(os.path.getsize(self.path), 11 + TRAILER_SIZE)
+        with open_verified(self.path) as file:
+            self.assertEqual(file.readline(), b"hello\n")
+            self.assertEqual(file.read(), b"world")
+            file.seek(0)
+            self.assertEqual(file.read(5), b"hello")
+
+    def test_without_checksum(self):
+        """
+        Test that a file without trailer is read as is.
+        """
+        with atomic_write(self.path, checksum=False) as file:
+            file.write(b"{}")
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.read(), b"{}")
+        with open_verified(self.path) as file:
+            self.assertEqual(file.read(), b"{}")
+
+    def test_error_keeps_old_file(self):
+        """
+        Test that an error inside the block keeps the old file
+        and removes the temporary file.
+        """
+        with atomic_write(self.path) as file:
+            file.write(b"old")
+        with self.assertRaises(RuntimeError):
+            with atomic_write(self.path) as file:
+                file.write(b"new")
+                raise RuntimeError("crash")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["data"])
+        with open_verified(self.path) as file:
+            self.assertEqual(file.read(), b"old")
+
+    def test_concurrent_writes(self):
+        """
+        Test that two writes of the same file at once use their own
+        temporary files, and that the last one replaces the file.
+        """
+        with atomic_write(self.path) as first:
+            first.write(b"first")
+            with atomic_write(self.path) as second:
+                second.write(b"second")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["data"])
+        with open_verified(self.path) as file:
+            self.assertEqual(file.read(), b"first")
+
+    def test_permissions(self):
+        """
+        Test that a replaced file keeps its permissions.
+        """
+        with atomic_write(self.path) as file:
+            file.write(b"old")
+        os.chmod(self.path, 0o640)
+        with atomic_write(self.path) as file:
+            file.write(b"new")
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+
+    def test_damaged_data(self):
+        """
+        Test that a changed byte or a changed size is detected.
+        """
+        with atomic_write(self.path) as file:
+            file.write(b"hello world")
+        with open(self.path, "r+b") as file:
+            file.write(b"j")
+        with self.assertRaisesRegex(ValueError, "checksum mismatch"):
+            with open_verified(self.path):
+                pass
+
+        with open(self.path, "rb") as file:
+            data = file.read()
+        with open(self.path, "wb") as file:
+            file.write(b"x" + data)
+        with self.assertRaisesRegex(ValueError, "size mismatch"):
+            with open_verified(self.path):
+                pass
+
+    def test_missing_file(self):
+        """
+        Test that opening a missing file raises FileNotFoundError.
+        """
+        with self.assertRaises(FileNotFoundError):
+            with open_verified(self.path):
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,8 +4,25 @@
 Unittest module for testing the FileStorage class.
 """
 
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from unittest.mock import patch
 from models.base_model import BaseModel
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.engine.fulltext import tokenize
+from models.engine.locking import ConflictError
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
 
 
 class TestFileStorage(unittest.TestCase):
@@ -56,5 +73,2116 @@ class TestFileStorage(unittest.TestCase):
             )
 
 
+class TempStorageTestCase(unittest.TestCase):
+    """
+    Base class for tests that run against a FileStorage backed by
+    a temporary file and installed as models.storage.
+    """
+
+    storage_options = {}
+
+    def setUp(self):
+        """
+        Set up a FileStorage backed by a temporary file.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "file.json")
+        self.storage = FileStorage(self.path, **self.storage_options)
+        patcher = patch("models.storage", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """
+        Close the storage before the temporary directory is removed.
+        """
+        self.storage.close()
+
+    def reloaded(self):
+        """
+        Returns a new FileStorage loaded from the temporary file.
+        """
+        storage = FileStorage(self.path, **self.storage_options)
+        self.addCleanup(storage.close)
+        storage.reload()
+        return storage
+
+
+class TestFileStorageDirtyTracking(TempStorageTestCase):
+    """
+    Test cases for the re-serialization of dirty objects only.
+    """
+
+    # the files are checked as plain JSON
+    storage_options = {"checksum": False, "fragment_cache": True}
+
+    def read_file(self):
+        """
+        Returns the decoded content of the storage file.
+        """
+        with open(self.path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def test_clean_objects_are_not_reserialized(self):
+        """
+        Test that save reuses the serialized form of clean objects.
+        """
+        user = User()
+        user.save()
+        user.__dict__["first_name"] = "Hidden"  # bypasses dirty tracking
+        self.storage.save()
+        self.assertNotIn("first_name", self.read_file()[f"User.{user.id}"])
+
+    def test_file_layout(self):
+        """
+        Test that the file is laid out as json.dump with indent=4,
+        before and after a reload.
+        """
+        self.storage.save()
+        with open(self.path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), "{}")
+        users = [User(), User()]
+        users[0].save()
+        expected = json.dumps(
+            {f"User.{user.id}": user.to_dict() for user in users}, indent=4)
+        with open(self.path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), expected)
+        self.reloaded().save()
+        with open(self.path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), expected)
+
+    def test_attribute_assignment_marks_dirty(self):
+        """
+        Test that assigning an attribute makes the next save persist it.
+        """
+        user = User()
+        user.save()
+        user.first_name = "Betty"
+        self.storage.save()
+        self.assertEqual(
+            self.read_file()[f"User.{user.id}"]["first_name"], "Betty")
+
+    def test_new_marks_dirty_after_reload(self):
+        """
+        Test that objects loaded from the file are clean and that
+        re-adding an object with new marks it dirty.
+        """
+        user = User()
+        user.save()
+        storage = self.reloaded()
+        obj = storage.all()[f"User.{user.id}"]
+        obj.__dict__["first_name"] = "Betty"
+        storage.save()
+        self.assertNotIn("first_name", self.read_file()[f"User.{user.id}"])
+        storage.new(obj)
+        storage.save()
+        self.assertEqual(
+            self.read_file()[f"User.{user.id}"]["first_name"], "Betty")
+
+    def test_fragments_not_kept(self):
+        """
+        Test that without the fragment cache a reload keeps no
+        serialized form of the instances, which a save serializes.
+        """
+        user = User()
+        user.save()
+        storage = FileStorage(self.path)
+        storage.reload()
+        self.assertEqual(storage._FileStorage__serialized, {})
+        storage.all()[f"User.{user.id}"].__dict__["first_name"] = "Betty"
+        storage.save()
+        self.assertEqual(storage._FileStorage__serialized, {})
+        self.assertEqual(
+            self.read_file()[f"User.{user.id}"]["first_name"], "Betty")
+
+    def test_default_storages(self):
+        """
+        Test that a storage created without a path saves the objects
+        another one created or deleted, as they share the objects.
+        """
+        for name in ("file_path", "objects", "by_class", "indexes",
+                     "spatial"):
+            value = self.path if name == "file_path" else {}
+            patcher = patch.object(FileStorage, f"_FileStorage__{name}",
+                                   value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        first, second = FileStorage(), FileStorage()
+        with patch("models.storage", first):
+            user, review = User(), Review()
+            first.save()
+        second.save()
+        self.assertEqual(set(self.reloaded().all()),
+                         {f"User.{user.id}", f"Review.{review.id}"})
+        with patch("models.storage", second):
+            second.delete(review)
+        first.save()
+        self.assertEqual(list(self.reloaded().all()), [f"User.{user.id}"])
+
+
+class TestFileStorageClassIndex(TempStorageTestCase):
+    """
+    Test cases for all(cls) and count(cls).
+    """
+
+    def test_new_and_delete(self):
+        """
+        Test that the index follows new and delete.
+        """
+        users = [User(), User()]
+        review = Review()
+        self.assertEqual(self.storage.count(User), 2)
+        self.assertEqual(self.storage.count("Review"), 1)
+        self.assertEqual(self.storage.count("Place"), 0)
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(list(self.storage.all(User).values()), users)
+        self.assertEqual(list(self.storage.all("Review")), [
+            f"Review.{review.id}"])
+        self.assertEqual(self.storage.all("Place"), {})
+
+        self.storage.delete(users[0])
+        self.assertEqual(list(self.storage.all(User).values()), users[1:])
+        self.assertEqual(self.storage.count(User), 1)
+
+    def test_reload(self):
+        """
+        Test that reload and journal replay fill the index.
+        """
+        users = [User(), User()]
+        Review()
+        self.storage.save()
+        storage = self.reloaded()
+        self.assertEqual(list(storage.all(User)),
+                         [f"User.{user.id}" for user in users])
+        self.assertEqual(storage.count(Review), 1)
+
+        storage = FileStorage(self.path, journal=True)
+        storage.reload()
+        with patch("models.storage", storage):
+            storage.delete(storage.get(User, users[0].id))
+            storage.save()
+        storage = FileStorage(self.path, journal=True)
+        storage.reload()
+        self.assertEqual(list(storage.all(User)), [f"User.{users[1].id}"])
+
+    def test_lazy(self):
+        """
+        Test that count does not create instances and that
+        all(cls) only creates the instances of that class.
+        """
+        user = User()
+        review = Review()
+        self.storage.save()
+        storage = FileStorage(self.path, lazy=True)
+        storage.reload()
+        objects = storage._FileStorage__objects
+        self.assertEqual(storage.count(User), 1)
+        self.assertEqual(storage.count(), 2)
+        self.assertEqual(objects, {})
+
+        self.assertEqual(storage.all(User)[f"User.{user.id}"].to_dict(),
+                         user.to_dict())
+        self.assertEqual(list(objects), [f"User.{user.id}"])
+        self.assertEqual(storage.count(Review), 1)
+        self.assertIn(f"Review.{review.id}", storage.all())
+        self.assertEqual(storage.count(), 2)
+
+
+class TestFileStorageIterate(TempStorageTestCase):
+    """
+    Test cases for iterating over the objects in the order of
+    their keys.
+    """
+
+    def setUp(self):
+        """
+        Set up places and users.
+        """
+        super().setUp()
+        self.places = sorted((Place() for _ in range(5)),
+                             key=lambda place: place.id)
+        self.users = sorted((User() for _ in range(3)),
+                            key=lambda user: user.id)
+
+    def test_iterate(self):
+        """
+        Test that the objects come in key order and pages resume
+        after an object or a key.
+        """
+        self.assertEqual(list(self.storage.iterate()),
+                         self.places + self.users)
+        self.assertEqual(list(self.storage.iterate(User)), self.users)
+        self.assertEqual(list(self.storage.iterate("Place",
+                                                   self.places[2])),
+                         self.places[3:])
+        self.assertEqual(
+            list(self.storage.iterate(after=f"Place.{self.places[4].id}")),
+            self.users)
+        self.assertEqual(list(self.storage.iterate(State)), [])
+
+    def test_changes(self):
+        """
+        Test that the order follows new and deleted objects, and that
+        a page resumes after a deleted object.
+        """
+        objects = self.storage.iterate(Place)
+        self.assertEqual(next(objects), self.places[0])
+        self.storage.delete(self.places[1])
+        self.assertEqual(list(objects), self.places[2:])
+        new = Place()
+        self.assertIn(new, list(self.storage.iterate(Place)))
+        self.assertEqual(list(self.storage.iterate(Place, self.places[1])),
+                         sorted((place for place in self.places[2:] + [new]
+                                 if place.id > self.places[1].id),
+                                key=lambda place: place.id))
+
+    def test_lazy(self):
+        """
+        Test that a lazy reload only creates the instances reached.
+        """
+        self.storage.save()
+        storage = FileStorage(self.path, lazy=True)
+        storage.reload()
+        found = next(storage.iterate(Place, self.places[2]))
+        self.assertEqual(found.id, self.places[3].id)
+        self.assertEqual(len(storage._FileStorage__objects), 1)
+        self.assertEqual([user.id for user in storage.iterate(User)],
+                         [user.id for user in self.users])
+
+
+class TestFileStorageSecondaryIndex(TempStorageTestCase):
+    """
+    Test cases for lookup() on indexed attributes.
+    """
+
+    def test_new_update_delete(self):
+        """
+        Test that the index follows new, attribute changes and delete.
+        """
+        state_id = "california"
+        cities = [City(), City(), City()]
+        cities[0].state_id = state_id
+        cities[2].state_id = state_id
+        self.assertEqual(self.storage.lookup(City, "state_id", state_id),
+                         [cities[0], cities[2]])
+        self.assertEqual(self.storage.lookup("City", "state_id", ""),
+                         [cities[1]])
+
+        cities[0].state_id = "nevada"
+        self.storage.delete(cities[2])
+        self.assertEqual(self.storage.lookup(City, "state_id", state_id), [])
+        self.assertEqual(self.storage.lookup(City, "state_id", "nevada"),
+                         [cities[0]])
+
+    def test_not_indexed(self):
+        """
+        Test that looking up an attribute that is not indexed raises.
+        """
+        with self.assertRaises(ValueError):
+            self.storage.lookup(City, "name", "Fremont")
+        with self.assertRaises(ValueError):
+            self.storage.lookup(User, "email", "betty@example.com")
+
+    def test_reload(self):
+        """
+        Test that reload, lazy or not, indexes the objects.
+        """
+        reviews = [Review(), Review()]
+        reviews[0].place_id = "p1"
+        reviews[0].user_id = "u1"
+        reviews[1].place_id = "p1"
+        self.storage.save()
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                storage = FileStorage(self.path, lazy=lazy)
+                storage.reload()
+                found = storage.lookup(Review, "place_id", "p1")
+                self.assertEqual([review.id for review in found],
+                                 [review.id for review in reviews])
+                found = storage.lookup(Review, "user_id", "u1")
+                self.assertEqual([review.id for review in found],
+                                 [reviews[0].id])
+
+    def test_journal_replay(self):
+        """
+        Test that replayed changes and deletes update the index.
+        """
+        storage = FileStorage(self.path, journal=True)
+        with patch("models.storage", storage):
+            place = Place()
+            other = Place()
+            place.city_id = "c1"
+            other.city_id = "c1"
+            storage.save()
+            place.city_id = "c2"
+            storage.delete(other)
+            storage.save()
+        storage = FileStorage(self.path, journal=True)
+        storage.reload()
+        self.assertEqual(storage.lookup(Place, "city_id", "c1"), [])
+        self.assertEqual([p.id for p in storage.lookup(Place, "city_id",
+                                                       "c2")], [place.id])
+
+
+class TestFileStorageSortedIndex(TempStorageTestCase):
+    """
+    Test cases for range(), min() and max() on sorted attributes.
+    """
+
+    def setUp(self):
+        """
+        Set up places priced from 0 to 90 a night.
+        """
+        super().setUp()
+        self.places = []
+        for i in range(10):
+            place = Place()
+            place.price_by_night = (i * 37) % 10 * 10
+            self.places.append(place)
+        self.by_price = sorted(self.places,
+                               key=lambda place: place.price_by_night)
+
+    def test_range(self):
+        """
+        Test that range() pages through the objects in order.
+        """
+        cursor = self.storage.range(Place, "price_by_night", 20, 60)
+        self.assertEqual(cursor.fetch(3), self.by_price[2:5])
+        self.assertEqual(cursor.fetch(3), self.by_price[5:7])
+        self.assertEqual(cursor.fetch(3), [])
+
+        cursor = self.storage.range("Place", "price_by_night", high=30,
+                                    descending=True)
+        self.assertEqual(list(cursor), self.by_price[3::-1])
+
+        resumed = self.storage.range(Place, "price_by_night", low=70,
+                                     after=cursor.position)
+        self.assertEqual(list(resumed), self.by_price[7:])
+
+    def test_min_max(self):
+        """
+        Test that min() and max() follow changes.
+        """
+        self.assertEqual(self.storage.min(Place, "price_by_night"), 0)
+        self.assertEqual(self.storage.max(Place, "max_guest"), 0)
+        self.by_price[0].price_by_night = 5.5
+        self.storage.delete(self.by_price[-1])
+        self.assertEqual(self.storage.min(Place, "price_by_night"), 5.5)
+        self.assertEqual(self.storage.max(Place, "price_by_night"), 80)
+        empty = FileStorage(os.path.join(self.tmp_dir.name, "empty.json"))
+        self.assertIsNone(empty.min(Place, "price_by_night"))
+
+    def test_not_sorted(self):
+        """
+        Test that range searches need a sorted attribute.
+        """
+        with self.assertRaises(ValueError):
+            self.storage.range(Place, "city_id")
+        with self.assertRaises(ValueError):
+            self.storage.min(User, "email")
+
+    def test_reload(self):
+        """
+        Test that reload, lazy or not, sorts the objects.
+        """
+        self.storage.save()
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                storage = FileStorage(self.path, lazy=lazy)
+                storage.reload()
+                found = storage.range(Place, "price_by_night", 50).fetch(10)
+                self.assertEqual([place.id for place in found],
+                                 [place.id for place in self.by_price[5:]])
+
+    def test_built_on_first_use(self):
+        """
+        Test that a reload builds no sorted index, and that the index
+        built by the first search follows the later changes.
+        """
+        self.storage.save()
+        storage = self.reloaded()
+        self.assertNotIn("price_by_night",
+                         storage._FileStorage__indexes.get("Place", {}))
+        self.assertEqual(storage.min(Place, "price_by_night"), 0)
+        with patch("models.storage", storage):
+            storage.get(Place, self.by_price[0].id).price_by_night = 95
+        self.assertEqual(storage.min(Place, "price_by_night"), 10)
+        self.assertEqual(storage.max(Place, "price_by_night"), 95)
+
+
+class TestFileStorageFullText(TempStorageTestCase):
+    """
+    Test cases for search() and the persisted text indexes.
+    """
+
+    def setUp(self):
+        """
+        Set up reviews and a place.
+        """
+        super().setUp()
+        self.reviews = [Review(), Review(), Review()]
+        self.reviews[0].text = "Great view. Great host!"
+        self.reviews[1].text = "Noisy street, but a great view"
+        self.reviews[2].text = "Quiet street"
+        self.place = Place()
+        self.place.description = "A quiet cabin with a view"
+        self.place.name = "Cabin"
+
+    def test_search(self):
+        """
+        Test that search() ranks the objects containing every word.
+        """
+        self.assertEqual(self.storage.search(Review, "great view"),
+                         self.reviews[:2])
+        self.assertEqual(self.storage.search("Review", "great", limit=1),
+                         self.reviews[:1])
+        self.assertEqual(self.storage.search(Place, "quiet view"),
+                         [self.place])
+        self.assertEqual(self.storage.search(Place, "cabin",
+                                             "description"), [self.place])
+        with self.assertRaises(ValueError):
+            self.storage.search(User, "betty")
+        with self.assertRaises(ValueError):
+            self.storage.search(Place, "cabin", "name")
+
+    def test_update_and_delete(self):
+        """
+        Test that changed and deleted texts are reindexed.
+        """
+        self.reviews[2].text = "Great pool"
+        self.assertEqual(self.storage.search(Review, "quiet"), [])
+        self.assertEqual(self.storage.search(Review, "great pool"),
+                         [self.reviews[2]])
+        self.storage.delete(self.reviews[0])
+        self.assertEqual(self.storage.search(Review, "host"), [])
+
+    def test_persisted_index(self):
+        """
+        Test that a reload, lazy or not, tokenizes no text, and that
+        building the index on its first use only tokenizes the texts
+        that changed since it was written, and forgets deleted ones.
+        """
+        for cls in (Review, Place):
+            self.storage.search(cls, "view")  # builds the indexes
+        self.storage.save()
+        with open(self.path + ".fts", "rb") as file:
+            stale_index = file.read()
+        self.reviews[1].text = "Quiet street"
+        self.storage.delete(self.reviews[0])
+        self.storage.save()
+        self.reviews[2].text = "Great pool"
+        self.storage.save()
+        self.storage.close()
+
+        for stale in (False, True):
+            if stale:
+                with open(self.path + ".fts", "wb") as file:
+                    file.write(stale_index)
+            for lazy in (False, True):
+                with self.subTest(stale=stale, lazy=lazy), \
+                        patch("models.engine.fulltext.tokenize",
+                              side_effect=tokenize) as tokenizer:
+                    storage = FileStorage(self.path, lazy=lazy)
+                    storage.reload()
+                    self.assertEqual(tokenizer.call_count, 0)
+                    storage.index(Review, "text")
+                    self.assertEqual(tokenizer.call_count, 2 if stale else 0)
+                    self.check_search(storage)
+
+    def check_search(self, storage):
+        """
+        Checks the searches of test_persisted_index.
+        """
+        found = storage.search(Review, "street")
+        self.assertEqual([review.id for review in found],
+                         [self.reviews[1].id])
+        self.assertEqual(storage.search(Review, "host"), [])
+        self.assertEqual(len(storage.search(Review, "great")), 1)
+        self.assertEqual(len(storage.search(Place, "view")), 1)
+
+    def test_index_file_is_json(self):
+        """
+        Test that the index file is JSON, that a saved index which
+        was not built is kept, and that an invalid index is rebuilt.
+        """
+        self.storage.search(Review, "view")
+        self.storage.search(Place, "view")
+        self.storage.save()
+        self.storage.close()
+        with open(self.path + ".fts", encoding="utf-8") as file:
+            saved = json.load(file)
+        self.assertEqual(set(saved), {"Review.text", "Place.description"})
+
+        storage = self.reloaded()
+        with patch("models.storage", storage):
+            storage.get(Review, self.reviews[2].id).text = "Great pool"
+            storage.save()
+        self.assertEqual(len(storage.search(Review, "pool")), 1)
+        storage.close()
+        with open(self.path + ".fts", encoding="utf-8") as file:
+            saved = json.load(file)
+        self.assertEqual(set(saved), {"Review.text", "Place.description"})
+
+        saved["Review.text"]["keys"] = []
+        with open(self.path + ".fts", "w", encoding="utf-8") as file:
+            json.dump(saved, file)
+        storage = self.reloaded()
+        self.assertEqual(len(storage.search(Review, "great")), 3)
+        self.assertEqual(len(storage.search(Place, "view")), 1)
+
+    def test_damaged_index(self):
+        """
+        Test that a damaged index file is rebuilt from the objects.
+        """
+        self.storage.save()
+        with open(self.path + ".fts", "wb") as file:
+            file.write(b"garbage")
+        storage = self.reloaded()
+        self.assertEqual(len(storage.search(Review, "great view")), 2)
+
+
+class TestFileStorageBitmaps(TempStorageTestCase):
+    """
+    Test cases for having() and the has conditions of queries.
+    """
+
+    def setUp(self):
+        """
+        Set up places with wifi, a pool and parking.
+        """
+        super().setUp()
+        amenities = [["wifi", "pool", "parking"], ["wifi", "pool"],
+                     ["wifi"], ["parking"], []]
+        self.places = []
+        for amenity_ids in amenities:
+            place = Place()
+            place.amenity_ids = amenity_ids
+            self.places.append(place)
+        self.default = Place()
+
+    def index(self, place):
+        """
+        Returns the position of a place in setUp.
+        """
+        return (self.places + [self.default]).index(place)
+
+    def test_having(self):
+        """
+        Test AND, OR and NOT searches on amenities.
+        """
+        def having(**search):
+            return sorted(self.storage.having(Place, "amenity_ids",
+                                              **search), key=self.index)
+
+        self.assertEqual(having(all_of=["wifi", "pool", "parking"]),
+                         self.places[:1])
+        self.assertEqual(having(all_of=["wifi"], none_of=["pool"]),
+                         self.places[2:3])
+        self.assertEqual(having(any_of=["pool", "parking"]),
+                         [self.places[i] for i in (0, 1, 3)])
+        self.assertEqual(having(none_of=["wifi"]),
+                         self.places[3:] + [self.default])
+        with self.assertRaises(ValueError):
+            self.storage.having(Place, "city_id", all_of=["x"])
+
+    def test_update_and_delete(self):
+        """
+        Test that assigned lists, touched lists and deleted places
+        are reindexed.
+        """
+        self.places[4].amenity_ids = ["pool"]
+        self.places[2].amenity_ids.append("pool")
+        self.storage.touch(self.places[2], "amenity_ids")
+        self.storage.delete(self.places[1])
+        self.assertCountEqual(
+            self.storage.having(Place, "amenity_ids", all_of=["pool"]),
+            [self.places[i] for i in (0, 2, 4)])
+
+    def test_save_reindexes(self):
+        """
+        Test that saving a place whose list was changed in place
+        reindexes it.
+        """
+        self.places[3].amenity_ids.append("pool")
+        self.places[0].amenity_ids.remove("pool")
+        self.places[3].save()
+        self.places[0].save()
+        self.assertCountEqual(
+            self.storage.having(Place, "amenity_ids", all_of=["pool"]),
+            [self.places[1], self.places[3]])
+
+    def test_query(self):
+        """
+        Test that has conditions are combined in the bitmap index
+        and compose with the other conditions.
+        """
+        self.places[1].name = "Loft"
+        query = self.storage.query(Place).where("amenity_ids", "has", "pool") \
+            .where("name", "==", "Loft").where("amenity_ids", "has", "wifi") \
+            .where("amenity_ids", "!has", "parking")
+        self.assertEqual(
+            query.explain(),
+            "index Place.amenity_ids has 'pool' and has 'wifi' and "
+            "!has 'parking' (~1 objects) -> filter name == 'Loft'")
+        self.assertEqual(query.all(), [self.places[1]])
+
+    def test_reload(self):
+        """
+        Test that reload, lazy or not, indexes the lists.
+        """
+        self.storage.save()
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                storage = FileStorage(self.path, lazy=lazy)
+                storage.reload()
+                found = storage.having(Place, "amenity_ids",
+                                       all_of=["wifi", "pool"])
+                self.assertCountEqual([place.id for place in found],
+                                      [place.id for place in self.places[:2]])
+
+
+class TestFileStorageRelations(TempStorageTestCase):
+    """
+    Test cases for children(), parent() and descendants().
+    """
+
+    def setUp(self):
+        """
+        Set up a state with two cities, a place and two reviews.
+        """
+        super().setUp()
+        self.state = State()
+        self.cities = [City(), City()]
+        self.user = User()
+        self.place = Place()
+        self.reviews = [Review(), Review()]
+        for city in self.cities:
+            city.state_id = self.state.id
+        self.place.city_id = self.cities[0].id
+        self.place.user_id = self.user.id
+        for review in self.reviews:
+            review.place_id = self.place.id
+        self.reviews[1].user_id = self.user.id
+
+    def test_children(self):
+        """
+        Test that children() follows the foreign keys to an object.
+        """
+        self.assertEqual(self.storage.children(self.state), self.cities)
+        self.assertEqual(self.storage.children(self.state, City),
+                         self.cities)
+        self.assertEqual(self.storage.children(self.state, "Place"), [])
+        self.assertEqual(self.storage.children(self.cities[1]), [])
+        self.assertEqual(self.storage.children(self.user),
+                         [self.place, self.reviews[1]])
+        self.assertEqual(self.storage.children(self.user, Review),
+                         [self.reviews[1]])
+
+        self.place.city_id = self.cities[1].id
+        self.assertEqual(self.storage.children(self.cities[0]), [])
+        self.assertEqual(self.storage.children(self.cities[1]), [self.place])
+
+    def test_parent(self):
+        """
+        Test that parent() returns the object a foreign key refers to.
+        """
+        self.assertIs(self.storage.parent(self.cities[0]), self.state)
+        self.assertIs(self.storage.parent(self.place), self.cities[0])
+        self.assertIs(self.storage.parent(self.place, User), self.user)
+        self.assertIs(self.storage.parent(self.reviews[1], "User"),
+                      self.user)
+        self.assertIsNone(self.storage.parent(self.reviews[0], User))
+        self.assertIsNone(self.storage.parent(self.state))
+        self.storage.delete(self.state)
+        self.assertIsNone(self.storage.parent(self.cities[0]))
+
+    def test_descendants(self):
+        """
+        Test that descendants() walks the graph depth first.
+        """
+        self.assertEqual(list(self.storage.descendants(self.state)), [
+            (1, self.cities[0]),
+            (2, self.place),
+            (3, self.reviews[0]),
+            (3, self.reviews[1]),
+            (1, self.cities[1]),
+        ])
+        self.assertEqual(list(self.storage.descendants(self.reviews[0])), [])
+
+    def test_reload(self):
+        """
+        Test that the graph is rebuilt on reload, lazy or not.
+        """
+        self.storage.save()
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                storage = FileStorage(self.path, lazy=lazy)
+                storage.reload()
+                state = storage.get(State, self.state.id)
+                found = [(depth, obj.id)
+                         for depth, obj in storage.descendants(state)]
+                self.assertEqual(found, [
+                    (1, self.cities[0].id),
+                    (2, self.place.id),
+                    (3, self.reviews[0].id),
+                    (3, self.reviews[1].id),
+                    (1, self.cities[1].id),
+                ])
+
+
+class TestFileStorageViews(TempStorageTestCase):
+    """
+    Test cases for the aggregate views of FileStorage.
+    """
+
+    def setUp(self):
+        """
+        Set up two states, three cities, four places and reviews,
+        and register views over them.
+        """
+        super().setUp()
+        self.states = [State(), State()]
+        self.cities = [City(), City(), City()]
+        for city, state in zip(self.cities, self.states * 2):
+            city.state_id = state.id
+        self.places = [Place() for _ in range(4)]
+        for i, place in enumerate(self.places):
+            place.city_id = self.cities[i % 3].id
+            place.price_by_night = (i + 1) * 10
+        self.reviews = [Review() for _ in range(3)]
+        for review in self.reviews:
+            review.place_id = self.places[0].id
+        self.register(self.storage)
+
+    def register(self, storage):
+        """
+        Registers the views on a storage.
+        """
+        storage.register_view("price", Place, "city_id", "avg",
+                              "price_by_night")
+        storage.register_view("reviews", "Review", "place_id")
+        storage.register_view("by_state", Place, ("city_id", "state_id"))
+
+    def expected(self):
+        """
+        Returns the view results computed by scanning the objects.
+        """
+        prices, reviews, by_state = {}, {}, {}
+        for place in self.storage.all(Place).values():
+            prices.setdefault(place.city_id, [])
+            if isinstance(place.price_by_night, int):
+                prices[place.city_id].append(place.price_by_night)
+            city = self.storage.get(City, place.city_id)
+            if city is not None:
+                by_state[city.state_id] = by_state.get(city.state_id, 0) + 1
+        for review in self.storage.all(Review).values():
+            reviews[review.place_id] = reviews.get(review.place_id, 0) + 1
+        return ({city_id: sum(values) / len(values) if values else None
+                 for city_id, values in prices.items()}, reviews, by_state)
+
+    def results(self, storage):
+        """
+        Returns the results of the views of a storage.
+        """
+        return tuple(storage.view(name).results()
+                     for name in ("price", "reviews", "by_state"))
+
+    def test_build(self):
+        """
+        Test that a view is built from the stored objects.
+        """
+        self.assertEqual(self.storage.views(),
+                         ["price", "reviews", "by_state"])
+        self.assertEqual(self.results(self.storage), self.expected())
+        self.assertEqual(self.storage.view("price").get(self.cities[0].id),
+                         25)
+        self.assertEqual(self.storage.view("reviews").get(
+            self.places[0].id), 3)
+        self.assertEqual(self.storage.view("by_state").get(
+            self.states[0].id), 3)
+        self.assertIsNone(self.storage.view("missing"))
+        self.storage.drop_view("price")
+        self.storage.drop_view("price")
+        self.assertEqual(self.storage.views(), ["reviews", "by_state"])
+
+    def test_changes(self):
+        """
+        Test that views follow created, changed and deleted objects.
+        """
+        place = Place()
+        place.city_id = self.cities[1].id
+        place.price_by_night = 100
+        self.places[0].price_by_night = "unknown"
+        self.places[1].city_id = self.cities[2].id
+        self.reviews[0].place_id = self.places[1].id
+        self.storage.delete(self.reviews[1])
+        self.storage.delete(self.places[2])
+        self.assertEqual(self.results(self.storage), self.expected())
+        self.assertEqual(self.storage.view("price").get(self.cities[0].id), 40)
+
+    def test_foreign_keys(self):
+        """
+        Test that places are regrouped when their city changes state
+        or is deleted.
+        """
+        self.cities[0].state_id = self.states[1].id
+        self.assertEqual(self.results(self.storage), self.expected())
+        self.assertEqual(self.storage.view("by_state").get(
+            self.states[1].id), 3)
+        self.storage.delete(self.cities[0])
+        self.assertEqual(self.results(self.storage), self.expected())
+        city = City()
+        city.id = self.places[0].city_id
+        city.state_id = self.states[0].id
+        self.storage.new(city)
+        self.assertEqual(self.results(self.storage), self.expected())
+        with self.assertRaises(ValueError):
+            self.storage.register_view("bad", Place, ("name", "state_id"))
+
+    def test_reload(self):
+        """
+        Test that views are rebuilt on reload, lazy or not.
+        """
+        self.storage.save()
+        expected = self.expected()
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                storage = FileStorage(self.path, lazy=lazy)
+                self.addCleanup(storage.close)
+                self.register(storage)
+                self.assertEqual(self.results(storage), ({}, {}, {}))
+                storage.reload()
+                self.assertEqual(self.results(storage), expected)
+                storage.reload()
+                self.assertEqual(self.results(storage), expected)
+
+
+class TestFileStorageSpatial(TempStorageTestCase):
+    """
+    Test cases for near() and within().
+    """
+
+    def setUp(self):
+        """
+        Set up places in San Francisco, Oakland and Los Angeles.
+        """
+        super().setUp()
+        self.places = []
+        for latitude, longitude in ((37.7749, -122.4194),
+                                    (37.8044, -122.2712),
+                                    (34.0522, -118.2437)):
+            place = Place()
+            place.latitude = latitude
+            place.longitude = longitude
+            self.places.append(place)
+
+    def test_near(self):
+        """
+        Test that near() returns the places around a point,
+        nearest first.
+        """
+        sf, oakland, la = self.places
+        self.assertEqual(self.storage.near(Place, 37.78, -122.41, 20),
+                         [sf, oakland])
+        self.assertEqual(self.storage.near("Place", 37.80, -122.27, 20, 1),
+                         [oakland])
+        self.assertEqual(self.storage.near(Place, 37.78, -122.41, 600),
+                         [sf, oakland, la])
+        self.assertEqual(self.storage.near(Place, 0, 0, 100), [])
+
+    def test_within(self):
+        """
+        Test that within() returns the places in a box.
+        """
+        sf, oakland, la = self.places
+        self.assertCountEqual(
+            self.storage.within(Place, 37, -123, 38, -122), [sf, oakland])
+        self.assertEqual(
+            self.storage.within(Place, 33, -119, 35, -118), [la])
+
+    def test_update_and_delete(self):
+        """
+        Test that moved and deleted places are reindexed.
+        """
+        sf, oakland, la = self.places
+        la.latitude = 37.7
+        self.assertEqual(self.storage.near(Place, 34.05, -118.24, 50), [])
+        la.longitude = -122.4
+        self.assertCountEqual(
+            self.storage.within(Place, 37, -123, 38, -122),
+            [sf, oakland, la])
+        self.storage.delete(oakland)
+        self.assertCountEqual(
+            self.storage.within(Place, 37, -123, 38, -122), [sf, la])
+
+    def test_places_without_coordinates(self):
+        """
+        Test that places whose coordinates were never set are not
+        found at the default point, and are once they are set.
+        """
+        unset = Place()
+        half = Place()
+        half.latitude = 0.0
+        self.assertEqual(self.storage.near(Place, 0, 0, 10), [])
+        half.longitude = 0.0
+        self.assertEqual(self.storage.near(Place, 0, 0, 10), [half])
+        self.storage.save()
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                storage = FileStorage(self.path, lazy=lazy)
+                self.addCleanup(storage.close)
+                storage.reload()
+                self.assertEqual(
+                    [place.id for place in storage.near(Place, 0, 0, 10)],
+                    [half.id])
+                self.assertIn(f"Place.{unset.id}", storage.all(Place))
+
+    def test_reload(self):
+        """
+        Test that reload, lazy or not, indexes the places.
+        """
+        self.storage.save()
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                storage = FileStorage(self.path, lazy=lazy)
+                storage.reload()
+                found = storage.near(Place, 37.78, -122.41, 20)
+                self.assertEqual([place.id for place in found],
+                                 [self.places[0].id, self.places[1].id])
+
+    def test_errors(self):
+        """
+        Test that invalid searches raise.
+        """
+        with self.assertRaises(ValueError):
+            self.storage.near(User, 0, 0, 10)
+        with self.assertRaises(ValueError):
+            self.storage.near(Place, 91, 0, 10)
+        with self.assertRaises(ValueError):
+            self.storage.near(Place, 0, 0, -1)
+        with self.assertRaises(ValueError):
+            self.storage.near(Place, 0, 0, 10, -1)
+        with self.assertRaises(ValueError):
+            self.storage.within(Place, 0, 0, 10, 181)
+
+
+class TestFileStorageJournal(TempStorageTestCase):
+    """
+    Test cases for the journal mode of FileStorage.
+    """
+
+    storage_options = {"journal": True}
+
+    def test_save_appends_only_changed_objects(self):
+        """
+        Test that save writes the journal and leaves the file untouched.
+        """
+        user = User()
+        user.save()
+        self.assertFalse(os.path.exists(self.path))
+        with open(self.path + ".journal", encoding="utf-8") as file:
+            self.assertEqual(len(file.readlines()), 1)
+
+        user.first_name = "Betty"
+        user.save()
+        with open(self.path + ".journal", encoding="utf-8") as file:
+            self.assertEqual(len(file.readlines()), 2)
+
+    def test_reload_replays_journal(self):
+        """
+        Test that reload rebuilds the objects from the journal.
+        """
+        user = User()
+        other = User()
+        user.first_name = "Betty"
+        user.save()
+        self.storage.delete(other)
+        self.storage.save()
+
+        reloaded = self.reloaded()
+        key = f"User.{user.id}"
+        self.assertEqual(list(reloaded.all()), [key])
+        self.assertEqual(reloaded.all()[key].first_name, "Betty")
+
+    def test_compact(self):
+        """
+        Test that compact writes the file and empties the journal.
+        """
+        user = User()
+        user.save()
+        self.storage.compact()
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path + ".journal"))
+
+        reloaded = self.reloaded()
+        self.assertIn(f"User.{user.id}", reloaded.all())
+
+    def test_save_after_torn_record(self):
+        """
+        Test that the saves made after reloading a journal whose last
+        record was cut by a crash are reloaded.
+        """
+        User().save()
+        with open(self.path + ".journal", "a", encoding="utf-8") as file:
+            file.write('{"op":"put","key":"User.2","da')
+        storage = self.reloaded()
+        with patch("models.storage", storage):
+            User().save()
+        self.assertEqual(self.reloaded().count(User), 2)
+
+
+class TestFileStorageSharded(TempStorageTestCase):
+    """
+    Test cases for the sharded mode of FileStorage.
+    """
+
+    storage_options = {"sharded": True, "checksum": False}
+
+    def test_save_rewrites_changed_shards_only(self):
+        """
+        Test that a save only writes the files of the changed classes.
+        """
+        user = User()
+        review = Review()
+        self.storage.save()
+        user_path = self.storage.shard_path("User")
+        review_path = self.storage.shard_path("Review")
+        self.assertTrue(os.path.exists(user_path))
+        self.assertTrue(os.path.exists(review_path))
+        self.assertFalse(os.path.exists(self.path))
+
+        os.remove(review_path)
+        user.first_name = "Betty"
+        user.save()
+        self.assertFalse(os.path.exists(review_path))
+
+        self.storage.delete(review)
+        self.storage.save()
+        with open(review_path, encoding="utf-8") as file:
+            self.assertEqual(json.load(file), {})
+
+    def test_reload_selected_classes(self):
+        """
+        Test that reload only loads the requested classes.
+        """
+        user = User()
+        Review()
+        self.storage.save()
+        storage = FileStorage(self.path, sharded=True)
+        storage.reload(["User"])
+        self.assertEqual(list(storage.all()), [f"User.{user.id}"])
+
+    def test_reload_selected_classes_needs_shards(self):
+        """
+        Test that a storage writing one file refuses to reload some
+        classes, which its next save would drop from the file.
+        """
+        Review()
+        self.storage.save()
+        storage = FileStorage(self.path)
+        with self.assertRaises(ValueError):
+            storage.reload(["User"])
+        self.assertEqual(storage.count(), 0)
+
+    def test_reload_selected_classes_needs_no_journal(self):
+        """
+        Test that a storage keeping a journal refuses to reload some
+        classes, whose changes its next compaction would drop from the
+        journal.
+        """
+        storage = FileStorage(self.path, journal=True, sharded=True)
+        with patch("models.storage", storage):
+            review = Review()
+            storage.save()
+        storage = FileStorage(self.path, journal=True, sharded=True)
+        with self.assertRaises(ValueError):
+            storage.reload(["User"])
+        self.assertEqual(storage.count(), 0)
+        storage.reload()
+        storage.compact()
+
+        storage = FileStorage(self.path, sharded=True)
+        storage.reload()
+        self.assertEqual(list(storage.all()), [f"Review.{review.id}"])
+
+    def test_journal_replay_marks_shards_stale(self):
+        """
+        Test that compacting after a journal replay writes the shards
+        of the replayed objects.
+        """
+        storage = FileStorage(self.path, journal=True, sharded=True)
+        with patch("models.storage", storage):
+            user = User()
+            storage.save()
+        self.assertFalse(os.path.exists(storage.shard_path("User")))
+
+        storage = FileStorage(self.path, journal=True, sharded=True,
+                              checksum=False)
+        storage.reload()
+        storage.compact()
+        with open(storage.shard_path("User"), encoding="utf-8") as file:
+            self.assertIn(f"User.{user.id}", json.load(file))
+
+
+class TestFileStorageLazy(TempStorageTestCase):
+    """
+    Test cases for the lazy mode of FileStorage.
+    """
+
+    storage_options = {"lazy": True}
+
+    def setUp(self):
+        """
+        Save two users and reload them into a lazy storage.
+        """
+        super().setUp()
+        self.users = [User(), User()]
+        self.storage.save()
+        self.lazy = self.reloaded()
+
+    def test_get_materializes_one_object(self):
+        """
+        Test that get only creates the requested instance.
+        """
+        user = self.lazy.get("User", self.users[0].id)
+        self.assertIsInstance(user, User)
+        self.assertIs(self.lazy.get(User, self.users[0].id), user)
+        self.assertEqual(self.lazy._FileStorage__objects,
+                         {f"User.{user.id}": user})
+        self.assertIsNone(self.lazy.get("User", "missing"))
+
+    def test_all_materializes_every_object(self):
+        """
+        Test that all returns every stored instance.
+        """
+        all_objects = self.lazy.all()
+        self.assertEqual(len(all_objects), 2)
+        for obj in all_objects.values():
+            self.assertIsInstance(obj, User)
+
+    def test_save_keeps_unloaded_objects(self):
+        """
+        Test that saving a partly loaded storage keeps every object.
+        """
+        with patch("models.storage", self.lazy):
+            self.lazy.get("User", self.users[0].id).first_name = "Betty"
+            self.lazy.save()
+        storage = self.reloaded()
+        self.assertEqual(len(storage.all()), 2)
+        self.assertEqual(
+            storage.get("User", self.users[0].id).first_name, "Betty")
+
+    def test_unloaded_objects_are_not_parsed_twice(self):
+        """
+        Test that the unloaded objects are kept as the fragments of the
+        next save, not also as parsed objects, whatever the format.
+        """
+        for options in ({}, {"snapshot_format": "json-compact"}):
+            with self.subTest(**options):
+                storage = FileStorage(self.path, lazy=True, **options)
+                self.addCleanup(storage.close)
+                storage.reload()
+                records = storage._FileStorage__unloaded["User"]
+                serialized = storage._FileStorage__serialized
+                for user in self.users:
+                    key = f"User.{user.id}"
+                    self.assertIs(records._FragmentRecords__fragments[key],
+                                  serialized[key])
+                    self.assertEqual(records[key], user.to_dict())
+                self.assertEqual(storage.get(User, self.users[1].id)
+                                 .to_dict(), self.users[1].to_dict())
+
+
+class TestFileStorageCache(TempStorageTestCase):
+    """
+    Test cases for the bounded cache of instances of FileStorage.
+    """
+
+    storage_options = {"cache_size": 3}
+
+    def setUp(self):
+        """
+        Set up ten places, more than the cache holds.
+        """
+        super().setUp()
+        self.places = [Place() for _ in range(10)]
+        for i, place in enumerate(self.places):
+            place.city_id = f"city-{i % 2}"
+            place.price_by_night = i * 10
+
+    def resident(self, storage=None):
+        """
+        Returns the number of instances a storage holds in memory.
+        """
+        storage = storage or self.storage
+        return len(storage._FileStorage__objects)
+
+    def test_bounded(self):
+        """
+        Test that only the most recently used instances stay in memory
+        and that evicted objects are read back.
+        """
+        self.assertEqual(self.resident(), 3)
+        self.assertEqual(self.storage.count(Place), 10)
+        place = self.storage.get(Place, self.places[0].id)
+        self.assertEqual(place.to_dict(), self.places[0].to_dict())
+        self.assertEqual(
+            [obj.id for obj in self.storage.lookup(Place, "city_id",
+                                                   "city-1")],
+            [place.id for place in self.places[1::2]])
+        self.assertEqual(len(list(self.storage.iterate(Place))), 10)
+        self.assertEqual(sorted(self.storage.all(Place)),
+                         sorted(f"Place.{p.id}" for p in self.places))
+        self.assertEqual(len(self.storage.all()), 10)
+        self.assertEqual(self.resident(), 3)
+        stats = self.storage.cache_stats()
+        self.assertEqual(stats["objects"], 3)
+        self.assertGreater(stats["misses"], 0)
+        self.assertGreater(stats["write_backs"], 0)
+        self.assertIsNone(FileStorage(self.path).cache_stats())
+
+    def test_hits(self):
+        """
+        Test that an accessed instance is not evicted before the
+        least recently used ones.
+        """
+        hot = self.storage.get(Place, self.places[-1].id)
+        for place in self.places[:5]:
+            self.storage.get(Place, place.id)
+            self.assertIs(self.storage.get(Place, hot.id), hot)
+        stats = self.storage.cache_stats()
+        self.assertEqual(stats["hits"], 6)
+        self.assertEqual(stats["hit_ratio"], 6 / (6 + stats["misses"]))
+
+    def test_changes(self):
+        """
+        Test that the changes of evicted instances are saved.
+        """
+        self.places[0].name = "Loft"
+        self.assertIs(self.storage.get(Place, self.places[0].id),
+                      self.places[0])
+        for place in self.places[1:5]:
+            place.name = "House"
+        self.storage.delete(self.places[9])
+        self.storage.delete(self.places[1])
+        self.storage.save()
+        storage = self.reloaded()
+        self.assertEqual(storage.count(Place), 8)
+        self.assertEqual(storage.get(Place, self.places[0].id).name, "Loft")
+        self.assertEqual(storage.get(Place, self.places[4].id).name, "House")
+        self.assertIsNone(storage.get(Place, self.places[1].id))
+
+    def test_evicted_instance_stays_live(self):
+        """
+        Test that an evicted instance still referenced elsewhere is
+        the one returned afterwards and that its changes are saved.
+        """
+        place = self.places[0]
+        self.storage.save()
+        self.assertNotIn(f"Place.{place.id}",
+                         self.storage._FileStorage__objects)
+        self.assertIs(self.storage.get(Place, place.id), place)
+        for other in self.places[1:5]:
+            self.storage.get(Place, other.id)
+        self.assertIs(self.storage.all(Place)[f"Place.{place.id}"], place)
+        place.name = "Stale"
+        with patch("models.storage", self.storage):
+            place.save()
+        self.assertEqual(self.reloaded().get(Place, place.id).name,
+                         "Stale")
+
+    def test_all_order(self):
+        """
+        Test that all() lists the objects of a class in the same order
+        whichever instances are in memory.
+        """
+        first = list(self.storage.all(Place))
+        self.storage.get(Place, self.places[4].id)
+        self.assertEqual(list(self.storage.all(Place)), first)
+        self.assertEqual(first, sorted(first))
+
+    def test_reload(self):
+        """
+        Test that a reload keeps the objects on disk, whatever the
+        format of the file.
+        """
+        for i, options in enumerate(({}, {"snapshot_format": "binary"},
+                                     {"journal": True})):
+            with self.subTest(**options):
+                path = os.path.join(self.tmp_dir.name, f"cached{i}.json")
+                storage = FileStorage(path, **options)
+                self.addCleanup(storage.close)
+                for place in self.places:
+                    storage.new(place)
+                storage.save()
+                storage = FileStorage(path, cache_size=2, **options)
+                self.addCleanup(storage.close)
+                storage.reload()
+                self.assertEqual(self.resident(storage), 0)
+                with patch("models.storage", storage):
+                    for place in storage.iterate(Place):
+                        place.max_guest = 4
+                    self.assertEqual(self.resident(storage), 2)
+                    storage.save()
+                    storage.compact()
+                loaded = FileStorage(path, **options)
+                self.addCleanup(loaded.close)
+                loaded.reload()
+                self.assertEqual(
+                    [place.max_guest for place in loaded.all().values()],
+                    [4] * 10)
+
+
+class TestFileStorageBinary(TempStorageTestCase):
+    """
+    Test cases for the binary snapshot format of FileStorage.
+    """
+
+    storage_options = {"snapshot_format": "binary"}
+
+    def test_unknown_format(self):
+        """
+        Test that an unknown snapshot format is rejected.
+        """
+        with self.assertRaises(ValueError):
+            FileStorage(self.path, snapshot_format="yaml")
+
+    def test_format_is_detected_and_converted(self):
+        """
+        Test that a file written in another format is loaded, and
+        written in the format of the storage on the next save.
+        """
+        user = User()
+        self.storage.save()
+        storage = FileStorage(self.path, snapshot_format="pickle+gzip")
+        storage.reload()
+        self.assertEqual(storage.get("User", user.id).to_dict(),
+                         user.to_dict())
+        storage.save()
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.readline(), b"HBNB-CODEC pickle+gzip\n")
+        storage = FileStorage(self.path, snapshot_format="pickle")
+        storage.reload()
+        self.assertEqual(len(storage.all()), 1)
+
+    def test_pickle_file_needs_pickle_format(self):
+        """
+        Test that a storage not configured with pickle refuses to
+        load a pickle file instead of unpickling it.
+        """
+        storage = FileStorage(self.path, snapshot_format="pickle")
+        self.addCleanup(storage.close)
+        storage.new(User())
+        storage.save()
+        for options in ({}, {"snapshot_format": "binary"}):
+            with self.subTest(**options):
+                with patch("pickle.loads") as loads:
+                    with self.assertRaisesRegex(ValueError, "refusing"):
+                        FileStorage(self.path, **options).reload()
+                loads.assert_not_called()
+
+    def test_save_and_reload(self):
+        """
+        Test that objects survive a save and reload in binary format.
+        """
+        user = User()
+        user.first_name = "Betty"
+        review = Review()
+        review.user_id = user.id
+        self.storage.save()
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.read(7), b"HBNBBIN")
+
+        storage = self.reloaded()
+        self.assertEqual(storage.get("User", user.id).first_name, "Betty")
+        self.assertEqual(storage.get("Review", review.id).to_dict(),
+                         review.to_dict())
+
+    def test_compressed_save_and_reload(self):
+        """
+        Test that a compressed binary file is read from the
+        decompressed stream, not mapped from the disk.
+        """
+        for snapshot_format in ("binary+gzip", "binary+lzma"):
+            with self.subTest(snapshot_format=snapshot_format):
+                storage = FileStorage(self.path,
+                                      snapshot_format=snapshot_format)
+                with patch("models.storage", storage):
+                    user = User()
+                    storage.save()
+                storage = FileStorage(self.path,
+                                      snapshot_format=snapshot_format)
+                storage.reload()
+                self.assertEqual(storage.get(User, user.id).to_dict(),
+                                 user.to_dict())
+
+    def test_export_and_import_json(self):
+        """
+        Test the conversion between the binary and the JSON format.
+        """
+        user = User()
+        self.storage.save()
+        json_path = os.path.join(self.tmp_dir.name, "export.json")
+        self.storage.export_json(json_path)
+        with open(json_path, encoding="utf-8") as file:
+            self.assertEqual(json.load(file),
+                             {f"User.{user.id}": user.to_dict()})
+
+        other_path = os.path.join(self.tmp_dir.name, "other.bin")
+        storage = FileStorage(other_path, snapshot_format="binary")
+        storage.import_json(json_path)
+        storage = FileStorage(other_path, snapshot_format="binary")
+        storage.reload()
+        self.assertEqual(storage.get("User", user.id).to_dict(),
+                         user.to_dict())
+
+
+class TestFileStorageBackground(TempStorageTestCase):
+    """
+    Test cases for the background flush mode of FileStorage.
+    """
+
+    storage_options = {"flush_interval": 60}
+
+    def test_save_is_written_by_flush(self):
+        """
+        Test that save leaves the write to the thread until flush.
+        """
+        user = User()
+        user.save()
+        self.assertFalse(os.path.exists(self.path))
+        self.storage.flush()
+        self.assertIn(f"User.{user.id}", self.reloaded().all())
+
+    def test_burst_is_coalesced(self):
+        """
+        Test that many saves before a flush are written once.
+        """
+        user = User()
+        with patch.object(FileStorage, "_FileStorage__write_file",
+                          autospec=True) as write_file:
+            for i in range(50):
+                user.first_name = f"Betty {i}"
+                user.save()
+            self.storage.flush()
+        self.assertEqual(write_file.call_count, 1)
+
+    def test_close_writes_latest_state(self):
+        """
+        Test that close writes the state of the last save.
+        """
+        user = User()
+        other = User()
+        user.save()
+        user.first_name = "Betty"
+        self.storage.delete(other)
+        user.save()
+        self.storage.close()
+        storage = self.reloaded()
+        self.assertEqual(list(storage.all()), [f"User.{user.id}"])
+        self.assertEqual(storage.get(User, user.id).first_name, "Betty")
+
+    def test_journal_batches_are_merged(self):
+        """
+        Test that the journal records of a burst are merged by key.
+        """
+        self.storage.close()
+        self.storage = FileStorage(self.path, journal=True,
+                                   flush_interval=60)
+        with patch("models.storage", self.storage):
+            user = User()
+            other = User()
+            for i in range(10):
+                user.first_name = f"Betty {i}"
+                user.save()
+            self.storage.delete(other)
+            self.storage.save()
+            self.storage.flush()
+        with open(self.path + ".journal", encoding="utf-8") as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual([(r["op"], r["key"]) for r in records],
+                         [("put", f"User.{user.id}"),
+                          ("del", f"User.{other.id}")])
+        self.assertEqual(records[0]["data"]["first_name"], "Betty 9")
+
+
+class TestFileStorageDurability(TempStorageTestCase):
+    """
+    Test cases for atomic saves, checksums and group commit.
+    """
+
+    storage_options = {"fsync": True, "checksum": True}
+
+    def test_failed_save_keeps_old_file(self):
+        """
+        Test that a save interrupted by an error leaves the old file.
+        """
+        user = User()
+        self.storage.save()
+        user.first_name = "Betty"
+        with patch.object(User, "to_dict", side_effect=OSError("crash")):
+            with self.assertRaises(OSError):
+                self.storage.save()
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["file.json"])
+        self.assertIn(f"User.{user.id}", self.reloaded().all())
+
+    def test_crash_during_write_keeps_old_file(self):
+        """
+        Test that an error raised while the file is written
+        leaves the old file and no temporary file.
+        """
+        user = User()
+        self.storage.save()
+        User()
+        with patch("models.engine.file_storage.write_file",
+                   side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.storage.save()
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["file.json"])
+        self.assertEqual(list(self.reloaded().all()), [f"User.{user.id}"])
+
+    def test_damaged_file_is_reported(self):
+        """
+        Test that reload raises instead of starting empty when the
+        file does not match its checksum.
+        """
+        user = User()
+        user.first_name = "Betty"
+        user.save()
+        with open(self.path, "r+b") as file:
+            data = file.read()
+            file.seek(data.index(b"Betty"))
+            file.write(b"Betsy")
+        storage = FileStorage(self.path)
+        with self.assertRaisesRegex(ValueError, "checksum mismatch"):
+            storage.reload()
+
+    def test_truncated_file_is_reported(self):
+        """
+        Test that reload raises when the file cannot be parsed.
+        """
+        User().save()
+        with open(self.path, "r+b") as file:
+            file.truncate(20)
+        with self.assertRaises(ValueError):
+            FileStorage(self.path).reload()
+
+    def test_missing_file_is_empty(self):
+        """
+        Test that reload starts empty when there is no file.
+        """
+        self.storage.reload()
+        self.assertEqual(self.storage.all(), {})
+
+    def test_file_without_trailer(self):
+        """
+        Test that a file written without checksum is still loaded.
+        """
+        storage = FileStorage(self.path, checksum=False)
+        with patch("models.storage", storage):
+            user = User()
+            storage.save()
+        self.assertIn(f"User.{user.id}", self.reloaded().all())
+
+    def test_default_file_is_json(self):
+        """
+        Test that the file of a storage with the default options is
+        plain JSON, without trailer.
+        """
+        storage = FileStorage(self.path)
+        with patch("models.storage", storage):
+            user = User()
+            storage.save()
+        with open(self.path, encoding="utf-8") as file:
+            self.assertIn(f"User.{user.id}", json.load(file))
+
+    def test_group_commit(self):
+        """
+        Test that concurrent saves are written in fewer writes
+        and that each save returns once it is written.
+        """
+        self.storage.close()
+        self.storage = FileStorage(self.path, group_commit=True)
+        users = [User() for _ in range(8)]
+        for user in users:
+            self.storage.new(user)
+        writes = []
+        real_write = FileStorage._FileStorage__write_file
+
+        def slow_write(storage, path, fragments):
+            writes.append(path)
+            time.sleep(0.05)
+            real_write(storage, path, fragments)
+
+        with patch.object(FileStorage, "_FileStorage__write_file",
+                          slow_write):
+            threads = [threading.Thread(target=self.storage.save)
+                       for _ in users]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertLess(len(writes), len(users))
+        self.assertEqual(len(self.reloaded().all()), len(users))
+
+
+class TestFileStorageShared(TempStorageTestCase):
+    """
+    Test cases for a storage saved by several processes.
+    """
+
+    storage_options = {"shared": True}
+    script = """
+import sys
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.user import User
+storage = FileStorage(sys.argv[1], shared=True)
+storage.reload()
+with patch("models.storage", storage):
+    for _ in range(25):
+        User().save()
+"""
+
+    def test_versions(self):
+        """
+        Test that every save of an object increments its version.
+        """
+        user = User()
+        user.save()
+        self.assertEqual(user.to_dict()["__version__"], 1)
+        user.first_name = "Betty"
+        user.save()
+        self.assertEqual(user.to_dict()["__version__"], 2)
+        reloaded = self.reloaded().get(User, user.id)
+        self.assertEqual(reloaded.to_dict(), user.to_dict())
+
+    def test_merge(self):
+        """
+        Test that a save keeps the changes another process saved.
+        """
+        first, second = User(), User()
+        self.storage.save()
+        other = self.reloaded()
+        with patch("models.storage", other):
+            other.get(User, first.id).first_name = "Betty"
+            other.delete(other.get(User, second.id))
+            third = User()
+            other.save()
+        fourth = User()
+        self.storage.save()
+        keys = {f"User.{obj.id}" for obj in (first, third, fourth)}
+        self.assertEqual(set(self.storage.all()), keys)
+        self.assertEqual(self.storage.get(User, first.id).first_name,
+                         "Betty")
+        self.assertEqual(set(self.reloaded().all()), keys)
+
+    def test_merge_keeps_references(self):
+        """
+        Test that a merge updates the instances in place, so the
+        later changes made through references held to them are saved.
+        """
+        user = User()
+        self.storage.save()
+        other = self.reloaded()
+        with patch("models.storage", other):
+            other.get(User, user.id).first_name = "Betty"
+            other.save()
+        User().save()
+        self.assertIs(self.storage.get(User, user.id), user)
+        self.assertEqual(user.first_name, "Betty")
+        user.last_name = "Holberton"
+        user.save()
+        reloaded = self.reloaded().get(User, user.id)
+        self.assertEqual(reloaded.first_name, "Betty")
+        self.assertEqual(reloaded.last_name, "Holberton")
+
+    def test_conflict(self):
+        """
+        Test that a save of an object another process changed since
+        keeps the other version and raises after the other changes
+        are written.
+        """
+        user = User()
+        self.storage.save()
+        other = self.reloaded()
+        with patch("models.storage", other):
+            other.get(User, user.id).first_name = "Betty"
+            other.save()
+        user.first_name = "Holberton"
+        place = Place()
+        with self.assertRaises(ConflictError) as context:
+            self.storage.save()
+        self.assertEqual(context.exception.keys, [f"User.{user.id}"])
+        self.assertEqual(self.storage.get(User, user.id).first_name,
+                         "Betty")
+        reloaded = self.reloaded()
+        self.assertIn(f"Place.{place.id}", reloaded.all())
+        self.assertEqual(reloaded.get(User, user.id).first_name, "Betty")
+        self.storage.save()
+
+    def test_processes(self):
+        """
+        Test that the objects saved by concurrent processes are kept.
+        """
+        User().save()
+        processes = [subprocess.Popen([sys.executable, "-c", self.script,
+                                       self.path]) for _ in range(4)]
+        for process in processes:
+            self.assertEqual(process.wait(), 0)
+        User().save()
+        self.assertEqual(self.storage.count(User), 102)
+        self.assertEqual(self.reloaded().count(User), 102)
+
+    def test_options(self):
+        """
+        Test that a shared storage rewrites its file synchronously.
+        """
+        for options in ({"journal": True}, {"sharded": True},
+                        {"flush_interval": 1}, {"group_commit": True}):
+            with self.assertRaises(ValueError):
+                FileStorage(self.path, shared=True, **options)
+
+
+class TestFileStorageThreadSafe(TempStorageTestCase):
+    """
+    Test cases for a storage used by several threads.
+    """
+
+    storage_options = {"thread_safe": True}
+
+    def test_all_is_a_copy(self):
+        """
+        Test that all() can be iterated while objects are created.
+        """
+        User()
+        for _ in self.storage.all().values():
+            User()
+        self.assertEqual(self.storage.count(User), 2)
+
+    def test_stress(self):
+        """
+        Test that threads creating, changing, deleting and saving
+        objects while others read them raise no error and leave the
+        objects and their indexes consistent.
+        """
+        states = [State() for _ in range(3)]
+        errors = []
+        writing = threading.Event()
+
+        def write(worker):
+            try:
+                cities = []
+                for i in range(300):
+                    city = City()
+                    city.name = f"City {worker}-{i}"
+                    city.state_id = states[i % 3].id
+                    cities.append(city)
+                    if i % 7 == 0:
+                        self.storage.delete(cities.pop(0))
+                    if i % 50 == 0:
+                        self.storage.save()
+            except Exception as e:
+                errors.append(e)
+
+        def read():
+            try:
+                while writing.is_set():
+                    for obj in self.storage.all(City).values():
+                        obj.to_dict()
+                    for state in states:
+                        for city in self.storage.lookup(
+                                City, "state_id", state.id):
+                            self.assertEqual(city.state_id, state.id)
+                        self.storage.query(City).where(
+                            "state_id", "==", state.id).count()
+                    for city in itertools.islice(
+                            self.storage.iterate(City), 100):
+                        self.storage.get(City, city.id)
+                    self.storage.view("cities").results()
+            except Exception as e:
+                errors.append(e)
+
+        self.storage.register_view("cities", City, "state_id")
+        writing.set()
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        writers = [threading.Thread(target=write, args=(i,))
+                   for i in range(4)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        writing.clear()
+        for thread in readers:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        self.storage.save()
+        cities = self.storage.all(City)
+        self.assertEqual(len(cities), 4 * (300 - 43))
+        self.assertEqual(
+            sum(len(self.storage.lookup(City, "state_id", state.id))
+                for state in states), len(cities))
+        self.assertEqual(
+            sum(self.storage.view("cities").results().values()),
+            len(cities))
+        self.assertEqual(set(self.reloaded().all(City)), set(cities))
+
+    def test_transaction_blocks_other_writers(self):
+        """
+        Test that another thread saving during a transaction that
+        rolls back waits for it, and that its save is kept.
+        """
+        started = threading.Event()
+        created = []
+
+        def write():
+            started.wait(5)
+            user = User()
+            user.save()
+            created.append(user)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        with self.assertRaises(KeyError):
+            with self.storage.transaction():
+                User()
+                started.set()
+                time.sleep(0.05)
+                self.assertEqual(created, [])
+                raise KeyError
+        writer.join()
+        self.assertEqual(list(self.storage.all(User)),
+                         [f"User.{created[0].id}"])
+        self.assertEqual(self.reloaded().count(User), 1)
+
+
+class TestFileStorageThreadSafeLazy(TestFileStorageThreadSafe):
+    """
+    Test cases for a lazy storage used by several threads.
+    """
+
+    storage_options = {"thread_safe": True, "lazy": True}
+
+
+class TestFileStorageSnapshot(TempStorageTestCase):
+    """
+    Test cases for the snapshots of a storage.
+    """
+
+    def test_point_in_time(self):
+        """
+        Test that a snapshot holds the objects as they were when it was
+        taken, unsaved changes included, which the next save writes.
+        """
+        users = [User() for _ in range(3)]
+        for user in users:
+            user.first_name = "Betty"
+        self.storage.save()
+        users[0].first_name = "Holberton"
+        snapshot = self.storage.snapshot()
+        users[0].first_name = "Later"
+        users[1].first_name = "Later"
+        self.storage.delete(users[2])
+        User()
+        self.storage.save()
+        self.assertEqual(snapshot.count(User), 3)
+        self.assertEqual(
+            [snapshot.get(User, user.id)["first_name"] for user in users],
+            ["Holberton", "Betty", "Betty"])
+        self.assertEqual(snapshot.get(User, users[0].id),
+                         {**users[0].to_dict(), "first_name": "Holberton"})
+        self.assertEqual(self.reloaded().count(User), 3)
+        snapshot.close()
+        self.assertEqual(self.storage.snapshot().count(User), 3)
+
+    def test_writers_do_not_wait(self):
+        """
+        Test that another thread changes and saves the objects while a
+        snapshot is being read, which keeps reading the same objects.
+        """
+        users = [User() for _ in range(20)]
+        self.storage.save()
+        snapshot = self.storage.snapshot()
+        expected = list(snapshot.iterate(User))
+        reading = snapshot.iterate(User)
+        next(reading)
+
+        def write():
+            for i in range(20):
+                for user in users:
+                    user.first_name = f"{i}"
+                if i % 2:
+                    self.storage.delete(users.pop())
+                self.storage.save()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        writer.join(10)
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(len(list(reading)), 19)
+        self.assertEqual(list(snapshot.iterate(User)), expected)
+        self.assertEqual(self.reloaded().count(User), 10)
+
+
+class TestFileStorageSnapshotCache(TestFileStorageSnapshot):
+    """
+    Test cases for the snapshots of a storage with a cache, which
+    keeps the serialized objects on disk, in the binary format.
+    """
+
+    storage_options = {"cache_size": 5, "snapshot_format": "binary"}
+
+
+class TestFileStorageSnapshotThreadSafe(TestFileStorageSnapshot):
+    """
+    Test cases for the snapshots of a thread-safe storage with a
+    journal.
+    """
+
+    storage_options = {"thread_safe": True, "journal": True}
+
+
+class TestFileStorageBatch(TempStorageTestCase):
+    """
+    Test cases for batches and transactions.
+    """
+
+    def setUp(self):
+        """
+        Set up the storage and count its writes.
+        """
+        super().setUp()
+        write = patch.object(self.storage, "_write_changes",
+                             wraps=self.storage._write_changes)
+        self.writes = write.start()
+        self.addCleanup(write.stop)
+
+    def test_batch_saves_once(self):
+        """
+        Test that the saves of nested batches are deferred to one save
+        at the end of the outermost batch.
+        """
+        with self.storage.batch():
+            for _ in range(50):
+                User().save()
+            with self.storage.batch() as storage:
+                self.assertIs(storage, self.storage)
+                User().save()
+            self.assertEqual(self.writes.call_count, 0)
+        self.assertEqual(self.writes.call_count, 1)
+        self.assertEqual(self.reloaded().count(User), 51)
+
+    def test_batch_saves_on_error(self):
+        """
+        Test that a batch keeps and saves its changes if it raises.
+        """
+        with self.assertRaises(KeyError):
+            with self.storage.batch():
+                User()
+                raise KeyError
+        self.assertEqual(self.writes.call_count, 1)
+        self.assertEqual(self.reloaded().count(User), 1)
+
+    def test_transaction_commits(self):
+        """
+        Test that a transaction that does not raise saves once.
+        """
+        with self.storage.transaction():
+            for _ in range(10):
+                User().save()
+        self.assertEqual(self.writes.call_count, 1)
+        self.assertEqual(self.reloaded().count(User), 10)
+
+    def test_transaction_rolls_back(self):
+        """
+        Test that a transaction that raises restores the objects it
+        changed, created and deleted, indexes and views included, and
+        saves nothing.
+        """
+        self.storage.register_view("cities", City, "state_id")
+        state = State()
+        cities = [City() for _ in range(2)]
+        for city in cities:
+            city.state_id = state.id
+            city.name = "San Francisco"
+        self.storage.save()
+        cities[1].name = "Unsaved"
+        with self.assertRaises(KeyError):
+            with self.storage.transaction():
+                cities[0].state_id = "other"
+                cities[0].population = 10
+                self.storage.delete(cities[1])
+                created = City()
+                created.state_id = state.id
+                created.save()
+                raise KeyError
+        self.assertEqual(self.writes.call_count, 1)
+        self.assertIs(self.storage.get(City, cities[0].id), cities[0])
+        self.assertEqual(cities[0].state_id, state.id)
+        self.assertNotIn("population", cities[0].__dict__)
+        self.assertEqual(self.storage.get(City, cities[1].id).name, "Unsaved")
+        self.assertIsNone(self.storage.get(City, created.id))
+        self.assertEqual(
+            {city.id for city in self.storage.lookup(
+                City, "state_id", state.id)},
+            {city.id for city in cities})
+        self.assertEqual(self.storage.view("cities").get(state.id), 2)
+        self.assertEqual(self.reloaded().get(City, cities[1].id).name,
+                         "San Francisco")
+        self.storage.save()
+        self.assertEqual(self.reloaded().get(City, cities[1].id).name,
+                         "Unsaved")
+
+    def test_nested_transaction(self):
+        """
+        Test that a nested transaction that raises only undoes its own
+        changes, and that the outer one can still undo them all.
+        """
+        user = User()
+        user.first_name = "Betty"
+        with self.assertRaises(ValueError):
+            with self.storage.transaction():
+                user.first_name = "Outer"
+                with self.assertRaises(KeyError):
+                    with self.storage.transaction():
+                        user.first_name = "Inner"
+                        raise KeyError
+                self.assertEqual(user.first_name, "Outer")
+                user.last_name = "Holberton"
+                raise ValueError
+        self.assertEqual(user.first_name, "Betty")
+        self.assertNotIn("last_name", user.__dict__)
+        self.assertEqual(self.writes.call_count, 0)
+
+    def test_transaction_reads_changed_objects_only(self):
+        """
+        Test that a transaction only keeps the saved form of the
+        objects it changes.
+        """
+        users = [User() for _ in range(20)]
+        self.storage.save()
+        with patch.object(self.storage, "_saved_record",
+                          wraps=self.storage._saved_record) as saved:
+            with self.assertRaises(KeyError):
+                with self.storage.transaction():
+                    for user in users[:2]:
+                        user.first_name = "Betty"
+                        user.last_name = "Holberton"
+                    raise KeyError
+        self.assertEqual(saved.call_count, 2)
+        self.assertNotIn("first_name", users[0].__dict__)
+
+
+class TestFileStorageBatchCache(TestFileStorageBatch):
+    """
+    Test cases for the batches and transactions of a thread-safe
+    storage with a cache, which evicts objects during a transaction.
+    """
+
+    storage_options = {"cache_size": 3, "thread_safe": True}
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the Flusher class.
+"""
+
+import threading
+import time
+import unittest
+from models.engine.flusher import Flusher
+
+
+class TestFlusher(unittest.TestCase):
+    """
+    Test cases for coalescing requests on the background thread.
+    """
+
+    def setUp(self):
+        """
+        Set up a list recording the writes.
+        """
+        self.writes = []
+
+    def write(self):
+        """
+        Records a write and the thread it ran on.
+        """
+        self.writes.append(threading.current_thread())
+
+    def test_requests_are_coalesced(self):
+        """
+        Test that a burst of requests is written once, by the thread.
+        """
+        flusher = Flusher(self.write, interval=60)
+        self.addCleanup(flusher.close)
+        for _ in range(100):
+            flusher.request()
+        self.assertEqual(flusher.pending, 100)
+        flusher.flush()
+        self.assertEqual(flusher.pending, 0)
+        self.assertEqual(len(self.writes), 1)
+        self.assertIsNot(self.writes[0], threading.current_thread())
+
+    def test_flush_without_requests(self):
+        """
+        Test that flush returns at once when nothing is pending.
+        """
+        flusher = Flusher(self.write, interval=60)
+        self.addCleanup(flusher.close)
+        flusher.flush()
+        self.assertEqual(self.writes, [])
+
+    def test_interval(self):
+        """
+        Test that a request is written once the interval has passed.
+        """
+        written = threading.Event()
+        flusher = Flusher(written.set, interval=0.01)
+        self.addCleanup(flusher.close)
+        flusher.request()
+        self.assertTrue(written.wait(5))
+
+    def test_threshold(self):
+        """
+        Test that reaching the threshold starts a write at once.
+        """
+        written = threading.Event()
+        flusher = Flusher(written.set, interval=60, threshold=10)
+        self.addCleanup(flusher.close)
+        for _ in range(9):
+            flusher.request()
+        self.assertFalse(written.wait(0.05))
+        flusher.request()
+        self.assertTrue(written.wait(5))
+
+    def test_close(self):
+        """
+        Test that close writes the pending requests and stops the thread.
+        """
+        flusher = Flusher(self.write, interval=60)
+        flusher.request()
+        flusher.close()
+        flusher.close()
+        self.assertEqual(len(self.writes), 1)
+        with self.assertRaises(ValueError):
+            flusher.request()
+
+    def test_write_error_is_raised_by_flush(self):
+        """
+        Test that an error of the thread is raised by the flush, and
+        that the requests stay pending until a write succeeds.
+        """
+        errors = [OSError("disk full")] * 2
+
+        def fail():
+            if errors:
+                raise errors.pop()
+            self.write()
+
+        flusher = Flusher(fail, interval=60)
+        self.addCleanup(flusher.close)
+        flusher.request()
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                flusher.flush()
+            self.assertEqual(flusher.pending, 1)
+        flusher.flush()
+        self.assertEqual(flusher.pending, 0)
+        self.assertEqual(len(self.writes), 1)
+
+    def test_write_error_is_raised_by_every_waiting_flush(self):
+        """
+        Test that every thread waiting for a failed write gets its
+        error, as the saves of a group commit do.
+        """
+        def fail():
+            raise OSError("disk full")
+
+        flusher = Flusher(fail, interval=60)
+        results = []
+
+        def save():
+            flusher.request()
+            try:
+                flusher.flush(urgent=False)
+                results.append("ok")
+            except OSError:
+                results.append("error")
+
+        threads = [threading.Thread(target=save) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while len(flusher._Flusher__waiting) < 4:
+            time.sleep(0.001)
+        with self.assertRaises(OSError):
+            flusher.flush()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["error"] * 4)
+        with self.assertRaises(OSError):
+            flusher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the full-text index of FileStorage.
+"""
+
+import unittest
+from models.engine.fulltext import TextIndex, tokenize
+
+
+class TestTokenize(unittest.TestCase):
+    """
+    Test cases for the tokenize function.
+    """
+
+    def test_tokenize(self):
+        """
+        Test that texts are split into lowercase words.
+        """
+        self.assertEqual(tokenize("Great view, QUIET street!"),
+                         ["great", "view", "quiet", "street"])
+        self.assertEqual(tokenize("Café près du lac"),
+                         ["café", "près", "du", "lac"])
+        self.assertEqual(tokenize(" ... "), [])
+
+
+class TestTextIndex(unittest.TestCase):
+    """
+    Test cases for the TextIndex class.
+    """
+
+    def setUp(self):
+        """
+        Set up an index of three reviews.
+        """
+        self.index = TextIndex()
+        self.index.add("Review.1", "Great view. Great host, great food.")
+        self.index.add("Review.2", "Noisy street, but a great view")
+        self.index.add("Review.3", "Quiet street")
+
+    def test_lookup(self):
+        """
+        Test that only the texts containing every word match.
+        """
+        self.assertCountEqual(self.index.lookup("great VIEW"),
+                              ["Review.1", "Review.2"])
+        self.assertEqual(self.index.lookup("street quiet"), ["Review.3"])
+        self.assertEqual(self.index.lookup("great quiet"), [])
+        self.assertEqual(self.index.lookup("pool"), [])
+        self.assertEqual(self.index.lookup(""), [])
+
+    def test_rank(self):
+        """
+        Test that BM25 ranks frequent words in short texts first.
+        """
+        ranked = self.index.rank("great")
+        self.assertEqual([key for _, key in ranked],
+                         ["Review.1", "Review.2"])
+        self.assertGreater(ranked[0][0], ranked[1][0])
+        self.assertEqual(self.index.rank("street", limit=1)[0][1],
+                         "Review.3")
+
+    def test_add_remove(self):
+        """
+        Test that changed and removed texts are reindexed.
+        """
+        self.index.add("Review.3", "Great pool")
+        self.assertEqual(self.index.lookup("quiet"), [])
+        self.assertEqual(self.index.lookup("pool"), ["Review.3"])
+        self.index.add("Review.3", "")
+        self.index.remove("Review.1")
+        self.index.remove("Review.1")
+        self.assertEqual(self.index.lookup("great"), ["Review.2"])
+        self.assertEqual(len(self.index), 1)
+        self.index.add("Review.4", 42)
+        self.assertEqual(self.index.lookup("42"), ["Review.4"])
+
+    def test_changes(self):
+        """
+        Test that only actual changes are counted.
+        """
+        self.assertEqual(self.index.changes, 3)
+        self.index.add("Review.3", "Quiet street")
+        self.index.add("Review.5", "")
+        self.index.remove("Review.6")
+        self.assertEqual(self.index.changes, 3)
+        self.index.dumps()
+        self.assertEqual(self.index.changes, 0)
+
+    def test_dumps_loads_prune(self):
+        """
+        Test that a loaded index keeps the objects added again
+        and prune() removes the others.
+        """
+        index = TextIndex()
+        index.loads(self.index.dumps())
+        self.assertEqual(index.rank("great"), self.index.rank("great"))
+        index.add("Review.1", "Great view. Great host, great food.")
+        index.add("Review.2", "Noisy street")
+        self.assertEqual(index.changes, 1)
+        index.prune()
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.lookup("street"), ["Review.2"])
+        with self.assertRaises(ValueError):
+            index.loads(b"not an index")
+
+    def test_loads_rejects_invalid(self):
+        """
+        Test that an index whose arrays do not match its keys and
+        words is rejected as a whole.
+        """
+        data = self.index.dumps()
+        for name, value in (("keys", data["keys"][:1]),
+                            ("words", [1] * len(data["words"])),
+                            ("postings", [["!", ""]] * len(data["words"])),
+                            ("total_length", "3")):
+            with self.subTest(name=name):
+                index = TextIndex()
+                with self.assertRaises(ValueError):
+                    index.loads(dict(data, **{name: value}))
+                self.assertEqual(len(index), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,246 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the secondary indexes of FileStorage.
+"""
+
+import random
+import unittest
+from unittest.mock import patch
+from models.city import City
+from models.engine.indexes import (
+    HashIndex, KeyIndex, SortedIndex, foreign_keys)
+from models.engine.query import OPERATORS, sort_key
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+
+class TestHashIndex(unittest.TestCase):
+    """
+    Test cases for the HashIndex class.
+    """
+
+    def setUp(self):
+        """
+        Set up an index of three objects.
+        """
+        self.index = HashIndex()
+        self.index.add("City.1", "CA")
+        self.index.add("City.2", "NV")
+        self.index.add("City.3", "CA")
+
+    def test_lookup(self):
+        """
+        Test that lookup returns the keys of a value in order.
+        """
+        self.assertEqual(self.index.lookup("CA"), ["City.1", "City.3"])
+        self.assertEqual(self.index.lookup("NV"), ["City.2"])
+        self.assertEqual(self.index.lookup("TX"), [])
+        self.assertEqual(len(self.index), 3)
+
+    def test_add_replaces_value(self):
+        """
+        Test that indexing a key again moves it to its new value.
+        """
+        self.index.add("City.1", "NV")
+        self.assertEqual(self.index.lookup("CA"), ["City.3"])
+        self.assertEqual(self.index.lookup("NV"), ["City.2", "City.1"])
+        self.assertEqual(len(self.index), 3)
+
+    def test_remove(self):
+        """
+        Test that removed keys are no longer found.
+        """
+        self.index.remove("City.2")
+        self.index.remove("City.4")
+        self.assertEqual(self.index.lookup("NV"), [])
+        self.assertEqual(len(self.index), 2)
+
+    def test_unhashable_values(self):
+        """
+        Test that unhashable values are not indexed.
+        """
+        self.index.add("City.1", ["CA"])
+        self.assertEqual(self.index.lookup("CA"), ["City.3"])
+        self.assertEqual(self.index.lookup(["CA"]), [])
+        self.assertEqual(len(self.index), 2)
+
+
+class TestSortedIndex(unittest.TestCase):
+    """
+    Test cases for the SortedIndex class.
+    """
+
+    def setUp(self):
+        """
+        Set up an index of random values of mixed types, with chunks
+        small enough to be split and emptied, and a dictionary of
+        the expected values.
+        """
+        patcher = patch.object(SortedIndex, "CHUNK_SIZE", 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        rng = random.Random(0)
+        self.index = SortedIndex()
+        self.values = {}
+        for _ in range(3000):
+            key = f"Place.{rng.randrange(300)}"
+            if rng.random() < 0.2:
+                self.index.remove(key)
+                self.values.pop(key, None)
+                continue
+            value = rng.choice([rng.randrange(50), rng.uniform(0, 50),
+                                str(rng.randrange(9)), float("nan"), [1]])
+            self.index.add(key, value)
+            if value == value:
+                self.values[key] = value
+            else:
+                self.values.pop(key, None)
+
+    def ordered(self, keys):
+        """
+        Returns keys in the order of their values.
+        """
+        return sorted(keys, key=lambda key: (sort_key(self.values[key]),
+                                             key))
+
+    def test_len(self):
+        """
+        Test that NaN is not indexed and other values are.
+        """
+        self.assertEqual(len(self.index), len(self.values))
+
+    def test_search(self):
+        """
+        Test comparisons against the same comparisons in Python.
+        """
+        for op in ("==", "<", "<=", ">", ">="):
+            for value in (10, 10.5, "4", 0, 49):
+                expected = []
+                for key, actual in self.values.items():
+                    try:
+                        if (not isinstance(actual, list)
+                                and OPERATORS[op](actual, value)):
+                            expected.append(key)
+                    except TypeError:
+                        pass
+                with self.subTest(op=op, value=value):
+                    self.assertEqual(self.index.search(op, value),
+                                     self.ordered(expected))
+                    self.assertEqual(self.index.estimate(op, value),
+                                     len(expected))
+        self.assertIsNone(self.index.estimate("!=", 10))
+        self.assertIsNone(self.index.estimate("==", [1]))
+        self.assertEqual(self.index.lookup("4"), self.index.search("==", "4"))
+
+    def test_min_max(self):
+        """
+        Test that min() and max() follow sort_key().
+        """
+        self.assertEqual(self.index.min(),
+                         min(self.values.values(), key=sort_key))
+        self.assertEqual(self.index.max(), [1])
+        self.assertIsNone(SortedIndex().min())
+        self.assertIsNone(SortedIndex().max())
+
+    def test_cursor(self):
+        """
+        Test paging through ranges in both directions and resuming
+        from a position after the index changed.
+        """
+        numbers = self.ordered(
+            key for key, value in self.values.items()
+            if isinstance(value, (int, float)) and 5 <= value <= 20)
+        self.assertEqual(list(self.index.cursor(5, 20)), numbers)
+        self.assertEqual(len(list(self.index.cursor())), len(self.values))
+        self.assertEqual(
+            list(self.index.cursor(high=20)),
+            self.ordered(key for key, value in self.values.items()
+                         if isinstance(value, (int, float)) and value <= 20))
+
+        cursor = self.index.cursor(5, 20, descending=True)
+        pages = []
+        while True:
+            page = cursor.fetch(7)
+            if not page:
+                break
+            pages.extend(page)
+        self.assertEqual(pages, numbers[::-1])
+
+        cursor = self.index.cursor(5, 20)
+        self.assertEqual(cursor.fetch(3), numbers[:3])
+        self.index.remove(numbers[3])
+        self.index.add(numbers[0], 19.99)
+        resumed = self.index.cursor(5, 20, after=cursor.position)
+        self.assertEqual(resumed.fetch(2), numbers[4:6])
+
+
+class TestKeyIndex(unittest.TestCase):
+    """
+    Test cases for the KeyIndex class.
+    """
+
+    def setUp(self):
+        """
+        Set up an index of random keys, with chunks small enough to be
+        split and emptied, and the set of expected keys.
+        """
+        patcher = patch.object(KeyIndex, "CHUNK_SIZE", 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        rng = random.Random(0)
+        self.keys = {f"Place.{i}" for i in range(0, 100, 3)}
+        self.index = KeyIndex(self.keys)
+        for _ in range(1000):
+            key = f"{rng.choice(['City', 'Place'])}.{rng.randrange(100)}"
+            if rng.random() < 0.4:
+                self.index.remove(key)
+                self.keys.discard(key)
+            else:
+                self.index.add(key)
+                self.keys.add(key)
+
+    def test_len(self):
+        """
+        Test that keys are only counted once.
+        """
+        self.assertEqual(len(self.index), len(self.keys))
+        self.assertEqual(len(KeyIndex()), 0)
+
+    def test_after(self):
+        """
+        Test that after() returns the following keys in order.
+        """
+        ordered = sorted(self.keys)
+        self.assertEqual(self.index.after("", len(ordered) + 1), ordered)
+        self.assertEqual(self.index.after("", 3), ordered[:3])
+        self.assertEqual(self.index.after(ordered[4], 2), ordered[5:7])
+        self.assertEqual(self.index.after("City.5x", 1000, "City/"),
+                         [key for key in ordered if "City.5x" < key < "City/"])
+        self.assertEqual(self.index.after(ordered[-1], 10), [])
+
+
+class TestForeignKeys(unittest.TestCase):
+    """
+    Test cases for the foreign_keys function.
+    """
+
+    def test_foreign_keys(self):
+        """
+        Test that <class name>_id attributes refer to their class.
+        """
+        classes = {"State": State, "City": City, "User": User,
+                   "Place": Place, "Review": Review}
+        self.assertEqual(foreign_keys(classes), {
+            "State": [],
+            "City": [("state_id", "State")],
+            "User": [],
+            "Place": [("city_id", "City"), ("user_id", "User")],
+            "Review": [("place_id", "Place"), ("user_id", "User")],
+        })
+        self.assertEqual(foreign_keys({"City": City})["City"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
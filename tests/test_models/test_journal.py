@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the Journal class.
+"""
+
+import os
+import tempfile
+import unittest
+from models.engine.journal import Journal
+
+
+class TestJournal(unittest.TestCase):
+    """
+    Test cases for appending to and replaying a journal.
+    """
+
+    def setUp(self):
+        """
+        Set up a journal in a temporary directory.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.journal = Journal(os.path.join(self.tmp_dir.name, "j.journal"))
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_replay_missing_file(self):
+        """
+        Test that replaying a journal that was never written yields nothing.
+        """
+        self.assertEqual(list(self.journal.replay()), [])
+
+    def test_append_and_replay(self):
+        """
+        Test that records are replayed in the order they were appended.
+        """
+        self.journal.append({"User.1": {"id": "1"}})
+        self.journal.append({}, ["User.1"])
+        self.assertEqual(self.journal.entries, 2)
+        self.assertEqual(
+            list(self.journal.replay()),
+            [("put", "User.1", {"id": "1"}), ("del", "User.1", None)],
+        )
+
+    def test_torn_record_is_ignored(self):
+        """
+        Test that a partially written last record ends the replay.
+        """
+        self.journal.append({"User.1": {"id": "1"}})
+        with open(self.journal.path, "a", encoding="utf-8") as file:
+            file.write('{"op": "put", "key": "User.2", "da')
+        self.assertEqual(len(list(self.journal.replay())), 1)
+
+    def test_append_after_torn_record(self):
+        """
+        Test that the replay cuts a partially written last record, so
+        the records appended afterwards are replayed.
+        """
+        self.journal.append({"User.1": {"id": "1"}})
+        with open(self.journal.path, "a", encoding="utf-8") as file:
+            file.write('{"op": "put", "key": "User.2", "da')
+        list(self.journal.replay())
+        self.journal.append({"User.3": {"id": "3"}})
+        self.assertEqual([key for _, key, _ in self.journal.replay()],
+                         ["User.1", "User.3"])
+
+    def test_truncate(self):
+        """
+        Test that truncate removes every record.
+        """
+        self.journal.append({"User.1": {"id": "1"}})
+        self.journal.truncate()
+        self.assertEqual(self.journal.entries, 0)
+        self.assertFalse(os.path.exists(self.journal.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the incremental JSON object reader.
+"""
+
+import io
+import json
+import unittest
+from models.engine.json_stream import iter_object_items
+
+
+class TestIterObjectItems(unittest.TestCase):
+    """
+    Test cases for iter_object_items.
+    """
+
+    def items(self, text, chunk_size=4):
+        """
+        Returns the members read from text with a small chunk size.
+        """
+        return list(iter_object_items(io.StringIO(text), chunk_size))
+
+    def test_empty_object(self):
+        """
+        Test that an empty object yields nothing.
+        """
+        self.assertEqual(self.items("  { \n }  "), [])
+
+    def test_matches_json_load(self):
+        """
+        Test that members spanning many chunks decode like json.load.
+        """
+        data = {
+            "User.1": {"id": "1", "name": "Betty \"B\"", "list": [1, 2]},
+            "Place.2": {"id": "2", "price_by_night": 12345, "lat": -1.5e3},
+            "count": 1234567,
+        }
+        for indent in (None, 4):
+            text = json.dumps(data, indent=indent)
+            self.assertEqual(self.items(text), list(data.items()))
+
+    def test_member_text(self):
+        """
+        Test that the source text of each member can be yielded.
+        """
+        text = '{"a": [1, 2],\n  "bb" : {"c": "}"}}'
+        items = list(iter_object_items(io.StringIO(text), 3, with_text=True))
+        self.assertEqual(items, [
+            ("a", [1, 2], '"a": [1, 2]'),
+            ("bb", {"c": "}"}, '"bb" : {"c": "}"}'),
+        ])
+
+    def test_malformed_document(self):
+        """
+        Test that malformed or truncated documents raise ValueError.
+        """
+        for text in ("", "[]", '{"a": 1', '{"a" 1}', '{"a": 1,}', "{1: 2}"):
+            with self.assertRaises(ValueError):
+                self.items(text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the file locks, signatures and
+reader-writer locks of models.engine.locking.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from models.engine.durable import atomic_write
+from models.engine.locking import (
+    ConflictError, ReadWriteLock, file_lock, file_signature,
+    synchronized_iterator)
+
+INCREMENT = """
+import sys
+from models.engine.locking import file_lock
+path = sys.argv[1]
+for _ in range(50):
+    with file_lock(path + ".lock"):
+        with open(path) as file:
+            count = int(file.read())
+        with open(path, "w") as file:
+            file.write(str(count + 1))
+"""
+
+
+class TestLocking(unittest.TestCase):
+    """
+    Test cases for file_lock, file_signature and ConflictError.
+    """
+
+    def setUp(self):
+        """
+        Set up a temporary directory.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "data")
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_lock_excludes_processes(self):
+        """
+        Test that read-modify-write cycles of processes holding the
+        lock do not lose updates.
+        """
+        with open(self.path, "w") as file:
+            file.write("0")
+        processes = [subprocess.Popen([sys.executable, "-c", INCREMENT,
+                                       self.path]) for _ in range(4)]
+        for process in processes:
+            self.assertEqual(process.wait(), 0)
+        with open(self.path) as file:
+            self.assertEqual(file.read(), "200")
+
+    def test_signature(self):
+        """
+        Test that replacing a file changes its signature.
+        """
+        self.assertIsNone(file_signature(self.path))
+        with atomic_write(self.path) as file:
+            file.write(b"a")
+        signature = file_signature(self.path)
+        self.assertEqual(file_signature(self.path), signature)
+        with atomic_write(self.path) as file:
+            file.write(b"a")
+        self.assertNotEqual(file_signature(self.path), signature)
+
+    def test_conflict_error(self):
+        """
+        Test that the error lists the keys in order.
+        """
+        error = ConflictError(["User.2", "User.1"])
+        self.assertEqual(error.keys, ["User.1", "User.2"])
+        self.assertIn("User.1, User.2", str(error))
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """
+    Test cases for the ReadWriteLock class.
+    """
+
+    def setUp(self):
+        """
+        Set up an unlocked lock.
+        """
+        self.lock = ReadWriteLock()
+
+    def test_readers_share(self):
+        """
+        Test that readers hold the lock at the same time.
+        """
+        barrier = threading.Barrier(3, timeout=5)
+
+        def read():
+            with self.lock.read():
+                barrier.wait()
+
+        threads = [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+
+    def test_writer_waits_and_goes_first(self):
+        """
+        Test that a writer waits for the reader holding the lock, and
+        that a reader arriving after the writer waits for it.
+        """
+        events = []
+        reading = threading.Event()
+        release = threading.Event()
+
+        def first_reader():
+            with self.lock.read():
+                reading.set()
+                release.wait(5)
+                events.append("first read")
+
+        def writer():
+            with self.lock.write():
+                events.append("write")
+
+        def second_reader():
+            with self.lock.read():
+                events.append("second read")
+
+        threads = [threading.Thread(target=first_reader)]
+        threads[0].start()
+        reading.wait(5)
+        threads.append(threading.Thread(target=writer))
+        threads[1].start()
+        while not self.lock._ReadWriteLock__waiting_writers:
+            time.sleep(0.001)
+        threads.append(threading.Thread(target=second_reader))
+        threads[2].start()
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(events, ["first read", "write", "second read"])
+
+    def test_reentrant(self):
+        """
+        Test that the lock can be taken again by its holder, but not
+        for writing by a reader.
+        """
+        with self.lock.write():
+            with self.lock.write():
+                with self.lock.read():
+                    pass
+        with self.lock.read():
+            with self.lock.read():
+                pass
+            with self.assertRaises(RuntimeError):
+                with self.lock.write():
+                    pass
+        with self.lock.write():
+            pass
+
+    def test_synchronized_iterator(self):
+        """
+        Test that the lock is only held while an item is computed.
+        """
+        def items():
+            for i in range(3):
+                self.assertEqual(self.lock._ReadWriteLock__writes, 1)
+                yield i
+
+        iterator = synchronized_iterator(items, self.lock.write)()
+        self.assertEqual(next(iterator), 0)
+        self.assertEqual(self.lock._ReadWriteLock__writes, 0)
+        self.assertEqual(list(iterator), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
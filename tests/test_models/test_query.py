@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the Query class.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.engine.query import sort_key
+from models.place import Place
+
+
+class TestQuery(unittest.TestCase):
+    """
+    Test cases for filtering, ordering and limiting objects.
+    """
+
+    def setUp(self):
+        """
+        Set up a temporary storage holding ten places.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = FileStorage(os.path.join(self.tmp_dir.name, "f.json"))
+        patcher = patch("models.storage", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.places = []
+        for i in range(10):
+            place = Place()
+            place.city_id = f"city-{i % 2}"
+            place.price_by_night = (i * 37) % 10 * 10
+            place.max_guest = i
+            self.places.append(place)
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_where(self):
+        """
+        Test that every condition must match.
+        """
+        query = self.storage.query(Place).where("price_by_night", "<", 50) \
+            .where("max_guest", ">=", 4)
+        expected = [place for place in self.places
+                    if place.price_by_night < 50 and place.max_guest >= 4]
+        self.assertEqual(query.all(), expected)
+        self.assertEqual(query.count(), len(expected))
+        self.assertEqual(query.first(), expected[0])
+
+    def test_uncomparable_values(self):
+        """
+        Test that missing or uncomparable attributes do not match.
+        """
+        self.places[0].max_guest = "many"
+        query = self.storage.query("Place").where("max_guest", ">", 8)
+        self.assertEqual(query.all(), [self.places[9]])
+        query = self.storage.query("Place").where("owner", "==", None)
+        self.assertEqual(query.all(), [])
+        with self.assertRaises(ValueError):
+            query.where("max_guest", "~", 1)
+
+    def test_has(self):
+        """
+        Test that has and !has only match list attributes.
+        """
+        self.places[0].amenity_ids = ["wifi"]
+        self.places[1].amenity_ids = "wifi"
+        self.places[2].amenity_ids = ("wifi", "pool")
+        query = self.storage.query(Place).where("amenity_ids", "has", "wifi")
+        self.assertEqual(query.all(), [self.places[0], self.places[2]])
+        query = self.storage.query(Place).where("max_guest", "<", 3) \
+            .where("amenity_ids", "!has", "pool")
+        self.assertEqual(query.all(), self.places[:1])
+
+    def test_order_and_limit(self):
+        """
+        Test that ordered limits return the same objects as a sort.
+        """
+        def price(place):
+            return place.price_by_night
+
+        for descending in (False, True):
+            ordered = sorted(self.places, key=price, reverse=descending)
+            query = self.storage.query(Place).order_by(
+                "price_by_night", descending)
+            self.assertEqual(query.all(), ordered)
+            self.assertEqual(query.limit(3).all(), ordered[:3])
+        self.assertEqual(self.storage.query(Place).limit(2).all(),
+                         self.places[:2])
+        self.assertEqual(self.storage.query(Place).limit(0).all(), [])
+
+    def test_plan(self):
+        """
+        Test that the most selective indexed condition uses its index.
+        """
+        query = self.storage.query(Place).where("latitude", ">", -1)
+        self.assertIsNone(query.plan()[0])
+        self.assertTrue(query.explain().startswith("scan Place (~10"))
+
+        query = self.storage.query(Place).where("max_guest", ">", 2)
+        self.assertEqual(query.plan()[0], ("max_guest", ">", 2))
+        self.assertTrue(query.explain().startswith(
+            "index Place.max_guest > 2 (~7 objects)"))
+
+        query.where("city_id", "==", "city-1").order_by("max_guest", True) \
+            .limit(2)
+        self.assertEqual(query.plan()[0], ("city_id", "==", "city-1"))
+        self.assertEqual(
+            query.explain(),
+            "index Place.city_id == 'city-1' (~5 objects) -> "
+            "filter max_guest > 2 -> top 2 by max_guest desc")
+        self.assertEqual(query.all(), [self.places[9], self.places[7]])
+
+    def test_range_plan(self):
+        """
+        Test that a range on a sorted attribute uses its index.
+        """
+        query = self.storage.query(Place).where("price_by_night", ">=", 40) \
+            .where("price_by_night", "<", 70)
+        self.assertEqual(query.plan()[0], ("price_by_night", ">=", 40))
+        self.assertEqual(
+            query.explain(),
+            "index Place.price_by_night >= 40 (~6 objects) -> "
+            "filter price_by_night < 70")
+        self.assertCountEqual(
+            query.all(),
+            [place for place in self.places
+             if 40 <= place.price_by_night < 70])
+
+    def test_lazy_storage(self):
+        """
+        Test that an indexed query only creates the matching instances.
+        """
+        self.storage.save()
+        storage = FileStorage(self.storage._FileStorage__file_path,
+                              lazy=True)
+        storage.reload()
+        found = storage.query(Place).where("city_id", "==", "city-0").all()
+        self.assertEqual([place.id for place in found],
+                         [place.id for place in self.places[::2]])
+        self.assertEqual(len(storage._FileStorage__objects), 5)
+
+    def test_sort_key(self):
+        """
+        Test that numbers come before strings and other values.
+        """
+        values = ["b", None, 2.5, "a", 1]
+        self.assertEqual(sorted(values, key=sort_key),
+                         [1, 2.5, "a", "b", None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the Snapshot class.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from models.engine.snapshot import Snapshot
+from models.user import User
+
+
+class Records(dict):
+    """
+    Records of JSON text, recording whether they were closed.
+    """
+
+    closed = False
+
+    def close(self):
+        """
+        Records the call.
+        """
+        self.closed = True
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    Test cases for the Snapshot class.
+    """
+
+    def setUp(self):
+        """
+        Set up a snapshot of a few objects stored as JSON text.
+        """
+        self.objects = {
+            f"{cls_name}.{i}": {"id": str(i), "__class__": cls_name,
+                                "tags": [i]}
+            for cls_name in ("User", "Place", "City") for i in range(3)}
+        self.records = Records(
+            (key, json.dumps(value)) for key, value in self.objects.items())
+        self.snapshot = Snapshot(self.records, json.loads)
+
+    def test_read(self):
+        """
+        Test that objects are decoded, by class and in key order.
+        """
+        self.assertEqual(len(self.snapshot), 9)
+        self.assertIn("User.1", self.snapshot)
+        self.assertEqual(self.snapshot.get(User, "1"), self.objects["User.1"])
+        self.assertIsNone(self.snapshot.get("User", "9"))
+        self.assertEqual(self.snapshot.keys(), sorted(self.objects))
+        self.assertEqual([value["id"] for value in
+                          self.snapshot.iterate("Place")], ["0", "1", "2"])
+        self.assertEqual(self.snapshot.count(User), 3)
+        self.assertEqual(self.snapshot.count("State"), 0)
+        self.assertEqual(self.snapshot.count(), 9)
+
+    def test_reads_are_copies(self):
+        """
+        Test that changing a returned object does not change the
+        snapshot.
+        """
+        self.snapshot.get(User, "1")["tags"].append(5)
+        self.assertEqual(self.snapshot.get(User, "1")["tags"], [1])
+
+    def test_close(self):
+        """
+        Test that a closed snapshot closes its records and cannot be
+        read.
+        """
+        with self.snapshot as snapshot:
+            self.assertEqual(snapshot.count(User), 3)
+        self.assertTrue(self.records.closed)
+        with self.assertRaises(ValueError):
+            self.snapshot.get(User, "1")
+        with self.assertRaises(ValueError):
+            len(self.snapshot)
+
+    def test_export_json(self):
+        """
+        Test that the export is a JSON object of every object.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "export.json")
+            self.snapshot.export_json(path)
+            with open(path, encoding="utf-8") as file:
+                self.assertEqual(json.load(file), self.objects)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the spatial index of FileStorage.
+"""
+
+import random
+import unittest
+from models.engine.spatial import GridIndex, distance_km, is_coordinate
+
+
+class TestDistance(unittest.TestCase):
+    """
+    Test cases for distance_km and is_coordinate.
+    """
+
+    def test_distance(self):
+        """
+        Test great-circle distances between known points.
+        """
+        self.assertEqual(distance_km(10, 20, 10, 20), 0)
+        # one degree of latitude
+        self.assertAlmostEqual(distance_km(0, 0, 1, 0), 111.195, places=2)
+        # San Francisco to Los Angeles
+        self.assertAlmostEqual(distance_km(37.7749, -122.4194,
+                                           34.0522, -118.2437), 559, delta=1)
+        # across the antimeridian
+        self.assertAlmostEqual(distance_km(0, 179.5, 0, -179.5),
+                               111.195, places=2)
+
+    def test_is_coordinate(self):
+        """
+        Test that only numbers within range are coordinates.
+        """
+        self.assertTrue(is_coordinate(0, 0))
+        self.assertTrue(is_coordinate(-90, 180.0))
+        self.assertFalse(is_coordinate(90.5, 0))
+        self.assertFalse(is_coordinate(0, -181))
+        self.assertFalse(is_coordinate("1", 0))
+        self.assertFalse(is_coordinate(True, 0))
+        self.assertFalse(is_coordinate(0, None))
+
+
+class TestGridIndex(unittest.TestCase):
+    """
+    Test cases for the GridIndex class.
+    """
+
+    def setUp(self):
+        """
+        Set up an index of random points and their brute-force
+        search.
+        """
+        rng = random.Random(0)
+        self.index = GridIndex(cell_size=1)
+        self.points = {}
+        for i in range(2000):
+            point = (rng.uniform(-90, 90), rng.uniform(-180, 180))
+            self.points[f"Place.{i}"] = point
+            self.index.add(f"Place.{i}", *point)
+
+    def test_add_remove(self):
+        """
+        Test that add replaces the point and remove forgets it.
+        """
+        self.index.add("Place.0", 1.5, 2.5)
+        self.assertEqual(self.index.point("Place.0"), (1.5, 2.5))
+        self.assertIn("Place.0", self.index.within(1, 2, 2, 3))
+        self.index.remove("Place.0")
+        self.index.remove("Place.0")
+        self.assertIsNone(self.index.point("Place.0"))
+        self.assertNotIn("Place.0", self.index.within(1, 2, 2, 3))
+        self.assertEqual(len(self.index), 1999)
+
+    def test_cell_size(self):
+        """
+        Test that the cell size must be a power of two.
+        """
+        self.assertEqual(GridIndex().cell_size, 0.125)
+        for cell_size in (0.1, 3, 0, -1):
+            with self.assertRaises(ValueError):
+                GridIndex(cell_size)
+
+    def test_invalid_points(self):
+        """
+        Test that invalid coordinates are not indexed.
+        """
+        self.index.add("Place.0", "north", 0)
+        self.index.add("Place.1", 91, 0)
+        self.assertIsNone(self.index.point("Place.0"))
+        self.assertIsNone(self.index.point("Place.1"))
+        self.assertEqual(len(self.index), 1998)
+
+    def test_within(self):
+        """
+        Test bounding boxes, small, large and across the antimeridian,
+        against a scan of every point.
+        """
+        for box in ((10, 20, 30.5, 40.5), (-90, -180, 90, 180),
+                    (-45.3, 170, 45.7, -170), (5, 5, 4, 6), (0, 0, 0, 0)):
+            south, west, north, east = box
+
+            def inside(longitude):
+                if west > east:
+                    return longitude >= west or longitude <= east
+                return west <= longitude <= east
+
+            expected = sorted(
+                key for key, (latitude, longitude) in self.points.items()
+                if south <= latitude <= north and inside(longitude))
+            with self.subTest(box=box):
+                self.assertEqual(sorted(self.index.within(*box)), expected)
+
+    def test_near(self):
+        """
+        Test radius searches, including around a pole and across the
+        antimeridian, against a scan of every point.
+        """
+        for center, radius in (((10, 20), 1500), ((85, 0), 1000),
+                               ((0, 179), 2000), ((-30, -60), 0),
+                               ((0, 0), 30000)):
+            expected = sorted(
+                (distance_km(*center, *point), key)
+                for key, point in self.points.items()
+                if distance_km(*center, *point) <= radius)
+            with self.subTest(center=center, radius=radius):
+                self.assertEqual(self.index.near(*center, radius), expected)
+                self.assertEqual(self.index.near(*center, radius, limit=3),
+                                 expected[:3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""
+Unittest module for testing the aggregate views of FileStorage.
+"""
+
+import unittest
+from models.engine.views import AggregateView
+
+
+class TestAggregateView(unittest.TestCase):
+    """
+    Test cases for the AggregateView class.
+    """
+
+    def setUp(self):
+        """
+        Set up a view of the average price of places by city.
+        """
+        self.view = AggregateView("Place", "city_id", "avg",
+                                  "price_by_night")
+        self.view.add("Place.1", "city-1", 100)
+        self.view.add("Place.2", "city-1", 50.5)
+        self.view.add("Place.3", "city-2", "free")
+
+    def test_functions(self):
+        """
+        Test count, sum and avg, and that only numbers are summed.
+        """
+        self.assertEqual(self.view.get("city-1"), 75.25)
+        self.assertIsNone(self.view.get("city-2"))
+        self.assertIsNone(self.view.get("city-3"))
+        count = AggregateView("Review", "place_id")
+        total = AggregateView("Place", "city_id", "sum", "max_guest")
+        for i, (group, value) in enumerate((("a", 2), ("a", True),
+                                            ("b", 3))):
+            count.add(f"Obj.{i}", group, value)
+            total.add(f"Obj.{i}", group, value)
+        self.assertEqual(count.results(), {"a": 2, "b": 1})
+        self.assertEqual(total.results(), {"a": 2, "b": 3})
+        self.assertEqual(count.get("c"), 0)
+        self.assertEqual(total.get(["unhashable"]), 0)
+
+    def test_add_remove(self):
+        """
+        Test that objects move between groups and empty groups
+        are dropped.
+        """
+        self.view.add("Place.2", "city-2", 20)
+        self.assertEqual(self.view.results(),
+                         {"city-1": 100, "city-2": 20})
+        self.view.remove("Place.1")
+        self.view.remove("Place.1")
+        self.view.remove("Place.3")
+        self.assertEqual(self.view.results(), {"city-2": 20})
+        self.view.add("Place.4", ["unhashable"], 10)
+        self.assertEqual(len(self.view), 1)
+        self.view.clear()
+        self.assertEqual(self.view.results(), {})
+
+    def test_errors(self):
+        """
+        Test that the function and the attributes are checked.
+        """
+        with self.assertRaises(ValueError):
+            AggregateView("Place", "city_id", "median", "price_by_night")
+        with self.assertRaises(ValueError):
+            AggregateView("Place", "city_id", "avg")
+        with self.assertRaises(ValueError):
+            AggregateView("Place", ("city_id", "state_id"))
+
+
+if __name__ == "__main__":
+    unittest.main()